@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+from time import perf_counter
+from typing import List
+
+from chia.server.address_manager import AddressManager
+from chia.server.address_manager_store import AddressManagerStore
+from chia.types.peer_info import PeerInfo, TimestampedPeerInfo
+from chia.util.ints import uint16, uint64
+
+random.seed(123456789)
+
+# Seed-facing nodes learn about a lot of addresses
+NUM_ADDRESSES = 200_000
+NUM_SOURCES = 2_000
+NUM_GOOD = 5_000
+NUM_SELECTIONS = 20_000
+NUM_GET_PEERS = 100
+
+
+def rand_host() -> str:
+    return f"{random.randint(11, 99)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
+
+
+async def main() -> None:
+    now = int(time.time())
+    sources = [PeerInfo(rand_host(), uint16(8444)) for _ in range(NUM_SOURCES)]
+    addresses: List[TimestampedPeerInfo] = [
+        TimestampedPeerInfo(rand_host(), uint16(8444), uint64(now - random.randint(0, 24 * 60 * 60)))
+        for _ in range(NUM_ADDRESSES)
+    ]
+
+    address_manager = AddressManager()
+    start = perf_counter()
+    for index in range(0, NUM_ADDRESSES, 1000):
+        await address_manager.add_to_new_table(addresses[index : index + 1000], random.choice(sources))
+    add_time = perf_counter() - start
+
+    start = perf_counter()
+    for address in random.sample(addresses, NUM_GOOD):
+        await address_manager.mark_good(PeerInfo(address.host, address.port), test_before_evict=False)
+    mark_good_time = perf_counter() - start
+
+    start = perf_counter()
+    for _ in range(NUM_SELECTIONS):
+        await address_manager.select_peer()
+    select_time = perf_counter() - start
+
+    start = perf_counter()
+    for _ in range(NUM_GET_PEERS):
+        await address_manager.get_peers()
+    get_peers_time = perf_counter() - start
+
+    start = perf_counter()
+    async with address_manager.lock:
+        address_manager.cleanup(0, 0)
+    cleanup_time = perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        peers_file_path = Path(directory) / "peers.dat"
+        start = perf_counter()
+        await AddressManagerStore.serialize(address_manager, peers_file_path)
+        serialize_time = perf_counter() - start
+        start = perf_counter()
+        await AddressManagerStore.create_address_manager(peers_file_path)
+        deserialize_time = perf_counter() - start
+
+    print(f"{NUM_ADDRESSES} addresses from {NUM_SOURCES} sources, {await address_manager.size()} in the tables")
+    print(f"  add:         {add_time:0.2f}s")
+    print(f"  mark good:   {mark_good_time * 1000000 / NUM_GOOD:0.1f}us per address")
+    print(f"  select peer: {select_time * 1000000 / NUM_SELECTIONS:0.1f}us per selection")
+    print(f"  get peers:   {get_peers_time * 1000 / NUM_GET_PEERS:0.2f}ms per call")
+    print(f"  cleanup:     {cleanup_time * 1000:0.2f}ms")
+    print(f"  serialize:   {serialize_time:0.2f}s")
+    print(f"  deserialize: {deserialize_time:0.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
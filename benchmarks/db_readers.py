@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+from time import monotonic
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from utils import ph, rand_hash, rewards
+
+from chia.full_node.coin_store import CoinStore
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.db_wrapper import DBWrapper2
+from chia.util.ints import uint32, uint64
+
+NUM_BLOCKS = 200
+NUM_CLIENTS = 32
+REQUESTS_PER_CLIENT = 100
+
+DB_PATH = Path("db-readers-benchmark.db")
+
+# (reader_count, max_reader_count, cache_size, mmap_size)
+CONFIGURATIONS: List[Tuple[int, Optional[int], Optional[int], Optional[int]]] = [
+    (1, None, None, None),
+    (2, None, None, None),
+    (4, None, None, None),
+    (8, None, None, None),
+    (16, None, None, None),
+    (1, 16, None, None),
+    (4, 16, None, None),
+    (4, None, -65536, None),
+    (4, None, None, 1 << 30),
+    (4, 16, -16384, 1 << 30),
+]
+
+# we need seeded random, to have reproducible benchmark runs
+random.seed(123456789)
+
+
+async def build_db(version: int) -> Tuple[List[bytes32], List[bytes32]]:
+    try:
+        os.unlink(DB_PATH)
+    except FileNotFoundError:
+        pass
+
+    all_coins: List[bytes32] = []
+    all_puzzle_hashes: List[bytes32] = []
+    unspent: List[bytes32] = []
+    db_wrapper = await DBWrapper2.create(database=DB_PATH, db_version=version, reader_count=1)
+    try:
+        coin_store = await CoinStore.create(db_wrapper)
+        timestamp = 1631794488
+        for height in range(1, NUM_BLOCKS + 1):
+            # a few puzzle hashes receive many coins, like the ones of busy wallets
+            puzzle_hashes = [rand_hash() for _ in range(20)]
+            additions = [Coin(rand_hash(), random.choice(puzzle_hashes), uint64(1)) for _ in range(2000)]
+            farmer_coin, pool_coin = rewards(uint32(height))
+            all_coins += [coin.name() for coin in additions]
+            all_puzzle_hashes += puzzle_hashes
+            unspent += [coin.name() for coin in additions]
+            random.shuffle(unspent)
+            removals = unspent[:500]
+            unspent = unspent[500:]
+            await coin_store.new_block(uint32(height), uint64(timestamp), {pool_coin, farmer_coin}, additions, removals)
+            timestamp += 19
+    finally:
+        await db_wrapper.close()
+
+    return all_coins, all_puzzle_hashes
+
+
+async def run_workload(
+    version: int,
+    all_coins: List[bytes32],
+    all_puzzle_hashes: List[bytes32],
+    reader_count: int,
+    max_reader_count: Optional[int],
+    cache_size: Optional[int],
+    mmap_size: Optional[int],
+) -> None:
+    db_wrapper = await DBWrapper2.create(
+        database=DB_PATH,
+        db_version=version,
+        reader_count=reader_count,
+        max_reader_count=max_reader_count,
+        cache_size=cache_size,
+        mmap_size=mmap_size,
+    )
+    try:
+        coin_store = await CoinStore.create(db_wrapper)
+        rng = random.Random(987654321)
+
+        # a mix of the reads of the coin RPCs of the full node and of the wallet protocol
+        requests: List[Callable[[], Awaitable[object]]] = [
+            lambda: coin_store.get_coin_record(rng.choice(all_coins)),
+            lambda: coin_store.get_coin_records_by_names(True, rng.sample(all_coins, 50)),
+            lambda: coin_store.get_coin_records_by_puzzle_hash(False, rng.choice(all_puzzle_hashes)),
+            lambda: coin_store.get_coin_records_by_puzzle_hashes(True, rng.sample(all_puzzle_hashes, 10)),
+            lambda: coin_store.get_coins_removed_at_height(uint32(rng.randint(1, NUM_BLOCKS))),
+            lambda: coin_store.get_coin_records_by_puzzle_hash(True, ph),
+        ]
+        weights = [40, 20, 15, 10, 10, 5]
+
+        async def client() -> None:
+            for request in rng.choices(requests, weights, k=REQUESTS_PER_CLIENT):
+                await request()
+
+        start = monotonic()
+        await asyncio.gather(*(client() for _ in range(NUM_CLIENTS)))
+        total_time = monotonic() - start
+
+        reader_wait = db_wrapper.statistics.reader_wait
+        pool = f"{reader_count}" if max_reader_count is None else f"{reader_count}-{max_reader_count}"
+        print(
+            f"readers: {pool:<6} cache_size: {str(cache_size):<7} mmap_size: {str(mmap_size):<11} "
+            f"{total_time:0.4f}s, {NUM_CLIENTS * REQUESTS_PER_CLIENT / total_time:0.1f} requests/s, "
+            f"reader wait avg: {reader_wait.total / reader_wait.count * 1000:0.3f}ms "
+            f"max: {reader_wait.max * 1000:0.3f}ms, ended with {db_wrapper.reader_count} readers"
+        )
+    finally:
+        await db_wrapper.close()
+
+
+async def run_db_readers_benchmark(version: int) -> None:
+    print("Building database ", end="")
+    sys.stdout.flush()
+    all_coins, all_puzzle_hashes = await build_db(version)
+    print(f"{os.path.getsize(DB_PATH) / 1000000:.3f} MB")
+
+    for reader_count, max_reader_count, cache_size, mmap_size in CONFIGURATIONS:
+        await run_workload(version, all_coins, all_puzzle_hashes, reader_count, max_reader_count, cache_size, mmap_size)
+
+
+if __name__ == "__main__":
+    print("version 1")
+    asyncio.run(run_db_readers_benchmark(1))
+    print("version 2")
+    asyncio.run(run_db_readers_benchmark(2))
@@ -1,24 +1,35 @@
 from __future__ import annotations
 
+import json
 import random
 from time import perf_counter
+from typing import Any, Callable, Dict
 
+from chia.util.json_util import dict_to_json_str
 from tests.util.test_full_block_utils import get_full_blocks
 
 random.seed(123456789)
 
 
 def main() -> None:
-    total_time = 0.0
+    # The RPC responses used to get created from the json dicts, the streaming encoder writes the blocks directly
+    modes: Dict[str, Callable[[Any], object]] = {
+        "to_json_dict": lambda block: block.to_json_dict(),
+        "json.dumps(to_json_dict)": lambda block: json.dumps(block.to_json_dict(), sort_keys=True),
+        "dict_to_json_str": dict_to_json_str,
+    }
+    total_times = {mode: 0.0 for mode in modes}
     counter = 0
     for block in get_full_blocks():
-        start = perf_counter()
-        block.to_json_dict()
-        end = perf_counter()
-        total_time += end - start
+        for mode, encode in modes.items():
+            start = perf_counter()
+            encode(block)
+            end = perf_counter()
+            total_times[mode] += end - start
         counter += 1
 
-    print(f"total time: {total_time:0.2f}s ({counter} iterations)")
+    for mode, total_time in total_times.items():
+        print(f"{mode:<25} total time: {total_time:0.2f}s ({counter} iterations)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import dataclasses
+import itertools
+import random
+from time import perf_counter
+from typing import Callable
+
+from benchmarks.utils import rand_bytes
+from chia.protocols.full_node_protocol import RespondBlocks
+from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.server.outbound_message import Message, make_msg
+from chia.types.blockchain_format.program import Program, SerializedProgram
+from chia.util.ints import uint16, uint32
+from tests.util.test_full_block_utils import get_full_blocks
+
+random.seed(123456789)
+
+NUM_BLOCKS = 32
+NUM_RUNS = 10
+
+
+def measure(cb: Callable[[], object]) -> float:
+    start = perf_counter()
+    for _ in range(NUM_RUNS):
+        cb()
+    return (perf_counter() - start) * 1000 / NUM_RUNS
+
+
+def main() -> None:
+    # Transaction blocks with large generators, like the ones sent during a long sync
+    generator = SerializedProgram.from_program(Program.to([rand_bytes(1000) for _ in range(500)]))
+    blocks = [
+        dataclasses.replace(block, transactions_generator=generator)
+        for block in itertools.islice(get_full_blocks(), 2000)
+        if block.transactions_generator is not None
+    ][:NUM_BLOCKS]
+    message = make_msg(ProtocolMessageTypes.respond_blocks, RespondBlocks(uint32(0), uint32(NUM_BLOCKS - 1), blocks))
+    frame = bytes(Message(message.type, uint16(1), message.data))
+
+    print(f"{NUM_BLOCKS} blocks, message size: {len(frame) / 1024 / 1024:0.1f} MiB")
+    print(f"  message:        {measure(lambda: Message.from_bytes(frame)):0.2f}ms")
+    print(f"  respond_blocks: {measure(lambda: RespondBlocks.from_bytes(message.data)):0.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
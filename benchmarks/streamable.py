@@ -1,18 +1,29 @@
 from __future__ import annotations
 
+import io
 import json
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from enum import Enum
 from statistics import stdev
 from time import process_time as clock
 from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple, Type, Union
 
 import click
-from utils import EnumType, get_commit_hash, rand_bytes, rand_full_block, rand_hash
-
+from utils import (
+    EnumType,
+    get_commit_hash,
+    rand_block_record,
+    rand_bytes,
+    rand_full_block,
+    rand_hash,
+    rand_header_block,
+)
+
+from chia.consensus.block_record import BlockRecord
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.full_block import FullBlock
+from chia.types.header_block import HeaderBlock
 from chia.util.ints import uint8, uint64
 from chia.util.streamable import Streamable, streamable
 
@@ -112,6 +123,8 @@ class Data(str, Enum):
     all = "all"
     benchmark = "benchmark"
     full_block = "full_block"
+    header_block = "header_block"
+    block_record = "block_record"
 
 
 # The strings in this Enum are by purpose. See benchmark.utils.EnumType.
@@ -120,6 +133,7 @@ class Mode(str, Enum):
     creation = "creation"
     to_bytes = "to_bytes"
     from_bytes = "from_bytes"
+    from_bytes_fields = "from_bytes_fields"
     to_json = "to_json"
     from_json = "from_json"
 
@@ -128,6 +142,20 @@ def to_bytes(obj: Any) -> bytes:
     return bytes(obj)
 
 
+def to_bytes_io(obj: Any) -> io.BytesIO:
+    return io.BytesIO(bytes(obj))
+
+
+def from_bytes_fields(cls: Type[Any]) -> Callable[[io.BytesIO], Any]:
+    # `Streamable.parse` only uses the generated parse functions for a `BytesReader`, so this walks the fields of all
+    # objects with their single parse functions
+    def parse(f: io.BytesIO) -> Any:
+        f.seek(0)
+        return cls.parse(f)
+
+    return parse
+
+
 @dataclass
 class ModeParameter:
     conversion_cb: Callable[[Any], Any]
@@ -141,29 +169,24 @@ class BenchmarkParameter:
     mode_parameter: Dict[Mode, Optional[ModeParameter]]
 
 
+def streamable_mode_parameter(cls: Type[Any]) -> Dict[Mode, Optional[ModeParameter]]:
+    return {
+        Mode.creation: None,
+        Mode.to_bytes: ModeParameter(to_bytes),
+        Mode.from_bytes: ModeParameter(cls.from_bytes, to_bytes),
+        Mode.from_bytes_fields: ModeParameter(from_bytes_fields(cls), to_bytes_io),
+        Mode.to_json: ModeParameter(cls.to_json_dict),
+        Mode.from_json: ModeParameter(cls.from_json_dict, cls.to_json_dict),
+    }
+
+
 benchmark_parameter: Dict[Data, BenchmarkParameter] = {
     Data.benchmark: BenchmarkParameter(
-        BenchmarkClass,
-        get_random_benchmark_object,
-        {
-            Mode.creation: None,
-            Mode.to_bytes: ModeParameter(to_bytes),
-            Mode.from_bytes: ModeParameter(BenchmarkClass.from_bytes, to_bytes),
-            Mode.to_json: ModeParameter(BenchmarkClass.to_json_dict),
-            Mode.from_json: ModeParameter(BenchmarkClass.from_json_dict, BenchmarkClass.to_json_dict),
-        },
-    ),
-    Data.full_block: BenchmarkParameter(
-        FullBlock,
-        rand_full_block,
-        {
-            Mode.creation: None,
-            Mode.to_bytes: ModeParameter(to_bytes),
-            Mode.from_bytes: ModeParameter(FullBlock.from_bytes, to_bytes),
-            Mode.to_json: ModeParameter(FullBlock.to_json_dict),
-            Mode.from_json: ModeParameter(FullBlock.from_json_dict, FullBlock.to_json_dict),
-        },
+        BenchmarkClass, get_random_benchmark_object, streamable_mode_parameter(BenchmarkClass)
     ),
+    Data.full_block: BenchmarkParameter(FullBlock, rand_full_block, streamable_mode_parameter(FullBlock)),
+    Data.header_block: BenchmarkParameter(HeaderBlock, rand_header_block, streamable_mode_parameter(HeaderBlock)),
+    Data.block_record: BenchmarkParameter(BlockRecord, rand_block_record, streamable_mode_parameter(BlockRecord)),
 }
 
 
@@ -274,7 +297,9 @@ def run(data: Data, mode: Mode, runs: int, ms: int, live: bool, output: TextIO,
 
                         if current_mode == Mode.creation:
                             cls = type(obj)
-                            us_iteration_results = run_for_ms(lambda: cls(**obj.__dict__), ms)
+                            # The `__dict__` also holds the cached serialization and hash of some classes
+                            kwargs = {field.name: getattr(obj, field.name) for field in fields(obj)}
+                            us_iteration_results = run_for_ms(lambda: cls(**kwargs), ms)
                         else:
                             assert current_mode_parameter is not None
                             conversion_cb = current_mode_parameter.conversion_cb
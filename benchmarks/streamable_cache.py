@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import itertools
+import random
+import tracemalloc
+from time import perf_counter
+from typing import Callable, List, Optional, Type
+
+from benchmarks.utils import rand_bytes
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.foliage import Foliage
+from chia.types.blockchain_format.program import Program, SerializedProgram
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.coin_spend import CoinSpend
+from chia.types.header_block import HeaderBlock
+from chia.types.spend_bundle import SpendBundle
+from chia.util.generator_tools import get_block_header
+from chia.util.ints import uint64
+from chia.util.streamable import Streamable
+from tests.util.test_full_block_utils import get_full_blocks, rand_g2
+
+random.seed(123456789)
+
+NUM_OBJECTS = 1000
+NUM_RUNS = 10
+
+
+def measure(cb: Callable[[], object]) -> float:
+    start = perf_counter()
+    for _ in range(NUM_RUNS):
+        cb()
+    return (perf_counter() - start) * 1000 / NUM_RUNS
+
+
+def rand_spend_bundle() -> SpendBundle:
+    coin_spends = [
+        CoinSpend(
+            Coin(bytes32(rand_bytes(32)), bytes32(rand_bytes(32)), uint64(random.randint(1, 10000))),
+            SerializedProgram.from_program(Program.to([rand_bytes(32) for _ in range(20)])),
+            SerializedProgram.from_program(Program.to([rand_bytes(32) for _ in range(5)])),
+        )
+        for _ in range(3)
+    ]
+    return SpendBundle(coin_spends, rand_g2())
+
+
+def memory_usage(cls: Type[Streamable], blobs: List[bytes]) -> int:
+    tracemalloc.start()
+    # Parse from fresh buffers, which get freed again unless the objects keep them
+    objects = [cls.from_bytes(bytes(bytearray(blob))) for blob in blobs]
+    for obj in objects:
+        obj.get_hash()
+        bytes(obj)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def run(cls: Type[Streamable], blobs: List[bytes]) -> None:
+    limit: Optional[int] = cls.serialization_cache_limit
+    results = {}
+    for enabled in [False, True]:
+        cls.serialization_cache_limit = limit if enabled else None
+        objects = [cls.from_bytes(blob) for blob in blobs]
+        results[enabled] = (
+            measure(lambda: [obj.get_hash() for obj in objects]),
+            measure(lambda: [bytes(obj) for obj in objects]),
+            memory_usage(cls, blobs),
+        )
+    cls.serialization_cache_limit = limit
+
+    average_size = sum(len(blob) for blob in blobs) / len(blobs)
+    print(f"{cls.__name__}, {len(blobs)} objects, {average_size:0.0f} bytes each, limit: {limit}")
+    for enabled, (hash_ms, bytes_ms, memory) in results.items():
+        print(
+            f"  cache {'on ' if enabled else 'off'}: get_hash {hash_ms:0.2f}ms, bytes {bytes_ms:0.2f}ms, "
+            f"memory {memory / len(blobs):0.0f} bytes/object"
+        )
+
+
+def main() -> None:
+    header_blocks = [get_block_header(block, [], []) for block in itertools.islice(get_full_blocks(), NUM_OBJECTS)]
+    run(HeaderBlock, [bytes(block) for block in header_blocks])
+    run(Foliage, [bytes(block.foliage) for block in header_blocks])
+    run(SpendBundle, [bytes(rand_spend_bundle()) for _ in range(NUM_OBJECTS)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import random
+import tracemalloc
+from time import perf_counter
+
+from chia.full_node.subscriptions import PeerSubscriptions
+from chia.types.blockchain_format.sized_bytes import bytes32
+
+random.seed(123456789)
+
+NUM_PEERS = 500
+NUM_SUBSCRIPTIONS = 1_000_000
+# Share of the puzzle hashes which more than one peer subscribed to
+SHARED_SUBSCRIPTIONS = 0.1
+NUM_LOOKUPS = 100_000
+
+
+def rand_hash() -> bytes32:
+    return bytes32(random.getrandbits(256).to_bytes(32, "big"))
+
+
+def main() -> None:
+    peers = [rand_hash() for _ in range(NUM_PEERS)]
+    per_peer = NUM_SUBSCRIPTIONS // NUM_PEERS
+    shared = [rand_hash() for _ in range(int(per_peer * SHARED_SUBSCRIPTIONS))]
+    requests = [shared + [rand_hash() for _ in range(per_peer - len(shared))] for _ in peers]
+    hits = [random.choice(request) for request in random.choices(requests, k=NUM_LOOKUPS)]
+    misses = [rand_hash() for _ in range(NUM_LOOKUPS)]
+
+    tracemalloc.start()
+    subscriptions = PeerSubscriptions()
+    start = perf_counter()
+    for peer_id, puzzle_hashes in zip(peers, requests):
+        subscriptions.add_ph_subscriptions(peer_id, puzzle_hashes, NUM_SUBSCRIPTIONS)
+    add_time = perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The puzzle hashes of the requests are still referenced by the benchmark and don't count
+    del requests
+
+    start = perf_counter()
+    assert all(subscriptions.has_ph_subscription(puzzle_hash) for puzzle_hash in hits)
+    hit_time = perf_counter() - start
+
+    start = perf_counter()
+    assert not any(subscriptions.has_ph_subscription(puzzle_hash) for puzzle_hash in misses)
+    miss_time = perf_counter() - start
+
+    start = perf_counter()
+    peer_count = sum(len(subscriptions.peers_for_puzzle_hash(puzzle_hash)) for puzzle_hash in hits)
+    peers_time = perf_counter() - start
+
+    start = perf_counter()
+    for peer_id in peers:
+        subscriptions.remove_peer(peer_id)
+    remove_time = perf_counter() - start
+
+    print(f"{NUM_SUBSCRIPTIONS} subscriptions from {NUM_PEERS} peers")
+    print(f"  memory:       {memory / 1024 / 1024:0.1f} MiB")
+    print(f"  add:          {add_time:0.2f}s")
+    print(f"  lookup hits:  {hit_time * 1000000 / NUM_LOOKUPS:0.3f}us per lookup")
+    print(f"  lookup miss:  {miss_time * 1000000 / NUM_LOOKUPS:0.3f}us per lookup")
+    print(f"  peers:        {peers_time * 1000000 / NUM_LOOKUPS:0.3f}us per lookup ({peer_count} peers)")
+    print(f"  remove peers: {remove_time:0.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ import aiosqlite
 import click
 from blspy import AugSchemeMPL, G1Element, G2Element
 
+from chia.consensus.block_record import BlockRecord
 from chia.consensus.coinbase import create_farmer_coin, create_pool_coin
 from chia.consensus.default_constants import DEFAULT_CONSTANTS
 from chia.types.blockchain_format.classgroup import ClassgroupElement
@@ -24,7 +25,9 @@ from chia.types.blockchain_format.reward_chain_block import RewardChainBlock
 from chia.types.blockchain_format.sized_bytes import bytes32, bytes100
 from chia.types.blockchain_format.vdf import VDFInfo, VDFProof
 from chia.types.full_block import FullBlock
+from chia.types.header_block import HeaderBlock
 from chia.util.db_wrapper import DBWrapper2
+from chia.util.generator_tools import get_block_header
 from chia.util.ints import uint8, uint32, uint64, uint128
 
 # farmer puzzle hash
@@ -175,6 +178,40 @@ def rand_full_block() -> FullBlock:
     return full_block
 
 
+def rand_header_block() -> HeaderBlock:
+    return get_block_header(rand_full_block(), [], [])
+
+
+def rand_block_record() -> BlockRecord:
+    return BlockRecord(
+        rand_hash(),  # header_hash
+        rand_hash(),  # prev_hash
+        uint32(random.randint(0, 10000000)),  # height
+        uint128(random.randint(0, 10000000000)),  # weight
+        uint128(random.randint(0, 10000000000000)),  # total_iters
+        uint8(random.randint(0, 63)),  # signage_point_index
+        rand_class_group_element(),  # challenge_vdf_output
+        rand_class_group_element(),  # infused_challenge_vdf_output
+        rand_hash(),  # reward_infusion_new_challenge
+        rand_hash(),  # challenge_block_info_hash
+        uint64(random.randint(0, 1000000000)),  # sub_slot_iters
+        rand_hash(),  # pool_puzzle_hash
+        rand_hash(),  # farmer_puzzle_hash
+        uint64(random.randint(0, 1000000)),  # required_iters
+        uint8(random.randint(0, 16)),  # deficit
+        False,  # overflow
+        uint32(random.randint(0, 10000000)),  # prev_transaction_block_height
+        uint64(random.randint(0, 2000000000)),  # timestamp
+        rand_hash(),  # prev_transaction_block_hash
+        uint64(0),  # fees
+        list(rewards(uint32(0))),  # reward_claims_incorporated
+        [rand_hash()],  # finished_challenge_slot_hashes
+        None,  # finished_infused_challenge_slot_hashes
+        [rand_hash()],  # finished_reward_slot_hashes
+        None,  # sub_epoch_summary_included
+    )
+
+
 async def setup_db(name: Union[str, os.PathLike], db_version: int) -> DBWrapper2:
     db_filename = Path(name)
     try:
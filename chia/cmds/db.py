@@ -1,10 +1,17 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Optional
 
 import click
 
-from chia.cmds.db_backup_func import db_backup_func
+from chia.cmds.db_backup_func import (
+    ONLINE_BACKUP_PAGES_PER_STEP,
+    ONLINE_BACKUP_STEP_DELAY,
+    db_apply_incremental_func,
+    db_backup_func,
+)
+from chia.cmds.db_snapshot_func import db_snapshot_export_func, db_snapshot_import_func, db_snapshot_verify_func
 from chia.cmds.db_upgrade_func import db_upgrade_func
 from chia.cmds.db_validate_func import db_validate_func
 
@@ -30,8 +37,15 @@ def db_cmd() -> None:
     is_flag=True,
     help="force conversion despite warnings",
 )
+@click.option(
+    "--workers",
+    default=None,
+    type=int,
+    help="the number of processes compressing blocks. Defaults to one less than the number of CPUs, "
+    "0 compresses them in the main process",
+)
 @click.pass_context
-def db_upgrade_cmd(ctx: click.Context, no_update_config: bool, force: bool, **kwargs) -> None:
+def db_upgrade_cmd(ctx: click.Context, no_update_config: bool, force: bool, workers: Optional[int], **kwargs) -> None:
 
     try:
         in_db_path = kwargs.get("input")
@@ -42,6 +56,7 @@ def db_upgrade_cmd(ctx: click.Context, no_update_config: bool, force: bool, **kw
             None if out_db_path is None else Path(out_db_path),
             no_update_config=no_update_config,
             force=force,
+            workers=workers,
         )
     except RuntimeError as e:
         print(f"FAILED: {e}")
@@ -55,30 +70,200 @@ def db_upgrade_cmd(ctx: click.Context, no_update_config: bool, force: bool, **kw
     is_flag=True,
     help="validate consistency of properties of the encoded blocks and block records",
 )
+@click.option(
+    "--validate-coins",
+    default=False,
+    is_flag=True,
+    help="validate the coin_record table against the coins created and spent by the blocks, by running their "
+    "generators",
+)
+@click.option(
+    "--workers",
+    default=None,
+    type=int,
+    help="the number of processes validating blocks and coins. Defaults to one less than the number of CPUs, "
+    "0 validates them in the main process",
+)
+@click.option("--start-height", default=None, type=int, help="the first height to validate blocks and coins at")
+@click.option("--end-height", default=None, type=int, help="the last height to validate blocks and coins at")
 @click.pass_context
-def db_validate_cmd(ctx: click.Context, validate_blocks: bool, **kwargs) -> None:
+def db_validate_cmd(
+    ctx: click.Context,
+    validate_blocks: bool,
+    validate_coins: bool,
+    workers: Optional[int],
+    start_height: Optional[int],
+    end_height: Optional[int],
+    **kwargs,
+) -> None:
     try:
         in_db_path = kwargs.get("db")
         db_validate_func(
             Path(ctx.obj["root_path"]),
             None if in_db_path is None else Path(in_db_path),
             validate_blocks=validate_blocks,
+            validate_coins=validate_coins,
+            workers=workers,
+            start_height=start_height,
+            end_height=end_height,
         )
     except RuntimeError as e:
         print(f"FAILED: {e}")
 
 
-@db_cmd.command("backup", short_help="backup the blockchain database using VACUUM INTO command")
+@db_cmd.command(
+    "backup", short_help="backup the blockchain database using VACUUM INTO, the online backup API or incrementally"
+)
 @click.option("--backup_file", default=None, type=click.Path(), help="Specifies the backup file")
-@click.option("--no_indexes", default=False, is_flag=True, help="Create backup without indexes")
+@click.option(
+    "--no_indexes",
+    default=False,
+    is_flag=True,
+    help="Create backup without indexes. Not supported with --online or --incremental",
+)
+@click.option(
+    "--online",
+    default=False,
+    is_flag=True,
+    help="Copy the database in steps with the SQLite online backup API, so a running full node can keep writing "
+    "blocks to it. The backup is a snapshot of the database at the start of the copy",
+)
+@click.option(
+    "--incremental",
+    default=False,
+    is_flag=True,
+    help="Copy only the blocks and coin changes since the previous backup, to the incremental backup file of the "
+    "backup file",
+)
+@click.option(
+    "--incremental_file",
+    default=None,
+    type=click.Path(),
+    help="Specifies the incremental backup file. Defaults to the backup file name with an _incremental suffix",
+)
+@click.option(
+    "--pages_per_step",
+    default=ONLINE_BACKUP_PAGES_PER_STEP,
+    type=int,
+    show_default=True,
+    help="The number of database pages an online backup copies at a time",
+)
+@click.option(
+    "--step_delay",
+    default=ONLINE_BACKUP_STEP_DELAY,
+    type=float,
+    show_default=True,
+    help="The seconds an online backup waits after each step, to leave the database to the full node",
+)
 @click.pass_context
-def db_backup_cmd(ctx: click.Context, no_indexes: bool, **kwargs) -> None:
+def db_backup_cmd(
+    ctx: click.Context,
+    no_indexes: bool,
+    online: bool,
+    incremental: bool,
+    pages_per_step: int,
+    step_delay: float,
+    **kwargs,
+) -> None:
     try:
         db_backup_file = kwargs.get("backup_file")
+        incremental_file = kwargs.get("incremental_file")
         db_backup_func(
             Path(ctx.obj["root_path"]),
             None if db_backup_file is None else Path(db_backup_file),
             no_indexes=no_indexes,
+            online=online,
+            incremental=incremental,
+            incremental_db_file=None if incremental_file is None else Path(incremental_file),
+            pages_per_step=pages_per_step,
+            step_delay=step_delay,
+        )
+    except RuntimeError as e:
+        print(f"FAILED: {e}")
+
+
+@db_cmd.command("apply-incremental", short_help="merge an incremental backup into the backup it continues")
+@click.option("--backup_file", default=None, type=click.Path(), help="Specifies the backup file")
+@click.option(
+    "--incremental_file",
+    default=None,
+    type=click.Path(),
+    help="Specifies the incremental backup file. Defaults to the backup file name with an _incremental suffix",
+)
+@click.pass_context
+def db_apply_incremental_cmd(ctx: click.Context, **kwargs) -> None:
+    try:
+        db_backup_file = kwargs.get("backup_file")
+        incremental_file = kwargs.get("incremental_file")
+        db_apply_incremental_func(
+            Path(ctx.obj["root_path"]),
+            None if db_backup_file is None else Path(db_backup_file),
+            None if incremental_file is None else Path(incremental_file),
+        )
+    except RuntimeError as e:
+        print(f"FAILED: {e}")
+
+
+@db_cmd.group("snapshot", short_help="export and import the coin set at a height to bootstrap a full node")
+def db_snapshot_cmd() -> None:
+    pass
+
+
+@db_snapshot_cmd.command("export", short_help="export the coin set of the blockchain database at a height")
+@click.option("--output", required=True, type=click.Path(), help="specify snapshot file")
+@click.option("--db", default=None, type=click.Path(), help="specify blockchain database file")
+@click.option("--height", default=None, type=int, help="the height to export the coin set at. Defaults to the peak")
+@click.pass_context
+def db_snapshot_export_cmd(ctx: click.Context, output: str, db: Optional[str], height: Optional[int]) -> None:
+    try:
+        db_snapshot_export_func(
+            Path(ctx.obj["root_path"]),
+            Path(output),
+            None if db is None else Path(db),
+            height=height,
+        )
+    except RuntimeError as e:
+        print(f"FAILED: {e}")
+
+
+@db_snapshot_cmd.command("import", short_help="create a blockchain database from a snapshot")
+@click.option("--input", required=True, type=click.Path(), help="specify snapshot file")
+@click.option(
+    "--output",
+    default=None,
+    type=click.Path(),
+    help="specify output database file. Defaults to the database of the selected network, "
+    "in which case the snapshot must be of that network",
+)
+@click.pass_context
+def db_snapshot_import_cmd(ctx: click.Context, output: Optional[str], **kwargs) -> None:
+    try:
+        db_snapshot_import_func(
+            Path(ctx.obj["root_path"]),
+            Path(kwargs["input"]),
+            None if output is None else Path(output),
+        )
+    except RuntimeError as e:
+        print(f"FAILED: {e}")
+
+
+@db_snapshot_cmd.command("verify", short_help="check a snapshot file, and that a blockchain database matches it")
+@click.option("--input", required=True, type=click.Path(), help="specify snapshot file")
+@click.option("--db", default=None, type=click.Path(), help="specify blockchain database file")
+@click.option(
+    "--no-db",
+    default=False,
+    is_flag=True,
+    help="only check the checksum and digest of the snapshot file, not the blockchain database",
+)
+@click.pass_context
+def db_snapshot_verify_cmd(ctx: click.Context, db: Optional[str], no_db: bool, **kwargs) -> None:
+    try:
+        db_snapshot_verify_func(
+            Path(ctx.obj["root_path"]),
+            Path(kwargs["input"]),
+            None if db is None else Path(db),
+            verify_db=not no_db,
         )
     except RuntimeError as e:
         print(f"FAILED: {e}")
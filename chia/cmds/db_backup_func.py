@@ -1,18 +1,24 @@
 from __future__ import annotations
 
+import sqlite3
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from chia.util.config import load_config
 from chia.util.path import path_from_root
 
+# The defaults of the online backup copy 4 MiB per step, with the default page size of 4096 bytes, and let the full
+# node have the database for 50 ms after each step
+ONLINE_BACKUP_PAGES_PER_STEP = 1024
+ONLINE_BACKUP_STEP_DELAY = 0.05
 
-def db_backup_func(
-    root_path: Path,
-    backup_db_file: Optional[Path] = None,
-    *,
-    no_indexes: bool,
-) -> None:
+# The tables of a v2 blockchain database an incremental backup carries the changes of. The `backup_increment` table
+# holds the height and header hash of the peak of the backup it continues, as "base_height" and "base_hash", and the
+# height its own copy goes up to, as "height"
+INCREMENTAL_TABLES = ["full_blocks", "current_peak", "sub_epoch_segments_v3", "coin_record", "hints"]
+
+
+def get_backup_paths(root_path: Path, backup_db_file: Optional[Path]) -> Tuple[Path, Path]:
     config: Dict[str, Any] = load_config(root_path, "config.yaml")["full_node"]
     selected_network: str = config["selected_network"]
     db_pattern: str = config["database_path"]
@@ -21,14 +27,60 @@ def db_backup_func(
     if backup_db_file is None:
         db_path_replaced_backup = db_path_replaced.replace("blockchain_", "vacuumed_blockchain_")
         backup_db_file = path_from_root(root_path, db_path_replaced_backup)
+    return source_db, backup_db_file
+
+
+def default_incremental_path(backup_db_file: Path) -> Path:
+    return backup_db_file.with_name(f"{backup_db_file.stem}_incremental{backup_db_file.suffix}")
+
+
+def db_backup_func(
+    root_path: Path,
+    backup_db_file: Optional[Path] = None,
+    *,
+    no_indexes: bool,
+    online: bool = False,
+    incremental: bool = False,
+    incremental_db_file: Optional[Path] = None,
+    pages_per_step: int = ONLINE_BACKUP_PAGES_PER_STEP,
+    step_delay: float = ONLINE_BACKUP_STEP_DELAY,
+) -> None:
+    if no_indexes and (online or incremental):
+        raise RuntimeError("--no_indexes is not supported with --online or --incremental")
+
+    source_db, backup_db_file = get_backup_paths(root_path, backup_db_file)
+
+    if incremental:
+        if incremental_db_file is None:
+            incremental_db_file = default_incremental_path(backup_db_file)
+        backup_db_incremental(source_db, backup_db_file, incremental_db_file)
+        print(f"\n\nIncremental database backup finished : {incremental_db_file}\n")
+        return
 
-    backup_db(source_db, backup_db_file, no_indexes=no_indexes)
+    if online:
+        backup_db_online(source_db, backup_db_file, pages_per_step=pages_per_step, step_delay=step_delay)
+    else:
+        backup_db(source_db, backup_db_file, no_indexes=no_indexes)
 
     print(f"\n\nDatabase backup finished : {backup_db_file}\n")
 
 
+def db_apply_incremental_func(
+    root_path: Path,
+    backup_db_file: Optional[Path] = None,
+    incremental_db_file: Optional[Path] = None,
+) -> None:
+    _, backup_db_file = get_backup_paths(root_path, backup_db_file)
+    if incremental_db_file is None:
+        incremental_db_file = default_incremental_path(backup_db_file)
+
+    apply_incremental_backup(backup_db_file, incremental_db_file)
+
+    print(f"\n\nIncremental backup {incremental_db_file} applied to : {backup_db_file}")
+    print("Incremental backups from now on need a new incremental backup file\n")
+
+
 def backup_db(source_db: Path, backup_db: Path, *, no_indexes: bool) -> None:
-    import sqlite3
     from contextlib import closing
 
     # VACUUM INTO is only available starting with SQLite version 3.27.0
@@ -75,3 +127,213 @@ def backup_db(source_db: Path, backup_db: Path, *, no_indexes: bool) -> None:
                 f"backup failed with error: '{e}'"
                 f"\n\tYour backup file {backup_db} is probably left over in an insconsistent state."
             )
+
+
+def backup_db_online(
+    source_db: Path,
+    backup_db: Path,
+    *,
+    pages_per_step: int = ONLINE_BACKUP_PAGES_PER_STEP,
+    step_delay: float = ONLINE_BACKUP_STEP_DELAY,
+) -> None:
+    """
+    Copies `source_db` to `backup_db` with the SQLite online backup API, `pages_per_step` pages at a time, sleeping
+    `step_delay` seconds after each step. The source is only locked while a step runs, so a full node can keep
+    writing blocks to it during the backup.
+    """
+    import time
+    from contextlib import closing
+
+    if not backup_db.parent.exists():
+        print(f"backup destination path doesn't exist. {backup_db.parent}")
+        raise RuntimeError(f"can't find {backup_db}")
+    if backup_db.exists():
+        raise RuntimeError(f"backup file already exists: {backup_db}")
+
+    print(f"reading from blockchain database: {source_db}")
+    print(f"writing to backup file: {backup_db}")
+
+    start_time = time.monotonic()
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        rate = (total - remaining) / max(time.monotonic() - start_time, 0.001)
+        print(f"\r{total - remaining}/{total} pages copied, {rate:0.0f} pages/s    ", end="")
+        time.sleep(step_delay)
+
+    with closing(sqlite3.connect(source_db, isolation_level=None)) as in_db:
+        with closing(sqlite3.connect(backup_db)) as out_db:
+            try:
+                # The backup restarts from the first page when another connection writes to the source between two
+                # steps. Holding a read transaction on the source for the whole backup pins the snapshot it copies,
+                # as long as the database is in WAL mode, so the blocks the full node adds meanwhile don't restart it
+                in_db.execute("BEGIN")
+                in_db.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                in_db.backup(out_db, pages=pages_per_step, progress=progress)
+                in_db.execute("COMMIT")
+            except sqlite3.Error as e:
+                raise RuntimeError(
+                    f"backup failed with error: '{e}'"
+                    f"\n\tYour backup file {backup_db} is probably left over in an insconsistent state."
+                )
+
+
+def get_peak(db: sqlite3.Connection, schema: str) -> Tuple[bytes, int]:
+    row = db.execute(f"SELECT hash FROM {schema}.current_peak WHERE key = 0").fetchone()
+    if row is None:
+        raise RuntimeError(f"the {schema} database has no peak")
+    peak_hash: bytes = row[0]
+    row = db.execute(f"SELECT height FROM {schema}.full_blocks WHERE header_hash = ?", (peak_hash,)).fetchone()
+    if row is None:
+        raise RuntimeError(f"the peak of the {schema} database is missing from its full_blocks table")
+    return peak_hash, row[0]
+
+
+def get_increment(db: sqlite3.Connection) -> Dict[str, Any]:
+    return dict(db.execute("SELECT key, value FROM incremental.backup_increment").fetchall())
+
+
+def has_table(db: sqlite3.Connection, schema: str, table: str) -> bool:
+    row = db.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+    return row is not None
+
+
+def find_fork_height(db: sqlite3.Connection, base_height: int, base_hash: bytes, height: int) -> int:
+    """
+    Returns the highest height, between `base_height` and `height`, at which the main chain of the incremental backup
+    is still the main chain of the blockchain database.
+    """
+    while height > base_height:
+        row = db.execute(
+            "SELECT 1 FROM incremental.full_blocks i JOIN main.full_blocks m ON i.header_hash = m.header_hash "
+            "WHERE i.height = ? AND i.in_main_chain = 1 AND m.in_main_chain = 1",
+            (height,),
+        ).fetchone()
+        if row is not None:
+            return height
+        height -= 1
+
+    row = db.execute("SELECT in_main_chain FROM main.full_blocks WHERE header_hash = ?", (base_hash,)).fetchone()
+    if row is None or row[0] != 1:
+        raise RuntimeError(
+            f"the blockchain reorged below the height of the backup ({base_height})."
+            f"\n\tCreate a new full backup to continue incremental backups from"
+        )
+    return base_height
+
+
+def backup_db_incremental(source_db: Path, backup_db: Path, incremental_db: Path) -> None:
+    """
+    Copies the blocks and coin changes of `source_db` above the height of the latest backup to the incremental
+    backup `incremental_db`, a sidecar of the full backup `backup_db` which `apply_incremental_backup` can merge into
+    it. The first call creates `incremental_db` and copies everything above the peak of `backup_db`, later calls the
+    changes since the previous one. Reorgs above the peak of `backup_db` are rolled back in `incremental_db`, deeper
+    ones need a new full backup.
+    """
+    from contextlib import closing
+
+    if not backup_db.exists():
+        raise RuntimeError(f"can't find {backup_db}, create a full backup first")
+
+    print(f"reading from blockchain database: {source_db}")
+    print(f"writing to incremental backup file: {incremental_db} (of {backup_db})")
+    # transactions are handled explicitly, to make reading the source and writing the increment a single one
+    with closing(sqlite3.connect(source_db, isolation_level=None)) as in_db:
+        try:
+            if not has_table(in_db, "main", "database_version"):
+                raise RuntimeError("incremental backups are only supported for v2 databases")
+            in_db.execute("ATTACH DATABASE ? AS backup", (str(backup_db),))
+            in_db.execute("ATTACH DATABASE ? AS incremental", (str(incremental_db),))
+
+            backup_hash, backup_height = get_peak(in_db, "backup")
+            in_db.execute("BEGIN")
+            if has_table(in_db, "incremental", "backup_increment"):
+                increment = get_increment(in_db)
+                if (increment["base_hash"], increment["base_height"]) != (backup_hash, backup_height):
+                    raise RuntimeError(
+                        f"the incremental backup {incremental_db} doesn't continue the backup {backup_db}"
+                        f"\n\tUse a new incremental backup file"
+                    )
+                last_height = increment["height"]
+            else:
+                for table in INCREMENTAL_TABLES:
+                    row = in_db.execute("SELECT sql FROM main.sqlite_master WHERE name = ?", (table,)).fetchone()
+                    in_db.execute(row[0].replace("CREATE TABLE ", "CREATE TABLE incremental.", 1))
+                in_db.execute("CREATE INDEX incremental.height ON full_blocks(height)")
+                in_db.execute("CREATE INDEX incremental.coin_confirmed_index ON coin_record(confirmed_index)")
+                in_db.execute("CREATE INDEX incremental.coin_spent_index ON coin_record(spent_index)")
+                in_db.execute("CREATE TABLE incremental.backup_increment(key text PRIMARY KEY, value)")
+                in_db.executemany(
+                    "INSERT INTO incremental.backup_increment VALUES(?, ?)",
+                    [("base_hash", backup_hash), ("base_height", backup_height), ("height", backup_height)],
+                )
+                last_height = backup_height
+
+            fork_height = find_fork_height(in_db, backup_height, backup_hash, last_height)
+            _, peak_height = get_peak(in_db, "main")
+
+            # the coins spent above the fork may have been un-spent by a reorg, and the ones created above it may be
+            # gone. Refresh the former and drop the latter before copying the current ones over
+            in_db.execute(
+                "INSERT OR REPLACE INTO incremental.coin_record SELECT * FROM main.coin_record WHERE coin_name IN "
+                "(SELECT coin_name FROM incremental.coin_record WHERE spent_index > ?)",
+                (fork_height,),
+            )
+            in_db.execute("DELETE FROM incremental.coin_record WHERE confirmed_index > ?", (fork_height,))
+            in_db.execute(
+                "INSERT OR REPLACE INTO incremental.coin_record SELECT * FROM main.coin_record "
+                "WHERE confirmed_index > ? OR spent_index > ?",
+                (fork_height, fork_height),
+            )
+            in_db.execute(
+                "INSERT OR IGNORE INTO incremental.hints SELECT h.* FROM main.coin_record c "
+                "JOIN main.hints h ON h.coin_id = c.coin_name WHERE c.confirmed_index > ?",
+                (fork_height,),
+            )
+            # re-copying the blocks above the fork updates the in_main_chain of the ones a reorg moved off of it
+            in_db.execute(
+                "INSERT OR REPLACE INTO incremental.full_blocks SELECT * FROM main.full_blocks WHERE height > ?",
+                (fork_height,),
+            )
+            in_db.execute(
+                "INSERT OR IGNORE INTO incremental.sub_epoch_segments_v3 SELECT s.* FROM main.full_blocks b "
+                "JOIN main.sub_epoch_segments_v3 s ON s.ses_block_hash = b.header_hash WHERE b.height > ?",
+                (fork_height,),
+            )
+            in_db.execute("INSERT OR REPLACE INTO incremental.current_peak SELECT * FROM main.current_peak")
+            in_db.execute("UPDATE incremental.backup_increment SET value = ? WHERE key = 'height'", (peak_height,))
+            in_db.execute("COMMIT")
+            if peak_height > fork_height:
+                print(f"copied heights {fork_height + 1} to {peak_height} (backup at height {backup_height})")
+            else:
+                print(f"no new blocks since the previous backup (height {peak_height})")
+        except sqlite3.Error as e:
+            raise RuntimeError(f"incremental backup failed with error: '{e}'")
+
+
+def apply_incremental_backup(backup_db: Path, incremental_db: Path) -> None:
+    """
+    Merges the incremental backup `incremental_db` into the full backup `backup_db` it continues, which brings the
+    latter up to the height of the former.
+    """
+    from contextlib import closing
+
+    if not incremental_db.exists():
+        raise RuntimeError(f"can't find {incremental_db}")
+
+    print(f"applying incremental backup: {incremental_db}")
+    print(f"to backup file: {backup_db}")
+    with closing(sqlite3.connect(backup_db, isolation_level=None)) as db:
+        try:
+            db.execute("ATTACH DATABASE ? AS incremental", (str(incremental_db),))
+            if not has_table(db, "incremental", "backup_increment"):
+                raise RuntimeError(f"{incremental_db} is not an incremental backup")
+            increment = get_increment(db)
+            if (increment["base_hash"], increment["base_height"]) != get_peak(db, "main"):
+                raise RuntimeError(f"the incremental backup {incremental_db} doesn't continue the backup {backup_db}")
+
+            db.execute("BEGIN")
+            for table in INCREMENTAL_TABLES:
+                db.execute(f"INSERT OR REPLACE INTO main.{table} SELECT * FROM incremental.{table}")
+            db.execute("COMMIT")
+        except sqlite3.Error as e:
+            raise RuntimeError(f"applying the incremental backup failed with error: '{e}'")
@@ -0,0 +1,585 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import struct
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from time import time
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from chia.consensus.default_constants import DEFAULT_CONSTANTS
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.full_block import FullBlock
+from chia.util.config import load_config
+from chia.util.ints import uint32, uint64
+from chia.util.path import path_from_root
+from chia.util.streamable import Streamable, streamable
+
+# A snapshot file holds the coin set of a v2 blockchain database at a height, its hints, and the block records of the
+# main chain up to that height, which is what a full node needs to continue syncing from that height. It starts with
+# SNAPSHOT_MAGIC and a SnapshotHeader, followed by frames of a kind byte, a 4 byte length and the zstd compressed
+# rows, all block rows first, then the serialized full block at the snapshot height, then the coin rows and the hint
+# rows. The last frame holds the uncompressed SnapshotSummary. The rows are in a canonical order, so the digest of the
+# uncompressed rows and full block only depends on the blockchain, and can be recomputed from any database that has
+# the height.
+SNAPSHOT_MAGIC = b"CHIASNAP"
+SNAPSHOT_VERSION = 1
+
+# rows are compressed in frames of about this many bytes
+FRAME_SIZE = 1 << 20
+
+FRAME_END = 0
+FRAME_BLOCKS = 1
+FRAME_PEAK_BLOCK = 2
+FRAME_COINS = 3
+FRAME_HINTS = 4
+
+FRAME_HEADER = struct.Struct(">BI")
+# header_hash, prev_hash, height, length of sub_epoch_summary (0 for none), length of block_record
+BLOCK_ROW = struct.Struct(">32s32sIII")
+# coin_name, confirmed_index, spent_index, coinbase, puzzle_hash, coin_parent, amount, timestamp
+COIN_ROW = struct.Struct(">32sIIB32s32s8sQ")
+# coin_id, length of hint
+HINT_ROW = struct.Struct(">32sH")
+COUNTS = struct.Struct(">QQQ")
+
+SNAPSHOT_COMMIT_RATE = 100
+
+
+@streamable
+@dataclass(frozen=True)
+class SnapshotHeader(Streamable):
+    version: uint32
+    genesis_challenge: bytes32
+    height: uint32
+    header_hash: bytes32
+
+
+@streamable
+@dataclass(frozen=True)
+class SnapshotSummary(Streamable):
+    block_count: uint64
+    coin_count: uint64
+    hint_count: uint64
+    # the sha256 of the header, the uncompressed block rows, full block, coin and hint rows, and the counts of the rows
+    digest: bytes32
+    # the sha256 of all the bytes of the file before the summary frame
+    checksum: bytes32
+
+
+class SnapshotDigest:
+    def __init__(self, header: SnapshotHeader) -> None:
+        self.hash = hashlib.sha256(bytes(header))
+        self.counts = {FRAME_BLOCKS: 0, FRAME_PEAK_BLOCK: 0, FRAME_COINS: 0, FRAME_HINTS: 0}
+
+    def add(self, kind: int, rows: bytes, count: int) -> None:
+        self.hash.update(rows)
+        self.counts[kind] += count
+
+    def finish(self) -> Tuple[int, int, int, bytes32]:
+        counts = (self.counts[FRAME_BLOCKS], self.counts[FRAME_COINS], self.counts[FRAME_HINTS])
+        self.hash.update(COUNTS.pack(*counts))
+        return (*counts, bytes32(self.hash.digest()))
+
+
+def get_db_path(root_path: Path) -> Path:
+    config: Dict[str, Any] = load_config(root_path, "config.yaml")["full_node"]
+    selected_network: str = config["selected_network"]
+    db_pattern: str = config["database_path"]
+    return path_from_root(root_path, db_pattern.replace("CHALLENGE", selected_network))
+
+
+def db_snapshot_export_func(
+    root_path: Path,
+    snapshot_file: Path,
+    in_db_path: Optional[Path] = None,
+    *,
+    height: Optional[int] = None,
+) -> None:
+    if in_db_path is None:
+        in_db_path = get_db_path(root_path)
+
+    summary = export_snapshot(in_db_path, snapshot_file, height=height)
+    print(f"\n\nSnapshot exported : {snapshot_file}")
+    print(f"digest: {summary.digest}\n")
+
+
+def db_snapshot_import_func(
+    root_path: Path,
+    snapshot_file: Path,
+    out_db_path: Optional[Path] = None,
+) -> None:
+    genesis_challenge: Optional[bytes32] = None
+    if out_db_path is None:
+        config: Dict[str, Any] = load_config(root_path, "config.yaml")["full_node"]
+        overrides = config["network_overrides"]["constants"][config["selected_network"]]
+        genesis_challenge = DEFAULT_CONSTANTS.replace_str_to_bytes(**overrides).GENESIS_CHALLENGE
+        out_db_path = get_db_path(root_path)
+        out_db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    summary = import_snapshot(snapshot_file, out_db_path, genesis_challenge=genesis_challenge)
+    print(f"\n\nSnapshot imported : {out_db_path}")
+    print(f"digest: {summary.digest}\n")
+
+
+def db_snapshot_verify_func(
+    root_path: Path,
+    snapshot_file: Path,
+    in_db_path: Optional[Path] = None,
+    *,
+    verify_db: bool = True,
+) -> None:
+    if verify_db and in_db_path is None:
+        in_db_path = get_db_path(root_path)
+
+    summary = verify_snapshot(snapshot_file, in_db_path if verify_db else None)
+    print(f"\n\nSnapshot verified : {snapshot_file}")
+    print(f"digest: {summary.digest}\n")
+
+
+def db_snapshot_rows(db: sqlite3.Connection, height: int) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yields the kind and encoding of the rows of the snapshot of `db` at `height`, and the full block at `height`, in
+    the order of the snapshot file. The coins spent above `height` are unspent in the snapshot.
+    """
+    import zstd
+
+    for header_hash, prev_hash, block_height, ses, block_record in db.execute(
+        "SELECT header_hash, prev_hash, height, sub_epoch_summary, block_record FROM full_blocks "
+        "WHERE height <= ? AND in_main_chain = 1 ORDER BY height",
+        (height,),
+    ):
+        ses = b"" if ses is None else ses
+        row = BLOCK_ROW.pack(header_hash, prev_hash, block_height, len(ses), len(block_record))
+        yield FRAME_BLOCKS, row + ses + block_record
+
+    _, block = get_main_chain_block(db, height)
+    yield FRAME_PEAK_BLOCK, zstd.decompress(block)
+
+    for coin_name, confirmed_index, spent_index, coinbase, puzzle_hash, coin_parent, amount, timestamp in db.execute(
+        "SELECT coin_name, confirmed_index, spent_index, coinbase, puzzle_hash, coin_parent, amount, timestamp "
+        "FROM coin_record WHERE confirmed_index <= ? ORDER BY coin_name",
+        (height,),
+    ):
+        if spent_index > height:
+            spent_index = 0
+        yield FRAME_COINS, COIN_ROW.pack(
+            coin_name, confirmed_index, spent_index, coinbase, puzzle_hash, coin_parent, amount, timestamp
+        )
+
+    for coin_id, hint in db.execute(
+        "SELECT h.coin_id, h.hint FROM hints h JOIN coin_record c ON c.coin_name = h.coin_id "
+        "WHERE c.confirmed_index <= ? ORDER BY h.coin_id, h.hint",
+        (height,),
+    ):
+        yield FRAME_HINTS, HINT_ROW.pack(coin_id, len(hint)) + hint
+
+
+def parse_rows(kind: int, rows: bytes) -> List[Tuple[Any, ...]]:
+    """
+    Returns the values of the encoded snapshot rows `rows` of frame `kind`, as the rows of their table.
+    """
+    ret: List[Tuple[Any, ...]] = []
+    offset = 0
+    if kind == FRAME_BLOCKS:
+        while offset < len(rows):
+            header_hash, prev_hash, height, ses_length, record_length = BLOCK_ROW.unpack_from(rows, offset)
+            offset += BLOCK_ROW.size
+            ses = rows[offset : offset + ses_length] if ses_length > 0 else None
+            offset += ses_length
+            block_record = rows[offset : offset + record_length]
+            offset += record_length
+            # the blocks below the snapshot height have no full block, so there is nothing to compactify
+            ret.append((header_hash, prev_hash, height, ses, 1, 1, None, block_record))
+    elif kind == FRAME_COINS:
+        ret = list(COIN_ROW.iter_unpack(rows))
+        offset = len(rows)
+    elif kind == FRAME_HINTS:
+        while offset < len(rows):
+            coin_id, hint_length = HINT_ROW.unpack_from(rows, offset)
+            offset += HINT_ROW.size
+            ret.append((coin_id, rows[offset : offset + hint_length]))
+            offset += hint_length
+    if offset != len(rows):
+        raise RuntimeError("snapshot file is corrupt: truncated row")
+    return ret
+
+
+class SnapshotWriter:
+    def __init__(self, f: BinaryIO, header: SnapshotHeader) -> None:
+        self.f = f
+        self.checksum = hashlib.sha256()
+        self.digest = SnapshotDigest(header)
+        self.kind = FRAME_END
+        self.rows: List[bytes] = []
+        self.size = 0
+        self.write(SNAPSHOT_MAGIC + bytes(header))
+
+    def write(self, data: bytes) -> None:
+        self.f.write(data)
+        self.checksum.update(data)
+
+    def write_frame(self, kind: int, payload: bytes) -> None:
+        import zstd
+
+        compressed = zstd.compress(payload)
+        self.write(FRAME_HEADER.pack(kind, len(compressed)) + compressed)
+
+    def add_row(self, kind: int, row: bytes) -> None:
+        if kind != self.kind or self.size >= FRAME_SIZE:
+            self.flush()
+            self.kind = kind
+        self.rows.append(row)
+        self.size += len(row)
+
+    def flush(self) -> None:
+        if len(self.rows) == 0:
+            return
+        payload = b"".join(self.rows)
+        self.digest.add(self.kind, payload, len(self.rows))
+        self.write_frame(self.kind, payload)
+        self.rows = []
+        self.size = 0
+
+    def add_peak_block(self, block: bytes) -> None:
+        self.flush()
+        self.digest.add(FRAME_PEAK_BLOCK, block, 1)
+        self.write_frame(FRAME_PEAK_BLOCK, block)
+
+    def finish(self) -> SnapshotSummary:
+        self.flush()
+        block_count, coin_count, hint_count, digest = self.digest.finish()
+        summary = SnapshotSummary(
+            uint64(block_count),
+            uint64(coin_count),
+            uint64(hint_count),
+            digest,
+            bytes32(self.checksum.digest()),
+        )
+        payload = bytes(summary)
+        self.f.write(FRAME_HEADER.pack(FRAME_END, len(payload)) + payload)
+        return summary
+
+
+def read_exactly(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise RuntimeError("snapshot file is corrupt: unexpected end of file")
+    return data
+
+
+class SnapshotReader:
+    """
+    Reads a snapshot file frame by frame, checking the order of the frames and, once the summary frame is reached,
+    the checksum and digest of the file.
+    """
+
+    def __init__(self, f: BinaryIO) -> None:
+        self.f = f
+        self.checksum = hashlib.sha256()
+        magic = self.read(len(SNAPSHOT_MAGIC))
+        if magic != SNAPSHOT_MAGIC:
+            raise RuntimeError("not a snapshot file")
+        try:
+            self.header = SnapshotHeader.parse(f)
+        except (AssertionError, ValueError) as e:
+            raise RuntimeError(f"snapshot file is corrupt: {e}")
+        self.checksum.update(bytes(self.header))
+        if self.header.version != SNAPSHOT_VERSION:
+            raise RuntimeError(f"unsupported snapshot version {self.header.version} (expected {SNAPSHOT_VERSION})")
+        self.digest = SnapshotDigest(self.header)
+
+    def read(self, size: int) -> bytes:
+        data = read_exactly(self.f, size)
+        self.checksum.update(data)
+        return data
+
+    def frames(self) -> Iterator[Tuple[int, bytes, List[Tuple[Any, ...]]]]:
+        """
+        Yields the kind, uncompressed payload and rows of the frames of the file, up to the summary frame. The caller
+        must exhaust it, as the checksum and digest are checked at the end.
+        """
+        import zstd
+
+        last_kind = FRAME_BLOCKS
+        while True:
+            header = read_exactly(self.f, FRAME_HEADER.size)
+            kind, length = FRAME_HEADER.unpack(header)
+            if kind == FRAME_END:
+                self.check_summary(read_exactly(self.f, length))
+                return
+            self.checksum.update(header)
+            if kind < last_kind or kind > FRAME_HINTS:
+                raise RuntimeError(f"snapshot file is corrupt: unexpected frame {kind}")
+            last_kind = kind
+            try:
+                payload = zstd.decompress(self.read(length))
+            except zstd.Error as e:
+                raise RuntimeError(f"snapshot file is corrupt: {e}")
+            rows: List[Tuple[Any, ...]] = []
+            if kind != FRAME_PEAK_BLOCK:
+                try:
+                    rows = parse_rows(kind, payload)
+                except struct.error as e:
+                    raise RuntimeError(f"snapshot file is corrupt: {e}")
+            self.digest.add(kind, payload, 1 if kind == FRAME_PEAK_BLOCK else len(rows))
+            yield kind, payload, rows
+
+    def check_summary(self, payload: bytes) -> None:
+        try:
+            self.summary = SnapshotSummary.from_bytes(payload)
+        except (AssertionError, ValueError) as e:
+            raise RuntimeError(f"snapshot file is corrupt: {e}")
+        if self.summary.checksum != self.checksum.digest():
+            raise RuntimeError("snapshot file is corrupt: checksum mismatch")
+        if (*self.digest.finish(),) != (
+            self.summary.block_count,
+            self.summary.coin_count,
+            self.summary.hint_count,
+            self.summary.digest,
+        ):
+            raise RuntimeError("snapshot file is corrupt: digest mismatch")
+
+
+def open_v2_db(db_path: Path) -> sqlite3.Connection:
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, isolation_level=None)
+    row = db.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='database_version'").fetchone()
+    if row is None or db.execute("SELECT version FROM database_version").fetchone()[0] != 2:
+        db.close()
+        raise RuntimeError(f"{db_path} is not a v2 blockchain database")
+    return db
+
+
+def get_main_chain_block(db: sqlite3.Connection, height: int) -> Tuple[bytes32, bytes]:
+    row = db.execute(
+        "SELECT header_hash, block FROM full_blocks WHERE height = ? AND in_main_chain = 1", (height,)
+    ).fetchone()
+    if row is None:
+        raise RuntimeError(f"the database has no main chain block at height {height}")
+    return bytes32(row[0]), row[1]
+
+
+def remove_tmp_file(tmp_path: Path) -> None:
+    try:
+        tmp_path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def export_snapshot(in_path: Path, out_path: Path, *, height: Optional[int] = None) -> SnapshotSummary:
+    """
+    Writes the snapshot of the blockchain database `in_path` at `height`, the peak by default, to `out_path`. It reads
+    the database in a single read transaction, so the full node can keep running.
+    """
+    if out_path.exists():
+        raise RuntimeError(f"snapshot file already exists: {out_path}")
+
+    print(f"reading from blockchain database: {in_path}")
+    print(f"writing to snapshot file: {out_path}")
+    start_time = time()
+    tmp_path = out_path.with_name(f"{out_path.name}.tmp")
+    with closing(open_v2_db(in_path)) as in_db:
+        in_db.execute("BEGIN")
+        peak_row = in_db.execute(
+            "SELECT height FROM full_blocks WHERE header_hash = (SELECT hash FROM current_peak WHERE key = 0)"
+        ).fetchone()
+        if peak_row is None:
+            raise RuntimeError("the database has no peak")
+        if height is None:
+            height = peak_row[0]
+        elif height > peak_row[0]:
+            raise RuntimeError(f"height {height} is above the peak of the database ({peak_row[0]})")
+        header_hash, _ = get_main_chain_block(in_db, height)
+        genesis_row = in_db.execute(
+            "SELECT prev_hash FROM full_blocks WHERE height = 0 AND in_main_chain = 1"
+        ).fetchone()
+        header = SnapshotHeader(uint32(SNAPSHOT_VERSION), bytes32(genesis_row[0]), uint32(height), header_hash)
+
+        try:
+            with open(tmp_path, "wb") as f:
+                writer = SnapshotWriter(f, header)
+                for kind, row in db_snapshot_rows(in_db, height):
+                    if kind == FRAME_PEAK_BLOCK:
+                        writer.add_peak_block(row)
+                    else:
+                        writer.add_row(kind, row)
+                summary = writer.finish()
+            tmp_path.replace(out_path)
+        except BaseException:
+            remove_tmp_file(tmp_path)
+            raise
+
+    print(f"      {summary.block_count} blocks, {summary.coin_count} coins, {summary.hint_count} hints")
+    print(f"exported height {height} in {time() - start_time:.2f} seconds")
+    return summary
+
+
+def import_snapshot(in_path: Path, out_path: Path, *, genesis_challenge: Optional[bytes32] = None) -> SnapshotSummary:
+    """
+    Creates the v2 blockchain database `out_path` from the snapshot file `in_path`. The rows are loaded into tables
+    without indices, which are built once all rows are in. The database is written to a temporary file, which is only
+    moved to `out_path` when the checksum and digest of the snapshot match, and if `genesis_challenge` is passed, the
+    snapshot is of the blockchain with that genesis challenge.
+    """
+    import zstd
+
+    if out_path.exists():
+        raise RuntimeError(f"output file already exists: {out_path}")
+
+    print(f"reading from snapshot file: {in_path}")
+    print(f"writing to blockchain database: {out_path}")
+    start_time = time()
+    tmp_path = out_path.with_name(f"{out_path.name}.tmp")
+    remove_tmp_file(tmp_path)
+    try:
+        with open(in_path, "rb") as f, closing(sqlite3.connect(tmp_path)) as out_db:
+            reader = SnapshotReader(f)
+            header = reader.header
+            if genesis_challenge is not None and header.genesis_challenge != genesis_challenge:
+                raise RuntimeError(
+                    f"the snapshot is of a different blockchain (genesis challenge {header.genesis_challenge}, "
+                    f"expected {genesis_challenge})"
+                )
+
+            # the temporary file is deleted on any error, there is nothing to journal
+            out_db.execute("pragma journal_mode=OFF")
+            out_db.execute("pragma synchronous=OFF")
+            out_db.execute("pragma locking_mode=exclusive")
+
+            out_db.execute("CREATE TABLE database_version(version int)")
+            out_db.execute("INSERT INTO database_version VALUES(?)", (2,))
+            out_db.execute(
+                "CREATE TABLE full_blocks("
+                "header_hash blob PRIMARY KEY,"
+                "prev_hash blob,"
+                "height bigint,"
+                "sub_epoch_summary blob,"
+                "is_fully_compactified tinyint,"
+                "in_main_chain tinyint,"
+                "block blob,"
+                "block_record blob)"
+            )
+            out_db.execute(
+                "CREATE TABLE sub_epoch_segments_v3(ses_block_hash blob PRIMARY KEY, challenge_segments blob)"
+            )
+            out_db.execute("CREATE TABLE current_peak(key int PRIMARY KEY, hash blob)")
+            out_db.execute(
+                "CREATE TABLE coin_record("
+                "coin_name blob PRIMARY KEY,"
+                " confirmed_index bigint,"
+                " spent_index bigint,"
+                " coinbase int,"
+                " puzzle_hash blob,"
+                " coin_parent blob,"
+                " amount blob,"
+                " timestamp bigint)"
+            )
+            out_db.execute("CREATE TABLE hints(coin_id blob, hint blob, UNIQUE (coin_id, hint))")
+            out_db.commit()
+
+            statements = {
+                FRAME_BLOCKS: "INSERT INTO full_blocks VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                FRAME_COINS: "INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                FRAME_HINTS: "INSERT INTO hints VALUES(?, ?)",
+            }
+            frame_count = 0
+            for kind, payload, rows in reader.frames():
+                if kind == FRAME_PEAK_BLOCK:
+                    try:
+                        peak_hash = FullBlock.from_bytes(payload).header_hash
+                    except (AssertionError, ValueError) as e:
+                        raise RuntimeError(f"snapshot file is corrupt: {e}")
+                    if peak_hash != header.header_hash:
+                        raise RuntimeError(
+                            f"snapshot file is corrupt: the block at the snapshot height is {peak_hash}, "
+                            f"the header has {header.header_hash}"
+                        )
+                    out_db.execute(
+                        "UPDATE full_blocks SET block = ?, is_fully_compactified = 0 WHERE header_hash = ?",
+                        (zstd.compress(payload), header.header_hash),
+                    )
+                else:
+                    out_db.executemany(statements[kind], rows)
+                frame_count += 1
+                if frame_count % SNAPSHOT_COMMIT_RATE == 0:
+                    out_db.commit()
+                    print(
+                        f"\r      {reader.digest.counts[FRAME_BLOCKS]} blocks, {reader.digest.counts[FRAME_COINS]} "
+                        f"coins, {reader.digest.counts[FRAME_HINTS]} hints  ",
+                        end="",
+                    )
+            summary = reader.summary
+            print(f"\r      {summary.block_count} blocks, {summary.coin_count} coins, {summary.hint_count} hints")
+
+            row = out_db.execute(
+                "SELECT height FROM full_blocks WHERE header_hash = ? AND block IS NOT NULL", (header.header_hash,)
+            ).fetchone()
+            if row is None or row[0] != header.height:
+                raise RuntimeError("snapshot file is corrupt: the block at the snapshot height is missing")
+            out_db.execute("INSERT INTO current_peak VALUES(?, ?)", (0, header.header_hash))
+            out_db.commit()
+
+            # If any of these indices are altered, they should also be altered in the stores they belong to
+            print("      building indices")
+            index_start_time = time()
+            out_db.execute("CREATE INDEX height on full_blocks(height)")
+            out_db.execute(
+                "CREATE INDEX is_fully_compactified ON"
+                " full_blocks(is_fully_compactified, in_main_chain) WHERE in_main_chain=1"
+            )
+            out_db.execute("CREATE INDEX main_chain ON full_blocks(height, in_main_chain) WHERE in_main_chain=1")
+            out_db.execute("CREATE INDEX coin_confirmed_index on coin_record(confirmed_index)")
+            out_db.execute("CREATE INDEX coin_spent_index on coin_record(spent_index)")
+            out_db.execute("CREATE INDEX coin_puzzle_hash on coin_record(puzzle_hash)")
+            out_db.execute("CREATE INDEX coin_parent_index on coin_record(coin_parent)")
+            out_db.execute("CREATE INDEX hint_index on hints(hint)")
+            out_db.commit()
+            print(f"      {time() - index_start_time:.2f} seconds")
+        tmp_path.replace(out_path)
+    except sqlite3.Error as e:
+        remove_tmp_file(tmp_path)
+        raise RuntimeError(f"snapshot import failed with error: '{e}'")
+    except BaseException:
+        remove_tmp_file(tmp_path)
+        raise
+
+    print(f"imported height {header.height} in {time() - start_time:.2f} seconds")
+    return summary
+
+
+def verify_snapshot(in_path: Path, db_path: Optional[Path] = None) -> SnapshotSummary:
+    """
+    Checks the checksum and digest of the snapshot file `in_path` and, if `db_path` is passed, that the digest of the
+    blockchain database `db_path` at the height of the snapshot matches it.
+    """
+    print(f"reading snapshot file: {in_path}")
+    with open(in_path, "rb") as f:
+        reader = SnapshotReader(f)
+        for _ in reader.frames():
+            pass
+    header = reader.header
+    summary = reader.summary
+    print(
+        f"      height {header.height}: {summary.block_count} blocks, {summary.coin_count} coins, "
+        f"{summary.hint_count} hints"
+    )
+
+    if db_path is not None:
+        print(f"recomputing the digest from blockchain database: {db_path}")
+        with closing(open_v2_db(db_path)) as db:
+            db.execute("BEGIN")
+            header_hash, _ = get_main_chain_block(db, header.height)
+            if header_hash != header.header_hash:
+                raise RuntimeError(
+                    f"the main chain block at height {header.height} is {header_hash}, "
+                    f"the snapshot has {header.header_hash}"
+                )
+            digest = SnapshotDigest(header)
+            for kind, row in db_snapshot_rows(db, header.height):
+                digest.add(kind, row, 1)
+            if digest.finish()[3] != summary.digest:
+                raise RuntimeError(f"the digest of {db_path} at height {header.height} doesn't match the snapshot")
+
+    return summary
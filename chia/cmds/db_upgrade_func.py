@@ -3,11 +3,15 @@ from __future__ import annotations
 import os
 import platform
 import shutil
+import sqlite3
 import sys
 import textwrap
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import closing
 from pathlib import Path
 from time import time
-from typing import Dict, Optional
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.util.config import load_config, lock_and_load_config, save_config
@@ -26,6 +30,7 @@ def db_upgrade_func(
     *,
     no_update_config: bool = False,
     force: bool = False,
+    workers: Optional[int] = None,
 ) -> None:
 
     update_config: bool = in_db_path is None and out_db_path is None and not no_update_config
@@ -68,7 +73,7 @@ def db_upgrade_func(
             return
 
     try:
-        convert_v1_to_v2(in_db_path, out_db_path)
+        convert_v1_to_v2(in_db_path, out_db_path, workers=workers)
 
         if update_config:
             print("updating config.yaml")
@@ -88,6 +93,7 @@ def db_upgrade_func(
             conversion failed with error: {e}.
             The target v2 database is left in place (possibly in an incomplete state)
               {out_db_path}
+            Running the upgrade again resumes the conversion where it stopped.
             If the failure was caused by a full disk, ensure the volumes of your
             temporary- and target directory have sufficient free space."""
             )
@@ -116,22 +122,63 @@ BLOCK_COMMIT_RATE = 10000
 SES_COMMIT_RATE = 2000
 HINT_COMMIT_RATE = 2000
 COIN_COMMIT_RATE = 30000
+# the blocks are sent to the worker processes to be compressed in batches of this many
+BLOCK_BATCH_SIZE = 500
 
+BlockRow = Tuple[bytes32, bytes32, int, Optional[bytes], int, bytes]
 
-def convert_v1_to_v2(in_path: Path, out_path: Path) -> None:
-    import sqlite3
-    from contextlib import closing
 
+def default_upgrade_workers() -> int:
+    # leave one core for the process reading the input and writing the output
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def compress_blocks(blocks: List[bytes]) -> List[bytes]:
     import zstd
 
+    return [zstd.compress(block) for block in blocks]
+
+
+def get_progress(out_db: sqlite3.Connection, key: str) -> Any:
+    with closing(out_db.execute("SELECT value FROM upgrade_progress WHERE key=?", (key,))) as cursor:
+        row = cursor.fetchone()
+    return None if row is None else row[0]
+
+
+def set_progress(out_db: sqlite3.Connection, key: str, value: Any) -> None:
+    out_db.execute("INSERT OR REPLACE INTO upgrade_progress VALUES(?, ?)", (key, value))
+
+
+def print_throughput(count: int, unit: str, seconds: float, extra: str = "") -> None:
+    rate = count / seconds if seconds > 0 else 0.0
+    print(f"\r      {seconds:.2f} seconds, {count} {unit}, {rate:0.1f} {unit}/s{extra}                 ")
+
+
+def convert_v1_to_v2(in_path: Path, out_path: Path, *, workers: Optional[int] = None) -> None:
+    """
+    Converts the v1 blockchain database at `in_path` into a v2 database at `out_path`. The blocks are compressed in
+    `workers` processes, or on this thread if it's 0, while this thread reads the input and commits the output. The
+    progress is checkpointed in the output database along with the data, so if `out_path` is a partially converted
+    database, the conversion resumes where it stopped.
+    """
     if not in_path.exists():
         raise RuntimeError(f"input file doesn't exist. {in_path}")
 
     if in_path == out_path:
         raise RuntimeError(f"output file is the same as the input {in_path}")
 
+    if workers is None:
+        workers = default_upgrade_workers()
+
+    resume = False
     if out_path.exists():
-        raise RuntimeError(f"output file already exists. {out_path}")
+        with closing(sqlite3.connect(out_path)) as out_db:
+            with closing(out_db.execute("SELECT name FROM sqlite_master WHERE type='table'")) as cursor:
+                tables = {row[0] for row in cursor}
+        # an empty database is left behind when the upgrade got killed before its schema was committed
+        resume = "upgrade_progress" in tables
+        if not resume and len(tables) > 0:
+            raise RuntimeError(f"output file already exists. {out_path}")
 
     print(f"opening file for reading: {in_path}")
     with closing(sqlite3.connect(in_path)) as in_db:
@@ -145,278 +192,408 @@ def convert_v1_to_v2(in_path: Path, out_path: Path) -> None:
 
         print(f"opening file for writing: {out_path}")
         with closing(sqlite3.connect(out_path)) as out_db:
-            out_db.execute("pragma journal_mode=OFF")
+            # the conversion is resumed from the last commit, so the commits need to be atomic. Only a power loss,
+            # rather than the upgrade being killed, can corrupt the output without syncing
+            out_db.execute("pragma journal_mode=TRUNCATE")
             out_db.execute("pragma synchronous=OFF")
             out_db.execute("pragma cache_size=131072")
             out_db.execute("pragma locking_mode=exclusive")
 
-            print("initializing v2 version")
-            out_db.execute("CREATE TABLE database_version(version int)")
-            out_db.execute("INSERT INTO database_version VALUES(?)", (2,))
-
-            print("initializing v2 block store")
-            out_db.execute(
-                "CREATE TABLE full_blocks("
-                "header_hash blob PRIMARY KEY,"
-                "prev_hash blob,"
-                "height bigint,"
-                "sub_epoch_summary blob,"
-                "is_fully_compactified tinyint,"
-                "in_main_chain tinyint,"
-                "block blob,"
-                "block_record blob)"
-            )
-            out_db.execute(
-                "CREATE TABLE sub_epoch_segments_v3(" "ses_block_hash blob PRIMARY KEY," "challenge_segments blob)"
-            )
-            out_db.execute("CREATE TABLE current_peak(key int PRIMARY KEY, hash blob)")
+            peak_hash: bytes32
+            peak_height: uint32
+            if resume:
+                peak_hash = bytes32(get_progress(out_db, "peak_hash"))
+                peak_height = uint32(get_progress(out_db, "peak_height"))
+                print(f"resuming the conversion of peak: {peak_hash.hex()} height: {peak_height}")
+            else:
+                peak_hash, peak_height = initialize_v2(in_db, out_db)
 
-            with closing(in_db.execute("SELECT header_hash, height from block_records WHERE is_peak = 1")) as cursor:
-                peak_row = cursor.fetchone()
-                if peak_row is None:
-                    raise RuntimeError("v1 database does not have a peak block, there is no blockchain to convert")
-            peak_hash = bytes32(bytes.fromhex(peak_row[0]))
-            peak_height = uint32(peak_row[1])
-            print(f"peak: {peak_hash.hex()} height: {peak_height}")
+            start_time = time()
+            block_count, block_bytes_in, block_bytes_out = convert_blocks(
+                in_db, out_db, peak_hash, peak_height, workers
+            )
+            ses_count = convert_sub_epoch_segments(in_db, out_db)
+            hint_count = convert_hints(in_db, out_db)
+            coin_count = convert_coins(in_db, out_db, peak_height)
+            build_indices(out_db)
 
-            out_db.execute("INSERT INTO current_peak VALUES(?, ?)", (0, peak_hash))
+            out_db.execute("DROP TABLE upgrade_progress")
             out_db.commit()
 
-            print("[1/5] converting full_blocks")
-            height = peak_height + 1
-            hh = peak_hash
+            end_time = time()
+            print(
+                f"this run converted {block_count} blocks ({block_bytes_in / 1024 / 1024:0.1f} MiB -> "
+                f"{block_bytes_out / 1024 / 1024:0.1f} MiB), {ses_count} sub epoch segments, {hint_count} hints "
+                f"and {coin_count} coins in {end_time - start_time:.2f} seconds"
+            )
 
+
+def initialize_v2(in_db: sqlite3.Connection, out_db: sqlite3.Connection) -> Tuple[bytes32, uint32]:
+    with closing(in_db.execute("SELECT header_hash, height from block_records WHERE is_peak = 1")) as cursor:
+        peak_row = cursor.fetchone()
+        if peak_row is None:
+            raise RuntimeError("v1 database does not have a peak block, there is no blockchain to convert")
+    peak_hash = bytes32(bytes.fromhex(peak_row[0]))
+    peak_height = uint32(peak_row[1])
+
+    # the schema is committed along with the progress, a resumed conversion relies on both. sqlite3 doesn't start a
+    # transaction for CREATE TABLE on its own
+    out_db.execute("BEGIN")
+    print("initializing v2 version")
+    out_db.execute("CREATE TABLE database_version(version int)")
+    out_db.execute("INSERT INTO database_version VALUES(?)", (2,))
+
+    print("initializing v2 block store")
+    out_db.execute(
+        "CREATE TABLE full_blocks("
+        "header_hash blob PRIMARY KEY,"
+        "prev_hash blob,"
+        "height bigint,"
+        "sub_epoch_summary blob,"
+        "is_fully_compactified tinyint,"
+        "in_main_chain tinyint,"
+        "block blob,"
+        "block_record blob)"
+    )
+    out_db.execute("CREATE TABLE sub_epoch_segments_v3(" "ses_block_hash blob PRIMARY KEY," "challenge_segments blob)")
+    out_db.execute("CREATE TABLE current_peak(key int PRIMARY KEY, hash blob)")
+    out_db.execute("CREATE TABLE hints(coin_id blob, hint blob, UNIQUE (coin_id, hint))")
+    out_db.execute(
+        "CREATE TABLE coin_record("
+        "coin_name blob PRIMARY KEY,"
+        " confirmed_index bigint,"
+        " spent_index bigint,"  # if this is zero, it means the coin has not been spent
+        " coinbase int,"
+        " puzzle_hash blob,"
+        " coin_parent blob,"
+        " amount blob,"  # we use a blob of 8 bytes to store uint64
+        " timestamp bigint)"
+    )
+    # dropped once the conversion is complete
+    out_db.execute("CREATE TABLE upgrade_progress(key text PRIMARY KEY, value)")
+
+    print(f"peak: {peak_hash.hex()} height: {peak_height}")
+
+    out_db.execute("INSERT INTO current_peak VALUES(?, ?)", (0, peak_hash))
+    set_progress(out_db, "peak_hash", peak_hash)
+    set_progress(out_db, "peak_height", peak_height)
+    out_db.commit()
+    return peak_hash, peak_height
+
+
+def convert_blocks(
+    in_db: sqlite3.Connection, out_db: sqlite3.Connection, peak_hash: bytes32, peak_height: uint32, workers: int
+) -> Tuple[int, int, int]:
+    print("[1/5] converting full_blocks")
+    if get_progress(out_db, "blocks_done"):
+        print("      already converted")
+        return 0, 0, 0
+
+    # the blocks are converted from the peak down, along the main chain. `height` is the lowest one converted
+    hh = peak_hash
+    height = peak_height + 1
+    next_hash = get_progress(out_db, "blocks_next_hash")
+    if next_hash is not None:
+        hh = bytes32(next_hash)
+        height = get_progress(out_db, "blocks_height")
+        print(f"      resuming at height {height - 1}")
+
+    pool: Optional[ProcessPoolExecutor] = None
+    if workers > 0:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    # the batches being compressed while the ones before them get written
+    pending: Deque[Tuple[List[BlockRow], Future[List[bytes]]]] = deque()
+    max_pending = max(2, workers * 2)
+
+    count = 0
+    bytes_in = 0
+    bytes_out = 0
+    commit_in = BLOCK_COMMIT_RATE
+    rate = 1.0
+    start_time = time()
+    block_start_time = start_time
+
+    def submit(rows: List[BlockRow], blocks: List[bytes]) -> None:
+        future: Future[List[bytes]]
+        if pool is None:
+            future = Future()
+            future.set_result(compress_blocks(blocks))
+        else:
+            future = pool.submit(compress_blocks, blocks)
+        pending.append((rows, future))
+
+    def write_batch() -> None:
+        nonlocal count, bytes_out, commit_in, rate, start_time
+        rows, future = pending.popleft()
+        compressed = future.result()
+        out_db.executemany(
+            "INSERT OR REPLACE INTO full_blocks VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (hh, prev_hash, height, ses, is_fully_compactified, 1, block, block_record)  # in_main_chain
+                for (hh, prev_hash, height, ses, is_fully_compactified, block_record), block in zip(rows, compressed)
+            ],
+        )
+        # the checkpoint is committed along with the blocks
+        set_progress(out_db, "blocks_next_hash", rows[-1][1])
+        set_progress(out_db, "blocks_height", rows[-1][2])
+        count += len(rows)
+        bytes_out += sum(len(block) for block in compressed)
+        commit_in -= len(rows)
+        if commit_in <= 0:
             commit_in = BLOCK_COMMIT_RATE
-            rate = 1.0
-            start_time = time()
-            block_start_time = start_time
-            block_values = []
+            out_db.commit()
+            out_db.execute("begin transaction")
+            end_time = time()
+            rate = BLOCK_COMMIT_RATE / (end_time - start_time)
+            start_time = end_time
 
+    try:
+        with closing(
+            in_db.execute(
+                "SELECT header_hash, prev_hash, block, sub_epoch_summary FROM block_records "
+                "WHERE height < ? ORDER BY height DESC",
+                (height,),
+            )
+        ) as cursor:
             with closing(
                 in_db.execute(
-                    "SELECT header_hash, prev_hash, block, sub_epoch_summary FROM block_records ORDER BY height DESC"
+                    "SELECT header_hash, height, is_fully_compactified, block FROM full_blocks "
+                    "WHERE height < ? ORDER BY height DESC",
+                    (height,),
                 )
-            ) as cursor:
-                with closing(
-                    in_db.execute(
-                        "SELECT header_hash, height, is_fully_compactified, block FROM full_blocks ORDER BY height DESC"
-                    )
-                ) as cursor_2:
-
-                    out_db.execute("begin transaction")
-                    for row in cursor:
-
-                        header_hash = bytes.fromhex(row[0])
-                        if header_hash != hh:
-                            continue
-
-                        # progress cursor_2 until we find the header hash
-                        while True:
-                            row_2 = cursor_2.fetchone()
-                            if row_2 is None:
-                                raise RuntimeError(f"block {hh.hex()} not found")
-                            if bytes.fromhex(row_2[0]) == hh:
-                                break
-
-                        assert row_2[1] == height - 1
-                        height = row_2[1]
-                        is_fully_compactified = row_2[2]
-                        block_bytes = row_2[3]
-
-                        prev_hash = bytes32.fromhex(row[1])
-                        block_record = row[2]
-                        ses = row[3]
-
-                        block_values.append(
-                            (
-                                hh,
-                                prev_hash,
-                                height,
-                                ses,
-                                is_fully_compactified,
-                                1,  # in_main_chain
-                                zstd.compress(block_bytes),
-                                block_record,
-                            )
-                        )
-                        hh = prev_hash
-                        if (height % 1000) == 0:
-                            print(
-                                f"\r{height: 10d} {(peak_height-height)*100/peak_height:.2f}% "
-                                f"{rate:0.1f} blocks/s ETA: {height//rate} s    ",
-                                end="",
-                            )
-                            sys.stdout.flush()
-                        commit_in -= 1
-                        if commit_in == 0:
-                            commit_in = BLOCK_COMMIT_RATE
-                            out_db.executemany(
-                                "INSERT OR REPLACE INTO full_blocks VALUES(?, ?, ?, ?, ?, ?, ?, ?)", block_values
-                            )
-                            out_db.commit()
-                            out_db.execute("begin transaction")
-                            block_values = []
-                            end_time = time()
-                            rate = BLOCK_COMMIT_RATE / (end_time - start_time)
-                            start_time = end_time
-
-            out_db.executemany("INSERT OR REPLACE INTO full_blocks VALUES(?, ?, ?, ?, ?, ?, ?, ?)", block_values)
-            out_db.commit()
-            end_time = time()
-            print(f"\r      {end_time - block_start_time:.2f} seconds                             ")
-
-            print("[2/5] converting sub_epoch_segments_v3")
+            ) as cursor_2:
 
-            commit_in = SES_COMMIT_RATE
-            ses_values = []
-            ses_start_time = time()
-            with closing(
-                in_db.execute("SELECT ses_block_hash, challenge_segments FROM sub_epoch_segments_v3")
-            ) as cursor:
-                count = 0
                 out_db.execute("begin transaction")
+                batch_rows: List[BlockRow] = []
+                batch_blocks: List[bytes] = []
                 for row in cursor:
-                    block_hash = bytes32.fromhex(row[0])
-                    ses = row[1]
-                    ses_values.append((block_hash, ses))
-                    count += 1
-                    if (count % 100) == 0:
-                        print(f"\r{count:10d}  ", end="")
-                        sys.stdout.flush()
 
-                    commit_in -= 1
-                    if commit_in == 0:
-                        commit_in = SES_COMMIT_RATE
-                        out_db.executemany("INSERT INTO sub_epoch_segments_v3 VALUES (?, ?)", ses_values)
-                        out_db.commit()
-                        out_db.execute("begin transaction")
-                        ses_values = []
+                    header_hash = bytes.fromhex(row[0])
+                    if header_hash != hh:
+                        continue
+
+                    # progress cursor_2 until we find the header hash
+                    while True:
+                        row_2 = cursor_2.fetchone()
+                        if row_2 is None:
+                            raise RuntimeError(f"block {hh.hex()} not found")
+                        if bytes.fromhex(row_2[0]) == hh:
+                            break
+
+                    assert row_2[1] == height - 1
+                    height = row_2[1]
+                    is_fully_compactified = row_2[2]
+                    block_bytes = row_2[3]
+
+                    prev_hash = bytes32.fromhex(row[1])
+                    block_record = row[2]
+                    ses = row[3]
+
+                    batch_rows.append((hh, prev_hash, height, ses, is_fully_compactified, block_record))
+                    batch_blocks.append(block_bytes)
+                    bytes_in += len(block_bytes)
+                    hh = prev_hash
+                    if len(batch_rows) == BLOCK_BATCH_SIZE:
+                        submit(batch_rows, batch_blocks)
+                        batch_rows = []
+                        batch_blocks = []
+                        if len(pending) >= max_pending:
+                            write_batch()
+
+                    if (height % 1000) == 0:
+                        print(
+                            f"\r{height: 10d} {(peak_height-height)*100/peak_height:.2f}% "
+                            f"{rate:0.1f} blocks/s ETA: {height//rate} s    ",
+                            end="",
+                        )
+                        sys.stdout.flush()
 
-            out_db.executemany("INSERT INTO sub_epoch_segments_v3 VALUES (?, ?)", ses_values)
-            out_db.commit()
+        if len(batch_rows) > 0:
+            submit(batch_rows, batch_blocks)
+        while len(pending) > 0:
+            write_batch()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    set_progress(out_db, "blocks_done", 1)
+    out_db.commit()
+    print_throughput(
+        count,
+        "blocks",
+        time() - block_start_time,
+        f", {bytes_in / 1024 / 1024:0.1f} MiB -> {bytes_out / 1024 / 1024:0.1f} MiB",
+    )
+    return count, bytes_in, bytes_out
+
+
+def convert_sub_epoch_segments(in_db: sqlite3.Connection, out_db: sqlite3.Connection) -> int:
+    print("[2/5] converting sub_epoch_segments_v3")
+    if get_progress(out_db, "sub_epoch_segments_done"):
+        print("      already converted")
+        return 0
+
+    # there are few of these, an interrupted conversion just starts this step over
+    commit_in = SES_COMMIT_RATE
+    ses_values = []
+    ses_start_time = time()
+    with closing(in_db.execute("SELECT ses_block_hash, challenge_segments FROM sub_epoch_segments_v3")) as cursor:
+        count = 0
+        out_db.execute("begin transaction")
+        for row in cursor:
+            block_hash = bytes32.fromhex(row[0])
+            ses = row[1]
+            ses_values.append((block_hash, ses))
+            count += 1
+            if (count % 100) == 0:
+                print(f"\r{count:10d}  ", end="")
+                sys.stdout.flush()
+
+            commit_in -= 1
+            if commit_in == 0:
+                commit_in = SES_COMMIT_RATE
+                out_db.executemany("INSERT OR REPLACE INTO sub_epoch_segments_v3 VALUES (?, ?)", ses_values)
+                out_db.commit()
+                out_db.execute("begin transaction")
+                ses_values = []
 
-            end_time = time()
-            print(f"\r      {end_time - ses_start_time:.2f} seconds                             ")
+    out_db.executemany("INSERT OR REPLACE INTO sub_epoch_segments_v3 VALUES (?, ?)", ses_values)
+    set_progress(out_db, "sub_epoch_segments_done", 1)
+    out_db.commit()
 
-            print("[3/5] converting hint_store")
+    print_throughput(count, "segments", time() - ses_start_time)
+    return count
 
-            commit_in = HINT_COMMIT_RATE
-            hint_start_time = time()
-            hint_values = []
-            out_db.execute("CREATE TABLE hints(coin_id blob, hint blob, UNIQUE (coin_id, hint))")
-            out_db.commit()
-            try:
-                with closing(in_db.execute("SELECT coin_id, hint FROM hints")) as cursor:
-                    count = 0
-                    out_db.execute("begin transaction")
-                    for row in cursor:
-                        hint_values.append((row[0], row[1]))
-                        commit_in -= 1
-                        if commit_in == 0:
-                            commit_in = HINT_COMMIT_RATE
-                            out_db.executemany("INSERT OR IGNORE INTO hints VALUES(?, ?)", hint_values)
-                            out_db.commit()
-                            out_db.execute("begin transaction")
-                            hint_values = []
-            except sqlite3.OperationalError:
-                print("      no hints table, skipping")
-
-            out_db.executemany("INSERT OR IGNORE INTO hints VALUES (?, ?)", hint_values)
-            out_db.commit()
 
-            end_time = time()
-            print(f"\r      {end_time - hint_start_time:.2f} seconds                             ")
-
-            print("[4/5] converting coin_store")
-            out_db.execute(
-                "CREATE TABLE coin_record("
-                "coin_name blob PRIMARY KEY,"
-                " confirmed_index bigint,"
-                " spent_index bigint,"  # if this is zero, it means the coin has not been spent
-                " coinbase int,"
-                " puzzle_hash blob,"
-                " coin_parent blob,"
-                " amount blob,"  # we use a blob of 8 bytes to store uint64
-                " timestamp bigint)"
-            )
-            out_db.commit()
+def convert_hints(in_db: sqlite3.Connection, out_db: sqlite3.Connection) -> int:
+    print("[3/5] converting hint_store")
+    if get_progress(out_db, "hints_done"):
+        print("      already converted")
+        return 0
 
-            commit_in = COIN_COMMIT_RATE
-            rate = 1.0
-            start_time = time()
-            coin_values = []
-            coin_start_time = start_time
-            with closing(
-                in_db.execute(
-                    "SELECT coin_name, confirmed_index, spent_index, coinbase, "
-                    "puzzle_hash, coin_parent, amount, timestamp "
-                    "FROM coin_record WHERE confirmed_index <= ?",
-                    (peak_height,),
+    last_rowid = get_progress(out_db, "hints_rowid")
+    if last_rowid is None:
+        last_rowid = 0
+    commit_in = HINT_COMMIT_RATE
+    hint_start_time = time()
+    hint_values = []
+    count = 0
+    try:
+        with closing(
+            in_db.execute("SELECT rowid, coin_id, hint FROM hints WHERE rowid > ? ORDER BY rowid", (last_rowid,))
+        ) as cursor:
+            out_db.execute("begin transaction")
+            for row in cursor:
+                hint_values.append((row[1], row[2]))
+                count += 1
+                commit_in -= 1
+                if commit_in == 0:
+                    commit_in = HINT_COMMIT_RATE
+                    out_db.executemany("INSERT OR IGNORE INTO hints VALUES(?, ?)", hint_values)
+                    set_progress(out_db, "hints_rowid", row[0])
+                    out_db.commit()
+                    out_db.execute("begin transaction")
+                    hint_values = []
+    except sqlite3.OperationalError:
+        print("      no hints table, skipping")
+
+    out_db.executemany("INSERT OR IGNORE INTO hints VALUES (?, ?)", hint_values)
+    set_progress(out_db, "hints_done", 1)
+    out_db.commit()
+
+    print_throughput(count, "hints", time() - hint_start_time)
+    return count
+
+
+def convert_coins(in_db: sqlite3.Connection, out_db: sqlite3.Connection, peak_height: uint32) -> int:
+    print("[4/5] converting coin_store")
+    if get_progress(out_db, "coins_done"):
+        print("      already converted")
+        return 0
+
+    last_rowid = get_progress(out_db, "coins_rowid")
+    if last_rowid is None:
+        last_rowid = 0
+    commit_in = COIN_COMMIT_RATE
+    rate = 1.0
+    start_time = time()
+    coin_values = []
+    coin_start_time = start_time
+    with closing(
+        in_db.execute(
+            "SELECT rowid, coin_name, confirmed_index, spent_index, coinbase, "
+            "puzzle_hash, coin_parent, amount, timestamp "
+            "FROM coin_record WHERE confirmed_index <= ? AND rowid > ? ORDER BY rowid",
+            (peak_height, last_rowid),
+        )
+    ) as cursor:
+        count = 0
+        out_db.execute("begin transaction")
+        for row in cursor:
+            spent_index = row[3]
+
+            # in order to convert a consistent snapshot of the
+            # blockchain state, any coin that was spent *after* our
+            # cutoff must be converted into an unspent coin
+            if spent_index > peak_height:
+                spent_index = 0
+
+            coin_values.append(
+                (
+                    bytes.fromhex(row[1]),
+                    row[2],
+                    spent_index,
+                    row[4],
+                    bytes.fromhex(row[5]),
+                    bytes.fromhex(row[6]),
+                    row[7],
+                    row[8],
                 )
-            ) as cursor:
-                count = 0
-                out_db.execute("begin transaction")
-                for row in cursor:
-                    spent_index = row[2]
-
-                    # in order to convert a consistent snapshot of the
-                    # blockchain state, any coin that was spent *after* our
-                    # cutoff must be converted into an unspent coin
-                    if spent_index > peak_height:
-                        spent_index = 0
-
-                    coin_values.append(
-                        (
-                            bytes.fromhex(row[0]),
-                            row[1],
-                            spent_index,
-                            row[3],
-                            bytes.fromhex(row[4]),
-                            bytes.fromhex(row[5]),
-                            row[6],
-                            row[7],
-                        )
-                    )
-                    count += 1
-                    if (count % 2000) == 0:
-                        print(f"\r{count//1000:10d}k coins {rate:0.1f} coins/s  ", end="")
-                        sys.stdout.flush()
-                    commit_in -= 1
-                    if commit_in == 0:
-                        commit_in = COIN_COMMIT_RATE
-                        out_db.executemany("INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?)", coin_values)
-                        out_db.commit()
-                        out_db.execute("begin transaction")
-                        coin_values = []
-                        end_time = time()
-                        rate = COIN_COMMIT_RATE / (end_time - start_time)
-                        start_time = end_time
-
-            out_db.executemany("INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?)", coin_values)
-            out_db.commit()
-            end_time = time()
-            print(f"\r      {end_time - coin_start_time:.2f} seconds                             ")
-
-            print("[5/5] build indices")
-            index_start_time = time()
-            print("      block store")
-            out_db.execute("CREATE INDEX height on full_blocks(height)")
-            out_db.execute(
-                "CREATE INDEX is_fully_compactified ON"
-                " full_blocks(is_fully_compactified, in_main_chain) WHERE in_main_chain=1"
             )
-            out_db.execute("CREATE INDEX main_chain ON full_blocks(height, in_main_chain) WHERE in_main_chain=1")
-            out_db.commit()
-            print("      coin store")
-
-            out_db.execute("CREATE INDEX IF NOT EXISTS coin_confirmed_index on coin_record(confirmed_index)")
-            out_db.execute("CREATE INDEX IF NOT EXISTS coin_spent_index on coin_record(spent_index)")
-            out_db.execute("CREATE INDEX IF NOT EXISTS coin_puzzle_hash on coin_record(puzzle_hash)")
-            out_db.execute("CREATE INDEX IF NOT EXISTS coin_parent_index on coin_record(coin_parent)")
-            out_db.commit()
-            print("      hint store")
-
-            out_db.execute("CREATE TABLE IF NOT EXISTS hints(coin_id blob, hint blob, UNIQUE (coin_id, hint))")
-            out_db.commit()
-            end_time = time()
-            print(f"\r      {end_time - index_start_time:.2f} seconds                             ")
+            count += 1
+            if (count % 2000) == 0:
+                print(f"\r{count//1000:10d}k coins {rate:0.1f} coins/s  ", end="")
+                sys.stdout.flush()
+            commit_in -= 1
+            if commit_in == 0:
+                commit_in = COIN_COMMIT_RATE
+                out_db.executemany("INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?)", coin_values)
+                set_progress(out_db, "coins_rowid", row[0])
+                out_db.commit()
+                out_db.execute("begin transaction")
+                coin_values = []
+                end_time = time()
+                rate = COIN_COMMIT_RATE / (end_time - start_time)
+                start_time = end_time
+
+    out_db.executemany("INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?)", coin_values)
+    set_progress(out_db, "coins_done", 1)
+    out_db.commit()
+    print_throughput(count, "coins", time() - coin_start_time)
+    return count
+
+
+def build_indices(out_db: sqlite3.Connection) -> None:
+    print("[5/5] build indices")
+    index_start_time = time()
+    print("      block store")
+    out_db.execute("CREATE INDEX IF NOT EXISTS height on full_blocks(height)")
+    out_db.execute(
+        "CREATE INDEX IF NOT EXISTS is_fully_compactified ON"
+        " full_blocks(is_fully_compactified, in_main_chain) WHERE in_main_chain=1"
+    )
+    out_db.execute("CREATE INDEX IF NOT EXISTS main_chain ON full_blocks(height, in_main_chain) WHERE in_main_chain=1")
+    out_db.commit()
+    print("      coin store")
+
+    out_db.execute("CREATE INDEX IF NOT EXISTS coin_confirmed_index on coin_record(confirmed_index)")
+    out_db.execute("CREATE INDEX IF NOT EXISTS coin_spent_index on coin_record(spent_index)")
+    out_db.execute("CREATE INDEX IF NOT EXISTS coin_puzzle_hash on coin_record(puzzle_hash)")
+    out_db.execute("CREATE INDEX IF NOT EXISTS coin_parent_index on coin_record(coin_parent)")
+    out_db.commit()
+    print("      hint store")
+
+    out_db.execute("CREATE TABLE IF NOT EXISTS hints(coin_id blob, hint blob, UNIQUE (coin_id, hint))")
+    out_db.commit()
+    end_time = time()
+    print(f"\r      {end_time - index_start_time:.2f} seconds                             ")
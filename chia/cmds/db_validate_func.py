@@ -1,21 +1,48 @@
 from __future__ import annotations
 
+import os
+import sqlite3
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from contextlib import closing
 from pathlib import Path
-from typing import Any, Dict, Optional
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
 
 from chia.consensus.block_record import BlockRecord
+from chia.consensus.constants import ConsensusConstants
 from chia.consensus.default_constants import DEFAULT_CONSTANTS
+from chia.full_node.mempool_check_conditions import get_name_puzzle_conditions
+from chia.types.blockchain_format.program import SerializedProgram
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.full_block import FullBlock
+from chia.types.generator_types import BlockGenerator
 from chia.util.config import load_config
+from chia.util.full_block_utils import generator_from_block
+from chia.util.generator_tools import tx_removals_and_additions
+from chia.util.ints import uint64
 from chia.util.path import path_from_root
 
+# the blocks and coins are validated in ranges of this many heights, in parallel
+VALIDATE_RANGE_SIZE = 1000
+
+# coin_name, confirmed_index, coinbase, puzzle_hash, coin_parent, amount, timestamp
+CoinRow = Tuple[bytes, int, int, bytes, bytes, bytes, int]
+
+
+def default_validate_workers() -> int:
+    return max(1, (os.cpu_count() or 1) - 1)
+
 
 def db_validate_func(
     root_path: Path,
     in_db_path: Optional[Path] = None,
     *,
     validate_blocks: bool,
+    validate_coins: bool = False,
+    workers: Optional[int] = None,
+    start_height: Optional[int] = None,
+    end_height: Optional[int] = None,
 ) -> None:
     if in_db_path is None:
         config: Dict[str, Any] = load_config(root_path, "config.yaml")["full_node"]
@@ -24,17 +51,35 @@ def db_validate_func(
         db_path_replaced: str = db_pattern.replace("CHALLENGE", selected_network)
         in_db_path = path_from_root(root_path, db_path_replaced)
 
-    validate_v2(in_db_path, validate_blocks=validate_blocks)
+    validate_v2(
+        in_db_path,
+        validate_blocks=validate_blocks,
+        validate_coins=validate_coins,
+        workers=default_validate_workers() if workers is None else workers,
+        start_height=start_height,
+        end_height=end_height,
+    )
 
     print(f"\n\nDATABASE IS VALID: {in_db_path}\n")
 
 
-def validate_v2(in_path: Path, *, validate_blocks: bool) -> None:
-    import sqlite3
-    from contextlib import closing
-
-    import zstd
-
+def validate_v2(
+    in_path: Path,
+    *,
+    validate_blocks: bool,
+    validate_coins: bool = False,
+    workers: int = 0,
+    start_height: Optional[int] = None,
+    end_height: Optional[int] = None,
+    constants: ConsensusConstants = DEFAULT_CONSTANTS,
+) -> None:
+    """
+    Validates the links of the main chain of the v2 database at `in_path`. With `validate_blocks`, the blobs and
+    block records of all the blocks are decoded and checked against their columns, and with `validate_coins` the
+    coin_record table is checked against the additions and removals of the main chain blocks, recomputed by running
+    their generators. Those checks are limited to the heights from `start_height` to `end_height`, inclusive, and
+    run in `workers` processes, or on this thread if it's 0.
+    """
     if not in_path.exists():
         print(f"input file doesn't exist. {in_path}")
         raise RuntimeError(f"can't find {in_path}")
@@ -85,11 +130,7 @@ def validate_v2(in_path: Path, *, validate_blocks: bool) -> None:
         height_to_hash = bytearray(peak_height * 32)
 
         with closing(
-            in_db.execute(
-                f"SELECT header_hash, prev_hash, height, in_main_chain"
-                f"{', block, block_record' if validate_blocks else ''} "
-                "FROM full_blocks ORDER BY height DESC"
-            )
+            in_db.execute("SELECT header_hash, prev_hash, height, in_main_chain FROM full_blocks ORDER BY height DESC")
         ) as cursor:
 
             for row in cursor:
@@ -104,35 +145,6 @@ def validate_v2(in_path: Path, *, validate_blocks: bool) -> None:
                 if height > peak_height:
                     continue
 
-                if validate_blocks:
-                    block = FullBlock.from_bytes(zstd.decompress(row[4]))
-                    block_record = BlockRecord.from_bytes(row[5])
-                    actual_header_hash = block.header_hash
-                    actual_prev_hash = block.prev_header_hash
-                    if actual_header_hash != hh:
-                        raise RuntimeError(
-                            f"Block {hh.hex()} has a blob with mismatching " f"hash: {actual_header_hash.hex()}"
-                        )
-                    if block_record.header_hash != hh:
-                        raise RuntimeError(
-                            f"Block {hh.hex()} has a block record with mismatching "
-                            f"hash: {block_record.header_hash.hex()}"
-                        )
-                    if block_record.total_iters != block.total_iters:
-                        raise RuntimeError(
-                            f"Block {hh.hex()} has a block record with mismatching total "
-                            f"iters: {block_record.total_iters} expected {block.total_iters}"
-                        )
-                    if block_record.prev_hash != actual_prev_hash:
-                        raise RuntimeError(
-                            f"Block {hh.hex()} has a block record with mismatching "
-                            f"prev_hash: {block_record.prev_hash} expected {actual_prev_hash.hex()}"
-                        )
-                    if block.height != height:
-                        raise RuntimeError(
-                            f"Block {hh.hex()} has a mismatching " f"height: {block.height} expected {height}"
-                        )
-
                 if height != current_height:
                     # we're moving to the next level. Make sure we found the block
                     # we were looking for at the previous level
@@ -153,13 +165,6 @@ def validate_v2(in_path: Path, *, validate_blocks: bool) -> None:
                             f"but in_main_chain is not set"
                         )
 
-                    if validate_blocks:
-                        if actual_prev_hash != prev:
-                            raise RuntimeError(
-                                f"Block {hh.hex()} has a blob with mismatching "
-                                f"prev-hash: {actual_prev_hash}, expected {prev}"
-                            )
-
                     next_hash = prev
 
                     height_to_hash[height * 32 : height * 32 + 32] = hh
@@ -177,6 +182,17 @@ def validate_v2(in_path: Path, *, validate_blocks: bool) -> None:
         if current_height != 0:
             raise RuntimeError(f"Database is missing blocks below height {current_height}")
 
+        if validate_blocks or validate_coins:
+            validate_height_ranges(
+                in_path,
+                0 if start_height is None else max(0, start_height),
+                peak_height if end_height is None else min(peak_height, end_height),
+                validate_blocks=validate_blocks,
+                validate_coins=validate_coins,
+                workers=workers,
+                constants=constants,
+            )
+
         # make sure the prev_hash pointer of block height 0 is the genesis
         # challenge
         if next_hash != DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA:
@@ -187,3 +203,222 @@ def validate_v2(in_path: Path, *, validate_blocks: bool) -> None:
 
         if num_orphans > 0:
             print(f"{num_orphans} orphaned blocks")
+
+
+def validate_height_ranges(
+    in_path: Path,
+    start_height: int,
+    end_height: int,
+    *,
+    validate_blocks: bool,
+    validate_coins: bool,
+    workers: int,
+    constants: ConsensusConstants,
+) -> None:
+    ranges = [
+        (start, min(start + VALIDATE_RANGE_SIZE, end_height + 1))
+        for start in range(start_height, end_height + 1, VALIDATE_RANGE_SIZE)
+    ]
+    checks = " and ".join(name for name, enabled in [("blocks", validate_blocks), ("coins", validate_coins)] if enabled)
+    print(f"validating {checks} from height {start_height} to {end_height} in {max(workers, 1)} process(es)")
+
+    start_time = time()
+    count = 0
+
+    def progress(blocks: int) -> None:
+        nonlocal count
+        count += blocks
+        rate = count / max(time() - start_time, 0.001)
+        print(f"\r{count} blocks {rate:0.1f} blocks/s ", end="")
+        sys.stdout.flush()
+
+    if workers == 0:
+        for start, end in ranges:
+            progress(validate_height_range(in_path, start, end, validate_blocks, validate_coins, constants))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures: List[Future[int]] = [
+                pool.submit(validate_height_range, in_path, start, end, validate_blocks, validate_coins, constants)
+                for start, end in ranges
+            ]
+            try:
+                for future in as_completed(futures):
+                    progress(future.result())
+            except BaseException:
+                # don't wait for the remaining ranges to be validated
+                for future in futures:
+                    future.cancel()
+                raise
+    end_time = time()
+    print(f"\nvalidated {count} blocks in {end_time - start_time:.2f} seconds")
+
+
+def validate_block(hh: bytes32, prev: bytes32, height: int, block: FullBlock, block_record: BlockRecord) -> None:
+    actual_header_hash = block.header_hash
+    actual_prev_hash = block.prev_header_hash
+    if actual_header_hash != hh:
+        raise RuntimeError(f"Block {hh.hex()} has a blob with mismatching " f"hash: {actual_header_hash.hex()}")
+    if block_record.header_hash != hh:
+        raise RuntimeError(
+            f"Block {hh.hex()} has a block record with mismatching " f"hash: {block_record.header_hash.hex()}"
+        )
+    if block_record.total_iters != block.total_iters:
+        raise RuntimeError(
+            f"Block {hh.hex()} has a block record with mismatching total "
+            f"iters: {block_record.total_iters} expected {block.total_iters}"
+        )
+    if block_record.prev_hash != actual_prev_hash:
+        raise RuntimeError(
+            f"Block {hh.hex()} has a block record with mismatching "
+            f"prev_hash: {block_record.prev_hash} expected {actual_prev_hash.hex()}"
+        )
+    if block.height != height:
+        raise RuntimeError(f"Block {hh.hex()} has a mismatching " f"height: {block.height} expected {height}")
+    if actual_prev_hash != prev:
+        raise RuntimeError(
+            f"Block {hh.hex()} has a blob with mismatching " f"prev-hash: {actual_prev_hash}, expected {prev}"
+        )
+
+
+def validate_height_range(
+    in_path: Path,
+    start_height: int,
+    end_height: int,
+    validate_blocks: bool,
+    validate_coins: bool,
+    constants: ConsensusConstants,
+) -> int:
+    """
+    Runs the checks of `validate_v2` on the blocks from `start_height` up to, but not including, `end_height`, on
+    a connection of its own so it can run in a worker process. Returns the number of blocks it checked.
+    """
+    import zstd
+
+    count = 0
+    main_chain: List[FullBlock] = []
+    with closing(sqlite3.connect(f"file:{in_path}?mode=ro", uri=True)) as in_db:
+        with closing(
+            in_db.execute(
+                "SELECT header_hash, prev_hash, height, in_main_chain, block, block_record FROM full_blocks "
+                f"WHERE {'' if validate_blocks else 'in_main_chain=1 AND '}height >= ? AND height < ?",
+                (start_height, end_height),
+            )
+        ) as cursor:
+            for row in cursor:
+                block = FullBlock.from_bytes(zstd.decompress(row[4]))
+                if validate_blocks:
+                    validate_block(bytes32(row[0]), bytes32(row[1]), row[2], block, BlockRecord.from_bytes(row[5]))
+                if row[3]:
+                    main_chain.append(block)
+                count += 1
+
+        if validate_coins:
+            validate_coin_records(in_db, main_chain, start_height, end_height, constants)
+
+    return count
+
+
+def get_generator_at(in_db: sqlite3.Connection, height: int) -> SerializedProgram:
+    import zstd
+
+    with closing(
+        in_db.execute("SELECT block FROM full_blocks WHERE in_main_chain=1 AND height=?", (height,))
+    ) as cursor:
+        row = cursor.fetchone()
+    if row is None:
+        raise RuntimeError(f"Database is missing the generator referenced at height {height}")
+    generator = generator_from_block(zstd.decompress(row[0]))
+    if generator is None:
+        raise RuntimeError(f"Block at height {height} is referenced, but has no generator")
+    return generator
+
+
+def validate_coin_records(
+    in_db: sqlite3.Connection,
+    main_chain: List[FullBlock],
+    start_height: int,
+    end_height: int,
+    constants: ConsensusConstants,
+) -> None:
+    # the coin_record rows the main chain blocks of the range should have created, and the heights at which they
+    # spent coins
+    expected_additions: Dict[bytes, CoinRow] = {}
+    expected_removals: Dict[bytes, int] = {}
+    for block in main_chain:
+        if not block.is_transaction_block():
+            continue
+        assert block.foliage_transaction_block is not None
+        timestamp = block.foliage_transaction_block.timestamp
+        for coin in block.get_included_reward_coins():
+            expected_additions[coin.name()] = (
+                coin.name(),
+                block.height,
+                1,
+                coin.puzzle_hash,
+                coin.parent_coin_info,
+                bytes(uint64(coin.amount)),
+                timestamp,
+            )
+        if block.transactions_generator is None:
+            continue
+
+        refs = [get_generator_at(in_db, height) for height in block.transactions_generator_ref_list]
+        npc_result = get_name_puzzle_conditions(
+            BlockGenerator(block.transactions_generator, refs, block.transactions_generator_ref_list),
+            constants.MAX_BLOCK_COST_CLVM,
+            cost_per_byte=constants.COST_PER_BYTE,
+            mempool_mode=False,
+        )
+        if npc_result.error is not None:
+            raise RuntimeError(
+                f"Block {block.header_hash.hex()} at height {block.height} has a generator that fails "
+                f"with error {npc_result.error}"
+            )
+        removals, additions = tx_removals_and_additions(npc_result.conds)
+        for coin in additions:
+            expected_additions[coin.name()] = (
+                coin.name(),
+                block.height,
+                0,
+                coin.puzzle_hash,
+                coin.parent_coin_info,
+                bytes(uint64(coin.amount)),
+                timestamp,
+            )
+        for name in removals:
+            expected_removals[name] = block.height
+
+    with closing(
+        in_db.execute(
+            "SELECT coin_name, confirmed_index, coinbase, puzzle_hash, coin_parent, amount, timestamp "
+            "FROM coin_record WHERE confirmed_index >= ? AND confirmed_index < ?",
+            (start_height, end_height),
+        )
+    ) as cursor:
+        for row in cursor:
+            expected = expected_additions.pop(row[0], None)
+            if expected is None:
+                raise RuntimeError(f"Coin {row[0].hex()} is confirmed at height {row[1]}, but no block created it")
+            if tuple(row) != expected:
+                raise RuntimeError(f"Coin {row[0].hex()} has the coin_record {tuple(row)}, expected {expected}")
+    if len(expected_additions) > 0:
+        coin_id, addition = next(iter(expected_additions.items()))
+        raise RuntimeError(f"Database is missing the coin {coin_id.hex()} created at height {addition[1]}")
+
+    # a spent_index of 0 marks the unspent coins, nothing can be spent at height 0
+    with closing(
+        in_db.execute(
+            "SELECT coin_name, spent_index FROM coin_record WHERE spent_index >= ? AND spent_index < ?",
+            (max(start_height, 1), end_height),
+        )
+    ) as cursor:
+        for coin_id, spent_index in cursor:
+            expected_height = expected_removals.pop(coin_id, None)
+            if expected_height != spent_index:
+                raise RuntimeError(
+                    f"Coin {coin_id.hex()} is spent at height {spent_index}, "
+                    f"but {'no block spent it' if expected_height is None else f'expected {expected_height}'}"
+                )
+    if len(expected_removals) > 0:
+        coin_id, height = next(iter(expected_removals.items()))
+        raise RuntimeError(f"Coin {coin_id.hex()} is spent at height {height}, but its coin_record isn't")
@@ -2,15 +2,17 @@ from __future__ import annotations
 
 import asyncio
 import dataclasses
+import functools
 import logging
 import multiprocessing
+import sqlite3
 import traceback
 from concurrent.futures import Executor
 from concurrent.futures.process import ProcessPoolExecutor
 from enum import Enum
 from multiprocessing.context import BaseContext
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from chia.consensus.block_body_validation import validate_block_body
 from chia.consensus.block_header_validation import validate_unfinished_header_block
@@ -44,6 +46,7 @@ from chia.types.header_block import HeaderBlock
 from chia.types.unfinished_block import UnfinishedBlock
 from chia.types.unfinished_header_block import UnfinishedHeaderBlock
 from chia.types.weight_proof import SubEpochChallengeSegment
+from chia.util.db_wrapper import run_all, run_on_connection
 from chia.util.errors import ConsensusError, Err
 from chia.util.generator_tools import get_block_header, tx_removals_and_additions
 from chia.util.hash import std_hash
@@ -262,14 +265,24 @@ class Blockchain(BlockchainInterface):
             None,
         )
         # Always add the block to the database
-        async with self.block_store.db_wrapper.writer():
+        async with self.block_store.db_wrapper.writer() as conn:
             try:
                 header_hash: bytes32 = block.header_hash
-                # Perform the DB operations to update the state, and rollback if something goes wrong
-                await self.block_store.add_full_block(header_hash, block, block_record)
+                # Perform the DB operations to update the state, and rollback if something goes wrong. The writes get
+                # collected and applied in one round trip to the database thread.
+                self.block_store.cache_block(header_hash, block)
+                writes: List[Callable[[sqlite3.Connection], object]] = [
+                    functools.partial(
+                        self.block_store.add_full_block_sync,
+                        header_hash=header_hash,
+                        block=block,
+                        block_record=block_record,
+                    )
+                ]
                 records, state_change_summary = await self._reconsider_peak(
-                    block_record, genesis, fork_point_with_peak, npc_result
+                    block_record, genesis, fork_point_with_peak, npc_result, writes
                 )
+                await run_on_connection(conn, functools.partial(run_all, functions=writes))
 
                 # Then update the memory cache. It is important that this is not cancelled and does not throw
                 # This is done after all async/DB operations, so there is a decreased chance of failure.
@@ -310,12 +323,15 @@ class Blockchain(BlockchainInterface):
         genesis: bool,
         fork_point_with_peak: Optional[uint32],
         npc_result: Optional[NPCResult],
+        writes: List[Callable[[sqlite3.Connection], object]],
     ) -> Tuple[List[BlockRecord], Optional[StateChangeSummary]]:
         """
         When a new block is added, this is called, to check if the new block is the new peak of the chain.
         This also handles reorgs by reverting blocks which are not in the heaviest chain.
         It returns the summary of the applied changes, including the height of the fork between the previous chain
         and the new chain, or returns None if there was no update to the heaviest chain.
+        The database updates get appended to `writes`, which the caller applies. The block itself is expected to be
+        among them, i.e. it's not in the database yet.
         """
 
         peak = self.get_peak()
@@ -332,15 +348,20 @@ class Blockchain(BlockchainInterface):
                     tx_removals, tx_additions = [], []
                 if block.is_transaction_block():
                     assert block.foliage_transaction_block is not None
-                    await self.coin_store.new_block(
-                        block.height,
-                        block.foliage_transaction_block.timestamp,
-                        block.get_included_reward_coins(),
-                        tx_additions,
-                        tx_removals,
+                    writes.append(
+                        functools.partial(
+                            self.coin_store.new_block_sync,
+                            height=block.height,
+                            timestamp=block.foliage_transaction_block.timestamp,
+                            included_reward_coins=block.get_included_reward_coins(),
+                            tx_additions=tx_additions,
+                            tx_removals=tx_removals,
+                        )
                     )
-                await self.block_store.set_in_chain([(block_record.header_hash,)])
-                await self.block_store.set_peak(block_record.header_hash)
+                writes.append(
+                    functools.partial(self.block_store.set_in_chain_sync, header_hashes=[(block_record.header_hash,)])
+                )
+                writes.append(functools.partial(self.block_store.set_peak_sync, header_hash=block_record.header_hash))
                 return [block_record], StateChangeSummary(
                     block_record, uint32(0), [], [], list(block.get_included_reward_coins())
                 )
@@ -361,6 +382,7 @@ class Blockchain(BlockchainInterface):
             fork_height = find_fork_point_in_chain(self, block_record, peak)
 
         if block_record.prev_hash != peak.header_hash:
+            # This needs the rolled back coin records right away, and runs before any of the collected writes
             for coin_record in await self.coin_store.rollback_to_block(fork_height):
                 rolled_back_state[coin_record.name] = coin_record
 
@@ -371,7 +393,12 @@ class Blockchain(BlockchainInterface):
         # Backtracks up to the fork point, pulling all the required blocks from DB (that will soon be in the chain)
         while fork_height < 0 or curr != self.height_to_hash(uint32(fork_height)):
             fetched_full_block: Optional[FullBlock] = await self.block_store.get_full_block(curr)
-            fetched_block_record: Optional[BlockRecord] = await self.block_store.get_block_record(curr)
+            fetched_block_record: Optional[BlockRecord]
+            if curr == block_record.header_hash:
+                # The new block isn't written to the database yet
+                fetched_block_record = block_record
+            else:
+                fetched_block_record = await self.block_store.get_block_record(curr)
             assert fetched_full_block is not None
             assert fetched_block_record is not None
             blocks_to_add.append((fetched_full_block, fetched_block_record))
@@ -403,23 +430,30 @@ class Blockchain(BlockchainInterface):
 
             # Apply the coin store changes for each block that is now in the blockchain
             assert fetched_full_block.foliage_transaction_block is not None
-            await self.coin_store.new_block(
-                fetched_full_block.height,
-                fetched_full_block.foliage_transaction_block.timestamp,
-                fetched_full_block.get_included_reward_coins(),
-                tx_additions,
-                tx_removals,
+            writes.append(
+                functools.partial(
+                    self.coin_store.new_block_sync,
+                    height=fetched_full_block.height,
+                    timestamp=fetched_full_block.foliage_transaction_block.timestamp,
+                    included_reward_coins=fetched_full_block.get_included_reward_coins(),
+                    tx_additions=tx_additions,
+                    tx_removals=tx_removals,
+                )
             )
             # Collect the new reward coins for later post-processing
             reward_coins.extend(fetched_full_block.get_included_reward_coins())
 
         # we made it to the end successfully
         # Rollback sub_epoch_summaries
-        await self.block_store.rollback(fork_height)
-        await self.block_store.set_in_chain([(br.header_hash,) for br in records_to_add])
+        writes.append(functools.partial(self.block_store.rollback_sync, height=fork_height))
+        writes.append(
+            functools.partial(
+                self.block_store.set_in_chain_sync, header_hashes=[(br.header_hash,) for br in records_to_add]
+            )
+        )
 
         # Changes the peak to be the new peak
-        await self.block_store.set_peak(block_record.header_hash)
+        writes.append(functools.partial(self.block_store.set_peak_sync, header_hash=block_record.header_hash))
 
         return records_to_add, StateChangeSummary(
             block_record, uint32(max(fork_height, 0)), list(rolled_back_state.values()), npc_results, reward_coins
@@ -765,8 +799,9 @@ class Blockchain(BlockchainInterface):
             if block is not None:
                 blocks.append(block)
                 hashes.remove(hash)
-        blocks_on_disk: List[FullBlock] = await self.block_store.get_blocks_by_hash(hashes)
-        blocks.extend(blocks_on_disk)
+        # the blocks imported from a snapshot below its height are left out, like the heights we don't have
+        blocks_on_disk: Dict[bytes32, FullBlock] = await self.block_store.get_stored_blocks_by_hash(hashes)
+        blocks.extend(blocks_on_disk.values())
         header_blocks: Dict[bytes32, HeaderBlock] = {}
 
         for block in blocks:
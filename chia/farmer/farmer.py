@@ -1,22 +1,28 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import json
 import logging
+import ssl
 import time
 import traceback
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import aiohttp
 from blspy import AugSchemeMPL, G1Element, G2Element, PrivateKey
 
+from chia import __version__
 from chia.consensus.constants import ConsensusConstants
 from chia.daemon.keychain_proxy import KeychainProxy, connect_to_keychain_and_validate, wrap_local_keychain
+from chia.farmer.farmer_cache import FarmerCache
+from chia.farmer.partial_submitter import PartialSubmitter, request_failed_response
 from chia.plot_sync.delta import Delta
-from chia.plot_sync.receiver import Receiver
+from chia.plot_sync.receiver import Receiver, ReceiverState
 from chia.pools.pool_config import PoolWalletConfig, add_auth_key, load_pool_config
-from chia.protocols import farmer_protocol, harvester_protocol
+from chia.protocols import harvester_protocol
 from chia.protocols.pool_protocol import (
     AuthenticationPayload,
     ErrorResponse,
@@ -24,6 +30,7 @@ from chia.protocols.pool_protocol import (
     PoolErrorCode,
     PostFarmerPayload,
     PostFarmerRequest,
+    PostPartialRequest,
     PutFarmerPayload,
     PutFarmerRequest,
     get_current_authentication_token,
@@ -34,7 +41,6 @@ from chia.server.outbound_message import NodeType, make_msg
 from chia.server.server import ssl_context_for_root
 from chia.server.ws_connection import WSChiaConnection
 from chia.ssl.create_ssl import get_mozilla_ca_crt
-from chia.types.blockchain_format.proof_of_space import ProofOfSpace
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.util.bech32m import decode_puzzle_hash
 from chia.util.byte_types import hexstr_to_bytes
@@ -43,6 +49,8 @@ from chia.util.errors import KeychainProxyConnectionFailure
 from chia.util.hash import std_hash
 from chia.util.ints import uint8, uint16, uint32, uint64
 from chia.util.keychain import Keychain
+from chia.util.misc import VersionedBlob
+from chia.util.streamable import Streamable, streamable
 from chia.wallet.derive_keys import (
     find_authentication_sk,
     find_owner_sk,
@@ -59,6 +67,20 @@ log = logging.getLogger(__name__)
 UPDATE_POOL_INFO_INTERVAL: int = 3600
 UPDATE_POOL_INFO_FAILURE_RETRY_INTERVAL: int = 120
 UPDATE_POOL_FARMER_INFO_INTERVAL: int = 300
+# Keep idle connections to the pools open long enough to reuse them for the next partial
+POOL_CONNECTION_KEEPALIVE_TIMEOUT: float = 120
+PLOT_SYNC_RESUME_STATES_VERSION: int = 2
+# Drop the state of harvesters which didn't reconnect within 7 days after their last completed sync
+PLOT_SYNC_RESUME_STATE_EXPIRY_SECONDS: int = 7 * 24 * 60 * 60
+# Only keep the states of the harvesters with the most recent syncs beyond this
+PLOT_SYNC_RESUME_STATES_MAX: int = 1000
+
+
+@streamable
+@dataclass(frozen=True)
+class PlotSyncResumeStatesV2(Streamable):
+    states: List[Tuple[bytes32, ReceiverState]]
+
 
 """
 HARVESTER PROTOCOL (FARMER <-> HARVESTER)
@@ -79,23 +101,14 @@ class Farmer:
         self._root_path = root_path
         self.config = farmer_config
         self.pool_config = pool_config
-        # Keep track of all sps, keyed on challenge chain signage point hash
-        self.sps: Dict[bytes32, List[farmer_protocol.NewSignagePoint]] = {}
-
-        # Keep track of harvester plot identifier (str), target sp index, and PoSpace for each challenge
-        self.proofs_of_space: Dict[bytes32, List[Tuple[str, ProofOfSpace]]] = {}
-
-        # Quality string to plot identifier and challenge_hash, for use with harvester.RequestSignatures
-        self.quality_str_to_identifiers: Dict[bytes32, Tuple[str, bytes32, bytes32, bytes32]] = {}
-
-        # number of responses to each signage point
-        self.number_of_responses: Dict[bytes32, int] = {}
-
-        # A dictionary of keys to time added. These keys refer to keys in the above 4 dictionaries. This is used
-        # to periodically clear the memory
-        self.cache_add_time: Dict[bytes32, uint64] = {}
+        # Signage points, proofs of space, quality strings and response counts keyed on challenge chain signage point
+        # hash. Entries expire after three sub slots.
+        self.cache = FarmerCache(consensus_constants.SUB_SLOT_TIME_TARGET * 3)
 
         self.plot_sync_receivers: Dict[bytes32, Receiver] = {}
+        # The state of disconnected harvesters, used to resume their plot sync when they reconnect
+        self.plot_sync_resume_states: Dict[bytes32, ReceiverState] = {}
+        self.plot_sync_resume_states_path: Path = self._root_path.resolve() / "cache" / "farmer_plot_sync.dat"
 
         self.cache_clear_task: Optional[asyncio.Task] = None
         self.update_pool_state_task: Optional[asyncio.Task] = None
@@ -116,6 +129,12 @@ class Farmer:
         # Last time we updated pool_state based on the config file
         self.last_config_access_time: uint64 = uint64(0)
 
+        # From pool URL to the HTTP session used for all requests to that pool
+        self.pool_sessions: Dict[str, aiohttp.ClientSession] = {}
+        self.pool_ssl_context: Optional[ssl.SSLContext] = None
+        # From pool URL to the partial submission queue for that pool
+        self.partial_submitters: Dict[str, PartialSubmitter] = {}
+
     def get_connections(self, request_node_type: Optional[NodeType]) -> List[Dict[str, Any]]:
         return default_get_connections(server=self.server, request_node_type=request_node_type)
 
@@ -178,7 +197,57 @@ class Farmer:
 
         return True
 
+    def load_plot_sync_resume_states(self) -> None:
+        try:
+            serialized = self.plot_sync_resume_states_path.read_bytes()
+            stored: VersionedBlob = VersionedBlob.from_bytes(serialized)
+            if stored.version != PLOT_SYNC_RESUME_STATES_VERSION:
+                raise ValueError(
+                    f"Invalid version {stored.version}. Expected version {PLOT_SYNC_RESUME_STATES_VERSION}."
+                )
+            self.plot_sync_resume_states = dict(PlotSyncResumeStatesV2.from_bytes(stored.blob).states)
+            self.prune_plot_sync_resume_states()
+            log.info(f"Loaded {len(self.plot_sync_resume_states)} plot sync resume states")
+        except FileNotFoundError:
+            log.debug(f"Plot sync resume states {self.plot_sync_resume_states_path} not found")
+        except Exception as e:
+            log.error(f"Failed to load plot sync resume states: {e}, {traceback.format_exc()}")
+
+    def prune_plot_sync_resume_states(self) -> None:
+        """
+        Drops the expired states and, beyond `PLOT_SYNC_RESUME_STATES_MAX`, the states with the oldest syncs.
+        """
+        now = time.time()
+        states = [
+            (node_id, state)
+            for node_id, state in self.plot_sync_resume_states.items()
+            if now - state.time_done < PLOT_SYNC_RESUME_STATE_EXPIRY_SECONDS
+        ]
+        if len(states) > PLOT_SYNC_RESUME_STATES_MAX:
+            states.sort(key=lambda item: item[1].time_done, reverse=True)
+            del states[PLOT_SYNC_RESUME_STATES_MAX:]
+        if len(states) < len(self.plot_sync_resume_states):
+            log.debug(f"Pruned {len(self.plot_sync_resume_states) - len(states)} plot sync resume states")
+            self.plot_sync_resume_states = dict(states)
+
+    def save_plot_sync_resume_states(self) -> None:
+        try:
+            self.prune_plot_sync_resume_states()
+            states: Dict[bytes32, ReceiverState] = self.plot_sync_resume_states.copy()
+            for node_id, receiver in self.plot_sync_receivers.items():
+                if receiver.last_sync().sync_id != 0:
+                    states[node_id] = receiver.resume_state()
+            blob = bytes(PlotSyncResumeStatesV2(list(states.items())))
+            serialized = bytes(VersionedBlob(uint16(PLOT_SYNC_RESUME_STATES_VERSION), blob))
+            self.plot_sync_resume_states_path.parent.mkdir(parents=True, exist_ok=True)
+            self.plot_sync_resume_states_path.write_bytes(serialized)
+            log.info(f"Saved {len(states)} plot sync resume states, {len(serialized)} bytes")
+        except Exception as e:
+            log.error(f"Failed to save plot sync resume states: {e}, {traceback.format_exc()}")
+
     async def _start(self):
+        self.load_plot_sync_resume_states()
+
         async def start_task():
             # `Farmer.setup_keys` returns `False` if there are no keys setup yet. In this case we just try until it
             # succeeds or until we need to shut down.
@@ -201,6 +270,14 @@ class Farmer:
             await self.cache_clear_task
         if self.update_pool_state_task is not None:
             await self.update_pool_state_task
+        for submitter in self.partial_submitters.values():
+            await submitter.stop()
+        self.partial_submitters.clear()
+        for session in self.pool_sessions.values():
+            await session.close()
+        self.pool_sessions.clear()
+        if shutting_down:
+            self.save_plot_sync_resume_states()
         if shutting_down and self.keychain_proxy is not None:
             proxy = self.keychain_proxy
             self.keychain_proxy = None
@@ -260,7 +337,10 @@ class Farmer:
         self.log.info(f"peer disconnected {connection.get_peer_logging()}")
         self.state_changed("close_connection", {})
         if connection.connection_type is NodeType.HARVESTER:
-            del self.plot_sync_receivers[connection.peer_node_id]
+            receiver = self.plot_sync_receivers.pop(connection.peer_node_id)
+            if receiver.last_sync().sync_id != 0:
+                self.plot_sync_resume_states[connection.peer_node_id] = receiver.resume_state()
+                self.prune_plot_sync_resume_states()
             self.state_changed("harvester_removed", {"node_id": connection.peer_node_id})
 
     async def plot_sync_callback(self, peer_id: bytes32, delta: Optional[Delta]) -> None:
@@ -270,21 +350,106 @@ class Farmer:
         if receiver.initial_sync() or harvester_updated:
             self.state_changed("harvester_update", receiver.to_dict(True))
 
+    def get_pool_session(self, pool_url: str) -> aiohttp.ClientSession:
+        session = self.pool_sessions.get(pool_url)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(keepalive_timeout=POOL_CONNECTION_KEEPALIVE_TIMEOUT)
+            session = aiohttp.ClientSession(trust_env=True, connector=connector)
+            self.pool_sessions[pool_url] = session
+        return session
+
+    def get_pool_ssl_context(self) -> ssl.SSLContext:
+        if self.pool_ssl_context is None:
+            self.pool_ssl_context = ssl_context_for_root(get_mozilla_ca_crt(), log=self.log)
+        return self.pool_ssl_context
+
+    def submit_partial(self, pool_config: PoolWalletConfig, post_partial_request: PostPartialRequest) -> bool:
+        submitter = self.partial_submitters.get(pool_config.pool_url)
+        if submitter is None:
+            submitter = PartialSubmitter(
+                pool_config.pool_url,
+                functools.partial(self.get_pool_session, pool_config.pool_url),
+                self.get_pool_ssl_context(),
+                {"User-Agent": f"Chia Blockchain v.{__version__}"},
+                self.process_partial_response,
+            )
+            submitter.start()
+            self.partial_submitters[pool_config.pool_url] = submitter
+        if submitter.submit(pool_config.p2_singleton_puzzle_hash, post_partial_request):
+            return True
+        pool_state_dict = self.pool_state.get(pool_config.p2_singleton_puzzle_hash)
+        if pool_state_dict is not None:
+            error = request_failed_response(f"Partial queue for {pool_config.pool_url} is full")
+            pool_state_dict["pool_errors_24h"].append(error)
+            self.partial_submitted(post_partial_request, pool_state_dict, error)
+        return False
+
+    async def process_partial_response(
+        self, p2_singleton_puzzle_hash: bytes32, post_partial_request: PostPartialRequest, pool_response: Dict
+    ) -> None:
+        pool_state_dict: Optional[Dict] = self.pool_state.get(p2_singleton_puzzle_hash)
+        if pool_state_dict is None:
+            self.log.warning(f"Received a partial response for an unknown pool {p2_singleton_puzzle_hash}")
+            return
+        self.log.info(f"Pool response: {pool_response}")
+        if "error_code" in pool_response:
+            self.log.error(f"Error in pooling: {pool_response['error_code'], pool_response['error_message']}")
+            pool_state_dict["pool_errors_24h"].append(pool_response)
+            self.partial_submitted(post_partial_request, pool_state_dict, pool_response)
+            if pool_response["error_code"] == PoolErrorCode.PROOF_NOT_GOOD_ENOUGH.value:
+                self.log.error("Partial not good enough, forcing pool farmer update to get our current difficulty.")
+                pool_state_dict["next_farmer_update"] = 0
+                await self.update_pool_state()
+        else:
+            new_difficulty = pool_response["new_difficulty"]
+            pool_state_dict["points_acknowledged_since_start"] += new_difficulty
+            pool_state_dict["points_acknowledged_24h"].append((time.time(), new_difficulty))
+            pool_state_dict["current_difficulty"] = new_difficulty
+            self.partial_submitted(post_partial_request, pool_state_dict, None)
+
+    def partial_submitted(
+        self, post_partial_request: PostPartialRequest, pool_state_dict: Dict, error: Optional[Dict]
+    ) -> None:
+        self.state_changed(
+            "submitted_partial",
+            {
+                "launcher_id": post_partial_request.payload.launcher_id.hex(),
+                "pool_url": pool_state_dict["pool_config"].pool_url,
+                "current_difficulty": pool_state_dict["current_difficulty"],
+                "points_acknowledged_since_start": pool_state_dict["points_acknowledged_since_start"],
+                "points_acknowledged_24h": pool_state_dict["points_acknowledged_24h"],
+                "error": error,
+            },
+        )
+
+    async def close_unused_pool_connections(self, pool_urls: Set[str]) -> None:
+        """
+        Stops the partial submitters and closes the sessions of the pool URLs which are no longer in use, e.g. after a
+        pool got removed from the config or its URL changed. The partials still queued for them get dropped.
+        """
+        for pool_url in [pool_url for pool_url in self.partial_submitters if pool_url not in pool_urls]:
+            self.log.info(f"Stopping the partial submissions to {pool_url}")
+            await self.partial_submitters.pop(pool_url).stop()
+        for pool_url in [pool_url for pool_url in self.pool_sessions if pool_url not in pool_urls]:
+            await self.pool_sessions.pop(pool_url).close()
+
+    def get_partial_submission_metrics(self, pool_url: str) -> Optional[Dict[str, Any]]:
+        submitter = self.partial_submitters.get(pool_url)
+        return None if submitter is None else submitter.to_dict()
+
     async def _pool_get_pool_info(self, pool_config: PoolWalletConfig) -> Optional[Dict]:
         try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.get(
-                    f"{pool_config.pool_url}/pool_info", ssl=ssl_context_for_root(get_mozilla_ca_crt(), log=self.log)
-                ) as resp:
-                    if resp.ok:
-                        response: Dict = json.loads(await resp.text())
-                        self.log.info(f"GET /pool_info response: {response}")
-                        return response
-                    else:
-                        self.handle_failed_pool_response(
-                            pool_config.p2_singleton_puzzle_hash,
-                            f"Error in GET /pool_info {pool_config.pool_url}, {resp.status}",
-                        )
+            session = self.get_pool_session(pool_config.pool_url)
+            async with session.get(f"{pool_config.pool_url}/pool_info", ssl=self.get_pool_ssl_context()) as resp:
+                if resp.ok:
+                    response: Dict = json.loads(await resp.text())
+                    self.log.info(f"GET /pool_info response: {response}")
+                    return response
+                else:
+                    self.handle_failed_pool_response(
+                        pool_config.p2_singleton_puzzle_hash,
+                        f"Error in GET /pool_info {pool_config.pool_url}, {resp.status}",
+                    )
 
         except Exception as e:
             self.handle_failed_pool_response(
@@ -309,25 +474,25 @@ class Farmer:
             "signature": bytes(signature).hex(),
         }
         try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.get(
-                    f"{pool_config.pool_url}/farmer",
-                    params=get_farmer_params,
-                    ssl=ssl_context_for_root(get_mozilla_ca_crt(), log=self.log),
-                ) as resp:
-                    if resp.ok:
-                        response: Dict = json.loads(await resp.text())
-                        log_level = logging.INFO
-                        if "error_code" in response:
-                            log_level = logging.WARNING
-                            self.pool_state[pool_config.p2_singleton_puzzle_hash]["pool_errors_24h"].append(response)
-                        self.log.log(log_level, f"GET /farmer response: {response}")
-                        return response
-                    else:
-                        self.handle_failed_pool_response(
-                            pool_config.p2_singleton_puzzle_hash,
-                            f"Error in GET /farmer {pool_config.pool_url}, {resp.status}",
-                        )
+            session = self.get_pool_session(pool_config.pool_url)
+            async with session.get(
+                f"{pool_config.pool_url}/farmer",
+                params=get_farmer_params,
+                ssl=self.get_pool_ssl_context(),
+            ) as resp:
+                if resp.ok:
+                    response: Dict = json.loads(await resp.text())
+                    log_level = logging.INFO
+                    if "error_code" in response:
+                        log_level = logging.WARNING
+                        self.pool_state[pool_config.p2_singleton_puzzle_hash]["pool_errors_24h"].append(response)
+                    self.log.log(log_level, f"GET /farmer response: {response}")
+                    return response
+                else:
+                    self.handle_failed_pool_response(
+                        pool_config.p2_singleton_puzzle_hash,
+                        f"Error in GET /farmer {pool_config.pool_url}, {resp.status}",
+                    )
         except Exception as e:
             self.handle_failed_pool_response(
                 pool_config.p2_singleton_puzzle_hash, f"Exception in GET /farmer {pool_config.pool_url}, {e}"
@@ -351,25 +516,25 @@ class Farmer:
         post_farmer_request = PostFarmerRequest(post_farmer_payload, signature)
         self.log.debug(f"POST /farmer request {post_farmer_request}")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{pool_config.pool_url}/farmer",
-                    json=post_farmer_request.to_json_dict(),
-                    ssl=ssl_context_for_root(get_mozilla_ca_crt(), log=self.log),
-                ) as resp:
-                    if resp.ok:
-                        response: Dict = json.loads(await resp.text())
-                        log_level = logging.INFO
-                        if "error_code" in response:
-                            log_level = logging.WARNING
-                            self.pool_state[pool_config.p2_singleton_puzzle_hash]["pool_errors_24h"].append(response)
-                        self.log.log(log_level, f"POST /farmer response: {response}")
-                        return response
-                    else:
-                        self.handle_failed_pool_response(
-                            pool_config.p2_singleton_puzzle_hash,
-                            f"Error in POST /farmer {pool_config.pool_url}, {resp.status}",
-                        )
+            session = self.get_pool_session(pool_config.pool_url)
+            async with session.post(
+                f"{pool_config.pool_url}/farmer",
+                json=post_farmer_request.to_json_dict(),
+                ssl=self.get_pool_ssl_context(),
+            ) as resp:
+                if resp.ok:
+                    response: Dict = json.loads(await resp.text())
+                    log_level = logging.INFO
+                    if "error_code" in response:
+                        log_level = logging.WARNING
+                        self.pool_state[pool_config.p2_singleton_puzzle_hash]["pool_errors_24h"].append(response)
+                    self.log.log(log_level, f"POST /farmer response: {response}")
+                    return response
+                else:
+                    self.handle_failed_pool_response(
+                        pool_config.p2_singleton_puzzle_hash,
+                        f"Error in POST /farmer {pool_config.pool_url}, {resp.status}",
+                    )
         except Exception as e:
             self.handle_failed_pool_response(
                 pool_config.p2_singleton_puzzle_hash, f"Exception in POST /farmer {pool_config.pool_url}, {e}"
@@ -393,24 +558,24 @@ class Farmer:
         put_farmer_request = PutFarmerRequest(put_farmer_payload, signature)
         self.log.debug(f"PUT /farmer request {put_farmer_request}")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.put(
-                    f"{pool_config.pool_url}/farmer",
-                    json=put_farmer_request.to_json_dict(),
-                    ssl=ssl_context_for_root(get_mozilla_ca_crt(), log=self.log),
-                ) as resp:
-                    if resp.ok:
-                        response: Dict = json.loads(await resp.text())
-                        log_level = logging.INFO
-                        if "error_code" in response:
-                            log_level = logging.WARNING
-                            self.pool_state[pool_config.p2_singleton_puzzle_hash]["pool_errors_24h"].append(response)
-                        self.log.log(log_level, f"PUT /farmer response: {response}")
-                    else:
-                        self.handle_failed_pool_response(
-                            pool_config.p2_singleton_puzzle_hash,
-                            f"Error in PUT /farmer {pool_config.pool_url}, {resp.status}",
-                        )
+            session = self.get_pool_session(pool_config.pool_url)
+            async with session.put(
+                f"{pool_config.pool_url}/farmer",
+                json=put_farmer_request.to_json_dict(),
+                ssl=self.get_pool_ssl_context(),
+            ) as resp:
+                if resp.ok:
+                    response: Dict = json.loads(await resp.text())
+                    log_level = logging.INFO
+                    if "error_code" in response:
+                        log_level = logging.WARNING
+                        self.pool_state[pool_config.p2_singleton_puzzle_hash]["pool_errors_24h"].append(response)
+                    self.log.log(log_level, f"PUT /farmer response: {response}")
+                else:
+                    self.handle_failed_pool_response(
+                        pool_config.p2_singleton_puzzle_hash,
+                        f"Error in PUT /farmer {pool_config.pool_url}, {resp.status}",
+                    )
         except Exception as e:
             self.handle_failed_pool_response(
                 pool_config.p2_singleton_puzzle_hash, f"Exception in PUT /farmer {pool_config.pool_url}, {e}"
@@ -428,6 +593,7 @@ class Farmer:
         config = load_config(self._root_path, "config.yaml")
 
         pool_config_list: List[PoolWalletConfig] = load_pool_config(self._root_path)
+        await self.close_unused_pool_connections({pool_config.pool_url for pool_config in pool_config_list})
         for pool_config in pool_config_list:
             p2_singleton_puzzle_hash = pool_config.p2_singleton_puzzle_hash
 
@@ -683,28 +849,13 @@ class Farmer:
             await asyncio.sleep(1)
 
     async def _periodically_clear_cache_and_refresh_task(self):
-        time_slept: uint64 = uint64(0)
         refresh_slept = 0
         while not self._shut_down:
             try:
-                if time_slept > self.constants.SUB_SLOT_TIME_TARGET:
-                    now = time.time()
-                    removed_keys: List[bytes32] = []
-                    for key, add_time in self.cache_add_time.items():
-                        if now - float(add_time) > self.constants.SUB_SLOT_TIME_TARGET * 3:
-                            self.sps.pop(key, None)
-                            self.proofs_of_space.pop(key, None)
-                            self.quality_str_to_identifiers.pop(key, None)
-                            self.number_of_responses.pop(key, None)
-                            removed_keys.append(key)
-                    for key in removed_keys:
-                        self.cache_add_time.pop(key, None)
-                    time_slept = uint64(0)
-                    log.debug(
-                        f"Cleared farmer cache. Num sps: {len(self.sps)} {len(self.proofs_of_space)} "
-                        f"{len(self.quality_str_to_identifiers)} {len(self.number_of_responses)}"
-                    )
-                time_slept += 1
+                # Entries are ordered by their last update, so this only touches the expired ones
+                expired = self.cache.expire()
+                if expired > 0:
+                    log.debug(f"Cleared farmer cache. Expired: {expired}, remaining: {len(self.cache)}")
                 refresh_slept += 1
                 # Periodically refresh GUI to show the correct download/upload rate.
                 if refresh_slept >= 30:
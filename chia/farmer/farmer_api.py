@@ -1,13 +1,10 @@
 from __future__ import annotations
 
-import json
 import time
 from typing import Any, Dict, List, Optional, Tuple
 
-import aiohttp
 from blspy import AugSchemeMPL, G2Element, PrivateKey
 
-from chia import __version__
 from chia.consensus.pot_iterations import calculate_iterations_quality, calculate_sp_interval_iters
 from chia.farmer.farmer import Farmer
 from chia.harvester.harvester_api import HarvesterAPI
@@ -16,20 +13,18 @@ from chia.protocols.harvester_protocol import (
     PlotSyncDone,
     PlotSyncPathList,
     PlotSyncPlotList,
+    PlotSyncResume,
     PlotSyncStart,
     PoolDifficulty,
 )
 from chia.protocols.pool_protocol import (
-    PoolErrorCode,
     PostPartialPayload,
     PostPartialRequest,
     get_current_authentication_token,
 )
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.server.outbound_message import NodeType, make_msg
-from chia.server.server import ssl_context_for_root
 from chia.server.ws_connection import WSChiaConnection
-from chia.ssl.create_ssl import get_mozilla_ca_crt
 from chia.types.blockchain_format.pool_target import PoolTarget
 from chia.types.blockchain_format.proof_of_space import (
     generate_plot_public_key,
@@ -62,28 +57,24 @@ class FarmerAPI:
         This is a response from the harvester, for a NewChallenge. Here we check if the proof
         of space is sufficiently good, and if so, we ask for the whole proof.
         """
-        if new_proof_of_space.sp_hash not in self.farmer.number_of_responses:
-            self.farmer.number_of_responses[new_proof_of_space.sp_hash] = 0
-            self.farmer.cache_add_time[new_proof_of_space.sp_hash] = uint64(int(time.time()))
-
         max_pos_per_sp = 5
 
         if self.farmer.config.get("selected_network") != "mainnet":
             # This is meant to make testnets more stable, when difficulty is very low
-            if self.farmer.number_of_responses[new_proof_of_space.sp_hash] > max_pos_per_sp:
+            if self.farmer.cache.number_of_responses(new_proof_of_space.sp_hash) > max_pos_per_sp:
                 self.farmer.log.info(
                     f"Surpassed {max_pos_per_sp} PoSpace for one SP, no longer submitting PoSpace for signage point "
                     f"{new_proof_of_space.sp_hash}"
                 )
                 return None
 
-        if new_proof_of_space.sp_hash not in self.farmer.sps:
+        sps = self.farmer.cache.get_signage_points(new_proof_of_space.sp_hash)
+        if sps is None:
             self.farmer.log.warning(
                 f"Received response for a signage point that we do not have {new_proof_of_space.sp_hash}"
             )
             return None
 
-        sps = self.farmer.sps[new_proof_of_space.sp_hash]
         for sp in sps:
             computed_quality_string = verify_and_get_quality_string(
                 new_proof_of_space.proof,
@@ -95,7 +86,7 @@ class FarmerAPI:
                 self.farmer.log.error(f"Invalid proof of space {new_proof_of_space.proof}")
                 return None
 
-            self.farmer.number_of_responses[new_proof_of_space.sp_hash] += 1
+            self.farmer.cache.add_response(new_proof_of_space.sp_hash)
 
             required_iters: uint64 = calculate_iterations_quality(
                 self.farmer.constants.DIFFICULTY_CONSTANT_FACTOR,
@@ -115,22 +106,18 @@ class FarmerAPI:
                     [sp.challenge_chain_sp, sp.reward_chain_sp],
                 )
 
-                if new_proof_of_space.sp_hash not in self.farmer.proofs_of_space:
-                    self.farmer.proofs_of_space[new_proof_of_space.sp_hash] = []
-                self.farmer.proofs_of_space[new_proof_of_space.sp_hash].append(
+                self.farmer.cache.add_proof(
+                    new_proof_of_space.sp_hash,
+                    new_proof_of_space.plot_identifier,
+                    new_proof_of_space.proof,
+                    computed_quality_string,
                     (
                         new_proof_of_space.plot_identifier,
-                        new_proof_of_space.proof,
-                    )
+                        new_proof_of_space.challenge_hash,
+                        new_proof_of_space.sp_hash,
+                        peer.peer_node_id,
+                    ),
                 )
-                self.farmer.cache_add_time[new_proof_of_space.sp_hash] = uint64(int(time.time()))
-                self.farmer.quality_str_to_identifiers[computed_quality_string] = (
-                    new_proof_of_space.plot_identifier,
-                    new_proof_of_space.challenge_hash,
-                    new_proof_of_space.sp_hash,
-                    peer.peer_node_id,
-                )
-                self.farmer.cache_add_time[computed_quality_string] = uint64(int(time.time()))
 
                 await peer.send_message(make_msg(ProtocolMessageTypes.request_signatures, request))
 
@@ -238,52 +225,7 @@ class FarmerAPI:
                 pool_state_dict["points_found_since_start"] += pool_state_dict["current_difficulty"]
                 pool_state_dict["points_found_24h"].append((time.time(), pool_state_dict["current_difficulty"]))
                 self.farmer.log.debug(f"POST /partial request {post_partial_request}")
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.post(
-                            f"{pool_url}/partial",
-                            json=post_partial_request.to_json_dict(),
-                            ssl=ssl_context_for_root(get_mozilla_ca_crt(), log=self.farmer.log),
-                            headers={"User-Agent": f"Chia Blockchain v.{__version__}"},
-                        ) as resp:
-                            if resp.ok:
-                                pool_response: Dict = json.loads(await resp.text())
-                                self.farmer.log.info(f"Pool response: {pool_response}")
-                                if "error_code" in pool_response:
-                                    self.farmer.log.error(
-                                        f"Error in pooling: "
-                                        f"{pool_response['error_code'], pool_response['error_message']}"
-                                    )
-                                    pool_state_dict["pool_errors_24h"].append(pool_response)
-                                    if pool_response["error_code"] == PoolErrorCode.PROOF_NOT_GOOD_ENOUGH.value:
-                                        self.farmer.log.error(
-                                            "Partial not good enough, forcing pool farmer update to "
-                                            "get our current difficulty."
-                                        )
-                                        pool_state_dict["next_farmer_update"] = 0
-                                        await self.farmer.update_pool_state()
-                                else:
-                                    new_difficulty = pool_response["new_difficulty"]
-                                    pool_state_dict["points_acknowledged_since_start"] += new_difficulty
-                                    pool_state_dict["points_acknowledged_24h"].append((time.time(), new_difficulty))
-                                    pool_state_dict["current_difficulty"] = new_difficulty
-                            else:
-                                self.farmer.log.error(f"Error sending partial to {pool_url}, {resp.status}")
-                except Exception as e:
-                    self.farmer.log.error(f"Error connecting to pool: {e}")
-                    return
-
-                self.farmer.state_changed(
-                    "submitted_partial",
-                    {
-                        "launcher_id": post_partial_request.payload.launcher_id.hex(),
-                        "pool_url": pool_url,
-                        "current_difficulty": pool_state_dict["current_difficulty"],
-                        "points_acknowledged_since_start": pool_state_dict["points_acknowledged_since_start"],
-                        "points_acknowledged_24h": pool_state_dict["points_acknowledged_24h"],
-                    },
-                )
-
+                self.farmer.submit_partial(pool_state_dict["pool_config"], post_partial_request)
                 return
 
     @api_request()
@@ -291,11 +233,11 @@ class FarmerAPI:
         """
         There are two cases: receiving signatures for sps, or receiving signatures for the block.
         """
-        if response.sp_hash not in self.farmer.sps:
+        sps = self.farmer.cache.get_signage_points(response.sp_hash)
+        if sps is None:
             self.farmer.log.warning(f"Do not have challenge hash {response.challenge_hash}")
             return None
         is_sp_signatures: bool = False
-        sps = self.farmer.sps[response.sp_hash]
         signage_point_index = sps[0].signage_point_index
         found_sp_hash_debug = False
         for sp_candidate in sps:
@@ -307,7 +249,7 @@ class FarmerAPI:
             assert is_sp_signatures
 
         pospace = None
-        for plot_identifier, candidate_pospace in self.farmer.proofs_of_space[response.sp_hash]:
+        for plot_identifier, candidate_pospace in self.farmer.cache.get_proofs(response.sp_hash):
             if plot_identifier == response.plot_identifier:
                 pospace = candidate_pospace
         assert pospace is not None
@@ -475,8 +417,6 @@ class FarmerAPI:
 
             msg = make_msg(ProtocolMessageTypes.new_signage_point_harvester, message)
             await self.farmer.server.send_to_all([msg], NodeType.HARVESTER)
-            if new_signage_point.challenge_chain_sp not in self.farmer.sps:
-                self.farmer.sps[new_signage_point.challenge_chain_sp] = []
         finally:
             # Age out old 24h information for every signage point regardless
             # of any failures.  Note that this still lets old data remain if
@@ -489,23 +429,20 @@ class FarmerAPI:
 
                     pool_dict[key] = strip_old_entries(pairs=pool_dict[key], before=cutoff_24h)
 
-        if new_signage_point in self.farmer.sps[new_signage_point.challenge_chain_sp]:
+        if not self.farmer.cache.add_signage_point(new_signage_point):
             self.farmer.log.debug(f"Duplicate signage point {new_signage_point.signage_point_index}")
             return
 
-        self.farmer.sps[new_signage_point.challenge_chain_sp].append(new_signage_point)
-        self.farmer.cache_add_time[new_signage_point.challenge_chain_sp] = uint64(int(time.time()))
         self.farmer.state_changed("new_signage_point", {"sp_hash": new_signage_point.challenge_chain_sp})
 
     @api_request()
     async def request_signed_values(self, full_node_request: farmer_protocol.RequestSignedValues):
-        if full_node_request.quality_string not in self.farmer.quality_str_to_identifiers:
+        identifiers = self.farmer.cache.get_quality_identifiers(full_node_request.quality_string)
+        if identifiers is None:
             self.farmer.log.error(f"Do not have quality string {full_node_request.quality_string}")
             return None
 
-        (plot_identifier, challenge_hash, sp_hash, node_id) = self.farmer.quality_str_to_identifiers[
-            full_node_request.quality_string
-        ]
+        (plot_identifier, challenge_hash, sp_hash, node_id) = identifiers
         request = harvester_protocol.RequestSignatures(
             plot_identifier,
             challenge_hash,
@@ -538,8 +475,21 @@ class FarmerAPI:
 
     @api_request(peer_required=True)
     async def plot_sync_start(self, message: PlotSyncStart, peer: WSChiaConnection):
+        # A full sync makes a stored resume state obsolete
+        self.farmer.plot_sync_resume_states.pop(peer.peer_node_id, None)
         await self.farmer.plot_sync_receivers[peer.peer_node_id].sync_started(message)
 
+    @api_request(peer_required=True)
+    async def plot_sync_resume(self, message: PlotSyncResume, peer: WSChiaConnection):
+        receiver = self.farmer.plot_sync_receivers[peer.peer_node_id]
+        resume_state = self.farmer.plot_sync_resume_states.pop(peer.peer_node_id, None)
+        # Restore the state of the last sync only for fresh receivers, `Receiver.sync_resumed` rejects the resume if
+        # there is no matching state which makes the harvester fall back to a full sync.
+        if resume_state is not None and receiver.last_sync().sync_id == 0 and receiver.current_sync().sync_id == 0:
+            receiver.restore(resume_state)
+            self.farmer.state_changed("harvester_update", receiver.to_dict(True))
+        await receiver.sync_resumed(message)
+
     @api_request(peer_required=True)
     async def plot_sync_loaded(self, message: PlotSyncPlotList, peer: WSChiaConnection):
         await self.farmer.plot_sync_receivers[peer.peer_node_id].process_loaded(message)
@@ -560,6 +510,10 @@ class FarmerAPI:
     async def plot_sync_duplicates(self, message: PlotSyncPathList, peer: WSChiaConnection):
         await self.farmer.plot_sync_receivers[peer.peer_node_id].process_duplicates(message)
 
+    @api_request(peer_required=True)
+    async def plot_sync_quarantined(self, message: PlotSyncPathList, peer: WSChiaConnection):
+        await self.farmer.plot_sync_receivers[peer.peer_node_id].process_quarantined(message)
+
     @api_request(peer_required=True)
     async def plot_sync_done(self, message: PlotSyncDone, peer: WSChiaConnection):
         await self.farmer.plot_sync_receivers[peer.peer_node_id].sync_done(message)
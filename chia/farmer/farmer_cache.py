@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from chia.protocols.farmer_protocol import NewSignagePoint
+from chia.types.blockchain_format.proof_of_space import ProofOfSpace
+from chia.types.blockchain_format.sized_bytes import bytes32
+
+log = logging.getLogger(__name__)
+
+# Plot identifier, challenge hash, signage point hash and harvester node id of a quality string
+QualityIdentifiers = Tuple[str, bytes32, bytes32, bytes32]
+
+
+@dataclass
+class SignagePointEntry:
+    signage_points: List[NewSignagePoint] = field(default_factory=list)
+    proofs: List[Tuple[str, ProofOfSpace]] = field(default_factory=list)
+    quality_strings: List[bytes32] = field(default_factory=list)
+    number_of_responses: int = 0
+    time_updated: float = field(default_factory=time.monotonic)
+
+
+class FarmerCache:
+    """
+    Keeps the signage points, the proofs of space and the quality strings of the farmer grouped by signage point hash.
+    The entries are ordered by the time of their last update which allows to expire them from the front in constant
+    time per entry. The number of signage points and proofs is limited, if a limit is exceeded the oldest entries get
+    dropped.
+    """
+
+    _entries: OrderedDict[bytes32, SignagePointEntry]
+    _quality_str_to_identifiers: Dict[bytes32, QualityIdentifiers]
+    _expiry_seconds: float
+    _max_signage_points: int
+    _max_proofs: int
+    _proof_count: int
+
+    def __init__(self, expiry_seconds: float, max_signage_points: int = 512, max_proofs: int = 10000) -> None:
+        self._entries = OrderedDict()
+        self._quality_str_to_identifiers = {}
+        self._expiry_seconds = expiry_seconds
+        self._max_signage_points = max_signage_points
+        self._max_proofs = max_proofs
+        self._proof_count = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _touch(self, sp_hash: bytes32, entry: SignagePointEntry) -> None:
+        entry.time_updated = time.monotonic()
+        self._entries.move_to_end(sp_hash)
+
+    def _drop_oldest(self) -> None:
+        _, entry = self._entries.popitem(last=False)
+        self._proof_count -= len(entry.proofs)
+        for quality_str in entry.quality_strings:
+            self._quality_str_to_identifiers.pop(quality_str, None)
+
+    def _enforce_limits(self) -> None:
+        while len(self._entries) > self._max_signage_points or self._proof_count > self._max_proofs:
+            self._drop_oldest()
+
+    def add_signage_point(self, signage_point: NewSignagePoint) -> bool:
+        """
+        Returns `False` if the signage point is already known, `True` otherwise.
+        """
+        sp_hash = signage_point.challenge_chain_sp
+        entry = self._entries.get(sp_hash)
+        if entry is None:
+            entry = SignagePointEntry()
+            self._entries[sp_hash] = entry
+        elif signage_point in entry.signage_points:
+            return False
+        entry.signage_points.append(signage_point)
+        self._touch(sp_hash, entry)
+        self._enforce_limits()
+        return True
+
+    def get_signage_points(self, sp_hash: bytes32) -> Optional[List[NewSignagePoint]]:
+        entry = self._entries.get(sp_hash)
+        if entry is None or len(entry.signage_points) == 0:
+            return None
+        return entry.signage_points
+
+    def get_all_signage_points(self) -> List[NewSignagePoint]:
+        return [sp for entry in self._entries.values() for sp in entry.signage_points]
+
+    def number_of_responses(self, sp_hash: bytes32) -> int:
+        entry = self._entries.get(sp_hash)
+        return 0 if entry is None else entry.number_of_responses
+
+    def add_response(self, sp_hash: bytes32) -> None:
+        entry = self._entries.get(sp_hash)
+        if entry is not None:
+            entry.number_of_responses += 1
+
+    def add_proof(
+        self,
+        sp_hash: bytes32,
+        plot_identifier: str,
+        proof: ProofOfSpace,
+        quality_str: bytes32,
+        identifiers: QualityIdentifiers,
+    ) -> None:
+        entry = self._entries.get(sp_hash)
+        if entry is None:
+            log.warning(f"add_proof: unknown signage point {sp_hash}")
+            return
+        entry.proofs.append((plot_identifier, proof))
+        self._proof_count += 1
+        if quality_str not in self._quality_str_to_identifiers:
+            entry.quality_strings.append(quality_str)
+        self._quality_str_to_identifiers[quality_str] = identifiers
+        self._touch(sp_hash, entry)
+        self._enforce_limits()
+
+    def get_proofs(self, sp_hash: bytes32) -> List[Tuple[str, ProofOfSpace]]:
+        entry = self._entries.get(sp_hash)
+        return [] if entry is None else entry.proofs
+
+    def get_quality_identifiers(self, quality_str: bytes32) -> Optional[QualityIdentifiers]:
+        return self._quality_str_to_identifiers.get(quality_str)
+
+    def expire(self) -> int:
+        """
+        Drops all entries which were not updated within the expiry time and returns the number of dropped entries.
+        """
+        expired = 0
+        cutoff = time.monotonic() - self._expiry_seconds
+        while len(self._entries) > 0 and next(iter(self._entries.values())).time_updated < cutoff:
+            self._drop_oldest()
+            expired += 1
+        return expired
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        oldest: Optional[float] = None
+        newest: Optional[float] = None
+        if len(self._entries) > 0:
+            oldest = now - next(iter(self._entries.values())).time_updated
+            newest = now - next(reversed(self._entries.values())).time_updated
+        return {
+            "signage_point_hashes": len(self._entries),
+            "signage_points": sum(len(entry.signage_points) for entry in self._entries.values()),
+            "proofs": self._proof_count,
+            "quality_strings": len(self._quality_str_to_identifiers),
+            "oldest_age": oldest,
+            "newest_age": newest,
+            "expiry_seconds": self._expiry_seconds,
+            "max_signage_points": self._max_signage_points,
+            "max_proofs": self._max_proofs,
+        }
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import ssl
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import aiohttp
+
+from chia.protocols.pool_protocol import ErrorResponse, PoolErrorCode, PostPartialRequest
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.ints import uint16
+
+log = logging.getLogger(__name__)
+
+
+class Constants:
+    # Maximum number of partials submitted concurrently to one pool
+    batch_size: int = 10
+    # Maximum number of partials submitted to one pool within `rate_limit_interval` seconds
+    rate_limit: int = 300
+    rate_limit_interval: float = 60
+    # Number of submission attempts per partial before it gets dropped
+    max_attempts: int = 3
+    retry_delay: float = 1
+    # Partials which are older than this get dropped instead of submitted since the pool would reject them anyway
+    max_partial_age: float = 25
+    max_queue_size: int = 1000
+    # Number of submission latencies used to calculate the metrics
+    latency_samples: int = 100
+
+
+@dataclass
+class PendingPartial:
+    p2_singleton_puzzle_hash: bytes32
+    request: PostPartialRequest
+    time_queued: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+    def age(self) -> float:
+        return time.monotonic() - self.time_queued
+
+
+@dataclass
+class SubmissionMetrics:
+    submitted: int = 0
+    failed: int = 0
+    retried: int = 0
+    dropped: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=Constants.latency_samples))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "latency_last": self.latencies[-1] if len(self.latencies) > 0 else None,
+            "latency_average": sum(self.latencies) / len(self.latencies) if len(self.latencies) > 0 else None,
+            "latency_max": max(self.latencies) if len(self.latencies) > 0 else None,
+        }
+
+
+# Gets called with the response of the pool, or with an `ErrorResponse` if the partial could not be submitted
+PartialResponseCallback = Callable[[bytes32, PostPartialRequest, Dict[str, Any]], Awaitable[None]]
+
+
+def request_failed_response(error_message: str) -> Dict[str, Any]:
+    return ErrorResponse(uint16(PoolErrorCode.REQUEST_FAILED.value), error_message).to_json_dict()
+
+
+class PartialSubmitter:
+    """
+    Submits the partials for one pool URL from a queue. Partials get submitted in batches of concurrent requests which
+    share the keep-alive connections of the session returned by `get_session`. Failed submissions get retried as long
+    as the partial is not too old and the number of submissions is limited to `Constants.rate_limit` per
+    `Constants.rate_limit_interval`. The response callback gets called for every partial, also for the ones which
+    failed or got dropped.
+    """
+
+    _pool_url: str
+    _get_session: Callable[[], aiohttp.ClientSession]
+    _ssl_context: Optional[ssl.SSLContext]
+    _headers: Dict[str, str]
+    _response_callback: PartialResponseCallback
+    _queue: Deque[PendingPartial]
+    _queue_event: asyncio.Event
+    _submission_times: Deque[float]
+    _metrics: SubmissionMetrics
+    _task: Optional[asyncio.Task[None]]
+    _stop_requested: bool
+
+    def __init__(
+        self,
+        pool_url: str,
+        get_session: Callable[[], aiohttp.ClientSession],
+        ssl_context: Optional[ssl.SSLContext],
+        headers: Dict[str, str],
+        response_callback: PartialResponseCallback,
+    ) -> None:
+        self._pool_url = pool_url
+        self._get_session = get_session
+        self._ssl_context = ssl_context
+        self._headers = headers
+        self._response_callback = response_callback
+        self._queue = deque()
+        self._queue_event = asyncio.Event()
+        self._submission_times = deque()
+        self._metrics = SubmissionMetrics()
+        self._task = None
+        self._stop_requested = False
+
+    def pool_url(self) -> str:
+        return self._pool_url
+
+    def metrics(self) -> SubmissionMetrics:
+        return self._metrics
+
+    def queue_size(self) -> int:
+        return len(self._queue)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"queue_size": self.queue_size(), **self._metrics.to_dict()}
+
+    def start(self) -> None:
+        if self._task is not None:
+            raise RuntimeError("Already started")
+        self._stop_requested = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stop_requested = True
+        self._queue_event.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def submit(self, p2_singleton_puzzle_hash: bytes32, request: PostPartialRequest) -> bool:
+        if len(self._queue) >= Constants.max_queue_size:
+            log.error(f"Partial queue for {self._pool_url} is full, dropping partial")
+            self._metrics.dropped += 1
+            return False
+        self._queue.append(PendingPartial(p2_singleton_puzzle_hash, request))
+        self._queue_event.set()
+        return True
+
+    def _requeue(self, pending: PendingPartial) -> None:
+        if self._stop_requested:
+            return
+        self._queue.appendleft(pending)
+        self._queue_event.set()
+
+    def _submissions_available(self) -> int:
+        now = time.monotonic()
+        while len(self._submission_times) > 0 and now - self._submission_times[0] >= Constants.rate_limit_interval:
+            self._submission_times.popleft()
+        return Constants.rate_limit - len(self._submission_times)
+
+    async def _process_response(self, pending: PendingPartial, response: Dict[str, Any]) -> None:
+        try:
+            await self._response_callback(pending.p2_singleton_puzzle_hash, pending.request, response)
+        except Exception as e:
+            log.error(f"Failed to process the partial response from {self._pool_url}: {e}")
+
+    async def _next_batch(self, limit: int) -> List[PendingPartial]:
+        batch: List[PendingPartial] = []
+        while len(self._queue) > 0 and len(batch) < limit:
+            pending = self._queue.popleft()
+            if pending.age() > Constants.max_partial_age:
+                error = f"Dropping partial for {self._pool_url} after {pending.age():.2f} seconds in the queue"
+                log.warning(error)
+                self._metrics.dropped += 1
+                await self._process_response(pending, request_failed_response(error))
+                continue
+            batch.append(pending)
+        return batch
+
+    async def _submit(self, pending: PendingPartial) -> None:
+        pending.attempts += 1
+        self._submission_times.append(time.monotonic())
+        response: Optional[Dict[str, Any]] = None
+        error = ""
+        retry = False
+        start = time.monotonic()
+        try:
+            async with self._get_session().post(
+                f"{self._pool_url}/partial",
+                json=pending.request.to_json_dict(),
+                ssl=self._ssl_context,
+                headers=self._headers,
+            ) as resp:
+                if resp.ok:
+                    response = json.loads(await resp.text())
+                else:
+                    error = f"Error sending partial to {self._pool_url}, {resp.status}"
+                    log.error(error)
+                    # Only server side errors are worth another attempt
+                    retry = resp.status >= 500
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = f"Error connecting to pool {self._pool_url}: {e}"
+            log.error(error)
+            retry = True
+        except Exception as e:
+            error = f"Error sending partial to {self._pool_url}: {e}"
+            log.error(error)
+
+        if response is not None:
+            self._metrics.latencies.append(time.monotonic() - start)
+            self._metrics.submitted += 1
+            await self._process_response(pending, response)
+        elif (
+            retry
+            and pending.attempts < Constants.max_attempts
+            and pending.age() + Constants.retry_delay < Constants.max_partial_age
+        ):
+            self._metrics.retried += 1
+            asyncio.get_running_loop().call_later(Constants.retry_delay, self._requeue, pending)
+        else:
+            self._metrics.failed += 1
+            await self._process_response(pending, request_failed_response(error))
+
+    async def _run(self) -> None:
+        while not self._stop_requested:
+            await self._queue_event.wait()
+            self._queue_event.clear()
+            while len(self._queue) > 0 and not self._stop_requested:
+                available = self._submissions_available()
+                if available <= 0:
+                    # Sleep in small steps to not delay the shutdown
+                    await asyncio.sleep(1)
+                    continue
+                batch = await self._next_batch(min(Constants.batch_size, available))
+                await asyncio.gather(*(self._submit(pending) for pending in batch))
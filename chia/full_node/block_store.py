@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import dataclasses
+import functools
 import logging
 import sqlite3
 from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
@@ -13,7 +14,7 @@ from chia.types.blockchain_format.program import SerializedProgram
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.full_block import FullBlock
 from chia.types.weight_proof import SubEpochChallengeSegment, SubEpochSegments
-from chia.util.db_wrapper import DBWrapper2, execute_fetchone
+from chia.util.db_wrapper import DBWrapper2, execute_fetchone, run_on_connection
 from chia.util.errors import Err
 from chia.util.full_block_utils import GeneratorBlockInfo, block_info_from_block, generator_from_block
 from chia.util.ints import uint32
@@ -154,18 +155,22 @@ class BlockStore:
     async def rollback(self, height: int) -> None:
         if self.db_wrapper.db_version == 2:
             async with self.db_wrapper.writer_maybe_transaction() as conn:
-                await conn.execute(
-                    "UPDATE full_blocks SET in_main_chain=0 WHERE height>? AND in_main_chain=1", (height,)
-                )
+                await run_on_connection(conn, functools.partial(self.rollback_sync, height=height))
+
+    def rollback_sync(self, conn: sqlite3.Connection, height: int) -> None:
+        if self.db_wrapper.db_version == 2:
+            conn.execute("UPDATE full_blocks SET in_main_chain=0 WHERE height>? AND in_main_chain=1", (height,))
 
     async def set_in_chain(self, header_hashes: List[Tuple[bytes32]]) -> None:
         if self.db_wrapper.db_version == 2:
             async with self.db_wrapper.writer_maybe_transaction() as conn:
-                async with await conn.executemany(
-                    "UPDATE full_blocks SET in_main_chain=1 WHERE header_hash=?", header_hashes
-                ) as cursor:
-                    if cursor.rowcount != len(header_hashes):
-                        raise RuntimeError(f"The blockchain database is corrupt. All of {header_hashes} should exist")
+                await run_on_connection(conn, functools.partial(self.set_in_chain_sync, header_hashes=header_hashes))
+
+    def set_in_chain_sync(self, conn: sqlite3.Connection, header_hashes: List[Tuple[bytes32]]) -> None:
+        if self.db_wrapper.db_version == 2:
+            cursor = conn.executemany("UPDATE full_blocks SET in_main_chain=1 WHERE header_hash=?", header_hashes)
+            if cursor.rowcount != len(header_hashes):
+                raise RuntimeError(f"The blockchain database is corrupt. All of {header_hashes} should exist")
 
     async def replace_proof(self, header_hash: bytes32, block: FullBlock) -> None:
 
@@ -190,8 +195,24 @@ class BlockStore:
             )
 
     async def add_full_block(self, header_hash: bytes32, block: FullBlock, block_record: BlockRecord) -> None:
+        self.cache_block(header_hash, block)
+        async with self.db_wrapper.writer_maybe_transaction() as conn:
+            await run_on_connection(
+                conn,
+                functools.partial(
+                    self.add_full_block_sync, header_hash=header_hash, block=block, block_record=block_record
+                ),
+            )
+
+    def cache_block(self, header_hash: bytes32, block: FullBlock) -> None:
         self.block_cache.put(header_hash, block)
 
+    def add_full_block_sync(
+        self, conn: sqlite3.Connection, header_hash: bytes32, block: FullBlock, block_record: BlockRecord
+    ) -> None:
+        """
+        Inserts the block without caching it, on the thread of the write connection, see `run_on_connection`.
+        """
         if self.db_wrapper.db_version == 2:
 
             ses: Optional[bytes] = (
@@ -200,48 +221,46 @@ class BlockStore:
                 else bytes(block_record.sub_epoch_summary_included)
             )
 
-            async with self.db_wrapper.writer_maybe_transaction() as conn:
-                await conn.execute(
-                    "INSERT OR IGNORE INTO full_blocks VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
-                    (
-                        header_hash,
-                        block.prev_header_hash,
-                        block.height,
-                        ses,
-                        int(block.is_fully_compactified()),
-                        False,  # in_main_chain
-                        self.compress(block),
-                        bytes(block_record),
-                    ),
-                )
+            conn.execute(
+                "INSERT OR IGNORE INTO full_blocks VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    header_hash,
+                    block.prev_header_hash,
+                    block.height,
+                    ses,
+                    int(block.is_fully_compactified()),
+                    False,  # in_main_chain
+                    self.compress(block),
+                    bytes(block_record),
+                ),
+            )
 
         else:
-            async with self.db_wrapper.writer_maybe_transaction() as conn:
-                await conn.execute(
-                    "INSERT OR IGNORE INTO full_blocks VALUES(?, ?, ?, ?, ?)",
-                    (
-                        header_hash.hex(),
-                        block.height,
-                        int(block.is_transaction_block()),
-                        int(block.is_fully_compactified()),
-                        bytes(block),
-                    ),
-                )
+            conn.execute(
+                "INSERT OR IGNORE INTO full_blocks VALUES(?, ?, ?, ?, ?)",
+                (
+                    header_hash.hex(),
+                    block.height,
+                    int(block.is_transaction_block()),
+                    int(block.is_fully_compactified()),
+                    bytes(block),
+                ),
+            )
 
-                await conn.execute(
-                    "INSERT OR IGNORE INTO block_records VALUES(?, ?, ?, ?,?, ?, ?)",
-                    (
-                        header_hash.hex(),
-                        block.prev_header_hash.hex(),
-                        block.height,
-                        bytes(block_record),
-                        None
-                        if block_record.sub_epoch_summary_included is None
-                        else bytes(block_record.sub_epoch_summary_included),
-                        False,
-                        block.is_transaction_block(),
-                    ),
-                )
+            conn.execute(
+                "INSERT OR IGNORE INTO block_records VALUES(?, ?, ?, ?,?, ?, ?)",
+                (
+                    header_hash.hex(),
+                    block.prev_header_hash.hex(),
+                    block.height,
+                    bytes(block_record),
+                    None
+                    if block_record.sub_epoch_summary_included is None
+                    else bytes(block_record.sub_epoch_summary_included),
+                    False,
+                    block.is_transaction_block(),
+                ),
+            )
 
     async def persist_sub_epoch_challenge_segments(
         self, ses_block_hash: bytes32, segments: List[SubEpochChallengeSegment]
@@ -292,7 +311,8 @@ class BlockStore:
                 "SELECT block from full_blocks WHERE header_hash=?", (self.maybe_to_hex(header_hash),)
             ) as cursor:
                 row = await cursor.fetchone()
-        if row is not None:
+        # blocks imported from a snapshot below its height only have their block record
+        if row is not None and row[0] is not None:
             block = self.maybe_decompress(row[0])
             self.block_cache.put(header_hash, block)
             return block
@@ -309,7 +329,7 @@ class BlockStore:
                 "SELECT block from full_blocks WHERE header_hash=?", (self.maybe_to_hex(header_hash),)
             ) as cursor:
                 row = await cursor.fetchone()
-        if row is not None:
+        if row is not None and row[0] is not None:
             if self.db_wrapper.db_version == 2:
                 ret: bytes = zstd.decompress(row[0])
             else:
@@ -327,7 +347,8 @@ class BlockStore:
             async with conn.execute(formatted_str, heights) as cursor:
                 ret: List[FullBlock] = []
                 for row in await cursor.fetchall():
-                    ret.append(self.maybe_decompress(row[0]))
+                    if row[0] is not None:
+                        ret.append(self.maybe_decompress(row[0]))
                 return ret
 
     async def get_block_info(self, header_hash: bytes32) -> Optional[GeneratorBlockInfo]:
@@ -342,7 +363,7 @@ class BlockStore:
         formatted_str = "SELECT block, height from full_blocks WHERE header_hash=?"
         async with self.db_wrapper.reader_no_transaction() as conn:
             row = await execute_fetchone(conn, formatted_str, (self.maybe_to_hex(header_hash),))
-            if row is None:
+            if row is None or row[0] is None:
                 return None
             if self.db_wrapper.db_version == 2:
                 block_bytes = zstd.decompress(row[0])
@@ -371,7 +392,7 @@ class BlockStore:
         formatted_str = "SELECT block, height from full_blocks WHERE header_hash=?"
         async with self.db_wrapper.reader_no_transaction() as conn:
             row = await execute_fetchone(conn, formatted_str, (self.maybe_to_hex(header_hash),))
-            if row is None:
+            if row is None or row[0] is None:
                 return None
             if self.db_wrapper.db_version == 2:
                 block_bytes = zstd.decompress(row[0])
@@ -402,6 +423,8 @@ class BlockStore:
         async with self.db_wrapper.reader_no_transaction() as conn:
             async with conn.execute(formatted_str, heights) as cursor:
                 async for row in cursor:
+                    if row[0] is None:
+                        continue
                     block_bytes = zstd.decompress(row[0])
 
                     try:
@@ -417,6 +440,9 @@ class BlockStore:
                         raise ValueError(Err.GENERATOR_REF_HAS_NO_GENERATOR)
                     generators[uint32(row[1])] = gen
 
+        # the blocks imported from a snapshot below its height don't have a generator to refer to
+        if any(h not in generators for h in heights):
+            raise ValueError(Err.GENERATOR_REF_HAS_NO_GENERATOR)
         return [generators[h] for h in heights]
 
     async def get_block_records_by_hash(self, header_hashes: List[bytes32]) -> List[BlockRecord]:
@@ -476,6 +502,8 @@ class BlockStore:
         async with self.db_wrapper.reader_no_transaction() as conn:
             async with conn.execute(formatted_str, header_hashes_db) as cursor:
                 for row in await cursor.fetchall():
+                    if row[1] is None:
+                        continue
                     header_hash = self.maybe_from_hex(row[0])
                     all_blocks[header_hash] = self.maybe_decompress_blob(row[1])
 
@@ -494,8 +522,22 @@ class BlockStore:
         Throws an exception if the blocks are not present
         """
 
+        all_blocks = await self.get_stored_blocks_by_hash(header_hashes)
+        ret: List[FullBlock] = []
+        for hh in header_hashes:
+            if hh not in all_blocks:
+                raise ValueError(f"Header hash {hh} not in the blockchain")
+            ret.append(all_blocks[hh])
+        return ret
+
+    async def get_stored_blocks_by_hash(self, header_hashes: List[bytes32]) -> Dict[bytes32, FullBlock]:
+        """
+        Returns the Full Blocks of header_hashes that are present, keyed by header hash. Blocks imported from a
+        snapshot below its height only have their block record, and are left out
+        """
+
         if len(header_hashes) == 0:
-            return []
+            return {}
 
         header_hashes_db: Sequence[Union[bytes32, str]]
         if self.db_wrapper.db_version == 2:
@@ -509,16 +551,13 @@ class BlockStore:
         async with self.db_wrapper.reader_no_transaction() as conn:
             async with conn.execute(formatted_str, header_hashes_db) as cursor:
                 for row in await cursor.fetchall():
+                    if row[1] is None:
+                        continue
                     header_hash = self.maybe_from_hex(row[0])
                     full_block: FullBlock = self.maybe_decompress(row[1])
                     all_blocks[header_hash] = full_block
                     self.block_cache.put(header_hash, full_block)
-        ret: List[FullBlock] = []
-        for hh in header_hashes:
-            if hh not in all_blocks:
-                raise ValueError(f"Header hash {hh} not in the blockchain")
-            ret.append(all_blocks[hh])
-        return ret
+        return all_blocks
 
     async def get_block_record(self, header_hash: bytes32) -> Optional[BlockRecord]:
 
@@ -592,7 +631,8 @@ class BlockStore:
         assert self.db_wrapper.db_version == 2
         async with self.db_wrapper.reader_no_transaction() as conn:
             async with conn.execute(
-                "SELECT block FROM full_blocks WHERE height >= ? AND height <= ? and in_main_chain=1",
+                "SELECT block FROM full_blocks "
+                "WHERE height >= ? AND height <= ? and in_main_chain=1 AND block IS NOT NULL",
                 (start, stop),
             ) as cursor:
                 rows: List[sqlite3.Row] = list(await cursor.fetchall())
@@ -659,18 +699,16 @@ class BlockStore:
     async def set_peak(self, header_hash: bytes32) -> None:
         # We need to be in a sqlite transaction here.
         # Note: we do not commit this to the database yet, as we need to also change the coin store
+        async with self.db_wrapper.writer_maybe_transaction() as conn:
+            await run_on_connection(conn, functools.partial(self.set_peak_sync, header_hash=header_hash))
 
+    def set_peak_sync(self, conn: sqlite3.Connection, header_hash: bytes32) -> None:
         if self.db_wrapper.db_version == 2:
             # Note: we use the key field as 0 just to ensure all inserts replace the existing row
-            async with self.db_wrapper.writer_maybe_transaction() as conn:
-                await conn.execute("INSERT OR REPLACE INTO current_peak VALUES(?, ?)", (0, header_hash))
+            conn.execute("INSERT OR REPLACE INTO current_peak VALUES(?, ?)", (0, header_hash))
         else:
-            async with self.db_wrapper.writer_maybe_transaction() as conn:
-                await conn.execute("UPDATE block_records SET is_peak=0 WHERE is_peak=1")
-                await conn.execute(
-                    "UPDATE block_records SET is_peak=1 WHERE header_hash=?",
-                    (self.maybe_to_hex(header_hash),),
-                )
+            conn.execute("UPDATE block_records SET is_peak=0 WHERE is_peak=1")
+            conn.execute("UPDATE block_records SET is_peak=1 WHERE header_hash=?", (self.maybe_to_hex(header_hash),))
 
     async def is_fully_compactified(self, header_hash: bytes32) -> Optional[bool]:
         async with self.db_wrapper.writer_maybe_transaction() as conn:
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import dataclasses
+import functools
 import logging
 import sqlite3
 import time
@@ -14,7 +15,7 @@ from chia.types.blockchain_format.coin import Coin
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.coin_record import CoinRecord
 from chia.util.chunks import chunks
-from chia.util.db_wrapper import SQLITE_MAX_VARIABLE_NUMBER, DBWrapper2
+from chia.util.db_wrapper import SQLITE_MAX_VARIABLE_NUMBER, DBWrapper2, run_on_connection
 from chia.util.ints import uint32, uint64
 from chia.util.lru_cache import LRUCache
 
@@ -123,6 +124,31 @@ class CoinStore:
         Only called for blocks which are blocks (and thus have rewards and transactions)
         Returns a list of the CoinRecords that were added by this block
         """
+        async with self.db_wrapper.writer_maybe_transaction() as conn:
+            return await run_on_connection(
+                conn,
+                functools.partial(
+                    self.new_block_sync,
+                    height=height,
+                    timestamp=timestamp,
+                    included_reward_coins=included_reward_coins,
+                    tx_additions=tx_additions,
+                    tx_removals=tx_removals,
+                ),
+            )
+
+    def new_block_sync(
+        self,
+        conn: sqlite3.Connection,
+        height: uint32,
+        timestamp: uint64,
+        included_reward_coins: Set[Coin],
+        tx_additions: List[Coin],
+        tx_removals: List[bytes32],
+    ) -> List[CoinRecord]:
+        """
+        `new_block` on the thread of the write connection, see `run_on_connection`.
+        """
 
         start = time.monotonic()
 
@@ -153,8 +179,8 @@ class CoinStore:
             )
             additions.append(reward_coin_r)
 
-        await self._add_coin_records(additions)
-        await self._set_spent(tx_removals, height)
+        self._add_coin_records_sync(conn, additions)
+        self._set_spent_sync(conn, tx_removals, height)
 
         end = time.monotonic()
         log.log(
@@ -501,6 +527,12 @@ class CoinStore:
 
     # Store CoinRecord in DB
     async def _add_coin_records(self, records: List[CoinRecord]) -> None:
+        if len(records) == 0:
+            return
+        async with self.db_wrapper.writer_maybe_transaction() as conn:
+            await run_on_connection(conn, functools.partial(self._add_coin_records_sync, records=records))
+
+    def _add_coin_records_sync(self, conn: sqlite3.Connection, records: List[CoinRecord]) -> None:
 
         if self.db_wrapper.db_version == 2:
             values2 = []
@@ -518,11 +550,10 @@ class CoinStore:
                     )
                 )
             if len(values2) > 0:
-                async with self.db_wrapper.writer_maybe_transaction() as conn:
-                    await conn.executemany(
-                        "INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
-                        values2,
-                    )
+                conn.executemany(
+                    "INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                    values2,
+                )
         else:
             values = []
             for record in records:
@@ -540,42 +571,44 @@ class CoinStore:
                     )
                 )
             if len(values) > 0:
-                async with self.db_wrapper.writer_maybe_transaction() as conn:
-                    await conn.executemany(
-                        "INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                        values,
-                    )
+                conn.executemany(
+                    "INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    values,
+                )
 
     # Update coin_record to be spent in DB
     async def _set_spent(self, coin_names: List[bytes32], index: uint32) -> None:
+        if len(coin_names) == 0:
+            return
+        async with self.db_wrapper.writer_maybe_transaction() as conn:
+            await run_on_connection(conn, functools.partial(self._set_spent_sync, coin_names=coin_names, index=index))
+
+    def _set_spent_sync(self, conn: sqlite3.Connection, coin_names: List[bytes32], index: uint32) -> None:
 
         assert len(coin_names) == 0 or index > 0
 
         if len(coin_names) == 0:
             return None
 
-        async with self.db_wrapper.writer_maybe_transaction() as conn:
-            rows_updated: int = 0
-            for coin_names_chunk in chunks(coin_names, SQLITE_MAX_VARIABLE_NUMBER):
-                name_params = ",".join(["?"] * len(coin_names_chunk))
-                if self.db_wrapper.db_version == 2:
-                    ret: Cursor = await conn.execute(
-                        f"UPDATE coin_record INDEXED BY sqlite_autoindex_coin_record_1 "
-                        f"SET spent_index={index} "
-                        f"WHERE spent_index=0 "
-                        f"AND coin_name IN ({name_params})",
-                        coin_names_chunk,
-                    )
-                else:
-                    ret = await conn.execute(
-                        f"UPDATE coin_record INDEXED BY sqlite_autoindex_coin_record_1 "
-                        f"SET spent=1, spent_index={index} "
-                        f"WHERE spent_index=0 "
-                        f"AND coin_name IN ({name_params})",
-                        [name.hex() for name in coin_names_chunk],
-                    )
-                rows_updated += ret.rowcount
-            if rows_updated != len(coin_names):
-                raise ValueError(
-                    f"Invalid operation to set spent, total updates {rows_updated} expected {len(coin_names)}"
+        rows_updated: int = 0
+        for coin_names_chunk in chunks(coin_names, SQLITE_MAX_VARIABLE_NUMBER):
+            name_params = ",".join(["?"] * len(coin_names_chunk))
+            if self.db_wrapper.db_version == 2:
+                ret: sqlite3.Cursor = conn.execute(
+                    f"UPDATE coin_record INDEXED BY sqlite_autoindex_coin_record_1 "
+                    f"SET spent_index={index} "
+                    f"WHERE spent_index=0 "
+                    f"AND coin_name IN ({name_params})",
+                    coin_names_chunk,
+                )
+            else:
+                ret = conn.execute(
+                    f"UPDATE coin_record INDEXED BY sqlite_autoindex_coin_record_1 "
+                    f"SET spent=1, spent_index={index} "
+                    f"WHERE spent_index=0 "
+                    f"AND coin_name IN ({name_params})",
+                    [name.hex() for name in coin_names_chunk],
                 )
+            rows_updated += ret.rowcount
+        if rows_updated != len(coin_names):
+            raise ValueError(f"Invalid operation to set spent, total updates {rows_updated} expected {len(coin_names)}")
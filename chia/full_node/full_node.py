@@ -34,15 +34,17 @@ from chia.full_node.hint_management import get_hints_and_subscription_coin_ids
 from chia.full_node.hint_store import HintStore
 from chia.full_node.lock_queue import LockClient, LockQueue
 from chia.full_node.mempool_manager import MempoolManager
+from chia.full_node.response_cache import ResponseCache
 from chia.full_node.signage_point import SignagePoint
 from chia.full_node.subscriptions import PeerSubscriptions
 from chia.full_node.sync_store import SyncStore
 from chia.full_node.tx_processing_queue import TransactionQueue
+from chia.full_node.wallet_update_queue import WalletUpdateQueue
 from chia.full_node.weight_proof import WeightProofHandler
 from chia.protocols import farmer_protocol, full_node_protocol, timelord_protocol, wallet_protocol
 from chia.protocols.full_node_protocol import RequestBlocks, RespondBlock, RespondBlocks, RespondSignagePoint
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
-from chia.protocols.wallet_protocol import CoinState, CoinStateUpdate
+from chia.protocols.wallet_protocol import CoinState
 from chia.server.node_discovery import FullNodePeers
 from chia.server.outbound_message import Message, NodeType, make_msg
 from chia.server.peer_store_resolver import PeerStoreResolver
@@ -67,6 +69,7 @@ from chia.util.bech32m import encode_puzzle_hash
 from chia.util.check_fork_next_block import check_fork_next_block
 from chia.util.condition_tools import pkm_pairs
 from chia.util.config import PEER_DB_PATH_KEY_DEPRECATED, process_config_start_method
+from chia.util.db_statistics import SLOW_QUERY_THRESHOLD
 from chia.util.db_synchronous import db_synchronous_on
 from chia.util.db_version import lookup_db_version, set_db_version_async
 from chia.util.db_wrapper import DBWrapper2, manage_connection
@@ -95,7 +98,7 @@ class FullNode:
     _server: Optional[ChiaServer]
     _shut_down: bool
     constants: ConsensusConstants
-    pow_creation: Dict[bytes32, asyncio.Event]
+    response_cache: ResponseCache
     state_changed_callback: Optional[Callable[[str, Optional[Dict[str, Any]]], None]]
     full_node_peers: Optional[FullNodePeers]
     sync_store: Any
@@ -112,6 +115,7 @@ class FullNode:
     simulator_transaction_callback: Optional[Callable[[bytes32], Awaitable[None]]]
     _sync_task: Optional[asyncio.Task[None]]
     _transaction_queue: Optional[TransactionQueue]
+    _wallet_update_queue: Optional[WalletUpdateQueue]
     _compact_vdf_sem: Optional[LimitedSemaphore]
     _new_peak_sem: Optional[LimitedSemaphore]
     _respond_transaction_semaphore: Optional[asyncio.Semaphore]
@@ -152,7 +156,7 @@ class FullNode:
         self._server = None
         self._shut_down = False  # Set to true to close all infinite loops
         self.constants = consensus_constants
-        self.pow_creation = {}
+        self.response_cache = ResponseCache()
         self.state_changed_callback = None
         self.full_node_peers = None
         self.sync_store = None
@@ -177,6 +181,7 @@ class FullNode:
 
         self._sync_task = None
         self._transaction_queue = None
+        self._wallet_update_queue = None
         self._compact_vdf_sem = None
         self._new_peak_sem = None
         self._respond_transaction_semaphore = None
@@ -194,6 +199,11 @@ class FullNode:
         self._maybe_blockchain_lock_high_priority = None
         self._maybe_blockchain_lock_low_priority = None
 
+    @property
+    def wallet_update_queue(self) -> WalletUpdateQueue:
+        assert self._wallet_update_queue is not None
+        return self._wallet_update_queue
+
     @property
     def block_store(self) -> BlockStore:
         assert self._block_store is not None
@@ -286,6 +296,9 @@ class FullNode:
                 "creation_time": con.creation_time,
                 "bytes_read": con.bytes_read,
                 "bytes_written": con.bytes_written,
+                "outgoing_queue_size": con.outgoing_queue.qsize(),
+                "outgoing_queue": con.outgoing_queue.to_dict(),
+                "broadcast_messages_dropped": con.broadcast_messages_dropped,
                 "last_message_time": con.last_message_time,
                 "peak_height": peak_height,
                 "peak_weight": peak_weight,
@@ -326,9 +339,14 @@ class FullNode:
         self._db_wrapper = await DBWrapper2.create(
             self.db_path,
             db_version=db_version,
-            reader_count=4,
+            reader_count=self.config.get("db_readers", 4),
+            max_reader_count=self.config.get("db_max_readers"),
+            cache_size=self.config.get("db_cache_size"),
+            total_cache_size=self.config.get("db_total_cache_size"),
+            mmap_size=self.config.get("db_mmap_size"),
             log_path=sql_log_path,
             synchronous=db_sync,
+            slow_query_threshold=self.config.get("db_slow_query_threshold", SLOW_QUERY_THRESHOLD),
         )
 
         if self.db_wrapper.db_version != 2:
@@ -385,6 +403,9 @@ class FullNode:
         # Transactions go into this queue from the server, and get sent to respond_transaction
         self._transaction_queue = TransactionQueue(1000, self.log)
         self._transaction_queue_task: asyncio.Task[None] = asyncio.create_task(self._handle_transactions())
+        # Coin state updates and new peaks for wallets get merged and sent from this queue
+        self._wallet_update_queue = WalletUpdateQueue(self.server.all_connections.get, self.log)
+        self._wallet_update_queue.start()
         self.transaction_responses = []
 
         self._init_weight_proof = asyncio.create_task(self.initialize_weight_proof())
@@ -900,6 +921,8 @@ class FullNode:
             self.uncompact_task.cancel()
         if self._transaction_queue_task is not None:
             self._transaction_queue_task.cancel()
+        if self._wallet_update_queue is not None:
+            self._wallet_update_queue.stop()
         if self._blockchain_lock_queue is not None:
             self._blockchain_lock_queue.close()
         cancel_task_safe(task=self._sync_task, log=self.log)
@@ -1156,13 +1179,16 @@ class FullNode:
     async def send_peak_to_wallets(self) -> None:
         peak = self.blockchain.get_peak()
         assert peak is not None
-        msg = make_msg(
-            ProtocolMessageTypes.new_peak_wallet,
+        self.send_to_wallets(
             wallet_protocol.NewPeakWallet(
                 peak.header_hash, peak.height, peak.weight, uint32(max(peak.height - 1, uint32(0)))
-            ),
+            )
         )
-        await self.server.send_to_all([msg], NodeType.WALLET)
+
+    def send_to_wallets(self, peak: wallet_protocol.NewPeakWallet) -> None:
+        # Goes through the wallet update queue so that wallets get the coin state updates before the peak
+        wallet_peers = [connection.peer_node_id for connection in self.server.get_connections(NodeType.WALLET)]
+        self.wallet_update_queue.add_peak(wallet_peers, peak)
 
     def get_peers_with_peak(self, peak_hash: bytes32) -> List[WSChiaConnection]:
         peer_ids: Set[bytes32] = self.sync_store.get_peers_that_have_peak([peak_hash])
@@ -1208,15 +1234,13 @@ class FullNode:
         for peer, changes in changes_for_peer.items():
             if peer not in self.server.all_connections:
                 continue
-            ws_peer: WSChiaConnection = self.server.all_connections[peer]
-            state = CoinStateUpdate(
+            self.wallet_update_queue.add_coin_states(
+                peer,
                 state_change_summary.peak.height,
                 state_change_summary.fork_height,
                 state_change_summary.peak.header_hash,
-                list(changes),
+                changes,
             )
-            msg = make_msg(ProtocolMessageTypes.coin_state_update, state)
-            await ws_peer.send_message(msg)
 
     async def receive_block_batch(
         self,
@@ -1450,6 +1474,8 @@ class FullNode:
         if not self.sync_store.get_sync_mode():
             self.blockchain.clean_block_records()
 
+        self.response_cache.new_peak(record.height, state_change_summary.fork_height)
+
         fork_block: Optional[BlockRecord] = None
         if state_change_summary.fork_height != block.height - 1 and block.height != 0:
             # This is a reorg
@@ -1575,17 +1601,15 @@ class FullNode:
                 await self.server.send_to_all([msg], NodeType.FULL_NODE)
 
         # Tell wallets about the new peak
-        msg = make_msg(
-            ProtocolMessageTypes.new_peak_wallet,
+        await self.update_wallets(state_change_summary, ppp_result.hints, ppp_result.lookup_coin_ids)
+        self.send_to_wallets(
             wallet_protocol.NewPeakWallet(
                 record.header_hash,
                 record.height,
                 record.weight,
                 state_change_summary.fork_height,
-            ),
+            )
         )
-        await self.update_wallets(state_change_summary, ppp_result.hints, ppp_result.lookup_coin_ids)
-        await self.server.send_to_all([msg], NodeType.WALLET)
         self._state_changed("new_peak")
 
     async def respond_block(
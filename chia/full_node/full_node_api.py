@@ -264,43 +264,27 @@ class FullNodeAPI:
 
     @api_request(reply_types=[ProtocolMessageTypes.respond_proof_of_weight])
     async def request_proof_of_weight(self, request: full_node_protocol.RequestProofOfWeight) -> Optional[Message]:
-        if self.full_node.weight_proof_handler is None:
+        weight_proof_handler = self.full_node.weight_proof_handler
+        if weight_proof_handler is None:
             return None
         if not self.full_node.blockchain.contains_block(request.tip):
             self.log.error(f"got weight proof request for unknown peak {request.tip}")
             return None
-        if request.tip in self.full_node.pow_creation:
-            event = self.full_node.pow_creation[request.tip]
-            await event.wait()
-            wp = await self.full_node.weight_proof_handler.get_proof_of_weight(request.tip)
-        else:
-            event = asyncio.Event()
-            self.full_node.pow_creation[request.tip] = event
-            wp = await self.full_node.weight_proof_handler.get_proof_of_weight(request.tip)
-            event.set()
-        tips = list(self.full_node.pow_creation.keys())
-
-        if len(tips) > 4:
-            # Remove old from cache
-            for i in range(0, 4):
-                self.full_node.pow_creation.pop(tips[i])
-
-        if wp is None:
-            self.log.error(f"failed creating weight proof for peak {request.tip}")
-            return None
+        tip_height = self.full_node.blockchain.block_record(request.tip).height
 
-        # Serialization of wp is slow
-        if (
-            self.full_node.full_node_store.serialized_wp_message_tip is not None
-            and self.full_node.full_node_store.serialized_wp_message_tip == request.tip
-        ):
-            return self.full_node.full_node_store.serialized_wp_message
-        message = make_msg(
-            ProtocolMessageTypes.respond_proof_of_weight, full_node_protocol.RespondProofOfWeight(wp, request.tip)
+        async def create_response() -> Optional[Message]:
+            wp = await weight_proof_handler.get_proof_of_weight(request.tip)
+            if wp is None:
+                self.log.error(f"failed creating weight proof for peak {request.tip}")
+                return None
+            # Serialization of wp is slow, the cache keeps the serialized message
+            return make_msg(
+                ProtocolMessageTypes.respond_proof_of_weight, full_node_protocol.RespondProofOfWeight(wp, request.tip)
+            )
+
+        return await self.full_node.response_cache.get(
+            (ProtocolMessageTypes.respond_proof_of_weight, request.tip), tip_height, create_response
         )
-        self.full_node.full_node_store.serialized_wp_message_tip = request.tip
-        self.full_node.full_node_store.serialized_wp_message = message
-        return message
 
     @api_request()
     async def respond_proof_of_weight(self, request: full_node_protocol.RespondProofOfWeight) -> Optional[Message]:
@@ -317,12 +301,23 @@ class FullNodeAPI:
         if header_hash is None:
             return make_msg(ProtocolMessageTypes.reject_block, RejectBlock(request.height))
 
-        block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(header_hash)
-        if block is not None:
+        async def create_response() -> Optional[Message]:
+            assert header_hash is not None
+            block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(header_hash)
+            if block is None:
+                return None
             if not request.include_transaction_block and block.transactions_generator is not None:
                 block = dataclasses.replace(block, transactions_generator=None)
             return make_msg(ProtocolMessageTypes.respond_block, full_node_protocol.RespondBlock(block))
-        return make_msg(ProtocolMessageTypes.reject_block, RejectBlock(request.height))
+
+        response = await self.full_node.response_cache.get(
+            (ProtocolMessageTypes.respond_block, header_hash, request.include_transaction_block),
+            request.height,
+            create_response,
+        )
+        if response is None:
+            return make_msg(ProtocolMessageTypes.reject_block, RejectBlock(request.height))
+        return response
 
     @api_request(reply_types=[ProtocolMessageTypes.respond_blocks, ProtocolMessageTypes.reject_blocks])
     async def request_blocks(self, request: full_node_protocol.RequestBlocks) -> Optional[Message]:
@@ -336,36 +331,33 @@ class FullNodeAPI:
                 msg = make_msg(ProtocolMessageTypes.reject_blocks, reject)
                 return msg
 
-        if not request.include_transaction_block:
-            blocks: List[FullBlock] = []
-            for i in range(request.start_height, request.end_height + 1):
-                header_hash_i: Optional[bytes32] = self.full_node.blockchain.height_to_hash(uint32(i))
-                if header_hash_i is None:
-                    reject = RejectBlocks(request.start_height, request.end_height)
-                    return make_msg(ProtocolMessageTypes.reject_blocks, reject)
-
-                block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(header_hash_i)
-                if block is None:
-                    reject = RejectBlocks(request.start_height, request.end_height)
-                    return make_msg(ProtocolMessageTypes.reject_blocks, reject)
-                block = dataclasses.replace(block, transactions_generator=None)
-                blocks.append(block)
-            msg = make_msg(
-                ProtocolMessageTypes.respond_blocks,
-                full_node_protocol.RespondBlocks(request.start_height, request.end_height, blocks),
-            )
-        else:
+        header_hashes: List[bytes32] = []
+        for i in range(request.start_height, request.end_height + 1):
+            header_hash_i: Optional[bytes32] = self.full_node.blockchain.height_to_hash(uint32(i))
+            if header_hash_i is None:
+                reject = RejectBlocks(request.start_height, request.end_height)
+                return make_msg(ProtocolMessageTypes.reject_blocks, reject)
+            header_hashes.append(header_hash_i)
+
+        async def create_response() -> Optional[Message]:
+            if not request.include_transaction_block:
+                blocks: List[FullBlock] = []
+                for header_hash_i in header_hashes:
+                    block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(header_hash_i)
+                    if block is None:
+                        return None
+                    block = dataclasses.replace(block, transactions_generator=None)
+                    blocks.append(block)
+                return make_msg(
+                    ProtocolMessageTypes.respond_blocks,
+                    full_node_protocol.RespondBlocks(request.start_height, request.end_height, blocks),
+                )
+
             blocks_bytes: List[bytes] = []
-            for i in range(request.start_height, request.end_height + 1):
-                header_hash_i = self.full_node.blockchain.height_to_hash(uint32(i))
-                if header_hash_i is None:
-                    reject = RejectBlocks(request.start_height, request.end_height)
-                    return make_msg(ProtocolMessageTypes.reject_blocks, reject)
+            for header_hash_i in header_hashes:
                 block_bytes: Optional[bytes] = await self.full_node.block_store.get_full_block_bytes(header_hash_i)
                 if block_bytes is None:
-                    reject = RejectBlocks(request.start_height, request.end_height)
-                    msg = make_msg(ProtocolMessageTypes.reject_blocks, reject)
-                    return msg
+                    return None
 
                 blocks_bytes.append(block_bytes)
 
@@ -376,9 +368,18 @@ class FullNodeAPI:
             )
             for block_bytes in blocks_bytes:
                 respond_blocks_manually_streamed += block_bytes
-            msg = make_msg(ProtocolMessageTypes.respond_blocks, respond_blocks_manually_streamed)
+            return make_msg(ProtocolMessageTypes.respond_blocks, respond_blocks_manually_streamed)
 
-        return msg
+        # The header hashes identify the blocks, cached responses can't outlive a reorg
+        response = await self.full_node.response_cache.get(
+            (ProtocolMessageTypes.respond_blocks, tuple(header_hashes), request.include_transaction_block),
+            request.end_height,
+            create_response,
+        )
+        if response is None:
+            reject = RejectBlocks(request.start_height, request.end_height)
+            return make_msg(ProtocolMessageTypes.reject_blocks, reject)
+        return response
 
     @api_request()
     async def reject_block(self, request: full_node_protocol.RejectBlock) -> None:
@@ -1087,6 +1088,13 @@ class FullNodeAPI:
         if header_hash is None:
             msg = make_msg(ProtocolMessageTypes.reject_header_request, RejectHeaderRequest(request.height))
             return msg
+        return await self.full_node.response_cache.get(
+            (ProtocolMessageTypes.respond_block_header, header_hash),
+            request.height,
+            functools.partial(self._create_block_header_response, header_hash),
+        )
+
+    async def _create_block_header_response(self, header_hash: bytes32) -> Optional[Message]:
         block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(header_hash)
         if block is None:
             return None
@@ -1381,7 +1389,13 @@ class FullNodeAPI:
                 return msg
             header_hashes.append(header_hash)
 
-        blocks: List[FullBlock] = await self.full_node.block_store.get_blocks_by_hash(header_hashes)
+        try:
+            blocks: List[FullBlock] = await self.full_node.block_store.get_blocks_by_hash(header_hashes)
+        except ValueError:
+            return make_msg(
+                ProtocolMessageTypes.reject_header_blocks,
+                RejectHeaderBlocks(request.start_height, request.end_height),
+            )
         header_blocks = []
         for block in blocks:
             added_coins_records_coroutine = self.full_node.coin_store.get_coins_added_at_height(block.height)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from chia.server.outbound_message import Message
+
+# Only responses which depend on blocks this close to the peak get cached, that's where the identical requests pile up
+RECENT_HEIGHTS = 64
+# The serialized responses of a few batches of `respond_blocks` and some weight proofs
+MAX_CACHE_BYTES = 100 * 1024 * 1024
+
+
+class ResponseCache:
+    """
+    Shares the serialized responses of hot full node API calls between peers. Identical requests which arrive while
+    the response is still being created wait for the same computation, and responses for recent heights get cached.
+
+    The keys must identify the content of the response, i.e. contain the header hashes of the blocks it depends on
+    rather than just their heights. A cached response can thus never be wrong, `new_peak` only drops the entries which
+    won't be requested anymore: the ones above the fork height of a reorg and the ones which are too far behind the
+    peak.
+    """
+
+    _entries: OrderedDict[Hashable, Tuple[int, Message]]
+    _in_flight: Dict[Hashable, asyncio.Task[Optional[Message]]]
+    _max_bytes: int
+    _recent_heights: int
+    _size: int
+    _peak_height: Optional[int]
+    hits: int
+    misses: int
+    merged: int
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES, recent_heights: int = RECENT_HEIGHTS) -> None:
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._max_bytes = max_bytes
+        self._recent_heights = recent_heights
+        self._size = 0
+        self._peak_height = None
+        self.hits = 0
+        self.misses = 0
+        self.merged = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_recent(self, height: int) -> bool:
+        return self._peak_height is None or height + self._recent_heights >= self._peak_height
+
+    async def get(
+        self, key: Hashable, height: int, create: Callable[[], Awaitable[Optional[Message]]]
+    ) -> Optional[Message]:
+        """
+        Returns the response for `key`, which depends on blocks up to `height`. `create` only gets called if the
+        response is neither cached nor already being created for another request. `None` results don't get cached.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._create(key, height, create))
+            self._in_flight[key] = task
+        else:
+            self.merged += 1
+        # The other requests which wait for the same response must not get cancelled with this one
+        return await asyncio.shield(task)
+
+    async def _create(
+        self, key: Hashable, height: int, create: Callable[[], Awaitable[Optional[Message]]]
+    ) -> Optional[Message]:
+        try:
+            message = await create()
+        finally:
+            self._in_flight.pop(key, None)
+        if message is not None and self.is_recent(height):
+            self._put(key, height, message)
+        return message
+
+    def _put(self, key: Hashable, height: int, message: Message) -> None:
+        size = len(message.data)
+        if size > self._max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (height, message)
+        self._size += size
+        while self._size > self._max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1].data)
+
+    def new_peak(self, height: int, fork_height: int) -> None:
+        """
+        Drops the responses for blocks which got reorged out and the ones which are no longer recent.
+        """
+        self._peak_height = height
+        for key, (entry_height, _) in list(self._entries.items()):
+            if entry_height > fork_height or not self.is_recent(entry_height):
+                self._remove(key)
@@ -2,22 +2,64 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass, field
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Union
 
 from chia.types.blockchain_format.sized_bytes import bytes32
 
 log = logging.getLogger(__name__)
 
 
+class SubscriptionIndex(Dict[bytes32, Union[bytes32, Set[bytes32]]]):
+    """
+    Maps coin ids or puzzle hashes to the peers subscribed to them. Most of them only have a single subscriber, so the
+    peer id gets stored directly and a set is only created once a second peer subscribes.
+    """
+
+    def add(self, key: bytes32, peer_id: bytes32) -> bool:
+        """
+        Returns `False` if the peer was already subscribed to the key.
+        """
+        peers = self.get(key)
+        if peers is None:
+            self[key] = peer_id
+        elif isinstance(peers, set):
+            if peer_id in peers:
+                return False
+            peers.add(peer_id)
+        else:
+            if peers == peer_id:
+                return False
+            self[key] = {peers, peer_id}
+        return True
+
+    def remove(self, key: bytes32, peer_id: bytes32) -> None:
+        peers = self[key]
+        if isinstance(peers, set):
+            peers.remove(peer_id)
+            if len(peers) == 1:
+                self[key] = peers.pop()
+        else:
+            assert peers == peer_id
+            del self[key]
+
+    def peers(self, key: bytes32) -> Set[bytes32]:
+        peers = self.get(key)
+        if peers is None:
+            return set()
+        if isinstance(peers, set):
+            return peers
+        return {peers}
+
+
 # The PeerSubscriptions class is essentially a multi-index container. It can be
 # indexed by peer_id, coin_id and puzzle_hash.
 @dataclass(frozen=True)
 class PeerSubscriptions:
     # TODO: use NewType all over to describe these various uses of the same types
-    # Puzzle Hash : Set[Peer ID]
-    _coin_subscriptions: Dict[bytes32, Set[bytes32]] = field(default_factory=dict, init=False)
-    # Puzzle Hash : Set[Peer ID]
-    _ph_subscriptions: Dict[bytes32, Set[bytes32]] = field(default_factory=dict, init=False)
+    # Coin ID : Peer IDs
+    _coin_subscriptions: SubscriptionIndex = field(default_factory=SubscriptionIndex, init=False)
+    # Puzzle Hash : Peer IDs
+    _ph_subscriptions: SubscriptionIndex = field(default_factory=SubscriptionIndex, init=False)
     # Peer ID: Set[Coin ids]
     _peer_coin_ids: Dict[bytes32, Set[bytes32]] = field(default_factory=dict, init=False)
     # Peer ID: Set[puzzle_hash]
@@ -49,11 +91,9 @@ class PeerSubscriptions:
         subscriptions_left = max_items - existing_sub_count
 
         for ph in phs:
-            ph_sub = self._ph_subscriptions.setdefault(ph, set())
-            if peer_id in ph_sub:
+            if not self._ph_subscriptions.add(ph, peer_id):
                 continue
 
-            ph_sub.add(peer_id)
             puzzle_hash_peers.add(ph)
             self._peer_sub_counter[peer_id] += 1
             subscriptions_left -= 1
@@ -83,11 +123,9 @@ class PeerSubscriptions:
         subscriptions_left = max_items - existing_sub_count
 
         for coin_id in coin_ids:
-            coin_sub = self._coin_subscriptions.setdefault(coin_id, set())
-            if peer_id in coin_sub:
+            if not self._coin_subscriptions.add(coin_id, peer_id):
                 continue
 
-            coin_sub.add(peer_id)
             coin_id_peers.add(coin_id)
             self._peer_sub_counter[peer_id] += 1
             subscriptions_left -= 1
@@ -105,21 +143,15 @@ class PeerSubscriptions:
         puzzle_hashes = self._peer_puzzle_hash.get(peer_id)
         if puzzle_hashes is not None:
             for ph in puzzle_hashes:
-                subs = self._ph_subscriptions[ph]
-                subs.remove(peer_id)
+                self._ph_subscriptions.remove(ph, peer_id)
                 counter += 1
-                if subs == set():
-                    self._ph_subscriptions.pop(ph)
             self._peer_puzzle_hash.pop(peer_id)
 
         coin_ids = self._peer_coin_ids.get(peer_id)
         if coin_ids is not None:
             for coin_id in coin_ids:
-                subs = self._coin_subscriptions[coin_id]
-                subs.remove(peer_id)
+                self._coin_subscriptions.remove(coin_id, peer_id)
                 counter += 1
-                if subs == set():
-                    self._coin_subscriptions.pop(coin_id)
             self._peer_coin_ids.pop(peer_id)
 
         if peer_id in self._peer_sub_counter:
@@ -127,7 +159,7 @@ class PeerSubscriptions:
             assert num_subs == counter
 
     def peers_for_coin_id(self, coin_id: bytes32) -> Set[bytes32]:
-        return self._coin_subscriptions.get(coin_id, set())
+        return self._coin_subscriptions.peers(coin_id)
 
     def peers_for_puzzle_hash(self, puzzle_hash: bytes32) -> Set[bytes32]:
-        return self._ph_subscriptions.get(puzzle_hash, set())
+        return self._ph_subscriptions.peers(puzzle_hash)
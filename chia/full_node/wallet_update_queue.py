@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.protocols.wallet_protocol import CoinState, CoinStateUpdate, NewPeakWallet
+from chia.server.outbound_message import Message, make_msg
+from chia.server.ws_connection import WSChiaConnection
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.ints import uint32
+
+
+def merge_fork_heights(fork_height: int, height: int, new_fork_height: int, new_height: int) -> uint32:
+    """
+    Returns the fork height for an update which combines an update from `fork_height` to `height` with the following
+    update from `new_fork_height` to `new_height`. An update with `fork_height == height - 1` just extends the chain,
+    if both do that, the combined update extends the chain too. If any of them is a reorg, the combined update needs
+    to roll back to the lowest fork height.
+    """
+    if fork_height == height - 1 and new_fork_height == new_height - 1:
+        return uint32(new_fork_height)
+    return uint32(min(fork_height, new_fork_height))
+
+
+@dataclass
+class PendingCoinStates:
+    height: uint32
+    fork_height: uint32
+    peak_hash: bytes32
+    states: Dict[bytes32, CoinState] = field(default_factory=dict)
+
+    def merge(self, height: uint32, fork_height: uint32, peak_hash: bytes32, states: Iterable[CoinState]) -> None:
+        self.fork_height = merge_fork_heights(self.fork_height, self.height, fork_height, height)
+        self.height = height
+        self.peak_hash = peak_hash
+        for state in states:
+            # Later states of the same coin replace the earlier ones
+            self.states[state.coin.name()] = state
+
+    def to_message(self) -> Message:
+        return make_msg(
+            ProtocolMessageTypes.coin_state_update,
+            CoinStateUpdate(self.height, self.fork_height, self.peak_hash, list(self.states.values())),
+        )
+
+
+@dataclass
+class PendingWalletUpdate:
+    coin_states: Optional[PendingCoinStates] = None
+    peak: Optional[NewPeakWallet] = None
+
+
+class WalletUpdateQueue:
+    """
+    Collects the coin state updates and the new peaks for the connected wallets and sends them from a separate task,
+    so that the peak processing doesn't wait for the wallet peers. Updates which get queued for a peer within
+    `interval` seconds, or while the previous updates are still being sent, get merged into a single
+    `CoinStateUpdate` followed by a single `NewPeakWallet`. The coin state update always gets sent before the peak,
+    like wallets expect it.
+    """
+
+    _get_connection: Callable[[bytes32], Optional[WSChiaConnection]]
+    _log: logging.Logger
+    _interval: float
+    _pending: Dict[bytes32, PendingWalletUpdate]
+    _event: asyncio.Event
+    _task: Optional[asyncio.Task[None]]
+    merged_updates: int
+
+    def __init__(
+        self,
+        get_connection: Callable[[bytes32], Optional[WSChiaConnection]],
+        log: logging.Logger,
+        interval: float = 0.1,
+    ) -> None:
+        self._get_connection = get_connection
+        self._log = log
+        self._interval = interval
+        self._pending = {}
+        self._event = asyncio.Event()
+        self._task = None
+        self.merged_updates = 0
+
+    def start(self) -> None:
+        if self._task is not None:
+            raise RuntimeError("Already started")
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def add_coin_states(
+        self, peer_id: bytes32, height: uint32, fork_height: uint32, peak_hash: bytes32, states: Iterable[CoinState]
+    ) -> None:
+        pending = self._pending.setdefault(peer_id, PendingWalletUpdate())
+        if pending.coin_states is None:
+            pending.coin_states = PendingCoinStates(
+                height, fork_height, peak_hash, {state.coin.name(): state for state in states}
+            )
+        else:
+            pending.coin_states.merge(height, fork_height, peak_hash, states)
+            self.merged_updates += 1
+        self._event.set()
+
+    def add_peak(self, peer_ids: Iterable[bytes32], peak: NewPeakWallet) -> None:
+        for peer_id in peer_ids:
+            pending = self._pending.setdefault(peer_id, PendingWalletUpdate())
+            if pending.peak is not None:
+                fork_height = merge_fork_heights(
+                    pending.peak.fork_point_with_previous_peak,
+                    pending.peak.height,
+                    peak.fork_point_with_previous_peak,
+                    peak.height,
+                )
+                pending.peak = NewPeakWallet(peak.header_hash, peak.height, peak.weight, fork_height)
+                self.merged_updates += 1
+            else:
+                pending.peak = peak
+        self._event.set()
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        # Most peers get the same peak, only serialize it once for all of them
+        peak_messages: Dict[NewPeakWallet, Message] = {}
+        for peer_id, update in pending.items():
+            connection = self._get_connection(peer_id)
+            if connection is None:
+                continue
+            messages: List[Message] = []
+            if update.coin_states is not None:
+                messages.append(update.coin_states.to_message())
+            if update.peak is not None:
+                if update.peak not in peak_messages:
+                    peak_messages[update.peak] = make_msg(ProtocolMessageTypes.new_peak_wallet, update.peak)
+                messages.append(peak_messages[update.peak])
+            await connection.send_messages(messages)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._event.wait()
+                self._event.clear()
+                # Give the updates of close peaks, like during a sync or a reorg, a chance to get merged
+                await asyncio.sleep(self._interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._log.error(f"Failed to send wallet updates: {e}")
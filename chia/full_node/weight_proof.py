@@ -203,11 +203,11 @@ class WeightProofHandler:
             # add to needed reward chain recent blocks
             header_hash = self.blockchain.height_to_hash(curr_height)
             assert header_hash is not None
-            header_block = headers[header_hash]
-            block_rec = blocks[header_block.header_hash]
+            header_block = headers.get(header_hash)
             if header_block is None:
                 log.error("creating recent chain failed")
                 return None
+            block_rec = blocks[header_block.header_hash]
             recent_chain.insert(0, header_block)
             if block_rec.sub_epoch_summary_included:
                 ses_count += 1
@@ -216,7 +216,10 @@ class WeightProofHandler:
 
         header_hash = self.blockchain.height_to_hash(curr_height)
         assert header_hash is not None
-        header_block = headers[header_hash]
+        header_block = headers.get(header_hash)
+        if header_block is None:
+            log.error("creating recent chain failed")
+            return None
         recent_chain.insert(0, header_block)
 
         log.info(
@@ -236,7 +239,9 @@ class WeightProofHandler:
         prev_ses_sub_block = self.blockchain.height_to_block_record(heights[-3])
         assert prev_ses_sub_block.sub_epoch_summary_included is not None
         segments = await self.__create_sub_epoch_segments(ses_sub_block, prev_ses_sub_block, uint32(count))
-        assert segments is not None
+        if segments is None:
+            log.error(f"failed while building segments for sub epoch {count}, ses height {heights[-2]} ")
+            return None
         await self.blockchain.persist_sub_epoch_challenge_segments(ses_sub_block.header_hash, segments)
         log.debug("sub_epoch_segments done")
         return None
@@ -293,12 +298,15 @@ class WeightProofHandler:
         segments: List[SubEpochChallengeSegment] = []
         start_height = await self.get_prev_two_slots_height(se_start)
 
-        blocks = await self.blockchain.get_block_records_in_range(
-            start_height, ses_block.height + self.constants.MAX_SUB_SLOT_BLOCKS
-        )
-        header_blocks = await self.blockchain.get_header_blocks_in_range(
-            start_height, ses_block.height + self.constants.MAX_SUB_SLOT_BLOCKS, tx_filter=False
-        )
+        end_height = ses_block.height + self.constants.MAX_SUB_SLOT_BLOCKS
+        blocks = await self.blockchain.get_block_records_in_range(start_height, end_height)
+        header_blocks = await self.blockchain.get_header_blocks_in_range(start_height, end_height, tx_filter=False)
+        # a database imported from a snapshot only has the block records of the blocks below its height
+        for h in range(start_height, end_height + 1):
+            header_hash = self.blockchain.height_to_hash(uint32(h))
+            if header_hash is not None and header_hash not in header_blocks:
+                log.error(f"block at height {h} is not in the database")
+                return None
         curr: Optional[HeaderBlock] = header_blocks[se_start.header_hash]
         height = se_start.height
         assert curr is not None
@@ -9,6 +9,7 @@ from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from chia.consensus.constants import ConsensusConstants
+from chia.harvester.lookup_statistics import LookupStatistics, QuarantineParameter
 from chia.plot_sync.sender import Sender
 from chia.plotting.manager import PlotManager
 from chia.plotting.util import (
@@ -31,6 +32,7 @@ log = logging.getLogger(__name__)
 class Harvester:
     plot_manager: PlotManager
     plot_sync_sender: Sender
+    lookup_statistics: LookupStatistics
     root_path: Path
     _shut_down: bool
     executor: ThreadPoolExecutor
@@ -71,7 +73,12 @@ class Harvester:
         self.plot_manager = PlotManager(
             root_path, refresh_parameter=refresh_parameter, refresh_callback=self._plot_refresh_callback
         )
-        self.plot_sync_sender = Sender(self.plot_manager)
+        self.lookup_statistics = LookupStatistics(
+            QuarantineParameter.from_json_dict(config.get("slow_plot_quarantine", {}))
+        )
+        self.plot_sync_sender = Sender(
+            self.plot_manager, config.get("plot_sync_window_size", 1), self.lookup_statistics.quarantined
+        )
         self._shut_down = False
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=config["num_threads"])
         self._server = None
@@ -121,13 +128,16 @@ class Harvester:
         if event == PlotRefreshEvents.batch_processed:
             self.plot_sync_sender.process_batch(update_result.loaded, update_result.remaining)
         if event == PlotRefreshEvents.done:
+            self.lookup_statistics.remove(update_result.removed)
             self.plot_sync_sender.sync_done(update_result.removed, update_result.duration)
 
     def on_disconnect(self, connection: WSChiaConnection):
         self.log.info(f"peer disconnected {connection.get_peer_logging()}")
         self.state_changed("close_connection")
         self.plot_sync_sender.stop()
-        asyncio.run_coroutine_threadsafe(self.plot_sync_sender.await_closed(), asyncio.get_running_loop())
+        asyncio.run_coroutine_threadsafe(
+            self.plot_sync_sender.await_closed(keep_last_sync=True), asyncio.get_running_loop()
+        )
         self.plot_manager.stop_refreshing()
 
     def get_plots(self) -> Tuple[List[Dict], List[str], List[str]]:
@@ -157,16 +157,25 @@ class HarvesterAPI:
                 self.harvester.log.error(f"Unknown error: {e}")
                 return []
 
+        def timed_blocking_lookup(
+            filename: Path, plot_info: PlotInfo
+        ) -> Tuple[List[Tuple[bytes32, ProofOfSpace]], float]:
+            # Measures the lookup itself, without the time it waited for a thread of the pool
+            lookup_start = time.monotonic()
+            responses = blocking_lookup(filename, plot_info)
+            return responses, time.monotonic() - lookup_start
+
         async def lookup_challenge(
             filename: Path, plot_info: PlotInfo
-        ) -> Tuple[Path, List[harvester_protocol.NewProofOfSpace]]:
+        ) -> Tuple[Path, List[harvester_protocol.NewProofOfSpace], float]:
             # Executes a DiskProverLookup in a thread pool, and returns responses
             all_responses: List[harvester_protocol.NewProofOfSpace] = []
             if self.harvester._shut_down:
-                return filename, []
-            proofs_of_space_and_q: List[Tuple[bytes32, ProofOfSpace]] = await loop.run_in_executor(
-                self.harvester.executor, blocking_lookup, filename, plot_info
+                return filename, [], 0
+            proofs_of_space_and_q, lookup_time = await loop.run_in_executor(
+                self.harvester.executor, timed_blocking_lookup, filename, plot_info
             )
+            self.harvester.lookup_statistics.add(filename, plot_info.device, lookup_time)
             for quality_str, proof_of_space in proofs_of_space_and_q:
                 all_responses.append(
                     harvester_protocol.NewProofOfSpace(
@@ -177,7 +186,7 @@ class HarvesterAPI:
                         new_challenge.signage_point_index,
                     )
                 )
-            return filename, all_responses
+            return filename, all_responses, lookup_time
 
         awaitables = []
         passed = 0
@@ -201,12 +210,12 @@ class HarvesterAPI:
         # Concurrently executes all lookups on disk, to take advantage of multiple disk parallelism
         total_proofs_found = 0
         for filename_sublist_awaitable in asyncio.as_completed(awaitables):
-            filename, sublist = await filename_sublist_awaitable
+            filename, sublist, lookup_time = await filename_sublist_awaitable
             time_taken = time.time() - start
             if time_taken > 5:
                 self.harvester.log.warning(
                     f"Looking up qualities on {filename} took: {time_taken}. This should be below 5 seconds "
-                    f"to minimize risk of losing rewards."
+                    f"to minimize risk of losing rewards. The lookup of the plot itself took: {lookup_time}."
                 )
             else:
                 pass
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+from chia.util.ints import uint32
+from chia.util.streamable import Streamable, streamable
+
+log = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the histogram buckets, lookups above the last bound end up in an extra bucket
+LATENCY_BUCKETS: List[float] = [0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20]
+
+
+@streamable
+@dataclass(frozen=True)
+class QuarantineParameter(Streamable):
+    enabled: bool = False
+    # Lookups which take longer than this count as threshold breaches
+    threshold_milliseconds: uint32 = uint32(5000)
+    # Number of consecutive breaches which quarantine a plot or a disk, the same number of consecutive lookups below
+    # the threshold releases it again
+    consecutive_breaches: uint32 = uint32(3)
+
+
+@dataclass
+class LatencyHistogram:
+    counts: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    count: int = 0
+    total: float = 0
+    maximum: float = 0
+    last: float = 0
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        self.last = seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "buckets": [{"le": bound, "count": count} for bound, count in zip([*LATENCY_BUCKETS, None], self.counts)],
+            "count": self.count,
+            "average": self.total / self.count if self.count > 0 else None,
+            "maximum": self.maximum,
+            "last": self.last,
+        }
+
+
+@dataclass
+class LatencyTracker:
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    consecutive_breaches: int = 0
+    consecutive_passes: int = 0
+    quarantined: bool = False
+
+    def add(self, seconds: float, parameter: QuarantineParameter) -> bool:
+        """
+        Returns `True` if the lookup changed the quarantine state.
+        """
+        self.histogram.add(seconds)
+        if seconds * 1000 > parameter.threshold_milliseconds:
+            self.consecutive_breaches += 1
+            self.consecutive_passes = 0
+        else:
+            self.consecutive_passes += 1
+            self.consecutive_breaches = 0
+        if not parameter.enabled:
+            return False
+        if not self.quarantined and self.consecutive_breaches >= parameter.consecutive_breaches:
+            self.quarantined = True
+            return True
+        if self.quarantined and self.consecutive_passes >= parameter.consecutive_breaches:
+            self.quarantined = False
+            return True
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "histogram": self.histogram.to_dict(),
+            "consecutive_breaches": self.consecutive_breaches,
+            "quarantined": self.quarantined,
+        }
+
+
+@dataclass
+class DiskTracker(LatencyTracker):
+    plots: Set[Path] = field(default_factory=set)
+
+
+class LookupStatistics:
+    """
+    Tracks the duration of the quality lookups per plot and per disk. If the quarantine is enabled, plots and disks
+    are marked as slow after repeated threshold breaches. Quarantined plots are still farmed, but they get reported to
+    the farmer with the plot sync so that the operator can find the slow disk.
+    """
+
+    _parameter: QuarantineParameter
+    _plots: Dict[Path, LatencyTracker]
+    _disks: Dict[int, DiskTracker]
+    _lock: threading.Lock
+
+    def __init__(self, parameter: QuarantineParameter) -> None:
+        self._parameter = parameter
+        self._plots = {}
+        self._disks = {}
+        # Lookups are added from the event loop while plots get removed and the quarantined plots get collected
+        # from the plot refresh thread
+        self._lock = threading.Lock()
+
+    def parameter(self) -> QuarantineParameter:
+        return self._parameter
+
+    def add(self, path: Path, device: int, seconds: float) -> None:
+        with self._lock:
+            plot = self._plots.setdefault(path, LatencyTracker())
+            if plot.add(seconds, self._parameter):
+                state = "quarantined" if plot.quarantined else "released"
+                log.warning(f"Plot {path} {state}, last lookup took: {seconds:.3f} seconds")
+            disk = self._disks.setdefault(device, DiskTracker())
+            disk.plots.add(path)
+            if disk.add(seconds, self._parameter):
+                state = "quarantined" if disk.quarantined else "released"
+                log.warning(f"Disk {device} of {path} {state}, last lookup took: {seconds:.3f} seconds")
+
+    def remove(self, paths: List[Path]) -> None:
+        with self._lock:
+            for path in paths:
+                self._plots.pop(path, None)
+            for device, disk in list(self._disks.items()):
+                disk.plots.difference_update(paths)
+                if len(disk.plots) == 0:
+                    del self._disks[device]
+
+    def quarantined(self) -> List[str]:
+        """
+        Returns the paths of all plots which are quarantined themselves or located on a quarantined disk.
+        """
+        with self._lock:
+            quarantined: Set[Path] = {path for path, plot in self._plots.items() if plot.quarantined}
+            for disk in self._disks.values():
+                if disk.quarantined:
+                    quarantined.update(disk.plots)
+            return sorted(str(path) for path in quarantined)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "quarantine": self._parameter.to_json_dict(),
+                "plots": [{"filename": str(path), **plot.to_dict()} for path, plot in self._plots.items()],
+                "disks": [
+                    {
+                        "device": device,
+                        "directories": sorted({str(path.parent) for path in disk.plots}),
+                        "plot_count": len(disk.plots),
+                        **disk.to_dict(),
+                    }
+                    for device, disk in self._disks.items()
+                ],
+            }
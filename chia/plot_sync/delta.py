@@ -44,14 +44,21 @@ class Delta:
     invalid: PathListDelta = field(default_factory=PathListDelta)
     keys_missing: PathListDelta = field(default_factory=PathListDelta)
     duplicates: PathListDelta = field(default_factory=PathListDelta)
+    quarantined: PathListDelta = field(default_factory=PathListDelta)
 
     def empty(self) -> bool:
-        return self.valid.empty() and self.invalid.empty() and self.keys_missing.empty() and self.duplicates.empty()
+        return (
+            self.valid.empty()
+            and self.invalid.empty()
+            and self.keys_missing.empty()
+            and self.duplicates.empty()
+            and self.quarantined.empty()
+        )
 
     def __str__(self) -> str:
         return (
             f"[valid {self.valid}, invalid {self.invalid}, keys missing: {self.keys_missing}, "
-            f"duplicates: {self.duplicates}]"
+            f"duplicates: {self.duplicates}, quarantined: {self.quarantined}]"
         )
 
     def clear(self) -> None:
@@ -59,3 +66,4 @@ class Delta:
         self.invalid.clear()
         self.keys_missing.clear()
         self.duplicates.clear()
+        self.quarantined.clear()
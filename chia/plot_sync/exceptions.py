@@ -5,6 +5,7 @@ from typing import Any
 from chia.plot_sync.util import ErrorCodes, State
 from chia.protocols.harvester_protocol import PlotSyncIdentifier
 from chia.server.outbound_message import NodeType
+from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.util.ints import uint64
 
 
@@ -54,3 +55,8 @@ class PlotNotAvailableError(PlotSyncException):
 class SyncIdsMatchError(PlotSyncException):
     def __init__(self, state: State, sync_id: uint64) -> None:
         super().__init__(f"{state.name}: Sync ids are equal - {sync_id}", ErrorCodes.sync_ids_match)
+
+
+class FingerprintMismatchError(InvalidValueError):
+    def __init__(self, actual: bytes32, expected: bytes32) -> None:
+        super().__init__("Fingerprint mismatch", actual, expected, ErrorCodes.fingerprint_mismatch)
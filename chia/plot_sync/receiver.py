@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import time
 from dataclasses import dataclass, field
@@ -9,6 +10,7 @@ from typing_extensions import Protocol
 
 from chia.plot_sync.delta import Delta, PathListDelta, PlotListDelta
 from chia.plot_sync.exceptions import (
+    FingerprintMismatchError,
     InvalidIdentifierError,
     InvalidLastSyncIdError,
     PlotAlreadyAvailableError,
@@ -16,7 +18,7 @@ from chia.plot_sync.exceptions import (
     PlotSyncException,
     SyncIdsMatchError,
 )
-from chia.plot_sync.util import ErrorCodes, State, T_PlotSyncMessage
+from chia.plot_sync.util import ErrorCodes, State, T_PlotSyncMessage, plots_fingerprint
 from chia.protocols.harvester_protocol import (
     Plot,
     PlotSyncDone,
@@ -25,6 +27,7 @@ from chia.protocols.harvester_protocol import (
     PlotSyncPathList,
     PlotSyncPlotList,
     PlotSyncResponse,
+    PlotSyncResume,
     PlotSyncStart,
 )
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
@@ -33,6 +36,7 @@ from chia.server.ws_connection import WSChiaConnection
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.util.ints import int16, uint32, uint64
 from chia.util.misc import get_list_or_len
+from chia.util.streamable import Streamable, streamable
 
 log = logging.getLogger(__name__)
 
@@ -68,6 +72,22 @@ class Sync:
         )
 
 
+@streamable
+@dataclass(frozen=True)
+class ReceiverState(Streamable):
+    """
+    The state of a `Receiver` after its last completed sync, used to resume the plot sync after a reconnect.
+    """
+
+    sync_id: uint64
+    time_done: uint64
+    plots: List[Plot]
+    invalid: List[str]
+    keys_missing: List[str]
+    duplicates: List[str]
+    quarantined: List[str]
+
+
 class ReceiverUpdateCallback(Protocol):
     def __call__(self, peer_id: bytes32, delta: Optional[Delta]) -> Awaitable[None]:
         pass
@@ -81,8 +101,10 @@ class Receiver:
     _invalid: List[str]
     _keys_missing: List[str]
     _duplicates: List[str]
+    _quarantined: List[str]
     _total_plot_size: int
     _update_callback: ReceiverUpdateCallback
+    _lock: asyncio.Lock
 
     def __init__(
         self,
@@ -96,8 +118,12 @@ class Receiver:
         self._invalid = []
         self._keys_missing = []
         self._duplicates = []
+        self._quarantined = []
         self._total_plot_size = 0
         self._update_callback = update_callback
+        # Incoming messages are processed in separate tasks, the lock makes sure they are processed one after another
+        # in the order they arrived, which allows the sender to have multiple messages in flight.
+        self._lock = asyncio.Lock()
 
     async def trigger_callback(self, update: Optional[Delta] = None) -> None:
         try:
@@ -113,8 +139,32 @@ class Receiver:
         self._invalid.clear()
         self._keys_missing.clear()
         self._duplicates.clear()
+        self._quarantined.clear()
         self._total_plot_size = 0
 
+    def resume_state(self) -> ReceiverState:
+        assert self._last_sync.time_done is not None
+        return ReceiverState(
+            self._last_sync.sync_id,
+            uint64(int(self._last_sync.time_done)),
+            list(self._plots.values()),
+            self._invalid.copy(),
+            self._keys_missing.copy(),
+            self._duplicates.copy(),
+            self._quarantined.copy(),
+        )
+
+    def restore(self, state: ReceiverState) -> None:
+        log.info(f"restore: node_id {self.connection().peer_node_id}, sync_id {state.sync_id}")
+        self.reset()
+        self._last_sync = Sync(state=State.done, sync_id=state.sync_id, time_done=float(state.time_done))
+        self._plots = {plot.filename: plot for plot in state.plots}
+        self._invalid = list(state.invalid)
+        self._keys_missing = list(state.keys_missing)
+        self._duplicates = list(state.duplicates)
+        self._quarantined = list(state.quarantined)
+        self._total_plot_size = sum(plot.file_size for plot in self._plots.values())
+
     def connection(self) -> WSChiaConnection:
         return self._connection
 
@@ -139,9 +189,15 @@ class Receiver:
     def duplicates(self) -> List[str]:
         return self._duplicates
 
+    def quarantined(self) -> List[str]:
+        return self._quarantined
+
     def total_plot_size(self) -> int:
         return self._total_plot_size
 
+    def fingerprint(self) -> bytes32:
+        return plots_fingerprint((path, plot.plot_id) for path, plot in self._plots.items())
+
     async def _process(
         self, method: Callable[[T_PlotSyncMessage], Any], message_type: ProtocolMessageTypes, message: T_PlotSyncMessage
     ) -> None:
@@ -158,18 +214,19 @@ class Receiver:
                     )
                 )
 
-        try:
-            await method(message)
-            await send_response()
-        except InvalidIdentifierError as e:
-            log.warning(f"_process: node_id {self.connection().peer_node_id}, InvalidIdentifierError {e}")
-            await send_response(PlotSyncError(int16(e.error_code), f"{e}", e.expected_identifier))
-        except PlotSyncException as e:
-            log.warning(f"_process: node_id {self.connection().peer_node_id}, Error {e}")
-            await send_response(PlotSyncError(int16(e.error_code), f"{e}", None))
-        except Exception as e:
-            log.warning(f"_process: node_id {self.connection().peer_node_id}, Exception {e}")
-            await send_response(PlotSyncError(int16(ErrorCodes.unknown), f"{e}", None))
+        async with self._lock:
+            try:
+                await method(message)
+                await send_response()
+            except InvalidIdentifierError as e:
+                log.warning(f"_process: node_id {self.connection().peer_node_id}, InvalidIdentifierError {e}")
+                await send_response(PlotSyncError(int16(e.error_code), f"{e}", e.expected_identifier))
+            except PlotSyncException as e:
+                log.warning(f"_process: node_id {self.connection().peer_node_id}, Error {e}")
+                await send_response(PlotSyncError(int16(e.error_code), f"{e}", None))
+            except Exception as e:
+                log.warning(f"_process: node_id {self.connection().peer_node_id}, Exception {e}")
+                await send_response(PlotSyncError(int16(ErrorCodes.unknown), f"{e}", None))
 
     def _validate_identifier(self, identifier: PlotSyncIdentifier, start: bool = False) -> None:
         sync_id_match = identifier.sync_id == self._current_sync.sync_id
@@ -192,15 +249,33 @@ class Receiver:
             raise InvalidLastSyncIdError(data.last_sync_id, self._last_sync.sync_id)
         if data.last_sync_id == data.identifier.sync_id:
             raise SyncIdsMatchError(State.idle, data.last_sync_id)
-        self._current_sync.sync_id = data.identifier.sync_id
-        self._current_sync.delta.clear()
-        self._current_sync.state = State.loaded
-        self._current_sync.plots_total = data.plot_file_count
-        self._current_sync.bump_next_message_id()
+        self._start_sync(data.identifier.sync_id, data.plot_file_count)
 
     async def sync_started(self, data: PlotSyncStart) -> None:
         await self._process(self._sync_started, ProtocolMessageTypes.plot_sync_start, data)
 
+    async def _sync_resumed(self, data: PlotSyncResume) -> None:
+        self._validate_identifier(data.identifier, True)
+        # Resuming is only possible if the sender's last sync is the one we restored with `Receiver.restore`
+        if data.last_sync_id == 0 or data.last_sync_id != self._last_sync.sync_id:
+            raise InvalidLastSyncIdError(data.last_sync_id, self._last_sync.sync_id)
+        if data.last_sync_id == data.identifier.sync_id:
+            raise SyncIdsMatchError(State.idle, data.last_sync_id)
+        fingerprint = self.fingerprint()
+        if data.fingerprint != fingerprint:
+            raise FingerprintMismatchError(data.fingerprint, fingerprint)
+        self._start_sync(data.identifier.sync_id, data.plot_file_count)
+
+    async def sync_resumed(self, data: PlotSyncResume) -> None:
+        await self._process(self._sync_resumed, ProtocolMessageTypes.plot_sync_resume, data)
+
+    def _start_sync(self, sync_id: uint64, plot_file_count: uint32) -> None:
+        self._current_sync.sync_id = sync_id
+        self._current_sync.delta.clear()
+        self._current_sync.state = State.loaded
+        self._current_sync.plots_total = plot_file_count
+        self._current_sync.bump_next_message_id()
+
     async def _process_loaded(self, plot_infos: PlotSyncPlotList) -> None:
         self._validate_identifier(plot_infos.identifier)
 
@@ -230,6 +305,7 @@ class Receiver:
         delta: List[str],
         paths: PlotSyncPathList,
         is_removal: bool = False,
+        count_processed: bool = True,
     ) -> None:
         self._validate_identifier(paths.identifier)
 
@@ -239,7 +315,7 @@ class Receiver:
             if not is_removal and path in delta:
                 raise PlotAlreadyAvailableError(state, path)
             delta.append(path)
-            if not is_removal:
+            if not is_removal and count_processed:
                 self._current_sync.bump_plots_processed()
 
         # Let the callback receiver know about the sync progress updates
@@ -290,7 +366,7 @@ class Receiver:
     async def _process_duplicates(self, paths: PlotSyncPathList) -> None:
         await self.process_path_list(
             state=State.duplicates,
-            next_state=State.done,
+            next_state=State.quarantined,
             target=self._duplicates,
             delta=self._current_sync.delta.duplicates.additions,
             paths=paths,
@@ -299,6 +375,20 @@ class Receiver:
     async def process_duplicates(self, paths: PlotSyncPathList) -> None:
         await self._process(self._process_duplicates, ProtocolMessageTypes.plot_sync_duplicates, paths)
 
+    async def _process_quarantined(self, paths: PlotSyncPathList) -> None:
+        # Quarantined plots are valid plots which are already counted with the loaded ones
+        await self.process_path_list(
+            state=State.quarantined,
+            next_state=State.done,
+            target=self._quarantined,
+            delta=self._current_sync.delta.quarantined.additions,
+            paths=paths,
+            count_processed=False,
+        )
+
+    async def process_quarantined(self, paths: PlotSyncPathList) -> None:
+        await self._process(self._process_quarantined, ProtocolMessageTypes.plot_sync_quarantined, paths)
+
     async def _sync_done(self, data: PlotSyncDone) -> None:
         self._validate_identifier(data.identifier)
         self._current_sync.time_done = time.time()
@@ -313,6 +403,9 @@ class Receiver:
         delta_duplicates: PathListDelta = PathListDelta.from_lists(
             self._duplicates, self._current_sync.delta.duplicates.additions
         )
+        delta_quarantined: PathListDelta = PathListDelta.from_lists(
+            self._quarantined, self._current_sync.delta.quarantined.additions
+        )
         update = Delta(
             PlotListDelta(
                 self._current_sync.delta.valid.additions.copy(), self._current_sync.delta.valid.removals.copy()
@@ -320,6 +413,7 @@ class Receiver:
             delta_invalid,
             delta_keys_missing,
             delta_duplicates,
+            delta_quarantined,
         )
         # Apply delta
         self._plots.update(self._current_sync.delta.valid.additions)
@@ -328,6 +422,7 @@ class Receiver:
         self._invalid = self._current_sync.delta.invalid.additions.copy()
         self._keys_missing = self._current_sync.delta.keys_missing.additions.copy()
         self._duplicates = self._current_sync.delta.duplicates.additions.copy()
+        self._quarantined = self._current_sync.delta.quarantined.additions.copy()
         self._total_plot_size = sum(plot.file_size for plot in self._plots.values())
         # Save current sync as last sync and create a new current sync
         self._last_sync = self._current_sync
@@ -356,6 +451,7 @@ class Receiver:
             "failed_to_open_filenames": get_list_or_len(self._invalid, counts_only),
             "no_key_filenames": get_list_or_len(self._keys_missing, counts_only),
             "duplicates": get_list_or_len(self._duplicates, counts_only),
+            "quarantined_filenames": get_list_or_len(self._quarantined, counts_only),
             "total_plot_size": self._total_plot_size,
             "syncing": syncing,
             "last_sync_time": self._last_sync.time_done,
@@ -4,14 +4,15 @@ import asyncio
 import logging
 import time
 import traceback
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Generic, Iterable, List, Optional, Tuple, Type, TypeVar
+from typing import Any, Callable, Deque, Dict, Generic, Iterable, List, Optional, Tuple, Type, TypeVar
 
 from typing_extensions import Protocol
 
 from chia.plot_sync.exceptions import AlreadyStartedError, InvalidConnectionTypeError
-from chia.plot_sync.util import Constants
+from chia.plot_sync.util import Constants, plots_fingerprint
 from chia.plotting.manager import PlotManager
 from chia.plotting.util import PlotInfo
 from chia.protocols.harvester_protocol import (
@@ -21,11 +22,14 @@ from chia.protocols.harvester_protocol import (
     PlotSyncPathList,
     PlotSyncPlotList,
     PlotSyncResponse,
+    PlotSyncResume,
     PlotSyncStart,
 )
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.protocols.shared_protocol import Capability
 from chia.server.outbound_message import NodeType, make_msg
 from chia.server.ws_connection import WSChiaConnection
+from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.util.generator_tools import list_to_batches
 from chia.util.ints import int16, uint32, uint64
 
@@ -80,6 +84,7 @@ class ExpectedResponse:
     message_type: ProtocolMessageTypes
     identifier: PlotSyncIdentifier
     message: Optional[PlotSyncResponse] = None
+    time_sent: float = field(default_factory=time.time)
 
     def __str__(self) -> str:
         return (
@@ -97,9 +102,19 @@ class Sender:
     _last_sync_id: uint64
     _stop_requested = False
     _task: Optional[asyncio.Task[None]]
-    _response: Optional[ExpectedResponse]
-
-    def __init__(self, plot_manager: PlotManager) -> None:
+    _responses: Deque[ExpectedResponse]
+    _window_size: int
+    _synced_plots: Dict[str, bytes32]
+    _get_quarantined: Callable[[], List[str]]
+
+    def __init__(
+        self,
+        plot_manager: PlotManager,
+        window_size: int = 1,
+        get_quarantined: Optional[Callable[[], List[str]]] = None,
+    ) -> None:
+        if window_size < 1:
+            raise ValueError(f"Invalid window_size {window_size}, must be at least 1")
         self._plot_manager = plot_manager
         self._connection = None
         self._sync_id = uint64(0)
@@ -108,18 +123,28 @@ class Sender:
         self._last_sync_id = uint64(0)
         self._stop_requested = False
         self._task = None
-        self._response = None
+        self._responses = deque()
+        self._window_size = window_size
+        self._synced_plots = {}
+        self._get_quarantined = get_quarantined if get_quarantined is not None else list
 
     def __str__(self) -> str:
-        return f"sync_id {self._sync_id}, next_message_id {self._next_message_id}, messages {len(self._messages)}"
+        return (
+            f"sync_id {self._sync_id}, next_message_id {self._next_message_id}, messages {len(self._messages)}, "
+            f"in_flight {len(self._responses)}/{self._window_size}"
+        )
 
     async def start(self) -> None:
         if self._task is not None and self._stop_requested:
-            await self.await_closed()
+            await self.await_closed(keep_last_sync=True)
         if self._task is None:
             self._task = asyncio.create_task(self._run())
             # TODO, Add typing in PlotManager
-            if not self._plot_manager.initial_refresh() or self._sync_id != 0:  # type:ignore[no-untyped-call]
+            if self._plot_manager.initial_refresh() and self._sync_id == 0:  # type:ignore[no-untyped-call]
+                # The initial refresh is still running and will sync all plots, so there is nothing to resume.
+                self._last_sync_id = uint64(0)
+                self._synced_plots.clear()
+            elif not self._resume():
                 self._reset()
         else:
             raise AlreadyStartedError()
@@ -127,11 +152,15 @@ class Sender:
     def stop(self) -> None:
         self._stop_requested = True
 
-    async def await_closed(self) -> None:
+    async def await_closed(self, keep_last_sync: bool = False) -> None:
         if self._task is not None:
             await self._task
         self._task = None
-        self._reset()
+        if keep_last_sync:
+            # Keep `_last_sync_id` and `_synced_plots` so that we can resume the sync after a reconnect.
+            self._clear_sync()
+        else:
+            self._reset()
         self._stop_requested = False
 
     def set_connection(self, connection: WSChiaConnection) -> None:
@@ -143,12 +172,17 @@ class Sender:
     def bump_next_message_id(self) -> None:
         self._next_message_id = uint64(self._next_message_id + 1)
 
-    def _reset(self) -> None:
-        log.debug(f"_reset {self}")
-        self._last_sync_id = uint64(0)
+    def _clear_sync(self) -> None:
         self._sync_id = uint64(0)
         self._next_message_id = uint64(0)
         self._messages.clear()
+        self._responses.clear()
+
+    def _reset(self) -> None:
+        log.debug(f"_reset {self}")
+        self._last_sync_id = uint64(0)
+        self._synced_plots.clear()
+        self._clear_sync()
         if self._task is not None:
             self.sync_start(self._plot_manager.plot_count(), True)
             for remaining, batch in list_to_batches(
@@ -157,38 +191,47 @@ class Sender:
                 self.process_batch(batch, remaining)
             self.sync_done([], 0)
 
-    async def _wait_for_response(self) -> bool:
-        start = time.time()
-        assert self._response is not None
-        while time.time() - start < Constants.message_timeout and self._response.message is None:
+    async def _wait_for_response(self, response: ExpectedResponse) -> bool:
+        while time.time() - response.time_sent < Constants.message_timeout and response.message is None:
             await asyncio.sleep(0.1)
-        return self._response.message is not None
+        return response.message is not None
 
     def set_response(self, response: PlotSyncResponse) -> bool:
-        if self._response is None or self._response.message is not None:
+        if len(self._responses) == 0:
             log.warning(f"set_response skip unexpected response: {response}")
             return False
         if time.time() - float(response.identifier.timestamp) > Constants.message_timeout:
             log.warning(f"set_response skip expired response: {response}")
             return False
-        if response.identifier.sync_id != self._response.identifier.sync_id:
+        # All messages in flight belong to the same sync so it's enough to check the first one here
+        if response.identifier.sync_id != self._responses[0].identifier.sync_id:
             log.warning(
-                "set_response unexpected sync-id: " f"{response.identifier.sync_id}/{self._response.identifier.sync_id}"
+                "set_response unexpected sync-id: "
+                f"{response.identifier.sync_id}/{self._responses[0].identifier.sync_id}"
             )
             return False
-        if response.identifier.message_id != self._response.identifier.message_id:
+        expected_response: Optional[ExpectedResponse] = None
+        for in_flight in self._responses:
+            if in_flight.identifier.message_id == response.identifier.message_id:
+                expected_response = in_flight
+                break
+        if expected_response is None:
             log.warning(
                 "set_response unexpected message-id: "
-                f"{response.identifier.message_id}/{self._response.identifier.message_id}"
+                f"{response.identifier.message_id}/{[r.identifier.message_id for r in self._responses]}"
             )
             return False
-        if response.message_type != int16(self._response.message_type.value):
+        if expected_response.message is not None:
+            log.warning(f"set_response skip unexpected response: {response}")
+            return False
+        if response.message_type != int16(expected_response.message_type.value):
             log.warning(
-                "set_response unexpected message-type: " f"{response.message_type}/{self._response.message_type.value}"
+                "set_response unexpected message-type: "
+                f"{response.message_type}/{expected_response.message_type.value}"
             )
             return False
         log.debug(f"set_response valid {response}")
-        self._response.message = response
+        expected_response.message = response
         return True
 
     def _add_message(self, message_type: ProtocolMessageTypes, payload_type: Any, *args: Any) -> None:
@@ -196,55 +239,74 @@ class Sender:
         message_id = uint64(len(self._messages))
         self._messages.append(MessageGenerator(self._sync_id, message_type, message_id, payload_type, args))
 
-    async def _send_next_message(self) -> bool:
-        def failed(message: str) -> bool:
-            # By forcing a reset we try to get back into a normal state if some not recoverable failure came up.
-            log.warning(message)
-            self._reset()
-            return False
+    def _failed(self, message: str) -> bool:
+        # By forcing a reset we try to get back into a normal state if some not recoverable failure came up.
+        log.warning(message)
+        self._reset()
+        return False
+
+    def _window_available(self) -> bool:
+        return len(self._responses) < self._window_size and self._next_message_id < len(self._messages)
+
+    async def _rewind(self, message_id: uint64) -> None:
+        """
+        Restart sending at `message_id`. Before the messages get resent we wait until all other messages in flight
+        were either answered or timed out, so that their (error) responses can't be mixed up with the responses to
+        the resent messages.
+        """
+        log.debug(f"_rewind {self}: message_id {message_id}")
+        for response in list(self._responses)[1:]:
+            await self._wait_for_response(response)
+        self._responses.clear()
+        self._next_message_id = message_id
 
-        assert len(self._messages) >= self._next_message_id
+    async def _send_next_message(self) -> bool:
+        assert len(self._messages) > self._next_message_id
         message_generator = self._messages[self._next_message_id]
         identifier, payload = message_generator.generate()
         if self._sync_id == 0 or identifier.sync_id != self._sync_id or identifier.message_id != self._next_message_id:
-            return failed(f"Invalid message generator {message_generator} for {self}")
+            return self._failed(f"Invalid message generator {message_generator} for {self}")
 
-        self._response = ExpectedResponse(message_generator.message_type, identifier)
+        self._responses.append(ExpectedResponse(message_generator.message_type, identifier))
         log.debug(f"_send_next_message send {message_generator.message_type.name}: {payload}")
         if self._connection is None or not await self._connection.send_message(
             make_msg(message_generator.message_type, payload)
         ):
-            return failed(f"Send failed {self._connection}")
-        if not await self._wait_for_response():
-            log.info(f"_send_next_message didn't receive response {self._response}")
+            return self._failed(f"Send failed {self._connection}")
+        self.bump_next_message_id()
+        return True
+
+    async def _process_next_response(self) -> bool:
+        assert len(self._responses) > 0
+        response = self._responses[0]
+        if not await self._wait_for_response(response):
+            log.info(f"_process_next_response didn't receive response {response}")
+            await self._rewind(response.identifier.message_id)
             return False
 
-        assert self._response.message is not None
-        if self._response.message.error is not None:
+        assert response.message is not None
+        if response.message.error is not None:
             recovered = False
-            expected = self._response.message.error.expected_identifier
+            expected = response.message.error.expected_identifier
             # If we have a recoverable error there is a `expected_identifier` included
             if expected is not None:
-                # If the receiver has a zero sync/message id and we already sent all messages from the current event
-                # we most likely missed the response to the done message. We can finalize the sync and move on here.
-                all_sent = (
-                    self._messages[-1].message_type == ProtocolMessageTypes.plot_sync_done
-                    and self._next_message_id == len(self._messages) - 1
-                )
+                # If the receiver has a zero sync/message id and the failed message is the done message (which is
+                # always the last one) we most likely missed the response to the done message. We can finalize the
+                # sync and move on here.
+                all_sent = response.message_type == ProtocolMessageTypes.plot_sync_done
                 if expected.sync_id == expected.message_id == 0 and all_sent:
                     self._finalize_sync()
                     recovered = True
                 elif self._sync_id == expected.sync_id and expected.message_id < len(self._messages):
-                    self._next_message_id = expected.message_id
+                    await self._rewind(expected.message_id)
                     recovered = True
             if not recovered:
-                return failed(f"Not recoverable error {self._response.message}")
+                return self._failed(f"Not recoverable error {response.message}")
             return True
 
-        if self._response.message_type == ProtocolMessageTypes.plot_sync_done:
+        self._responses.popleft()
+        if response.message_type == ProtocolMessageTypes.plot_sync_done:
             self._finalize_sync()
-        else:
-            self.bump_next_message_id()
 
         return True
 
@@ -255,6 +317,51 @@ class Sender:
         for remaining, batch in list_to_batches(data, self._plot_manager.refresh_parameter.batch_size):
             self._add_message(message_type, payload_type, batch, remaining == 0)
 
+    def _resume(self) -> bool:
+        """
+        Queues a sync which only contains the changes since the last completed sync instead of all plots. The receiver
+        only accepts it if it still has the state of our last sync with a matching fingerprint, otherwise it responds
+        with an error which makes us fall back to a full sync via `_reset`.
+        """
+        if self._last_sync_id == 0 or self.sync_active():
+            return False
+        if self._connection is None or not self._connection.has_capability(Capability.PLOT_SYNC_RESUME):
+            return False
+        current: Dict[str, PlotInfo] = {
+            plot_info.prover.get_filename(): plot_info for plot_info in self._plot_manager.plots.values()
+        }
+        loaded: List[PlotInfo] = [plot_info for path, plot_info in current.items() if path not in self._synced_plots]
+        removed: List[Path] = []
+        for path, plot_id in self._synced_plots.items():
+            if path not in current:
+                removed.append(Path(path))
+            elif current[path].prover.get_id() != plot_id:
+                # The plot was replaced, that's not possible to sync within one sync cycle, do a full sync instead.
+                return False
+        log.info(f"_resume {self}: last_sync_id {self._last_sync_id}, loaded {len(loaded)}, removed {len(removed)}")
+        self._sync_id = self._next_sync_id()
+        self._add_message(
+            ProtocolMessageTypes.plot_sync_resume,
+            PlotSyncResume,
+            self._last_sync_id,
+            uint32(len(loaded)),
+            plots_fingerprint(self._synced_plots.items()),
+        )
+        if len(loaded) == 0:
+            self.process_batch([], 0)
+        for remaining, batch in list_to_batches(loaded, self._plot_manager.refresh_parameter.batch_size):
+            self.process_batch(batch, remaining)
+        self.sync_done(removed, 0)
+        return True
+
+    def _next_sync_id(self) -> uint64:
+        sync_id = int(time.time())
+        # Make sure we have unique sync-id's even if we restart refreshing within a second (i.e. in tests)
+        if sync_id == self._last_sync_id:
+            sync_id = sync_id + 1
+        log.debug(f"_next_sync_id {sync_id}")
+        return uint64(sync_id)
+
     def sync_start(self, count: float, initial: bool) -> None:
         log.debug(f"sync_start {self}: count {count}, initial {initial}")
         while self.sync_active():
@@ -262,12 +369,7 @@ class Sender:
                 log.debug("sync_start aborted")
                 return
             time.sleep(0.1)
-        sync_id = int(time.time())
-        # Make sure we have unique sync-id's even if we restart refreshing within a second (i.e. in tests)
-        if sync_id == self._last_sync_id:
-            sync_id = sync_id + 1
-        log.debug(f"sync_start {sync_id}")
-        self._sync_id = uint64(sync_id)
+        self._sync_id = self._next_sync_id()
         self._add_message(
             ProtocolMessageTypes.plot_sync_start, PlotSyncStart, initial, self._last_sync_id, uint32(int(count))
         )
@@ -292,14 +394,33 @@ class Sender:
         self._add_list_batched(ProtocolMessageTypes.plot_sync_keys_missing, PlotSyncPathList, no_key_list)
         duplicates_list = self._plot_manager.get_duplicates().copy()
         self._add_list_batched(ProtocolMessageTypes.plot_sync_duplicates, PlotSyncPathList, duplicates_list)
+        # Farmers without the capability don't know the quarantined message
+        if self._connection is not None and self._connection.has_capability(Capability.PLOT_SYNC_QUARANTINE):
+            quarantined_list = self._get_quarantined()
+            self._add_list_batched(ProtocolMessageTypes.plot_sync_quarantined, PlotSyncPathList, quarantined_list)
         self._add_message(ProtocolMessageTypes.plot_sync_done, PlotSyncDone, uint64(int(duration)))
 
+    def _update_synced_plots(self) -> None:
+        # Apply the messages of the finished sync the same way the receiver does to know its plots after the sync.
+        for message in self._messages:
+            args: List[Any] = list(message.args)
+            if message.message_type == ProtocolMessageTypes.plot_sync_start and args[0]:
+                self._synced_plots.clear()
+            elif message.message_type == ProtocolMessageTypes.plot_sync_loaded:
+                for plot in args[0]:
+                    self._synced_plots[plot.filename] = plot.plot_id
+            elif message.message_type == ProtocolMessageTypes.plot_sync_removed:
+                for path in args[0]:
+                    self._synced_plots.pop(path, None)
+
     def _finalize_sync(self) -> None:
         log.debug(f"_finalize_sync {self}")
         assert self._sync_id != 0
+        self._update_synced_plots()
         self._last_sync_id = self._sync_id
         self._next_message_id = uint64(0)
         self._messages.clear()
+        self._responses.clear()
         # Do this at the end since `_sync_id` is used as sync active indicator.
         self._sync_id = uint64(0)
 
@@ -312,7 +433,8 @@ class Sender:
     async def _run(self) -> None:
         """
         This is the sender task responsible to send new messages during sync as they come into Sender._messages
-        triggered by the plot manager callback.
+        triggered by the plot manager callback. Up to `_window_size` messages are sent without waiting for their
+        responses, the responses are then processed in the order the messages were sent.
         """
         while not self._stop_requested:
             try:
@@ -321,10 +443,14 @@ class Sender:
                         return
                     await asyncio.sleep(0.1)
                 while not self._stop_requested and self.sync_active():
-                    if self._next_message_id >= len(self._messages):
+                    if self._window_available():
+                        if not await self._send_next_message():
+                            await asyncio.sleep(Constants.message_timeout)
+                        continue
+                    if len(self._responses) == 0:
                         await asyncio.sleep(0.1)
                         continue
-                    if not await self._send_next_message():
+                    if not await self._process_next_response():
                         await asyncio.sleep(Constants.message_timeout)
             except Exception as e:
                 log.error(f"Exception: {e} {traceback.format_exc()}")
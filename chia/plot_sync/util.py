@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 from enum import IntEnum
-from typing import TypeVar
+from typing import Iterable, Tuple, TypeVar
 
 from typing_extensions import Protocol
 
 from chia.protocols.harvester_protocol import PlotSyncIdentifier
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.hash import std_hash
 
 
 class Constants:
@@ -19,7 +21,8 @@ class State(IntEnum):
     invalid = 3
     keys_missing = 4
     duplicates = 5
-    done = 6
+    quarantined = 6
+    done = 7
 
 
 class ErrorCodes(IntEnum):
@@ -32,6 +35,7 @@ class ErrorCodes(IntEnum):
     plot_already_available = 5
     plot_not_available = 6
     sync_ids_match = 7
+    fingerprint_mismatch = 8
 
 
 class PlotSyncMessage(Protocol):
@@ -41,3 +45,14 @@ class PlotSyncMessage(Protocol):
 
 
 T_PlotSyncMessage = TypeVar("T_PlotSyncMessage", bound=PlotSyncMessage)
+
+
+def plots_fingerprint(plots: Iterable[Tuple[str, bytes32]]) -> bytes32:
+    """
+    Returns an order independent fingerprint of the given (path, plot id) pairs. It's used to make sure harvester and
+    farmer have the same plots before they resume the plot sync after a reconnect.
+    """
+    fingerprint = 0
+    for path, plot_id in plots:
+        fingerprint ^= int.from_bytes(std_hash(plot_id + path.encode()), "big")
+    return bytes32(fingerprint.to_bytes(32, "big"))
@@ -326,6 +326,7 @@ class PlotManager:
                     cache_entry.plot_public_key,
                     stat_info.st_size,
                     stat_info.st_mtime,
+                    stat_info.st_dev,
                 )
 
                 cache_entry.bump_last_use()
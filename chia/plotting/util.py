@@ -34,6 +34,8 @@ class PlotInfo:
     plot_public_key: G1Element
     file_size: int
     time_modified: float
+    # The id of the device which contains the plot file, used to group lookup statistics by disk
+    device: int = 0
 
 
 class PlotRefreshEvents(Enum):
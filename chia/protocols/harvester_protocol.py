@@ -122,6 +122,21 @@ class PlotSyncStart(Streamable):
         )
 
 
+@streamable
+@dataclass(frozen=True)
+class PlotSyncResume(Streamable):
+    identifier: PlotSyncIdentifier
+    last_sync_id: uint64
+    plot_file_count: uint32
+    fingerprint: bytes32
+
+    def __str__(self) -> str:
+        return (
+            f"PlotSyncResume: identifier {self.identifier}, last_sync_id {self.last_sync_id}, "
+            f"plot_file_count {self.plot_file_count}, fingerprint {self.fingerprint}"
+        )
+
+
 @streamable
 @dataclass(frozen=True)
 class PlotSyncPathList(Streamable):
@@ -113,3 +113,12 @@ class ProtocolMessageTypes(Enum):
     respond_block_headers = 88
     request_fee_estimates = 89
     respond_fee_estimates = 90
+
+    # More harvester protocol
+    plot_sync_resume = 92
+    plot_sync_quarantined = 93
+
+    # Transport only, wraps the compressed data of another message
+    compressed_message = 94
+    # Transport only, carries a part of another message
+    message_chunk = 95
@@ -7,7 +7,7 @@ from typing import List, Tuple
 from chia.util.ints import uint8, uint16
 from chia.util.streamable import Streamable, streamable
 
-protocol_version = "0.0.34"
+protocol_version = "0.0.36"
 
 """
 Handshake when establishing a connection between two servers.
@@ -30,6 +30,18 @@ class Capability(IntEnum):
     # a node can handle a None response and not wait the full timeout
     NONE_RESPONSE = 4
 
+    # the farmer can resume the plot sync of a reconnecting harvester based on a fingerprint of the last synced plots
+    PLOT_SYNC_RESUME = 5
+
+    # the harvester reports plots with slow lookups during the plot sync
+    PLOT_SYNC_QUARANTINE = 6
+
+    # large messages can be sent zstd compressed, see `chia.server.message_compression`
+    COMPRESSION = 7
+
+    # large bulk messages can be sent in chunks, see `chia.server.message_chunking`
+    CHUNKED_MESSAGES = 8
+
 
 @streamable
 @dataclass(frozen=True)
@@ -48,4 +60,8 @@ capabilities = [
     (uint16(Capability.BLOCK_HEADERS.value), "1"),
     (uint16(Capability.RATE_LIMITS_V2.value), "1"),
     (uint16(Capability.NONE_RESPONSE.value), "1"),
+    (uint16(Capability.PLOT_SYNC_RESUME.value), "1"),
+    (uint16(Capability.PLOT_SYNC_QUARANTINE.value), "1"),
+    (uint16(Capability.COMPRESSION.value), "1"),
+    (uint16(Capability.CHUNKED_MESSAGES.value), "1"),
 ]
@@ -88,6 +88,7 @@ class FarmerRpcApi:
         return {
             "/get_signage_point": self.get_signage_point,
             "/get_signage_points": self.get_signage_points,
+            "/get_cache_info": self.get_cache_info,
             "/get_reward_targets": self.get_reward_targets,
             "/set_reward_targets": self.set_reward_targets,
             "/get_pool_state": self.get_pool_state,
@@ -98,6 +99,7 @@ class FarmerRpcApi:
             "/get_harvester_plots_invalid": self.get_harvester_plots_invalid,
             "/get_harvester_plots_keys_missing": self.get_harvester_plots_keys_missing,
             "/get_harvester_plots_duplicates": self.get_harvester_plots_duplicates,
+            "/get_harvester_plots_quarantined": self.get_harvester_plots_quarantined,
             "/get_pool_login_link": self.get_pool_login_link,
         }
 
@@ -167,44 +169,44 @@ class FarmerRpcApi:
         return payloads
 
     async def get_signage_point(self, request: Dict) -> EndpointResult:
-        sp_hash = hexstr_to_bytes(request["sp_hash"])
-        for _, sps in self.service.sps.items():
-            for sp in sps:
-                if sp.challenge_chain_sp == sp_hash:
-                    pospaces = self.service.proofs_of_space.get(sp.challenge_chain_sp, [])
-                    return {
-                        "signage_point": {
-                            "challenge_hash": sp.challenge_hash,
-                            "challenge_chain_sp": sp.challenge_chain_sp,
-                            "reward_chain_sp": sp.reward_chain_sp,
-                            "difficulty": sp.difficulty,
-                            "sub_slot_iters": sp.sub_slot_iters,
-                            "signage_point_index": sp.signage_point_index,
-                        },
-                        "proofs": pospaces,
-                    }
-        raise ValueError(f"Signage point {sp_hash.hex()} not found")
+        sp_hash = bytes32.from_hexstr(request["sp_hash"])
+        sps = self.service.cache.get_signage_points(sp_hash)
+        if sps is None:
+            raise ValueError(f"Signage point {sp_hash.hex()} not found")
+        sp = sps[0]
+        return {
+            "signage_point": {
+                "challenge_hash": sp.challenge_hash,
+                "challenge_chain_sp": sp.challenge_chain_sp,
+                "reward_chain_sp": sp.reward_chain_sp,
+                "difficulty": sp.difficulty,
+                "sub_slot_iters": sp.sub_slot_iters,
+                "signage_point_index": sp.signage_point_index,
+            },
+            "proofs": self.service.cache.get_proofs(sp_hash),
+        }
 
     async def get_signage_points(self, _: Dict) -> EndpointResult:
         result: List[Dict[str, Any]] = []
-        for sps in self.service.sps.values():
-            for sp in sps:
-                pospaces = self.service.proofs_of_space.get(sp.challenge_chain_sp, [])
-                result.append(
-                    {
-                        "signage_point": {
-                            "challenge_hash": sp.challenge_hash,
-                            "challenge_chain_sp": sp.challenge_chain_sp,
-                            "reward_chain_sp": sp.reward_chain_sp,
-                            "difficulty": sp.difficulty,
-                            "sub_slot_iters": sp.sub_slot_iters,
-                            "signage_point_index": sp.signage_point_index,
-                        },
-                        "proofs": pospaces,
-                    }
-                )
+        for sp in self.service.cache.get_all_signage_points():
+            result.append(
+                {
+                    "signage_point": {
+                        "challenge_hash": sp.challenge_hash,
+                        "challenge_chain_sp": sp.challenge_chain_sp,
+                        "reward_chain_sp": sp.reward_chain_sp,
+                        "difficulty": sp.difficulty,
+                        "sub_slot_iters": sp.sub_slot_iters,
+                        "signage_point_index": sp.signage_point_index,
+                    },
+                    "proofs": self.service.cache.get_proofs(sp.challenge_chain_sp),
+                }
+            )
         return {"signage_points": result}
 
+    async def get_cache_info(self, _: Dict) -> EndpointResult:
+        return {"cache_info": self.service.cache.to_dict()}
+
     async def get_reward_targets(self, request: Dict) -> EndpointResult:
         search_for_private_key = request["search_for_private_key"]
         max_ph_to_search = request.get("max_ph_to_search", 500)
@@ -234,6 +236,9 @@ class FarmerRpcApi:
             pool_state = pool_dict.copy()
             pool_state["p2_singleton_puzzle_hash"] = p2_singleton_puzzle_hash.hex()
             pool_state["plot_count"] = self.get_pool_contract_puzzle_hash_plot_count(p2_singleton_puzzle_hash)
+            pool_state["partial_submission"] = self.service.get_partial_submission_metrics(
+                pool_dict["pool_config"].pool_url
+            )
             pools_list.append(pool_state)
         return {"pool_state": pools_list}
 
@@ -285,6 +290,9 @@ class FarmerRpcApi:
     async def get_harvester_plots_duplicates(self, request_dict: Dict[str, object]) -> EndpointResult:
         return self.paginated_plot_path_request(Receiver.duplicates, request_dict)
 
+    async def get_harvester_plots_quarantined(self, request_dict: Dict[str, object]) -> EndpointResult:
+        return self.paginated_plot_path_request(Receiver.quarantined, request_dict)
+
     async def get_pool_login_link(self, request: Dict) -> EndpointResult:
         launcher_id: bytes32 = bytes32(hexstr_to_bytes(request["launcher_id"]))
         login_link: Optional[str] = await self.service.generate_login_link(launcher_id)
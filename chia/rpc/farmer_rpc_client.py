@@ -26,6 +26,9 @@ class FarmerRpcClient(RpcClient):
     async def get_signage_points(self) -> List[Dict]:
         return (await self.fetch("get_signage_points", {}))["signage_points"]
 
+    async def get_cache_info(self) -> Dict[str, Any]:
+        return (await self.fetch("get_cache_info", {}))["cache_info"]
+
     async def get_reward_targets(self, search_for_private_key: bool, max_ph_to_search: int = 500) -> Dict:
         response = await self.fetch(
             "get_reward_targets",
@@ -74,6 +77,9 @@ class FarmerRpcClient(RpcClient):
     async def get_harvester_plots_duplicates(self, request: PlotPathRequestData) -> Dict[str, Any]:
         return await self.fetch("get_harvester_plots_duplicates", dataclass_to_json_dict(request))
 
+    async def get_harvester_plots_quarantined(self, request: PlotPathRequestData) -> Dict[str, Any]:
+        return await self.fetch("get_harvester_plots_quarantined", dataclass_to_json_dict(request))
+
     async def get_pool_login_link(self, launcher_id: bytes32) -> Optional[str]:
         try:
             return (await self.fetch("get_pool_login_link", {"launcher_id": launcher_id.hex()}))["login_link"]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 from clvm.casts import int_from_bytes
 
@@ -25,14 +25,14 @@ from chia.types.spend_bundle import SpendBundle
 from chia.types.unfinished_header_block import UnfinishedHeaderBlock
 from chia.util.byte_types import hexstr_to_bytes
 from chia.util.ints import uint32, uint64, uint128
+from chia.util.json_util import JSONStreamable
 from chia.util.log_exceptions import log_exceptions
 from chia.util.ws_message import WsRpcMessage, create_payload_dict
 from chia.wallet.puzzles.decompress_block_spends import DECOMPRESS_BLOCK_SPENDS
 
 
-def coin_record_dict_backwards_compat(coin_record: Dict[str, Any]):
-    coin_record["spent"] = coin_record["spent_block_index"] > 0
-    return coin_record
+def coin_record_json_backwards_compat(coin_record: CoinRecord) -> JSONStreamable:
+    return JSONStreamable(coin_record, {"spent": coin_record.spent_block_index > 0})
 
 
 class FullNodeRpcApi:
@@ -60,6 +60,7 @@ class FullNodeRpcApi:
             "/get_initial_freeze_period": self.get_initial_freeze_period,
             "/get_network_info": self.get_network_info,
             "/get_recent_signage_point_or_eos": self.get_recent_signage_point_or_eos,
+            "/get_request_budget": self.get_request_budget,
             # Coins
             "/get_coin_records_by_puzzle_hash": self.get_coin_records_by_puzzle_hash,
             "/get_coin_records_by_puzzle_hashes": self.get_coin_records_by_puzzle_hashes,
@@ -234,6 +235,9 @@ class FullNodeRpcApi:
         address_prefix = self.service.config["network_overrides"]["config"][network_name]["address_prefix"]
         return {"network_name": network_name, "network_prefix": address_prefix}
 
+    async def get_request_budget(self, request: Dict) -> EndpointResult:
+        return {"request_budget": self.service.server.request_budget.to_dict()}
+
     async def get_recent_signage_point_or_eos(self, request: Dict) -> EndpointResult:
         if "sp_hash" not in request:
             challenge_hash: bytes32 = bytes32.from_hexstr(request["challenge_hash"])
@@ -354,16 +358,16 @@ class FullNodeRpcApi:
         for a in range(start, end):
             block_range.append(uint32(a))
         blocks: List[FullBlock] = await self.service.block_store.get_full_blocks_at(block_range)
-        json_blocks = []
+        json_blocks: List[Union[FullBlock, JSONStreamable]] = []
         for block in blocks:
             hh: bytes32 = block.header_hash
             if exclude_reorged and self.service.blockchain.height_to_hash(block.height) != hh:
                 # Don't include forked (reorged) blocks
                 continue
-            json = block.to_json_dict()
-            if not exclude_hh:
-                json["header_hash"] = hh.hex()
-            json_blocks.append(json)
+            if exclude_hh:
+                json_blocks.append(block)
+            else:
+                json_blocks.append(JSONStreamable(block, {"header_hash": hh.hex()}))
         return {"blocks": json_blocks}
 
     async def get_block_count_metrics(self, request: Dict) -> EndpointResult:
@@ -553,7 +557,7 @@ class FullNodeRpcApi:
 
         coin_records = await self.service.blockchain.coin_store.get_coin_records_by_puzzle_hash(**kwargs)
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        return {"coin_records": [coin_record_json_backwards_compat(cr) for cr in coin_records]}
 
     async def get_coin_records_by_puzzle_hashes(self, request: Dict) -> EndpointResult:
         """
@@ -575,7 +579,7 @@ class FullNodeRpcApi:
 
         coin_records = await self.service.blockchain.coin_store.get_coin_records_by_puzzle_hashes(**kwargs)
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        return {"coin_records": [coin_record_json_backwards_compat(cr) for cr in coin_records]}
 
     async def get_coin_record_by_name(self, request: Dict) -> EndpointResult:
         """
@@ -589,7 +593,7 @@ class FullNodeRpcApi:
         if coin_record is None:
             raise ValueError(f"Coin record 0x{name.hex()} not found")
 
-        return {"coin_record": coin_record_dict_backwards_compat(coin_record.to_json_dict())}
+        return {"coin_record": coin_record_json_backwards_compat(coin_record)}
 
     async def get_coin_records_by_names(self, request: Dict) -> EndpointResult:
         """
@@ -611,7 +615,7 @@ class FullNodeRpcApi:
 
         coin_records = await self.service.blockchain.coin_store.get_coin_records_by_names(**kwargs)
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        return {"coin_records": [coin_record_json_backwards_compat(cr) for cr in coin_records]}
 
     async def get_coin_records_by_parent_ids(self, request: Dict) -> EndpointResult:
         """
@@ -633,7 +637,7 @@ class FullNodeRpcApi:
 
         coin_records = await self.service.blockchain.coin_store.get_coin_records_by_parent_ids(**kwargs)
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        return {"coin_records": [coin_record_json_backwards_compat(cr) for cr in coin_records]}
 
     async def get_coin_records_by_hint(self, request: Dict) -> EndpointResult:
         """
@@ -662,7 +666,7 @@ class FullNodeRpcApi:
 
         coin_records = await self.service.blockchain.coin_store.get_coin_records_by_names(**kwargs)
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        return {"coin_records": [coin_record_json_backwards_compat(cr) for cr in coin_records]}
 
     async def push_tx(self, request: Dict) -> EndpointResult:
         if "spend_bundle" not in request:
@@ -730,8 +734,8 @@ class FullNodeRpcApi:
             removals: List[CoinRecord] = await self.service.coin_store.get_coins_removed_at_height(block.height)
 
         return {
-            "additions": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in additions],
-            "removals": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in removals],
+            "additions": [coin_record_json_backwards_compat(cr) for cr in additions],
+            "removals": [coin_record_json_backwards_compat(cr) for cr in removals],
         }
 
     async def get_all_mempool_tx_ids(self, request: Dict) -> EndpointResult:
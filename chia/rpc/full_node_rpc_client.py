@@ -242,6 +242,10 @@ class FullNodeRpcClient(RpcClient):
         except Exception:
             return None
 
+    async def get_request_budget(self) -> Dict[str, Any]:
+        response = await self.fetch("get_request_budget", {})
+        return response["request_budget"]
+
     async def get_recent_signage_point_or_eos(
         self, sp_hash: Optional[bytes32], challenge_hash: Optional[bytes32]
     ) -> Optional[Any]:
@@ -20,6 +20,7 @@ class HarvesterRpcApi:
             "/add_plot_directory": self.add_plot_directory,
             "/get_plot_directories": self.get_plot_directories,
             "/remove_plot_directory": self.remove_plot_directory,
+            "/get_lookup_statistics": self.get_lookup_statistics,
         }
 
     async def _state_changed(self, change: str, change_data: Dict[str, Any] = None) -> List[WsRpcMessage]:
@@ -71,3 +72,6 @@ class HarvesterRpcApi:
         if await self.service.remove_plot_directory(directory_name):
             return {}
         raise ValueError(f"Did not remove plot directory {directory_name}")
+
+    async def get_lookup_statistics(self, request: Dict) -> EndpointResult:
+        return self.service.lookup_statistics.to_dict()
@@ -82,6 +82,10 @@ class RpcClient:
     async def healthz(self) -> Dict:
         return await self.fetch("healthz", {})
 
+    async def get_db_statistics(self, reset: bool = False) -> List[Dict[str, Any]]:
+        response = await self.fetch("get_db_statistics", {"reset": reset})
+        return response["databases"]
+
     def close(self) -> None:
         self.closing_task = asyncio.create_task(self.session.close())
 
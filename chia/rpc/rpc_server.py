@@ -19,6 +19,7 @@ from chia.server.ws_connection import WSChiaConnection
 from chia.types.peer_info import PeerInfo
 from chia.util.byte_types import hexstr_to_bytes
 from chia.util.config import str2bool
+from chia.util.db_statistics import all_statistics
 from chia.util.ints import uint16
 from chia.util.json_util import dict_to_json_str
 from chia.util.network import WebServer
@@ -127,6 +128,9 @@ def default_get_connections(server: ChiaServer, request_node_type: Optional[Node
             "creation_time": con.creation_time,
             "bytes_read": con.bytes_read,
             "bytes_written": con.bytes_written,
+            "outgoing_queue_size": con.outgoing_queue.qsize(),
+            "outgoing_queue": con.outgoing_queue.to_dict(),
+            "broadcast_messages_dropped": con.broadcast_messages_dropped,
             "last_message_time": con.last_message_time,
         }
         for con in connections
@@ -244,6 +248,7 @@ class RpcServer:
             "/stop_node": self.stop_node,
             "/get_routes": self._get_routes,
             "/healthz": self.healthz,
+            "/get_db_statistics": self.get_db_statistics,
         }
 
     async def _get_routes(self, request: Dict[str, Any]) -> EndpointResult:
@@ -292,6 +297,18 @@ class RpcServer:
             self.stop_cb()
         return {}
 
+    async def get_db_statistics(self, request: Dict[str, Any]) -> EndpointResult:
+        """
+        Returns the statement latencies and the lock and connection waits of the databases of this process, and
+        starts over collecting them if `reset` is set.
+        """
+        statistics = sorted(all_statistics, key=lambda db_statistics: db_statistics.name or "")
+        databases = [db_statistics.to_json_dict() for db_statistics in statistics]
+        if request.get("reset", False):
+            for db_statistics in statistics:
+                db_statistics.reset()
+        return {"databases": databases}
+
     async def healthz(self, request: Dict[str, Any]) -> EndpointResult:
         return {
             "success": True,
@@ -31,6 +31,7 @@ from chia.util.byte_types import hexstr_to_bytes
 from chia.util.config import load_config
 from chia.util.errors import KeychainIsLocked
 from chia.util.ints import uint8, uint16, uint32, uint64
+from chia.util.json_util import JSONStreamable
 from chia.util.keychain import bytes_to_mnemonic, generate_mnemonic
 from chia.util.path import path_from_root
 from chia.util.ws_message import WsRpcMessage, create_payload_dict
@@ -850,11 +851,9 @@ class WalletRpcApi:
         transactions = await self.service.wallet_state_manager.tx_store.get_transactions_between(
             wallet_id, start, end, sort_key=sort_key, reverse=reverse, to_puzzle_hash=to_puzzle_hash
         )
+        converted = [await self._convert_tx_puzzle_hash(tr) for tr in transactions]
         return {
-            "transactions": [
-                (await self._convert_tx_puzzle_hash(tr)).to_json_dict_convenience(self.service.config)
-                for tr in transactions
-            ],
+            "transactions": [JSONStreamable(tr, tr.convenience_json_fields(self.service.config)) for tr in converted],
             "wallet_id": wallet_id,
         }
 
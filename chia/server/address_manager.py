@@ -3,10 +3,11 @@ from __future__ import annotations
 import logging
 import math
 import time
+from array import array
 from asyncio import Lock
 from random import choice, randrange
 from secrets import randbits
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 from chia.types.peer_info import PeerInfo, TimestampedPeerInfo
 from chia.util.hash import std_hash
@@ -48,6 +49,10 @@ class ExtendedPeerInfo:
         self.random_pos: Optional[int] = None
         self.is_tried: bool = False
         self.ref_count: int = 0
+        # The buckets and bucket positions this peer occupies in the new table, maintained by the AddressManager
+        self.new_positions: Dict[int, int] = {}
+        # Caches the result of `get_tried_position` as (key, bucket, bucket position)
+        self._tried_position: Optional[Tuple[int, int, int]] = None
         self.last_success: int = 0
         self.last_try: int = 0
         self.num_attempts: int = 0
@@ -88,6 +93,15 @@ class ExtendedPeerInfo:
         )
         return hash2 % TRIED_BUCKET_COUNT
 
+    def get_tried_position(self, key: int) -> Tuple[int, int]:
+        """
+        Returns the tried bucket and the position in it, the hashing is only done once per key.
+        """
+        if self._tried_position is None or self._tried_position[0] != key:
+            bucket = self.get_tried_bucket(key)
+            self._tried_position = (key, bucket, self.get_bucket_position(key, False, bucket))
+        return self._tried_position[1], self._tried_position[2]
+
     def get_new_bucket(self, key: int, src_peer: Optional[PeerInfo] = None) -> int:
         if src_peer is None:
             src_peer = self.src
@@ -158,22 +172,62 @@ class ExtendedPeerInfo:
         return chance
 
 
+class BucketTable:
+    """
+    The node ids of the new or the tried table, `bucket_count` buckets with `BUCKET_SIZE` positions each, in one flat
+    array. Empty positions are -1. The used positions are tracked as flat indices so that sparse tables can be walked
+    without visiting every position.
+    """
+
+    bucket_count: int
+    cells: array[int]
+    used: Set[int]
+
+    def __init__(self, bucket_count: int) -> None:
+        self.bucket_count = bucket_count
+        self.cells = array("q", [-1]) * (bucket_count * BUCKET_SIZE)
+        self.used = set()
+
+    def __len__(self) -> int:
+        return len(self.used)
+
+    def get(self, bucket: int, pos: int) -> int:
+        return self.cells[bucket * BUCKET_SIZE + pos]
+
+    def set(self, bucket: int, pos: int, node_id: int) -> None:
+        index = bucket * BUCKET_SIZE + pos
+        self.cells[index] = node_id
+        if node_id == -1:
+            self.used.discard(index)
+        else:
+            self.used.add(index)
+
+    def used_positions(self) -> Iterator[Tuple[int, int]]:
+        """
+        Yields the used (bucket, bucket position) pairs in table order.
+        """
+        for index in sorted(self.used):
+            yield divmod(index, BUCKET_SIZE)
+
+
 # This is a Python port from 'CAddrMan' class from Bitcoin core code.
 class AddressManager:
     id_count: int
     key: int
     random_pos: List[int]
-    tried_matrix: List[List[int]]
-    new_matrix: List[List[int]]
+    tried_matrix: BucketTable
+    new_matrix: BucketTable
     tried_count: int
     new_count: int
     map_addr: Dict[str, int]
     map_info: Dict[int, ExtendedPeerInfo]
     last_good: int
     tried_collisions: List[int]
-    used_new_matrix_positions: Set[Tuple[int, int]]
-    used_tried_matrix_positions: Set[Tuple[int, int]]
     allow_private_subnets: bool
+    # The persisted state of these changed since the last write of the peers file, see `AddressManagerStore`
+    changed_node_ids: Set[int]
+    deleted_hosts: Set[str]
+    peers_file_generation: int
 
     def __init__(self) -> None:
         self.clear()
@@ -183,52 +237,41 @@ class AddressManager:
         self.id_count = 0
         self.key = randbits(256)
         self.random_pos = []
-        self.tried_matrix = [[-1 for x in range(BUCKET_SIZE)] for y in range(TRIED_BUCKET_COUNT)]
-        self.new_matrix = [[-1 for x in range(BUCKET_SIZE)] for y in range(NEW_BUCKET_COUNT)]
+        self.tried_matrix = BucketTable(TRIED_BUCKET_COUNT)
+        self.new_matrix = BucketTable(NEW_BUCKET_COUNT)
         self.tried_count = 0
         self.new_count = 0
         self.map_addr = {}
         self.map_info = {}
         self.last_good = 1
         self.tried_collisions = []
-        self.used_new_matrix_positions = set()
-        self.used_tried_matrix_positions = set()
         self.allow_private_subnets = False
+        self.changed_node_ids = set()
+        self.deleted_hosts = set()
+        self.peers_file_generation = 0
 
     def make_private_subnets_valid(self) -> None:
         self.allow_private_subnets = True
 
     # Use only this method for modifying new matrix.
     def _set_new_matrix(self, row: int, col: int, value: int) -> None:
-        self.new_matrix[row][col] = value
-        if value == -1:
-            if (row, col) in self.used_new_matrix_positions:
-                self.used_new_matrix_positions.remove((row, col))
-        else:
-            if (row, col) not in self.used_new_matrix_positions:
-                self.used_new_matrix_positions.add((row, col))
+        old_value = self.new_matrix.get(row, col)
+        if old_value != -1 and old_value in self.map_info:
+            self.map_info[old_value].new_positions.pop(row, None)
+            self.changed_node_ids.add(old_value)
+        self.new_matrix.set(row, col, value)
+        if value != -1:
+            self.map_info[value].new_positions[row] = col
+            self.changed_node_ids.add(value)
 
     # Use only this method for modifying tried matrix.
     def _set_tried_matrix(self, row: int, col: int, value: int) -> None:
-        self.tried_matrix[row][col] = value
-        if value == -1:
-            if (row, col) in self.used_tried_matrix_positions:
-                self.used_tried_matrix_positions.remove((row, col))
-        else:
-            if (row, col) not in self.used_tried_matrix_positions:
-                self.used_tried_matrix_positions.add((row, col))
-
-    def load_used_table_positions(self) -> None:
-        self.used_new_matrix_positions = set()
-        self.used_tried_matrix_positions = set()
-        for bucket in range(NEW_BUCKET_COUNT):
-            for pos in range(BUCKET_SIZE):
-                if self.new_matrix[bucket][pos] != -1:
-                    self.used_new_matrix_positions.add((bucket, pos))
-        for bucket in range(TRIED_BUCKET_COUNT):
-            for pos in range(BUCKET_SIZE):
-                if self.tried_matrix[bucket][pos] != -1:
-                    self.used_tried_matrix_positions.add((bucket, pos))
+        old_value = self.tried_matrix.get(row, col)
+        if old_value != -1:
+            self.changed_node_ids.add(old_value)
+        self.tried_matrix.set(row, col, value)
+        if value != -1:
+            self.changed_node_ids.add(value)
 
     def create_(self, addr: TimestampedPeerInfo, addr_src: Optional[PeerInfo]) -> Tuple[ExtendedPeerInfo, int]:
         self.id_count += 1
@@ -237,6 +280,7 @@ class AddressManager:
         self.map_addr[addr.host] = node_id
         self.map_info[node_id].random_pos = len(self.random_pos)
         self.random_pos.append(node_id)
+        self.changed_node_ids.add(node_id)
         return (self.map_info[node_id], node_id)
 
     def find_(self, addr: PeerInfo) -> Tuple[Optional[ExtendedPeerInfo], Optional[int]]:
@@ -259,18 +303,15 @@ class AddressManager:
         self.random_pos[rand_pos_2] = node_id_1
 
     def make_tried_(self, info: ExtendedPeerInfo, node_id: int) -> None:
-        for bucket in range(NEW_BUCKET_COUNT):
-            pos = info.get_bucket_position(self.key, True, bucket)
-            if self.new_matrix[bucket][pos] == node_id:
-                self._set_new_matrix(bucket, pos, -1)
-                info.ref_count -= 1
+        for bucket, pos in list(info.new_positions.items()):
+            self._set_new_matrix(bucket, pos, -1)
+            info.ref_count -= 1
         assert info.ref_count == 0
         self.new_count -= 1
-        cur_bucket = info.get_tried_bucket(self.key)
-        cur_bucket_pos = info.get_bucket_position(self.key, False, cur_bucket)
-        if self.tried_matrix[cur_bucket][cur_bucket_pos] != -1:
+        cur_bucket, cur_bucket_pos = info.get_tried_position(self.key)
+        if self.tried_matrix.get(cur_bucket, cur_bucket_pos) != -1:
             # Evict the old node from the tried table.
-            node_id_evict = self.tried_matrix[cur_bucket][cur_bucket_pos]
+            node_id_evict = self.tried_matrix.get(cur_bucket, cur_bucket_pos)
             assert node_id_evict in self.map_info
             old_info = self.map_info[node_id_evict]
             old_info.is_tried = False
@@ -288,8 +329,8 @@ class AddressManager:
         info.is_tried = True
 
     def clear_new_(self, bucket: int, pos: int) -> None:
-        if self.new_matrix[bucket][pos] != -1:
-            delete_id = self.new_matrix[bucket][pos]
+        delete_id = self.new_matrix.get(bucket, pos)
+        if delete_id != -1:
             delete_info = self.map_info[delete_id]
             assert delete_info.ref_count > 0
             delete_info.ref_count -= 1
@@ -321,28 +362,17 @@ class AddressManager:
         if info.is_tried:
             return None
 
-        # find a bucket it is in now
-        bucket_rand = randrange(NEW_BUCKET_COUNT)
-        new_bucket = -1
-        for n in range(NEW_BUCKET_COUNT):
-            cur_new_bucket = (n + bucket_rand) % NEW_BUCKET_COUNT
-            cur_new_bucket_pos = info.get_bucket_position(self.key, True, cur_new_bucket)
-            if self.new_matrix[cur_new_bucket][cur_new_bucket_pos] == node_id:
-                new_bucket = cur_new_bucket
-                break
-
-        # if no bucket is found, something bad happened;
-        if new_bucket == -1:
+        # if it's in no bucket of the new table, something bad happened;
+        if len(info.new_positions) == 0:
             return None
 
         # NOTE(Florin): Double check this. It's not used anywhere else.
 
         # which tried bucket to move the entry to
-        tried_bucket = info.get_tried_bucket(self.key)
-        tried_bucket_pos = info.get_bucket_position(self.key, False, tried_bucket)
+        tried_bucket, tried_bucket_pos = info.get_tried_position(self.key)
 
         # Will moving this address into tried evict another entry?
-        if test_before_evict and self.tried_matrix[tried_bucket][tried_bucket_pos] != -1:
+        if test_before_evict and self.tried_matrix.get(tried_bucket, tried_bucket_pos) != -1:
             if len(self.tried_collisions) < TRIED_COLLISION_SIZE:
                 if node_id not in self.tried_collisions:
                     self.tried_collisions.append(node_id)
@@ -354,9 +384,11 @@ class AddressManager:
         if info is None or info.random_pos is None:
             return None
         self.swap_random_(info.random_pos, len(self.random_pos) - 1)
-        self.random_pos = self.random_pos[:-1]
+        self.random_pos.pop()
         del self.map_addr[info.peer_info.host]
         del self.map_info[node_id]
+        self.changed_node_ids.discard(node_id)
+        self.deleted_hosts.add(info.peer_info.host)
         self.new_count -= 1
 
     def add_to_new_table_(self, addr: TimestampedPeerInfo, source: Optional[PeerInfo], penalty: int) -> bool:
@@ -379,6 +411,8 @@ class AddressManager:
                 info.timestamp > 0 or info.timestamp < addr.timestamp - update_interval - penalty
             ):
                 info.timestamp = max(0, addr.timestamp - penalty)
+                if node_id is not None:
+                    self.changed_node_ids.add(node_id)
 
             # do not update if no new information is present
             if addr.timestamp == 0 or (info.timestamp > 0 and addr.timestamp <= info.timestamp):
@@ -404,10 +438,11 @@ class AddressManager:
 
         new_bucket = info.get_new_bucket(self.key, source)
         new_bucket_pos = info.get_bucket_position(self.key, True, new_bucket)
-        if self.new_matrix[new_bucket][new_bucket_pos] != node_id:
-            add_to_new = self.new_matrix[new_bucket][new_bucket_pos] == -1
+        existing_id = self.new_matrix.get(new_bucket, new_bucket_pos)
+        if existing_id != node_id:
+            add_to_new = existing_id == -1
             if not add_to_new:
-                info_existing = self.map_info[self.new_matrix[new_bucket][new_bucket_pos]]
+                info_existing = self.map_info[existing_id]
                 if info_existing.is_terrible() or (info_existing.ref_count > 1 and info.ref_count == 0):
                     add_to_new = True
             if add_to_new:
@@ -445,26 +480,26 @@ class AddressManager:
         if not new_only and self.tried_count > 0 and (self.new_count == 0 or randrange(2) == 0):
             chance = 1.0
             start = time.time()
-            cached_tried_matrix_positions: List[Tuple[int, int]] = []
-            if len(self.used_tried_matrix_positions) < math.sqrt(TRIED_BUCKET_COUNT * BUCKET_SIZE):
-                cached_tried_matrix_positions = list(self.used_tried_matrix_positions)
+            cached_tried_matrix_positions: List[int] = []
+            if len(self.tried_matrix) < math.sqrt(TRIED_BUCKET_COUNT * BUCKET_SIZE):
+                cached_tried_matrix_positions = list(self.tried_matrix.used)
             while True:
-                if len(self.used_tried_matrix_positions) < math.sqrt(TRIED_BUCKET_COUNT * BUCKET_SIZE):
-                    if len(self.used_tried_matrix_positions) == 0:
+                if len(self.tried_matrix) < math.sqrt(TRIED_BUCKET_COUNT * BUCKET_SIZE):
+                    if len(self.tried_matrix) == 0:
                         log.error(f"Empty tried table, but tried_count shows {self.tried_count}.")
                         return None
                     # The table is sparse, randomly pick from positions list.
                     index = randrange(len(cached_tried_matrix_positions))
-                    tried_bucket, tried_bucket_pos = cached_tried_matrix_positions[index]
+                    tried_bucket, tried_bucket_pos = divmod(cached_tried_matrix_positions[index], BUCKET_SIZE)
                 else:
                     # The table is dense, randomly trying positions is faster than loading positions list.
                     tried_bucket = randrange(TRIED_BUCKET_COUNT)
                     tried_bucket_pos = randrange(BUCKET_SIZE)
-                    while self.tried_matrix[tried_bucket][tried_bucket_pos] == -1:
+                    while self.tried_matrix.get(tried_bucket, tried_bucket_pos) == -1:
                         tried_bucket = (tried_bucket + randbits(LOG_TRIED_BUCKET_COUNT)) % TRIED_BUCKET_COUNT
                         tried_bucket_pos = (tried_bucket_pos + randbits(LOG_BUCKET_SIZE)) % BUCKET_SIZE
 
-                node_id = self.tried_matrix[tried_bucket][tried_bucket_pos]
+                node_id = self.tried_matrix.get(tried_bucket, tried_bucket_pos)
                 assert node_id != -1
                 info = self.map_info[node_id]
                 if randbits(30) < (chance * info.get_selection_chance() * (1 << 30)):
@@ -475,23 +510,23 @@ class AddressManager:
         else:
             chance = 1.0
             start = time.time()
-            cached_new_matrix_positions: List[Tuple[int, int]] = []
-            if len(self.used_new_matrix_positions) < math.sqrt(NEW_BUCKET_COUNT * BUCKET_SIZE):
-                cached_new_matrix_positions = list(self.used_new_matrix_positions)
+            cached_new_matrix_positions: List[int] = []
+            if len(self.new_matrix) < math.sqrt(NEW_BUCKET_COUNT * BUCKET_SIZE):
+                cached_new_matrix_positions = list(self.new_matrix.used)
             while True:
-                if len(self.used_new_matrix_positions) < math.sqrt(NEW_BUCKET_COUNT * BUCKET_SIZE):
-                    if len(self.used_new_matrix_positions) == 0:
+                if len(self.new_matrix) < math.sqrt(NEW_BUCKET_COUNT * BUCKET_SIZE):
+                    if len(self.new_matrix) == 0:
                         log.error(f"Empty new table, but new_count shows {self.new_count}.")
                         return None
                     index = randrange(len(cached_new_matrix_positions))
-                    new_bucket, new_bucket_pos = cached_new_matrix_positions[index]
+                    new_bucket, new_bucket_pos = divmod(cached_new_matrix_positions[index], BUCKET_SIZE)
                 else:
                     new_bucket = randrange(NEW_BUCKET_COUNT)
                     new_bucket_pos = randrange(BUCKET_SIZE)
-                    while self.new_matrix[new_bucket][new_bucket_pos] == -1:
+                    while self.new_matrix.get(new_bucket, new_bucket_pos) == -1:
                         new_bucket = (new_bucket + randbits(LOG_NEW_BUCKET_COUNT)) % NEW_BUCKET_COUNT
                         new_bucket_pos = (new_bucket_pos + randbits(LOG_BUCKET_SIZE)) % BUCKET_SIZE
-                node_id = self.new_matrix[new_bucket][new_bucket_pos]
+                node_id = self.new_matrix.get(new_bucket, new_bucket_pos)
                 assert node_id != -1
                 info = self.map_info[node_id]
                 if randbits(30) < chance * info.get_selection_chance() * (1 << 30):
@@ -508,10 +543,9 @@ class AddressManager:
             else:
                 info = self.map_info[node_id]
                 peer = info.peer_info
-                tried_bucket = info.get_tried_bucket(self.key)
-                tried_bucket_pos = info.get_bucket_position(self.key, False, tried_bucket)
-                if self.tried_matrix[tried_bucket][tried_bucket_pos] != -1:
-                    old_id = self.tried_matrix[tried_bucket][tried_bucket_pos]
+                tried_bucket, tried_bucket_pos = info.get_tried_position(self.key)
+                old_id = self.tried_matrix.get(tried_bucket, tried_bucket_pos)
+                if old_id != -1:
                     old_info = self.map_info[old_id]
                     if time.time() - old_info.last_success < 4 * 60 * 60:
                         resolved = True
@@ -536,14 +570,14 @@ class AddressManager:
             self.tried_collisions.remove(new_id)
             return None
         new_info = self.map_info[new_id]
-        tried_bucket = new_info.get_tried_bucket(self.key)
-        tried_bucket_pos = new_info.get_bucket_position(self.key, False, tried_bucket)
+        tried_bucket, tried_bucket_pos = new_info.get_tried_position(self.key)
 
-        old_id = self.tried_matrix[tried_bucket][tried_bucket_pos]
+        old_id = self.tried_matrix.get(tried_bucket, tried_bucket_pos)
         return self.map_info[old_id]
 
     def get_peers_(self) -> List[TimestampedPeerInfo]:
         addr: List[TimestampedPeerInfo] = []
+        now = int(math.floor(time.time()))
         num_nodes = math.ceil(23 * len(self.random_pos) / 100)
         if num_nodes > 1000:
             num_nodes = 1000
@@ -556,7 +590,7 @@ class AddressManager:
             info = self.map_info[self.random_pos[n]]
             if not info.peer_info.is_valid(self.allow_private_subnets):
                 continue
-            if not info.is_terrible():
+            if not info.is_terrible(now):
                 cur_peer_info = TimestampedPeerInfo(
                     info.peer_info.host,
                     uint16(info.peer_info.port),
@@ -568,20 +602,17 @@ class AddressManager:
 
     def cleanup(self, max_timestamp_difference: int, max_consecutive_failures: int) -> None:
         now = int(math.floor(time.time()))
-        for bucket in range(NEW_BUCKET_COUNT):
-            for pos in range(BUCKET_SIZE):
-                if self.new_matrix[bucket][pos] != -1:
-                    node_id = self.new_matrix[bucket][pos]
-                    cur_info = self.map_info[node_id]
-                    if (
-                        cur_info.timestamp < now - max_timestamp_difference
-                        and cur_info.num_attempts >= max_consecutive_failures
-                    ):
-                        self.clear_new_(bucket, pos)
+        for bucket, pos in list(self.new_matrix.used_positions()):
+            cur_info = self.map_info[self.new_matrix.get(bucket, pos)]
+            if (
+                cur_info.timestamp < now - max_timestamp_difference
+                and cur_info.num_attempts >= max_consecutive_failures
+            ):
+                self.clear_new_(bucket, pos)
 
     def connect_(self, addr: PeerInfo, timestamp: int) -> None:
-        info, _ = self.find_(addr)
-        if info is None:
+        info, node_id = self.find_(addr)
+        if info is None or node_id is None:
             return None
 
         # check whether we are talking about the exact same peer
@@ -591,6 +622,7 @@ class AddressManager:
         update_interval = 20 * 60
         if timestamp - info.timestamp > update_interval:
             info.timestamp = timestamp
+            self.changed_node_ids.add(node_id)
 
     async def size(self) -> int:
         async with self.lock:
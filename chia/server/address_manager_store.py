@@ -2,26 +2,29 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import os
 from dataclasses import dataclass
 from pathlib import Path
 from timeit import default_timer as timer
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import aiofiles
 
-from chia.server.address_manager import (
-    BUCKET_SIZE,
-    NEW_BUCKET_COUNT,
-    NEW_BUCKETS_PER_ADDRESS,
-    AddressManager,
-    ExtendedPeerInfo,
-)
+from chia.server.address_manager import NEW_BUCKETS_PER_ADDRESS, AddressManager, ExtendedPeerInfo
 from chia.util.files import write_file_async
-from chia.util.ints import uint64
+from chia.util.ints import uint16, uint32, uint64
 from chia.util.streamable import Streamable, streamable
 
 log = logging.getLogger(__name__)
 
+# The log of changes gets compacted into a new peers file once it's larger than the peers file, or this size
+MIN_COMPACTION_SIZE = 1024 * 1024
+
+# The metadata, nodes and new table entries of a peers file
+PeerDataSnapshot = Tuple[List[Tuple[str, str]], List[Tuple[int, ExtendedPeerInfo]], List[Tuple[int, int]]]
+# The ids of the changed nodes and the deleted hosts which a write persists
+PendingChanges = Tuple[Set[int], Set[str]]
+
 
 @streamable
 @dataclass(frozen=True)
@@ -35,6 +38,31 @@ class PeerDataSerialization(Streamable):
     new_table: List[Tuple[uint64, uint64]]
 
 
+@streamable
+@dataclass(frozen=True)
+class PeerDataNode(Streamable):
+    """
+    The persisted state of a single node, see `ExtendedPeerInfo.to_string` for `info`.
+    """
+
+    info: str
+    is_tried: bool
+    new_buckets: List[uint16]
+
+
+@streamable
+@dataclass(frozen=True)
+class PeerDataChanges(Streamable):
+    """
+    A record of the peers file log, the changes since the previous record. Only records of the peers file's
+    generation apply to it.
+    """
+
+    generation: uint64
+    deleted_hosts: List[str]
+    nodes: List[PeerDataNode]
+
+
 async def makePeerDataSerialization(
     metadata: List[Tuple[str, Any]], nodes: List[Tuple[int, ExtendedPeerInfo]], new_table: List[Tuple[int, int]]
 ) -> bytes:
@@ -75,6 +103,11 @@ class AddressManagerStore:
     * Once we know the buckets, we can also deduce the bucket positions.
     Every other information, such as tried_matrix, map_addr, map_info, random_pos,
     be deduced and it is not explicitly stored, instead it is recalculated.
+
+    Rewriting the whole peers file is slow for large tables, so `persist` appends only the nodes which changed since
+    the last write to a log next to it and compacts the log into a new peers file once it grows too large. Loading
+    replays the log on top of the peers file. The metadata contains a generation which gets bumped with each new
+    peers file, log records of older generations get ignored.
     """
 
     @classmethod
@@ -101,6 +134,11 @@ class AddressManagerStore:
         """
         Serialize the address manager's peer data to a file.
         """
+        snapshot = cls._take_snapshot(address_manager)
+        await cls._write_snapshot(address_manager, peers_file_path, snapshot, cls._take_pending(address_manager))
+
+    @classmethod
+    def _take_snapshot(cls, address_manager: AddressManager) -> PeerDataSnapshot:
         metadata: List[Tuple[str, str]] = []
         nodes: List[Tuple[int, ExtendedPeerInfo]] = []
         new_table_entries: List[Tuple[int, int]] = []
@@ -108,7 +146,9 @@ class AddressManagerStore:
         count_ids: int = 0
 
         log.info("Serializing peer data")
+        generation = address_manager.peers_file_generation + 1
         metadata.append(("key", str(address_manager.key)))
+        metadata.append(("generation", str(generation)))
 
         for node_id, info in address_manager.map_info.items():
             unique_ids[node_id] = count_ids
@@ -128,20 +168,195 @@ class AddressManagerStore:
                 tried_ids += 1
         metadata.append(("tried_count", str(tried_ids)))
 
-        for bucket in range(NEW_BUCKET_COUNT):
-            for i in range(BUCKET_SIZE):
-                if address_manager.new_matrix[bucket][i] != -1:
-                    index = unique_ids[address_manager.new_matrix[bucket][i]]
-                    new_table_entries.append((index, bucket))
+        for bucket, i in address_manager.new_matrix.used_positions():
+            index = unique_ids[address_manager.new_matrix.get(bucket, i)]
+            new_table_entries.append((index, bucket))
 
+        return metadata, nodes, new_table_entries
+
+    @classmethod
+    async def _write_snapshot(
+        cls,
+        address_manager: AddressManager,
+        peers_file_path: Path,
+        snapshot: PeerDataSnapshot,
+        pending: PendingChanges,
+    ) -> None:
+        metadata, nodes, new_table_entries = snapshot
+        generation = int(dict(metadata)["generation"])
         try:
             # Ensure the parent directory exists
             peers_file_path.parent.mkdir(parents=True, exist_ok=True)
             start_time = timer()
             await cls._write_peers(peers_file_path, metadata, nodes, new_table_entries)
+            address_manager.peers_file_generation = generation
+            # The log only contains changes which are part of the new peers file now
+            try:
+                cls._log_path(peers_file_path).unlink()
+            except FileNotFoundError:
+                pass
             log.debug(f"Serializing peer data took {timer() - start_time} seconds")
         except Exception:
             log.exception(f"Failed to write peer data to {peers_file_path}")
+            cls._restore_pending(address_manager, pending)
+
+    @classmethod
+    async def persist(cls, address_manager: AddressManager, peers_file_path: Path) -> None:
+        """
+        Appends the changes since the last call to the log of the peers file, or writes a new peers file if the log got
+        too large. The lock of the address manager is only held while collecting the data, not while writing it.
+        """
+        log_path = cls._log_path(peers_file_path)
+        log_size = log_path.stat().st_size if log_path.exists() else 0
+        if (
+            address_manager.peers_file_generation == 0
+            or not peers_file_path.exists()
+            or log_size > max(MIN_COMPACTION_SIZE, peers_file_path.stat().st_size)
+        ):
+            # Also the first time, the log doesn't apply to peers files written by older versions
+            async with address_manager.lock:
+                snapshot = cls._take_snapshot(address_manager)
+                pending = cls._take_pending(address_manager)
+            await cls._write_snapshot(address_manager, peers_file_path, snapshot, pending)
+            return
+
+        async with address_manager.lock:
+            changes = cls._take_changes(address_manager)
+            pending = cls._take_pending(address_manager)
+        if len(changes.deleted_hosts) == 0 and len(changes.nodes) == 0:
+            return
+        try:
+            start_time = timer()
+            await cls._append_changes(log_path, changes)
+            log.debug(
+                f"Logging {len(changes.nodes)} changed and {len(changes.deleted_hosts)} deleted peers "
+                f"took {timer() - start_time} seconds"
+            )
+        except Exception:
+            log.exception(f"Failed to write peer data changes to {log_path}")
+            cls._restore_pending(address_manager, pending)
+
+    @classmethod
+    def _log_path(cls, peers_file_path: Path) -> Path:
+        return peers_file_path.with_name(peers_file_path.name + ".log")
+
+    @classmethod
+    def _take_changes(cls, address_manager: AddressManager) -> PeerDataChanges:
+        nodes: List[PeerDataNode] = []
+        for node_id in address_manager.changed_node_ids:
+            info = address_manager.map_info.get(node_id)
+            if info is None:
+                continue
+            nodes.append(
+                PeerDataNode(info.to_string(), info.is_tried, [uint16(bucket) for bucket in sorted(info.new_positions)])
+            )
+        # Deletions come first when replaying, a deleted host might have been added again later
+        return PeerDataChanges(
+            uint64(address_manager.peers_file_generation), sorted(address_manager.deleted_hosts), nodes
+        )
+
+    @classmethod
+    def _take_pending(cls, address_manager: AddressManager) -> PendingChanges:
+        """
+        Starts tracking the changes after the ones about to be written, which only get dropped for good once the write
+        succeeded, see `_restore_pending`.
+        """
+        pending = (address_manager.changed_node_ids, address_manager.deleted_hosts)
+        address_manager.changed_node_ids = set()
+        address_manager.deleted_hosts = set()
+        return pending
+
+    @classmethod
+    def _restore_pending(cls, address_manager: AddressManager, pending: PendingChanges) -> None:
+        """
+        Merges the changes of a failed write back, so that the next write picks them up along with the newer changes.
+        """
+        changed_node_ids, deleted_hosts = pending
+        address_manager.changed_node_ids.update(changed_node_ids)
+        address_manager.deleted_hosts.update(deleted_hosts)
+
+    @classmethod
+    async def _append_changes(cls, log_path: Path, changes: PeerDataChanges) -> None:
+        """
+        Appends a record to the log. If the write fails, e.g. when the disk is full, the partially written record gets
+        cut off again, so that the next record doesn't end up behind it.
+        """
+        data = bytes(changes)
+        log_size = log_path.stat().st_size if log_path.exists() else 0
+        try:
+            async with aiofiles.open(log_path, "ab") as f:
+                await f.write(bytes(uint32(len(data))) + data)
+                await f.flush()
+                # Don't block the event loop while the disk catches up
+                await asyncio.get_running_loop().run_in_executor(None, os.fsync, f.fileno())
+        except Exception:
+            cls._truncate_log(log_path, log_size)
+            raise
+
+    @classmethod
+    def _truncate_log(cls, log_path: Path, size: int) -> None:
+        try:
+            os.truncate(log_path, size)
+        except OSError:
+            log.exception(f"Failed to truncate {log_path} to {size} bytes")
+
+    @classmethod
+    async def _read_changes(cls, log_path: Path, generation: int) -> List[PeerDataChanges]:
+        """
+        Returns the log records of the given peers file generation. A record which was only partially written, e.g.
+        due to a crash, ends the log and gets cut off, so that the records appended later can be read.
+        """
+        async with aiofiles.open(log_path, "rb") as f:
+            data = await f.read()
+        changes: List[PeerDataChanges] = []
+        offset = 0
+        while offset + 4 <= len(data):
+            size = int.from_bytes(data[offset : offset + 4], "big")
+            if offset + 4 + size > len(data):
+                break
+            try:
+                record = PeerDataChanges.from_bytes(data[offset + 4 : offset + 4 + size])
+            except Exception:
+                break
+            offset += 4 + size
+            if record.generation == generation:
+                changes.append(record)
+        if offset < len(data):
+            log.warning(f"Ignoring incomplete record at the end of {log_path}")
+            cls._truncate_log(log_path, offset)
+        return changes
+
+    @classmethod
+    def _apply_changes(cls, peer_data: PeerDataSerialization, changes: List[PeerDataChanges]) -> PeerDataSerialization:
+        """
+        Returns the peer data with the logged changes applied, in the same form as it was written by `serialize`.
+        """
+        metadata: Dict[str, str] = {key: value for key, value in peer_data.metadata}
+        new_count = int(metadata["new_count"])
+        new_buckets: Dict[int, List[int]] = {}
+        for node_id, bucket in peer_data.new_table:
+            new_buckets.setdefault(node_id, []).append(bucket)
+
+        # The host identifies a node, it's the first part of the info string
+        entries: Dict[str, Tuple[str, bool, List[int]]] = {}
+        for node_id, info_str in peer_data.nodes:
+            entries[info_str.split(" ")[0]] = (info_str, node_id >= new_count, new_buckets.get(node_id, []))
+        for change in changes:
+            for host in change.deleted_hosts:
+                entries.pop(host, None)
+            for node in change.nodes:
+                buckets = [int(bucket) for bucket in node.new_buckets]
+                entries[node.info.split(" ")[0]] = (node.info, node.is_tried, buckets)
+
+        new_entries = [entry for entry in entries.values() if not entry[1] and len(entry[2]) > 0]
+        tried_entries = [entry for entry in entries.values() if entry[1]]
+        metadata["new_count"] = str(len(new_entries))
+        metadata["tried_count"] = str(len(tried_entries))
+        return PeerDataSerialization(
+            list(metadata.items()),
+            [(uint64(node_id), entry[0]) for node_id, entry in enumerate(new_entries + tried_entries)],
+            [(uint64(node_id), uint64(bucket)) for node_id, entry in enumerate(new_entries) for bucket in entry[2]],
+        )
 
     @classmethod
     async def _deserialize(cls, peers_file_path: Path) -> AddressManager:
@@ -156,6 +371,16 @@ class AddressManagerStore:
         except Exception:
             log.exception(f"Unable to deserialize peers from {peers_file_path}")
 
+        log_path = cls._log_path(peers_file_path)
+        if peer_data is not None and log_path.exists():
+            try:
+                generation = int(dict(peer_data.metadata).get("generation", "0"))
+                changes = await cls._read_changes(log_path, generation)
+                if len(changes) > 0:
+                    peer_data = cls._apply_changes(peer_data, changes)
+            except Exception:
+                log.exception(f"Unable to apply the peer data changes of {log_path}")
+
         if peer_data is not None:
             metadata: Dict[str, str] = {key: value for key, value in peer_data.metadata}
             nodes: List[Tuple[int, ExtendedPeerInfo]] = [
@@ -179,16 +404,15 @@ class AddressManagerStore:
             tried_table_nodes = [(node_id, info) for node_id, info in nodes if node_id >= address_manager.new_count]
             # lost_count = 0
             for node_id, info in tried_table_nodes:
-                tried_bucket = info.get_tried_bucket(address_manager.key)
-                tried_bucket_pos = info.get_bucket_position(address_manager.key, False, tried_bucket)
-                if address_manager.tried_matrix[tried_bucket][tried_bucket_pos] == -1:
+                tried_bucket, tried_bucket_pos = info.get_tried_position(address_manager.key)
+                if address_manager.tried_matrix.get(tried_bucket, tried_bucket_pos) == -1:
                     info.random_pos = len(address_manager.random_pos)
                     info.is_tried = True
                     id_count = address_manager.id_count
                     address_manager.random_pos.append(id_count)
                     address_manager.map_info[id_count] = info
                     address_manager.map_addr[info.peer_info.host] = id_count
-                    address_manager.tried_matrix[tried_bucket][tried_bucket_pos] = id_count
+                    address_manager._set_tried_matrix(tried_bucket, tried_bucket_pos, id_count)
                     address_manager.id_count += 1
                     address_manager.tried_count += 1
                 # else:
@@ -200,17 +424,20 @@ class AddressManagerStore:
                     info = address_manager.map_info[node_id]
                     bucket_pos = info.get_bucket_position(address_manager.key, True, bucket)
                     if (
-                        address_manager.new_matrix[bucket][bucket_pos] == -1
+                        address_manager.new_matrix.get(bucket, bucket_pos) == -1
                         and info.ref_count < NEW_BUCKETS_PER_ADDRESS
                     ):
                         info.ref_count += 1
-                        address_manager.new_matrix[bucket][bucket_pos] = node_id
+                        address_manager._set_new_matrix(bucket, bucket_pos, node_id)
 
             for node_id, info in list(address_manager.map_info.items()):
                 if not info.is_tried and info.ref_count == 0:
                     address_manager.delete_new_entry_(node_id)
 
-            address_manager.load_used_table_positions()
+            # The loaded state is already persisted
+            address_manager.peers_file_generation = int(metadata.get("generation", "0"))
+            address_manager.changed_node_ids.clear()
+            address_manager.deleted_hosts.clear()
 
         return address_manager
 
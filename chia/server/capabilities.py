@@ -24,3 +24,17 @@ def known_active_capabilities(values: Iterable[Tuple[uint16, str]]) -> List[Capa
 
     # TODO: consider changing all uses to sets instead of lists
     return [Capability(value) for value in filtered]
+
+
+def compression_negotiated(local_capabilities: List[Capability], peer_capabilities: List[Capability]) -> bool:
+    """
+    Compressed messages are only sent if both sides announced the compression capability in their handshake.
+    """
+    return Capability.COMPRESSION in local_capabilities and Capability.COMPRESSION in peer_capabilities
+
+
+def chunking_negotiated(local_capabilities: List[Capability], peer_capabilities: List[Capability]) -> bool:
+    """
+    Messages are only sent in chunks if both sides announced the chunked messages capability in their handshake.
+    """
+    return Capability.CHUNKED_MESSAGES in local_capabilities and Capability.CHUNKED_MESSAGES in peer_capabilities
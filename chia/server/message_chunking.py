@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.server.outbound_message import Message, make_msg
+from chia.util.ints import uint32
+from chia.util.streamable import Streamable, streamable
+
+# Bulk messages larger than this get split into chunks of this size
+CHUNK_SIZE = 64 * 1024
+# Same as the websocket message size limit, the reassembled message can't be larger than an unchunked message
+MAX_MESSAGE_SIZE = 50 * 1024 * 1024
+
+
+@streamable
+@dataclass(frozen=True)
+class MessageChunk(Streamable):
+    size: uint32  # the size of the whole serialized message
+    data: bytes
+
+
+def split_message(encoded: bytes, chunk_size: int = CHUNK_SIZE) -> List[bytes]:
+    """
+    Splits a serialized message into serialized `message_chunk` messages. The chunks of a message are sent in order,
+    other messages can be sent in between them.
+    """
+    size = uint32(len(encoded))
+    return [
+        bytes(make_msg(ProtocolMessageTypes.message_chunk, MessageChunk(size, encoded[start : start + chunk_size])))
+        for start in range(0, len(encoded), chunk_size)
+    ]
+
+
+class ChunkAssembler:
+    """
+    Reassembles the message of the received chunks. Raises `ValueError` if the chunks don't add up to a message.
+    """
+
+    _size: Optional[int]
+    _received: int
+    _parts: List[bytes]
+
+    def __init__(self) -> None:
+        self._reset()
+
+    def _reset(self) -> None:
+        self._size = None
+        self._received = 0
+        self._parts = []
+
+    def add(self, message: Message) -> Optional[Message]:
+        """
+        Returns the reassembled message once all of its chunks were added, `None` before.
+        """
+        assert message.type == ProtocolMessageTypes.message_chunk.value
+        chunk = MessageChunk.from_bytes(message.data)
+        if chunk.size > MAX_MESSAGE_SIZE:
+            raise ValueError(f"Invalid message size: {chunk.size}")
+        if len(chunk.data) == 0:
+            raise ValueError("Empty chunk")
+        if self._size is None:
+            self._size = chunk.size
+        elif chunk.size != self._size:
+            raise ValueError(f"Message size mismatch: {chunk.size} != {self._size}")
+        self._received += len(chunk.data)
+        if self._received > self._size:
+            raise ValueError(f"Chunks exceed the message size: {self._received} > {self._size}")
+        self._parts.append(chunk.data)
+        if self._received < self._size:
+            return None
+        data = b"".join(self._parts)
+        self._reset()
+        reassembled = Message.from_bytes(data)
+        if reassembled.type == ProtocolMessageTypes.message_chunk.value:
+            raise ValueError("Nested message chunk")
+        return reassembled
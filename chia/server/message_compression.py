@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import zstd
+
+from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.server.outbound_message import Message
+from chia.util.ints import uint8, uint32
+from chia.util.streamable import Streamable, streamable
+
+# Only the data of these message types gets compressed, all of them can get large and compress well
+COMPRESSED_MESSAGE_TYPES = {
+    ProtocolMessageTypes.respond_blocks.value,
+    ProtocolMessageTypes.respond_proof_of_weight.value,
+    ProtocolMessageTypes.respond_to_ph_update.value,
+    ProtocolMessageTypes.request_mempool_transactions.value,
+}
+# Messages with less data than this are sent uncompressed
+COMPRESSION_THRESHOLD = 16 * 1024
+COMPRESSION_LEVEL = 3
+# Messages with more data than this get compressed and decompressed in a thread, to not block the event loop
+EXECUTOR_THRESHOLD = 1024 * 1024
+# Same as the websocket message size limit, the decompressed data can't be larger than an uncompressed message
+MAX_DECOMPRESSED_SIZE = 50 * 1024 * 1024
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+@streamable
+@dataclass(frozen=True)
+class CompressedMessage(Streamable):
+    type: uint8  # the ProtocolMessageTypes of the original message
+    size: uint32  # the size of the uncompressed data
+    data: bytes
+
+
+def should_compress(message: Message) -> bool:
+    return message.type in COMPRESSED_MESSAGE_TYPES and len(message.data) > COMPRESSION_THRESHOLD
+
+
+def compress_message(message: Message) -> Message:
+    """
+    Wraps the message into a `compressed_message` with the same id, the receiver restores the original message with
+    `decompress_message` before rate limiting and processing it.
+    """
+    compressed = CompressedMessage(
+        message.type, uint32(len(message.data)), zstd.compress(message.data, COMPRESSION_LEVEL)
+    )
+    return Message(uint8(ProtocolMessageTypes.compressed_message.value), message.id, bytes(compressed))
+
+
+def zstd_frame_content_size(data: bytes) -> Optional[int]:
+    """
+    Returns the decompressed size the header of the zstd frame in `data` declares, or None if `data` isn't exactly
+    one frame, or its header doesn't declare the size. Only the headers get parsed, see the frame format in RFC 8878.
+    """
+    if len(data) < 5 or data[:4] != ZSTD_MAGIC:
+        return None
+    descriptor = data[4]
+    if descriptor & 0x08:
+        # the reserved bit must be zero
+        return None
+    single_segment = bool(descriptor & 0x20)
+    size_field_length = [1 if single_segment else 0, 2, 4, 8][descriptor >> 6]
+    if size_field_length == 0:
+        return None
+    offset = 5 + (0 if single_segment else 1) + [0, 1, 2, 4][descriptor & 0x03]
+    if len(data) < offset + size_field_length:
+        return None
+    size = int.from_bytes(data[offset : offset + size_field_length], "little")
+    if size_field_length == 2:
+        size += 256
+    offset += size_field_length
+
+    # zstd decompresses the frames following the first one too, into a larger buffer
+    last_block = False
+    while not last_block:
+        if len(data) < offset + 3:
+            return None
+        block_header = int.from_bytes(data[offset : offset + 3], "little")
+        last_block = bool(block_header & 1)
+        block_type = (block_header >> 1) & 3
+        if block_type == 3:
+            return None
+        # RLE blocks are a single byte repeated block size times
+        offset += 3 + (1 if block_type == 1 else block_header >> 3)
+    if descriptor & 0x04:
+        offset += 4
+    if offset != len(data):
+        return None
+    return size
+
+
+def decompress_message(message: Message) -> Message:
+    """
+    Raises `ValueError` if the message can't be decompressed or the compressed message type isn't allowed.
+    """
+    assert message.type == ProtocolMessageTypes.compressed_message.value
+    compressed = CompressedMessage.from_bytes(message.data)
+    if compressed.type not in COMPRESSED_MESSAGE_TYPES:
+        raise ValueError(f"Invalid compressed message type: {compressed.type}")
+    if compressed.size > MAX_DECOMPRESSED_SIZE:
+        raise ValueError(f"Invalid decompressed size: {compressed.size}")
+    # zstd allocates the buffer for the size in the frame header, check it before decompressing anything. The
+    # buffer can't grow, a frame that decompresses to more than that fails to decompress
+    content_size = zstd_frame_content_size(compressed.data)
+    if content_size is None:
+        raise ValueError("Failed to decompress message: not a single zstd frame with the content size")
+    if content_size != compressed.size:
+        raise ValueError(f"Decompressed size mismatch: {content_size} != {compressed.size}")
+    try:
+        data = zstd.decompress(compressed.data)
+    except (zstd.Error, MemoryError) as e:
+        raise ValueError(f"Failed to decompress message: {e}") from e
+    if len(data) != compressed.size:
+        raise ValueError(f"Decompressed size mismatch: {len(data)} != {compressed.size}")
+    return Message(compressed.type, message.id, data)
@@ -439,10 +439,10 @@ class FullNodeDiscovery:
             if self.address_manager is None:
                 await asyncio.sleep(10)
                 continue
-            serialize_interval = random.randint(15 * 60, 30 * 60)
+            # Only the changes get written, so this can happen a lot more often than rewriting the whole peers file
+            serialize_interval = random.randint(60, 2 * 60)
             await asyncio.sleep(serialize_interval)
-            async with self.address_manager.lock:
-                await AddressManagerStore.serialize(self.address_manager, self.peers_file_path)
+            await AddressManagerStore.persist(self.address_manager, self.peers_file_path)
 
     async def _periodically_cleanup(self) -> None:
         while not self.is_closed:
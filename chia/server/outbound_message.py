@@ -31,3 +31,17 @@ class Message(Streamable):
 
 def make_msg(msg_type: ProtocolMessageTypes, data: Union[bytes, SupportsBytes]) -> Message:
     return Message(uint8(msg_type.value), None, bytes(data))
+
+
+@dataclass(frozen=True)
+class EncodedMessage:
+    """
+    A message together with its serialized form, used to serialize broadcast messages only once for all peers.
+    """
+
+    message: Message
+    encoded: bytes
+
+    @classmethod
+    def from_message(cls, message: Message) -> EncodedMessage:
+        return cls(message, bytes(message))
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Deque, Dict, Optional, Tuple, Union
+
+from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.server.outbound_message import EncodedMessage, Message
+
+
+class MessagePriority(IntEnum):
+    # Lower values are sent first
+    HIGH = 0
+    NORMAL = 1
+    BULK = 2
+
+
+# Messages the farming and the block propagation depend on, they get sent before everything else
+HIGH_PRIORITY_MESSAGE_TYPES = {
+    message_type.value
+    for message_type in [
+        ProtocolMessageTypes.new_peak,
+        ProtocolMessageTypes.new_unfinished_block,
+        ProtocolMessageTypes.request_unfinished_block,
+        ProtocolMessageTypes.respond_unfinished_block,
+        ProtocolMessageTypes.request_block,
+        ProtocolMessageTypes.respond_block,
+        ProtocolMessageTypes.new_signage_point_or_end_of_sub_slot,
+        ProtocolMessageTypes.request_signage_point_or_end_of_sub_slot,
+        ProtocolMessageTypes.respond_signage_point,
+        ProtocolMessageTypes.respond_end_of_sub_slot,
+        ProtocolMessageTypes.new_signage_point,
+        ProtocolMessageTypes.declare_proof_of_space,
+        ProtocolMessageTypes.request_signed_values,
+        ProtocolMessageTypes.signed_values,
+        ProtocolMessageTypes.new_signage_point_harvester,
+        ProtocolMessageTypes.new_proof_of_space,
+        ProtocolMessageTypes.request_signatures,
+        ProtocolMessageTypes.respond_signatures,
+        ProtocolMessageTypes.new_peak_timelord,
+        ProtocolMessageTypes.new_unfinished_block_timelord,
+        ProtocolMessageTypes.new_infusion_point_vdf,
+        ProtocolMessageTypes.new_signage_point_vdf,
+        ProtocolMessageTypes.new_end_of_sub_slot_vdf,
+    ]
+}
+
+# Potentially large messages nobody waits for urgently, these get split into chunks if the peer supports it. Messages
+# are only sent in order within a priority class, so all messages of a stream which the receiver expects in order have
+# to be in the same class: the whole plot sync, and the new peak which a wallet expects after the coin state updates.
+BULK_MESSAGE_TYPES = {
+    message_type.value
+    for message_type in [
+        ProtocolMessageTypes.respond_blocks,
+        ProtocolMessageTypes.respond_proof_of_weight,
+        ProtocolMessageTypes.respond_header_blocks,
+        ProtocolMessageTypes.respond_block_headers,
+        ProtocolMessageTypes.respond_to_ph_update,
+        ProtocolMessageTypes.respond_to_coin_update,
+        ProtocolMessageTypes.respond_children,
+        ProtocolMessageTypes.respond_additions,
+        ProtocolMessageTypes.respond_removals,
+        ProtocolMessageTypes.respond_ses_hashes,
+        ProtocolMessageTypes.coin_state_update,
+        ProtocolMessageTypes.new_peak_wallet,
+        ProtocolMessageTypes.request_mempool_transactions,
+        ProtocolMessageTypes.respond_peers,
+        ProtocolMessageTypes.respond_peers_introducer,
+        ProtocolMessageTypes.respond_plots,
+        ProtocolMessageTypes.plot_sync_start,
+        ProtocolMessageTypes.plot_sync_resume,
+        ProtocolMessageTypes.plot_sync_loaded,
+        ProtocolMessageTypes.plot_sync_removed,
+        ProtocolMessageTypes.plot_sync_invalid,
+        ProtocolMessageTypes.plot_sync_keys_missing,
+        ProtocolMessageTypes.plot_sync_duplicates,
+        ProtocolMessageTypes.plot_sync_quarantined,
+        ProtocolMessageTypes.plot_sync_done,
+    ]
+}
+
+OutgoingItem = Union[Message, EncodedMessage]
+
+
+def message_priority(message_type: int) -> MessagePriority:
+    if message_type in HIGH_PRIORITY_MESSAGE_TYPES:
+        return MessagePriority.HIGH
+    if message_type in BULK_MESSAGE_TYPES:
+        return MessagePriority.BULK
+    return MessagePriority.NORMAL
+
+
+def _message_type(item: OutgoingItem) -> int:
+    if isinstance(item, EncodedMessage):
+        return item.message.type
+    return item.type
+
+
+@dataclass
+class QueueLatency:
+    sent: int = 0
+    total: float = 0
+    maximum: float = 0
+
+    def add(self, seconds: float) -> None:
+        self.sent += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sent": self.sent,
+            "average": self.total / self.sent if self.sent > 0 else None,
+            "maximum": self.maximum,
+        }
+
+
+class OutgoingQueue:
+    """
+    The outgoing messages of a connection, one FIFO queue per `MessagePriority`. Messages of a higher priority always
+    get sent first. Like the `asyncio.Queue` it replaces, it's unbounded and putting messages never waits. The time
+    each message spent in the queue gets tracked per priority.
+    """
+
+    _queues: Dict[MessagePriority, Deque[Tuple[float, OutgoingItem]]]
+    _latencies: Dict[MessagePriority, QueueLatency]
+    _size: int
+    _not_empty: asyncio.Event
+
+    def __init__(self) -> None:
+        self._queues = {priority: deque() for priority in MessagePriority}
+        self._latencies = {priority: QueueLatency() for priority in MessagePriority}
+        self._size = 0
+        self._not_empty = asyncio.Event()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def put_nowait(self, item: OutgoingItem) -> None:
+        self._queues[message_priority(_message_type(item))].append((time.monotonic(), item))
+        self._size += 1
+        self._not_empty.set()
+
+    async def put(self, item: OutgoingItem) -> None:
+        self.put_nowait(item)
+
+    def get_nowait(self, lowest_priority: MessagePriority = MessagePriority.BULK) -> Optional[OutgoingItem]:
+        """
+        Returns the next message with `lowest_priority` or a higher priority, or `None` if there is none.
+        """
+        for priority in MessagePriority:
+            if priority > lowest_priority:
+                break
+            queue = self._queues[priority]
+            if len(queue) > 0:
+                queued_at, item = queue.popleft()
+                self._size -= 1
+                self._latencies[priority].add(time.monotonic() - queued_at)
+                return item
+        return None
+
+    async def get(self) -> OutgoingItem:
+        while True:
+            item = self.get_nowait()
+            if item is not None:
+                return item
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            priority.name.lower(): {"queued": len(self._queues[priority]), **self._latencies[priority].to_dict()}
+            for priority in MessagePriority
+        }
@@ -134,11 +134,13 @@ rate_limits = {
             ProtocolMessageTypes.request_plots: RLSettings(10, 10 * 1024 * 1024),
             ProtocolMessageTypes.respond_plots: RLSettings(10, 100 * 1024 * 1024),
             ProtocolMessageTypes.plot_sync_start: RLSettings(1000, 100 * 1024 * 1024),
+            ProtocolMessageTypes.plot_sync_resume: RLSettings(1000, 100 * 1024 * 1024),
             ProtocolMessageTypes.plot_sync_loaded: RLSettings(1000, 100 * 1024 * 1024),
             ProtocolMessageTypes.plot_sync_removed: RLSettings(1000, 100 * 1024 * 1024),
             ProtocolMessageTypes.plot_sync_invalid: RLSettings(1000, 100 * 1024 * 1024),
             ProtocolMessageTypes.plot_sync_keys_missing: RLSettings(1000, 100 * 1024 * 1024),
             ProtocolMessageTypes.plot_sync_duplicates: RLSettings(1000, 100 * 1024 * 1024),
+            ProtocolMessageTypes.plot_sync_quarantined: RLSettings(1000, 100 * 1024 * 1024),
             ProtocolMessageTypes.plot_sync_done: RLSettings(1000, 100 * 1024 * 1024),
             ProtocolMessageTypes.plot_sync_response: RLSettings(3000, 100 * 1024 * 1024),
             ProtocolMessageTypes.coin_state_update: RLSettings(1000, 100 * 1024 * 1024),
@@ -184,3 +186,14 @@ rate_limits = {
         },
     },
 }
+
+# Costly requests are additionally limited per minute across all peers, see `RequestBudget`. A single peer can only
+# use `peer_share_percent` of each limit.
+default_request_budget: Dict[str, Any] = {
+    "peer_share_percent": 25,
+    "limits": {
+        ProtocolMessageTypes.request_blocks.name: 2000,
+        ProtocolMessageTypes.register_interest_in_puzzle_hash.name: 4000,
+        ProtocolMessageTypes.register_interest_in_coin.name: 4000,
+    },
+}
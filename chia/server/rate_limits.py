@@ -3,44 +3,162 @@ from __future__ import annotations
 import dataclasses
 import logging
 import time
-from collections import Counter
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.protocols.shared_protocol import Capability
 from chia.server.outbound_message import Message
-from chia.server.rate_limit_numbers import RLSettings, get_rate_limits_to_use
+from chia.server.rate_limit_numbers import RLSettings, default_request_budget, get_rate_limits_to_use
+from chia.types.blockchain_format.sized_bytes import bytes32
 
 log = logging.getLogger(__name__)
 
+_message_type_values = {message_type.value for message_type in ProtocolMessageTypes}
+
+
+@dataclasses.dataclass
+class TokenBucket:
+    """
+    Holds up to `capacity` tokens and gets refilled with `capacity` tokens per `period` seconds. Unlike a counter
+    which gets reset at the end of a fixed window, this doesn't allow twice the capacity around a window boundary.
+    """
+
+    capacity: float
+    refill_rate: float
+    tokens: float
+    last_refill: float
+
+    @classmethod
+    def create(cls, capacity: float, period: float, now: float) -> TokenBucket:
+        return cls(capacity, capacity / period, capacity, now)
+
+    def refill(self, now: float) -> None:
+        if now > self.last_refill:
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+            self.last_refill = now
+
+    def available(self, amount: float) -> bool:
+        return self.tokens >= amount
+
+    def consume(self, amount: float) -> None:
+        self.tokens = max(0.0, self.tokens - amount)
+
+
+@dataclasses.dataclass(frozen=True)
+class MessageLimits:
+    # The frequency and the total size are already scaled by the percentage of the limit
+    frequency: float
+    max_size: int
+    max_total_size: float
+    non_tx: bool
+
+
+@dataclasses.dataclass(frozen=True)
+class RateLimitTable:
+    limits: Dict[int, MessageLimits]
+    default_limits: MessageLimits
+    non_tx_frequency: float
+    non_tx_max_total_size: float
+
+    @classmethod
+    def create(cls, rate_limits: Dict[str, Any], percentage_of_limit: int) -> RateLimitTable:
+        proportion_of_limit = percentage_of_limit / 100
+
+        def resolve(settings: RLSettings, non_tx: bool) -> MessageLimits:
+            max_total_size = settings.max_total_size
+            if max_total_size is None:
+                max_total_size = settings.frequency * settings.max_size
+            return MessageLimits(
+                settings.frequency * proportion_of_limit,
+                settings.max_size,
+                max_total_size * proportion_of_limit,
+                non_tx,
+            )
+
+        limits: Dict[int, MessageLimits] = {}
+        for message_type, settings in rate_limits["rate_limits_other"].items():
+            limits[message_type.value] = resolve(settings, True)
+        # Transaction limits take precedence like they do in `get_rate_limits_to_use`
+        for message_type, settings in rate_limits["rate_limits_tx"].items():
+            limits[message_type.value] = resolve(settings, False)
+        return cls(
+            limits,
+            resolve(rate_limits["default_settings"], False),
+            rate_limits["non_tx_freq"] * proportion_of_limit,
+            rate_limits["non_tx_max_total_size"] * proportion_of_limit,
+        )
+
 
 # TODO: only full node disconnects based on rate limits
 class RateLimiter:
     incoming: bool
     reset_seconds: int
-    current_minute: int
-    message_counts: Counter[ProtocolMessageTypes]
-    message_cumulative_sizes: Counter[ProtocolMessageTypes]
     percentage_of_limit: int
-    non_tx_message_counts: int = 0
-    non_tx_cumulative_size: int = 0
+    table: Optional[RateLimitTable]
+    our_capabilities: Optional[List[Capability]]
+    peer_capabilities: Optional[List[Capability]]
+    message_buckets: Dict[int, Tuple[TokenBucket, TokenBucket]]
+    non_tx_buckets: Optional[Tuple[TokenBucket, TokenBucket]]
 
     def __init__(self, incoming: bool, reset_seconds: int = 60, percentage_of_limit: int = 100):
         """
-        The incoming parameter affects whether counters are incremented
-        unconditionally or not. For incoming messages, the counters are always
-        incremented. For outgoing messages, the counters are only incremented
+        The incoming parameter affects whether tokens are consumed
+        unconditionally or not. For incoming messages, the tokens are always
+        consumed. For outgoing messages, the tokens are only consumed
         if they are allowed to be sent by the rate limiter, since we won't send
         the messages otherwise.
         """
         self.incoming = incoming
         self.reset_seconds = reset_seconds
-        self.current_minute = int(time.time() // reset_seconds)
-        self.message_counts = Counter()
-        self.message_cumulative_sizes = Counter()
         self.percentage_of_limit = percentage_of_limit
-        self.non_tx_message_counts = 0
-        self.non_tx_cumulative_size = 0
+        self.table = None
+        self.our_capabilities = None
+        self.peer_capabilities = None
+        self.message_buckets = {}
+        self.non_tx_buckets = None
+
+    def _resolve_table(self, our_capabilities: List[Capability], peer_capabilities: List[Capability]) -> RateLimitTable:
+        # The connection passes the same capability lists with every message, so the limits get resolved once after
+        # the handshake instead of for each message.
+        if (
+            self.table is None
+            or our_capabilities is not self.our_capabilities
+            or peer_capabilities is not self.peer_capabilities
+        ):
+            table = RateLimitTable.create(
+                get_rate_limits_to_use(our_capabilities, peer_capabilities), self.percentage_of_limit
+            )
+            if table != self.table:
+                self.message_buckets = {}
+                self.non_tx_buckets = None
+            self.table = table
+            self.our_capabilities = our_capabilities
+            self.peer_capabilities = peer_capabilities
+        return self.table
+
+    def _buckets(self, message_type: int, limits: MessageLimits, now: float) -> Tuple[TokenBucket, TokenBucket]:
+        buckets = self.message_buckets.get(message_type)
+        if buckets is None:
+            buckets = (
+                TokenBucket.create(limits.frequency, self.reset_seconds, now),
+                TokenBucket.create(limits.max_total_size, self.reset_seconds, now),
+            )
+            self.message_buckets[message_type] = buckets
+        else:
+            buckets[0].refill(now)
+            buckets[1].refill(now)
+        return buckets
+
+    def _non_tx_buckets(self, table: RateLimitTable, now: float) -> Tuple[TokenBucket, TokenBucket]:
+        if self.non_tx_buckets is None:
+            self.non_tx_buckets = (
+                TokenBucket.create(table.non_tx_frequency, self.reset_seconds, now),
+                TokenBucket.create(table.non_tx_max_total_size, self.reset_seconds, now),
+            )
+        else:
+            self.non_tx_buckets[0].refill(now)
+            self.non_tx_buckets[1].refill(now)
+        return self.non_tx_buckets
 
     def process_msg_and_check(
         self, message: Message, our_capabilities: List[Capability], peer_capabilities: List[Capability]
@@ -48,67 +166,134 @@ class RateLimiter:
         """
         Returns True if message can be processed successfully, false if a rate limit is passed.
         """
-
-        current_minute = int(time.time() // self.reset_seconds)
-        if current_minute != self.current_minute:
-            self.current_minute = current_minute
-            self.message_counts = Counter()
-            self.message_cumulative_sizes = Counter()
-            self.non_tx_message_counts = 0
-            self.non_tx_cumulative_size = 0
-        try:
-            message_type = ProtocolMessageTypes(message.type)
-        except Exception as e:
-            log.warning(f"Invalid message: {message.type}, {e}")
+        if message.type not in _message_type_values:
+            log.warning(f"Invalid message: {message.type}")
             return True
 
-        new_message_counts: int = self.message_counts[message_type] + 1
-        new_cumulative_size: int = self.message_cumulative_sizes[message_type] + len(message.data)
-        new_non_tx_count: int = self.non_tx_message_counts
-        new_non_tx_size: int = self.non_tx_cumulative_size
-        proportion_of_limit: float = self.percentage_of_limit / 100
-
-        ret: bool = False
-        rate_limits = get_rate_limits_to_use(our_capabilities, peer_capabilities)
-
-        try:
-
-            limits: RLSettings = rate_limits["default_settings"]
-            if message_type in rate_limits["rate_limits_tx"]:
-                limits = rate_limits["rate_limits_tx"][message_type]
-            elif message_type in rate_limits["rate_limits_other"]:
-                limits = rate_limits["rate_limits_other"][message_type]
-                non_tx_freq = rate_limits["non_tx_freq"]
-                non_tx_max_total_size = rate_limits["non_tx_max_total_size"]
-                new_non_tx_count = self.non_tx_message_counts + 1
-                new_non_tx_size = self.non_tx_cumulative_size + len(message.data)
-                if new_non_tx_count > non_tx_freq * proportion_of_limit:
-                    return False
-                if new_non_tx_size > non_tx_max_total_size * proportion_of_limit:
-                    return False
-            else:
-                log.warning(f"Message type {message_type} not found in rate limits")
-
-            if limits.max_total_size is None:
-                limits = dataclasses.replace(limits, max_total_size=limits.frequency * limits.max_size)
-            assert limits.max_total_size is not None
-
-            if new_message_counts > limits.frequency * proportion_of_limit:
-                return False
-            if len(message.data) > limits.max_size:
-                return False
-            if new_cumulative_size > limits.max_total_size * proportion_of_limit:
-                return False
-
-            ret = True
+        table = self._resolve_table(our_capabilities, peer_capabilities)
+        limits = table.limits.get(message.type)
+        if limits is None:
+            log.warning(f"Message type {ProtocolMessageTypes(message.type)} not found in rate limits")
+            limits = table.default_limits
+
+        now = time.monotonic()
+        size = len(message.data)
+        bucket_pairs = [self._buckets(message.type, limits, now)]
+        if limits.non_tx:
+            bucket_pairs.append(self._non_tx_buckets(table, now))
+        allowed = size <= limits.max_size and all(
+            count_bucket.available(1) and size_bucket.available(size) for count_bucket, size_bucket in bucket_pairs
+        )
+
+        if self.incoming or allowed:
+            # Now that we determined that it's OK to send the message, consume the tokens. Alternatively, if this was
+            # an incoming message, we already received it and it should consume the tokens unconditionally.
+            for count_bucket, size_bucket in bucket_pairs:
+                count_bucket.consume(1)
+                size_bucket.consume(size)
+        return allowed
+
+
+@dataclasses.dataclass
+class BudgetStatistics:
+    allowed: int = 0
+    rejected: int = 0
+
+
+class RequestBudget:
+    """
+    Limits costly requests across all peers, a request needs a token from the global bucket of its message type and
+    from the bucket of the peer. The peer buckets only hold `peer_share_percent` of the global limit, so that a single
+    peer can't use up the whole budget. The usage of a peer is kept for a period after it disconnected, so that it
+    can't get a fresh share by reconnecting.
+    """
+
+    _period: int
+    _peer_share_percent: int
+    _limits: Dict[int, int]
+    _buckets: Dict[int, TokenBucket]
+    _peer_buckets: Dict[bytes32, Dict[int, TokenBucket]]
+    _disconnected: Dict[bytes32, float]
+    _statistics: Dict[int, BudgetStatistics]
+
+    def __init__(self, limits: Dict[ProtocolMessageTypes, int], peer_share_percent: int, period: int = 60) -> None:
+        self._period = period
+        self._peer_share_percent = peer_share_percent
+        self._limits = {message_type.value: limit for message_type, limit in limits.items()}
+        now = time.monotonic()
+        self._buckets = {
+            message_type: TokenBucket.create(limit, period, now) for message_type, limit in self._limits.items()
+        }
+        self._peer_buckets = {}
+        self._disconnected = {}
+        self._statistics = {message_type: BudgetStatistics() for message_type in self._limits}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> RequestBudget:
+        limits = {
+            ProtocolMessageTypes[name]: int(limit)
+            for name, limit in config.get("limits", default_request_budget["limits"]).items()
+        }
+        return cls(limits, int(config.get("peer_share_percent", default_request_budget["peer_share_percent"])))
+
+    def process_request(self, message_type: int, peer_id: bytes32) -> bool:
+        """
+        Returns True if the request can be processed, message types without a budget are always allowed.
+        """
+        bucket = self._buckets.get(message_type)
+        if bucket is None:
             return True
-        finally:
-            if self.incoming or ret:
-                # now that we determined that it's OK to send the message, commit the
-                # updates to the counters. Alternatively, if this was an
-                # incoming message, we already received it and it should
-                # increment the counters unconditionally
-                self.message_counts[message_type] = new_message_counts
-                self.message_cumulative_sizes[message_type] = new_cumulative_size
-                self.non_tx_message_counts = new_non_tx_count
-                self.non_tx_cumulative_size = new_non_tx_size
+        now = time.monotonic()
+        bucket.refill(now)
+        self._disconnected.pop(peer_id, None)
+        peer_buckets = self._peer_buckets.setdefault(peer_id, {})
+        peer_bucket = peer_buckets.get(message_type)
+        if peer_bucket is None:
+            peer_capacity = self._limits[message_type] * self._peer_share_percent / 100
+            peer_bucket = TokenBucket.create(peer_capacity, self._period, now)
+            peer_buckets[message_type] = peer_bucket
+        else:
+            peer_bucket.refill(now)
+        statistics = self._statistics[message_type]
+        if not bucket.available(1) or not peer_bucket.available(1):
+            statistics.rejected += 1
+            return False
+        bucket.consume(1)
+        peer_bucket.consume(1)
+        statistics.allowed += 1
+        return True
+
+    def remove_peer(self, peer_id: bytes32) -> None:
+        now = time.monotonic()
+        if peer_id in self._peer_buckets:
+            self._disconnected.pop(peer_id, None)
+            self._disconnected[peer_id] = now
+        self._prune_disconnected(now)
+
+    def _prune_disconnected(self, now: float) -> None:
+        # The buckets of a peer are full again one period after its last request, at that point they are the same as
+        # new ones. `_disconnected` is ordered by the time of the disconnect.
+        for peer_id, disconnected in list(self._disconnected.items()):
+            if now - disconnected < self._period:
+                break
+            del self._disconnected[peer_id]
+            self._peer_buckets.pop(peer_id, None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self._prune_disconnected(now)
+        budgets = []
+        for message_type, bucket in self._buckets.items():
+            bucket.refill(now)
+            statistics = self._statistics[message_type]
+            budgets.append(
+                {
+                    "message_type": ProtocolMessageTypes(message_type).name,
+                    "limit": self._limits[message_type],
+                    "available": int(bucket.tokens),
+                    "allowed": statistics.allowed,
+                    "rejected": statistics.rejected,
+                    "peers": sum(1 for buckets in self._peer_buckets.values() if message_type in buckets),
+                }
+            )
+        return {"period": self._period, "peer_share_percent": self._peer_share_percent, "budgets": budgets}
@@ -29,7 +29,8 @@ from chia.protocols.protocol_state_machine import message_requires_reply
 from chia.protocols.protocol_timing import INVALID_PROTOCOL_BAN_SECONDS
 from chia.protocols.shared_protocol import protocol_version
 from chia.server.introducer_peers import IntroducerPeers
-from chia.server.outbound_message import Message, NodeType
+from chia.server.outbound_message import EncodedMessage, Message, NodeType
+from chia.server.rate_limits import RequestBudget
 from chia.server.ssl_context import private_ssl_paths, public_ssl_paths
 from chia.server.ws_connection import ConnectionCallback, WSChiaConnection
 from chia.types.blockchain_format.sized_bytes import bytes32
@@ -131,6 +132,7 @@ class ChiaServer:
     ssl_client_context: ssl.SSLContext
     node_id: bytes32
     exempt_peer_networks: List[Union[IPv4Network, IPv6Network]]
+    request_budget: RequestBudget
     all_connections: Dict[bytes32, WSChiaConnection] = field(default_factory=dict)
     on_connect: Optional[ConnectionCallback] = None
     shut_down_event: asyncio.Event = field(default_factory=asyncio.Event)
@@ -141,6 +143,8 @@ class ChiaServer:
     received_message_callback: Optional[ConnectionCallback] = None
     banned_peers: Dict[str, float] = field(default_factory=dict)
     invalid_protocol_ban_seconds = INVALID_PROTOCOL_BAN_SECONDS
+    # Broadcasts get dropped for peers with more messages than this in their outgoing queue
+    max_broadcast_queue_size = 1000
 
     @classmethod
     def create(
@@ -223,6 +227,7 @@ class ChiaServer:
             ssl_client_context=ssl_client_context,
             node_id=calculate_node_id(node_id_cert_path),
             exempt_peer_networks=[ip_network(net, strict=False) for net in config.get("exempt_peer_networks", [])],
+            request_budget=RequestBudget.from_config(config.get("request_budget", {})),
             introducer_peers=IntroducerPeers() if local_type is NodeType.INTRODUCER else None,
         )
 
@@ -323,6 +328,7 @@ class ChiaServer:
                 self._inbound_rate_limit_percent,
                 self._outbound_rate_limit_percent,
                 self._local_capabilities_for_handshake,
+                request_budget=self.request_budget,
             )
             await connection.perform_handshake(self._network_id, protocol_version, self._port, self._local_type)
             assert connection.connection_type is not None, "handshake failed to set connection type, still None"
@@ -474,6 +480,7 @@ class ChiaServer:
                 self._outbound_rate_limit_percent,
                 self._local_capabilities_for_handshake,
                 session=session,
+                request_budget=self.request_budget,
             )
             await connection.perform_handshake(self._network_id, protocol_version, self._port, self._local_type)
             await self.connection_added(connection, on_connect)
@@ -531,6 +538,7 @@ class ChiaServer:
 
         if connection.peer_node_id in self.all_connections:
             self.all_connections.pop(connection.peer_node_id)
+            self.request_budget.remove_peer(connection.peer_node_id)
 
         if not closed_connection:
             self.log.info(f"Connection closed: {connection.peer_host}, node id: {connection.peer_node_id}")
@@ -552,12 +560,14 @@ class ChiaServer:
         node_type: NodeType,
         origin_peer: WSChiaConnection,
     ) -> None:
-        for node_id, connection in self.all_connections.items():
-            if node_id == origin_peer.peer_node_id:
-                continue
-            if connection.connection_type is node_type:
-                for message in messages:
-                    await connection.send_message(message)
+        self._broadcast(
+            messages,
+            [
+                connection
+                for node_id, connection in self.all_connections.items()
+                if node_id != origin_peer.peer_node_id and connection.connection_type is node_type
+            ],
+        )
 
     async def validate_broadcast_message_type(self, messages: List[Message], node_type: NodeType) -> None:
         for message in messages:
@@ -580,10 +590,25 @@ class ChiaServer:
         exclude: Optional[bytes32] = None,
     ) -> None:
         await self.validate_broadcast_message_type(messages, node_type)
-        for _, connection in self.all_connections.items():
-            if connection.connection_type is node_type and connection.peer_node_id != exclude:
-                for message in messages:
-                    await connection.send_message(message)
+        self._broadcast(
+            messages,
+            [
+                connection
+                for connection in self.all_connections.values()
+                if connection.connection_type is node_type and connection.peer_node_id != exclude
+            ],
+        )
+
+    def _broadcast(self, messages: List[Message], connections: List[WSChiaConnection]) -> None:
+        """
+        Serializes the messages once and queues the shared buffers for all connections without waiting for any of
+        them. Peers which don't keep up with their outgoing queue miss the broadcast instead of holding it up.
+        """
+        if len(connections) == 0:
+            return
+        encoded_messages = [EncodedMessage.from_message(message) for message in messages]
+        for connection in connections:
+            connection.queue_broadcast(encoded_messages, self.max_broadcast_queue_size)
 
     async def send_to_specific(self, messages: List[Message], node_id: bytes32) -> None:
         if node_id in self.all_connections:
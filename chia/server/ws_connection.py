@@ -19,9 +19,17 @@ from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.protocols.protocol_state_machine import message_requires_reply, message_response_ok
 from chia.protocols.protocol_timing import API_EXCEPTION_BAN_SECONDS, INTERNAL_PROTOCOL_ERROR_BAN_SECONDS
 from chia.protocols.shared_protocol import Capability, Handshake
-from chia.server.capabilities import known_active_capabilities
-from chia.server.outbound_message import Message, NodeType, make_msg
-from chia.server.rate_limits import RateLimiter
+from chia.server.capabilities import chunking_negotiated, compression_negotiated, known_active_capabilities
+from chia.server.message_chunking import CHUNK_SIZE, ChunkAssembler, split_message
+from chia.server.message_compression import (
+    EXECUTOR_THRESHOLD,
+    compress_message,
+    decompress_message,
+    should_compress,
+)
+from chia.server.outbound_message import EncodedMessage, Message, NodeType, make_msg
+from chia.server.outgoing_queue import MessagePriority, OutgoingItem, OutgoingQueue, message_priority
+from chia.server.rate_limits import RateLimiter, RequestBudget
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.peer_info import PeerInfo
 from chia.util.api_decorators import get_metadata
@@ -73,6 +81,8 @@ class WSChiaConnection:
     close_callback: Optional[ConnectionClosedCallbackProtocol]
     outbound_rate_limiter: RateLimiter
     inbound_rate_limiter: RateLimiter
+    # Shared by all connections of the server
+    request_budget: Optional[RequestBudget]
 
     # connection properties
     is_outbound: bool
@@ -80,7 +90,8 @@ class WSChiaConnection:
     # Messaging
     received_message_callback: Optional[ConnectionCallback]
     incoming_queue: asyncio.Queue[Message] = field(default_factory=asyncio.Queue)
-    outgoing_queue: asyncio.Queue[Message] = field(default_factory=asyncio.Queue)
+    outgoing_queue: OutgoingQueue = field(default_factory=OutgoingQueue)
+    chunk_assembler: ChunkAssembler = field(default_factory=ChunkAssembler)
     api_tasks: Dict[bytes32, asyncio.Task[None]] = field(default_factory=dict)
     # Contains task ids of api tasks which should not be canceled
     execute_tasks: Set[bytes32] = field(default_factory=set)
@@ -90,6 +101,8 @@ class WSChiaConnection:
     bytes_read: int = 0
     bytes_written: int = 0
     last_message_time: float = 0
+    # Broadcast messages which were dropped because the outgoing queue was full
+    broadcast_messages_dropped: int = 0
 
     peer_server_port: Optional[uint16] = None
     inbound_task: Optional[asyncio.Task[None]] = None
@@ -126,6 +139,7 @@ class WSChiaConnection:
         outbound_rate_limit_percent: int,
         local_capabilities_for_handshake: List[Tuple[uint16, str]],
         session: Optional[ClientSession] = None,
+        request_budget: Optional[RequestBudget] = None,
     ) -> WSChiaConnection:
 
         assert ws._writer is not None
@@ -156,6 +170,7 @@ class WSChiaConnection:
             request_nonce=request_nonce,
             outbound_rate_limiter=RateLimiter(incoming=False, percentage_of_limit=outbound_rate_limit_percent),
             inbound_rate_limiter=RateLimiter(incoming=True, percentage_of_limit=inbound_rate_limit_percent),
+            request_budget=request_budget,
             is_outbound=is_outbound,
             received_message_callback=received_message_callback,
             session=session,
@@ -230,6 +245,8 @@ class WSChiaConnection:
             if inbound_handshake.network_id != network_id:
                 raise ProtocolError(Err.INCOMPATIBLE_NETWORK_ID)
             await self._send_message(outbound_handshake)
+            self.version = inbound_handshake.software_version
+            self.protocol_version = inbound_handshake.protocol_version
             self.peer_server_port = inbound_handshake.server_port
             self.connection_type = NodeType(inbound_handshake.node_type)
             # "1" means capability is enabled
@@ -312,9 +329,7 @@ class WSChiaConnection:
     async def outbound_handler(self) -> None:
         try:
             while not self.closed:
-                msg = await self.outgoing_queue.get()
-                if msg is not None:
-                    await self._send_message(msg)
+                await self._send_outgoing(await self.outgoing_queue.get())
         except asyncio.CancelledError:
             pass
         except Exception as e:
@@ -449,6 +464,24 @@ class WSChiaConnection:
         await self.outgoing_queue.put(message)
         return True
 
+    def queue_broadcast(self, messages: List[EncodedMessage], max_queue_size: int) -> bool:
+        """
+        Queues already serialized broadcast messages without waiting. If the outgoing queue of this connection already
+        holds `max_queue_size` messages, the peer is not keeping up and the messages get dropped for it.
+        """
+        if self.closed:
+            return False
+        if self.outgoing_queue.qsize() + len(messages) > max_queue_size:
+            self.broadcast_messages_dropped += len(messages)
+            self.log.debug(
+                f"Dropping {len(messages)} broadcast messages for {self.peer_host}, "
+                f"outgoing queue size: {self.outgoing_queue.qsize()}"
+            )
+            return False
+        for message in messages:
+            self.outgoing_queue.put_nowait(message)
+        return True
+
     async def call_api(
         self,
         request_method: Callable[..., Awaitable[Optional[Message]]],
@@ -531,7 +564,13 @@ class WSChiaConnection:
         for message in messages:
             await self.outgoing_queue.put(message)
 
-    async def _wait_and_retry(self, msg: Message) -> None:
+    async def _send_outgoing(self, item: OutgoingItem) -> None:
+        if isinstance(item, EncodedMessage):
+            await self._send_message(item.message, item.encoded)
+        else:
+            await self._send_message(item)
+
+    async def _wait_and_retry(self, msg: OutgoingItem) -> None:
         try:
             await asyncio.sleep(1)
             await self.outgoing_queue.put(msg)
@@ -539,10 +578,7 @@ class WSChiaConnection:
             self.log.debug(f"Exception {e} while waiting to retry sending rate limited message")
             return None
 
-    async def _send_message(self, message: Message) -> None:
-        encoded: bytes = bytes(message)
-        size = len(encoded)
-        assert len(encoded) < (2 ** (LENGTH_BYTES * 8))
+    async def _send_message(self, message: Message, encoded: Optional[bytes] = None) -> None:
         if not self.outbound_rate_limiter.process_msg_and_check(
             message, self.local_capabilities, self.peer_capabilities
         ):
@@ -554,7 +590,9 @@ class WSChiaConnection:
 
                 # TODO: fix this special case. This function has rate limits which are too low.
                 if ProtocolMessageTypes(message.type) != ProtocolMessageTypes.respond_peers:
-                    asyncio.create_task(self._wait_and_retry(message))
+                    asyncio.create_task(
+                        self._wait_and_retry(message if encoded is None else EncodedMessage(message, encoded))
+                    )
 
                 return None
             else:
@@ -563,9 +601,35 @@ class WSChiaConnection:
                     f"peer: {self.peer_host}"
                 )
 
-        await self.ws.send_bytes(encoded)
+        # The rate limits above apply to the uncompressed message
+        if should_compress(message) and compression_negotiated(self.local_capabilities, self.peer_capabilities):
+            if len(message.data) > EXECUTOR_THRESHOLD:
+                compressed = await asyncio.get_running_loop().run_in_executor(None, compress_message, message)
+            else:
+                compressed = compress_message(message)
+            encoded = bytes(compressed)
+        elif encoded is None:
+            encoded = bytes(message)
+        size = len(encoded)
+        assert len(encoded) < (2 ** (LENGTH_BYTES * 8))
+        if (
+            size > CHUNK_SIZE
+            and message_priority(message.type) == MessagePriority.BULK
+            and chunking_negotiated(self.local_capabilities, self.peer_capabilities)
+        ):
+            for chunk in split_message(encoded):
+                await self.ws.send_bytes(chunk)
+                self.bytes_written += len(chunk)
+                # Let more important messages which got queued in the meantime go out between the chunks
+                while True:
+                    item = self.outgoing_queue.get_nowait(MessagePriority.NORMAL)
+                    if item is None:
+                        break
+                    await self._send_outgoing(item)
+        else:
+            await self.ws.send_bytes(encoded)
+            self.bytes_written += size
         self.log.debug(f"-> {ProtocolMessageTypes(message.type).name} to peer {self.peer_host} {self.peer_node_id}")
-        self.bytes_written += size
 
     async def _read_one_message(self) -> Optional[Message]:
         try:
@@ -608,6 +672,33 @@ class WSChiaConnection:
             full_message_loaded: Message = Message.from_bytes(data)
             self.bytes_read += len(data)
             self.last_message_time = time.time()
+            if full_message_loaded.type == ProtocolMessageTypes.message_chunk.value:
+                try:
+                    if not chunking_negotiated(self.local_capabilities, self.peer_capabilities):
+                        raise ValueError("Chunked messages not negotiated")
+                    reassembled = self.chunk_assembler.add(full_message_loaded)
+                except Exception as e:
+                    asyncio.create_task(self.ban_peer_bad_protocol(f"Invalid message chunk: {e}"))
+                    await asyncio.sleep(3)
+                    return None
+                if reassembled is None:
+                    return None
+                full_message_loaded = reassembled
+            if full_message_loaded.type == ProtocolMessageTypes.compressed_message.value:
+                try:
+                    if not compression_negotiated(self.local_capabilities, self.peer_capabilities):
+                        raise ValueError("Compression not negotiated")
+                    # Rate limits below apply to the uncompressed message
+                    if len(full_message_loaded.data) > EXECUTOR_THRESHOLD:
+                        full_message_loaded = await asyncio.get_running_loop().run_in_executor(
+                            None, decompress_message, full_message_loaded
+                        )
+                    else:
+                        full_message_loaded = decompress_message(full_message_loaded)
+                except Exception as e:
+                    asyncio.create_task(self.ban_peer_bad_protocol(f"Invalid compressed message: {e}"))
+                    await asyncio.sleep(3)
+                    return None
             try:
                 message_type = ProtocolMessageTypes(full_message_loaded.type).name
             except Exception:
@@ -630,6 +721,19 @@ class WSChiaConnection:
                         f"port {self.peer_port} but not disconnecting"
                     )
                     return full_message_loaded
+            if (
+                self.request_budget is not None
+                and not is_localhost(self.peer_host)
+                and not self.request_budget.process_request(full_message_loaded.type, self.peer_node_id)
+            ):
+                # Not the fault of this peer, so just skip the request instead of disconnecting
+                self.log.debug(f"Request budget exceeded, skipping {message_type} from {self.peer_host}")
+                if message_requires_reply(ProtocolMessageTypes(full_message_loaded.type)) and self.has_capability(
+                    Capability.NONE_RESPONSE
+                ):
+                    response = Message(uint8(ProtocolMessageTypes.none_response.value), full_message_loaded.id, b"")
+                    await self.send_message(response)
+                return None
             return full_message_loaded
         elif message.type == WSMsgType.ERROR:
             self.log.error(f"WebSocket Error: {message}")
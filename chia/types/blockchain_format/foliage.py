@@ -59,3 +59,6 @@ class Foliage(Streamable):
     foliage_block_data_signature: G2Element
     foliage_transaction_block_hash: Optional[bytes32]
     foliage_transaction_block_signature: Optional[G2Element]
+
+    # Every `header_hash` of full and header blocks hashes the foliage, only its hash is worth keeping
+    serialization_cache_limit = 0
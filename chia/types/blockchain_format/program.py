@@ -13,12 +13,17 @@ from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.spend_bundle_conditions import SpendBundleConditions
 from chia.util.byte_types import hexstr_to_bytes
 from chia.util.hash import std_hash
+from chia.util.streamable import remaining_buffer
 
 from .tree_hash import sha256_treehash
 
 INFINITE_COST = 0x7FFFFFFFFFFFFFFF
 
 
+# Size of the first prefix of the remaining data which `SerializedProgram.parse` tries to get the program length from
+SERIALIZED_LENGTH_WINDOW = 64 * 1024
+
+
 class Program(SExp):
     """
     A thin wrapper around s-expression data intended to be invoked with "eval".
@@ -238,7 +243,18 @@ class SerializedProgram:
 
     @classmethod
     def parse(cls, f) -> "SerializedProgram":
-        length = serialized_length(f.getvalue()[f.tell() :])
+        buf = remaining_buffer(f)
+        # `serialized_length` needs `bytes`, only copy growing prefixes of the buffer instead of everything after the
+        # program, which is most of the message for the generators of `RespondBlocks`
+        window = SERIALIZED_LENGTH_WINDOW
+        while True:
+            try:
+                length = serialized_length(bytes(buf[:window]))
+                break
+            except OSError:
+                if window >= len(buf):
+                    raise
+                window *= 4
         return SerializedProgram.from_bytes(f.read(length))
 
     def stream(self, f):
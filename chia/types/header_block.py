@@ -26,6 +26,9 @@ class HeaderBlock(Streamable):
     transactions_filter: bytes  # Filter for block transactions
     transactions_info: Optional[TransactionsInfo]  # Reward chain foliage data (tx block additional)
 
+    # Header blocks get stored, sent to wallets and put into weight proofs over and over
+    serialization_cache_limit = 1024 * 1024
+
     @property
     def prev_header_hash(self):
         return self.foliage.prev_block_hash
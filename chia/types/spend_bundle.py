@@ -28,6 +28,9 @@ class SpendBundle(Streamable):
     coin_spends: List[CoinSpend]
     aggregated_signature: G2Element
 
+    # The mempool and the peers need the name and the serialization of the same bundles over and over
+    serialization_cache_limit = 1024 * 1024
+
     @property
     def coin_solutions(self):
         return self.coin_spends
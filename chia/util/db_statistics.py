@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import dataclasses
+import functools
+import logging
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, List, Optional
+
+log = logging.getLogger(__name__)
+
+# The upper bounds of the latency histogram buckets in seconds, the last bucket takes everything above
+HISTOGRAM_BUCKETS = [0.0001, 0.0003, 0.001, 0.003, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0]
+SLOW_QUERY_THRESHOLD = 1.0
+# Statements with values formatted into the SQL can create many templates, the ones beyond this get merged
+MAX_TEMPLATES = 1000
+OTHER_TEMPLATE = "<other>"
+
+# All the statistics of this process, for the RPC
+all_statistics: weakref.WeakSet[DBStatistics] = weakref.WeakSet()
+
+_string_literal = re.compile(r"[xX]?'(?:[^']|'')*'")
+_number_literal = re.compile(r"\b\d+(?:\.\d+)?\b")
+_placeholder_list = re.compile(r"\?(?:\s*,\s*\?)+")
+_whitespace = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=4096)
+def statement_template(sql: str) -> str:
+    """
+    Returns `sql` with its literals replaced by `?` and lists of placeholders collapsed into `?...`, so that the
+    statements which only differ in the values they got formatted with share their statistics.
+    """
+    template = _string_literal.sub("?", sql)
+    template = _number_literal.sub("?", template)
+    template = _placeholder_list.sub("?...", template)
+    return _whitespace.sub(" ", template).strip()
+
+
+@dataclasses.dataclass
+class LatencyHistogram:
+    counts: List[int] = dataclasses.field(default_factory=lambda: [0] * (len(HISTOGRAM_BUCKETS) + 1))
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        index = 0
+        while index < len(HISTOGRAM_BUCKETS) and seconds > HISTOGRAM_BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "buckets": [{"le": bound, "count": count} for bound, count in zip([*HISTOGRAM_BUCKETS, None], self.counts)],
+        }
+
+
+@dataclasses.dataclass
+class StatementStatistics:
+    executions: LatencyHistogram = dataclasses.field(default_factory=LatencyHistogram)
+    # The time it took to fetch the rows after executing the statement
+    fetch_total: float = 0.0
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {**self.executions.to_json_dict(), "fetch_total": self.fetch_total}
+
+
+class DBStatistics:
+    """
+    Latency histograms of the statements executed on the connections of a `DBWrapper2`, by statement template, and
+    of the time tasks waited for the write lock or for a read connection. The statements get timed on the threads
+    of the connections, see `InstrumentedConnection`, so they don't include the time a call waits for the thread.
+    Only the statistics with a name are added to `all_statistics`.
+    """
+
+    name: Optional[str]
+    slow_query_threshold: Optional[float]
+    statements: Dict[str, StatementStatistics]
+    writer_lock_wait: LatencyHistogram
+    reader_wait: LatencyHistogram
+    slow_queries: int
+    _lock: threading.Lock
+
+    def __init__(
+        self, name: Optional[str] = None, slow_query_threshold: Optional[float] = SLOW_QUERY_THRESHOLD
+    ) -> None:
+        self.name = name
+        self.slow_query_threshold = slow_query_threshold
+        self._lock = threading.Lock()
+        self.reset()
+        if name is not None:
+            all_statistics.add(self)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.statements = {}
+            self.writer_lock_wait = LatencyHistogram()
+            self.reader_wait = LatencyHistogram()
+            self.slow_queries = 0
+
+    def _statement(self, template: str) -> StatementStatistics:
+        statement = self.statements.get(template)
+        if statement is None:
+            if len(self.statements) >= MAX_TEMPLATES:
+                template = OTHER_TEMPLATE
+            statement = self.statements.setdefault(template, StatementStatistics())
+        return statement
+
+    def _check_slow(self, action: str, template: str, seconds: float, connection_name: str) -> None:
+        if self.slow_query_threshold is not None and seconds >= self.slow_query_threshold:
+            self.slow_queries += 1
+            log.warning(f"DB {self.name} ({connection_name}): {action} took {seconds:0.3f}s: {template}")
+
+    def add_execution(self, template: str, seconds: float, connection_name: str) -> None:
+        with self._lock:
+            self._statement(template).executions.add(seconds)
+            self._check_slow("executing", template, seconds, connection_name)
+
+    def add_fetch(self, template: str, seconds: float, connection_name: str) -> None:
+        with self._lock:
+            self._statement(template).fetch_total += seconds
+            self._check_slow("fetching", template, seconds, connection_name)
+
+    def add_writer_lock_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.writer_lock_wait.add(seconds)
+
+    def add_reader_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.reader_wait.add(seconds)
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "slow_query_threshold": self.slow_query_threshold,
+                "slow_queries": self.slow_queries,
+                "writer_lock_wait": self.writer_lock_wait.to_json_dict(),
+                "reader_wait": self.reader_wait.to_json_dict(),
+                "statements": {
+                    template: statement.to_json_dict()
+                    for template, statement in sorted(
+                        self.statements.items(), key=lambda item: item[1].executions.total, reverse=True
+                    )
+                },
+            }
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    connection: InstrumentedConnection
+    _template: str = ""
+
+    def _fetched(self, start: float) -> None:
+        self.connection.statistics.add_fetch(self._template, time.perf_counter() - start, self.connection.name)
+
+    def execute(self, sql: str, parameters: Any = ()) -> InstrumentedCursor:
+        self._template = statement_template(sql)
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self.connection.statistics.add_execution(self._template, time.perf_counter() - start, self.connection.name)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> InstrumentedCursor:
+        self._template = statement_template(sql)
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.statistics.add_execution(self._template, time.perf_counter() - start, self.connection.name)
+        return self
+
+    def fetchone(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._fetched(start)
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Any]:
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._fetched(start)
+
+    def fetchall(self) -> List[Any]:
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._fetched(start)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    A sqlite3 connection which records the statements executed through it in `statistics`. Pass it as `factory` to
+    `sqlite3.connect`, or `aiosqlite.connect`, with `functools.partial` to set `statistics` and `name`.
+    """
+
+    statistics: DBStatistics
+    name: str
+
+    def __init__(self, *args: Any, statistics: DBStatistics, name: str, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.statistics = statistics
+        self.name = name
+
+    def cursor(self, factory: Any = InstrumentedCursor) -> Any:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()) -> InstrumentedCursor:
+        cursor: InstrumentedCursor = self.cursor()
+        return cursor.execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> InstrumentedCursor:
+        cursor: InstrumentedCursor = self.cursor()
+        return cursor.executemany(sql, seq_of_parameters)
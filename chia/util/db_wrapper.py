@@ -3,19 +3,46 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import functools
+import logging
 import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, AsyncIterator, Dict, Iterable, Optional, TextIO, Type, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 import aiosqlite
 from typing_extensions import final
 
+from chia.util.db_statistics import SLOW_QUERY_THRESHOLD, DBStatistics, InstrumentedConnection, all_statistics
+
 if aiosqlite.sqlite_version_info < (3, 32, 0):
     SQLITE_MAX_VARIABLE_NUMBER = 900
 else:
     SQLITE_MAX_VARIABLE_NUMBER = 32700
 
+log = logging.getLogger(__name__)
+
+# how long a task waits for a read connection before the pool opens another one, if it's allowed to grow
+READER_GROW_WAIT = 0.01
+
+_T = TypeVar("_T")
+SQLParameters = Union[Sequence[Any], Dict[str, Any]]
+
 
 async def execute_fetchone(
     c: aiosqlite.Connection, sql: str, parameters: Iterable[Any] = None
@@ -26,13 +53,69 @@ async def execute_fetchone(
     return None
 
 
+async def run_on_connection(c: aiosqlite.Connection, function: Callable[[sqlite3.Connection], _T]) -> _T:
+    """
+    Runs `function` with the underlying sqlite3 connection on the thread of `c` and returns its result. Every awaited
+    call on an aiosqlite connection is a round trip to that thread, this is just one for all the statements `function`
+    executes.
+    """
+    # aiosqlite doesn't expose this, `_execute` is what all its own calls go through. setup.py pins the version of
+    # aiosqlite, see `_check_aiosqlite` for an upgrade
+    return await c._execute(function, c._conn)
+
+
+def _check_aiosqlite() -> None:
+    # Fail at startup rather than on the first write if an aiosqlite upgrade changed what `run_on_connection` uses
+    if not callable(getattr(aiosqlite.Connection, "_execute", None)):
+        raise ImportError(f"aiosqlite {aiosqlite.__version__} is not supported, `run_on_connection` needs `_execute`")
+
+
+_check_aiosqlite()
+
+
+def run_all(c: sqlite3.Connection, functions: Iterable[Callable[[sqlite3.Connection], object]]) -> None:
+    """
+    Calls the `functions` in order, pass it to `run_on_connection` to run a batch of them in one round trip.
+    """
+    for function in functions:
+        function(c)
+
+
+def execute_statements_sync(
+    c: sqlite3.Connection, statements: Sequence[Tuple[str, SQLParameters]]
+) -> List[List[sqlite3.Row]]:
+    results = []
+    for sql, parameters in statements:
+        cursor = c.execute(sql, parameters)
+        try:
+            results.append(cursor.fetchall())
+        finally:
+            cursor.close()
+    return results
+
+
+async def execute_statements(
+    c: aiosqlite.Connection, statements: Sequence[Tuple[str, SQLParameters]]
+) -> List[List[sqlite3.Row]]:
+    """
+    Executes the `(sql, parameters)` statements in order, as one round trip to the thread of `c`, and returns the
+    rows of each of them.
+    """
+    return await run_on_connection(c, functools.partial(execute_statements_sync, statements=statements))
+
+
 async def _create_connection(
     database: Union[str, Path],
     uri: bool = False,
     log_file: Optional[TextIO] = None,
     name: Optional[str] = None,
+    statistics: Optional[DBStatistics] = None,
 ) -> aiosqlite.Connection:
-    connection = await aiosqlite.connect(database=database, uri=uri)
+    if statistics is None:
+        connection = await aiosqlite.connect(database=database, uri=uri)
+    else:
+        factory = functools.partial(InstrumentedConnection, statistics=statistics, name="" if name is None else name)
+        connection = await aiosqlite.connect(database=database, uri=uri, factory=factory)
 
     if log_file is not None:
         await connection.set_trace_callback(functools.partial(sql_trace_callback, file=log_file, name=name))
@@ -40,6 +123,19 @@ async def _create_connection(
     return connection
 
 
+async def set_cache_pragmas(
+    connection: aiosqlite.Connection, cache_size: Optional[int] = None, mmap_size: Optional[int] = None
+) -> None:
+    """
+    Sets the page cache size of `connection`, in pages or, if negative, in KiB, and the number of bytes of the
+    database it memory maps. Leaving them as None keeps the defaults of SQLite.
+    """
+    if cache_size is not None:
+        await (await connection.execute(f"pragma cache_size={int(cache_size)}")).close()
+    if mmap_size is not None:
+        await (await connection.execute(f"pragma mmap_size={int(mmap_size)}")).close()
+
+
 @contextlib.asynccontextmanager
 async def manage_connection(
     database: Union[str, Path],
@@ -75,15 +171,19 @@ class DBWrapper2:
     _read_connections: asyncio.Queue[aiosqlite.Connection]
     _write_connection: aiosqlite.Connection
     _num_read_connections: int
+    _max_read_connections: int
+    _reader_grow_wait: float
+    _create_reader: Optional[Callable[[str], Awaitable[aiosqlite.Connection]]]
     _in_use: Dict[asyncio.Task, aiosqlite.Connection]
     _current_writer: Optional[asyncio.Task]
     _savepoint_name: int
     _log_file: Optional[TextIO]
+    statistics: DBStatistics
 
     async def add_connection(self, c: aiosqlite.Connection) -> None:
         # this guarantees that reader connections can only be used for reading
         assert c != self._write_connection
-        await c.execute("pragma query_only")
+        await (await c.execute("pragma query_only")).close()
         self._read_connections.put_nowait(c)
         self._num_read_connections += 1
 
@@ -92,16 +192,22 @@ class DBWrapper2:
         connection: aiosqlite.Connection,
         db_version: int = 1,
         log_file: Optional[TextIO] = None,
+        statistics: Optional[DBStatistics] = None,
     ) -> None:
         self._read_connections = asyncio.Queue()
         self._write_connection = connection
         self._lock = asyncio.Lock()
         self.db_version = db_version
         self._num_read_connections = 0
+        # the pool only grows beyond the connections added to it if it's been created with a max_reader_count
+        self._max_read_connections = 0
+        self._reader_grow_wait = READER_GROW_WAIT
+        self._create_reader = None
         self._in_use = {}
         self._current_writer = None
         self._savepoint_name = 0
         self._log_file = log_file
+        self.statistics = DBStatistics() if statistics is None else statistics
 
     @classmethod
     async def create(
@@ -111,40 +217,70 @@ class DBWrapper2:
         db_version: int = 1,
         uri: bool = False,
         reader_count: int = 4,
+        max_reader_count: Optional[int] = None,
+        reader_grow_wait: float = READER_GROW_WAIT,
+        cache_size: Optional[int] = None,
+        total_cache_size: Optional[int] = None,
+        mmap_size: Optional[int] = None,
         log_path: Optional[Path] = None,
         journal_mode: str = "WAL",
         synchronous: Optional[str] = None,
         foreign_keys: bool = False,
         row_factory: Optional[Type[aiosqlite.Row]] = None,
+        slow_query_threshold: Optional[float] = SLOW_QUERY_THRESHOLD,
     ) -> DBWrapper2:
+        """
+        Opens the writer and `reader_count` read connections to `database`. If `max_reader_count` is larger than
+        that, tasks which wait more than `reader_grow_wait` seconds for a read connection make the pool open
+        another one, until it has `max_reader_count`. `cache_size` and `mmap_size` set the pragmas of the same name
+        on every connection, see `set_cache_pragmas`. Instead of `cache_size`, `total_cache_size` splits a page cache
+        of that many KiB evenly between the writer and the most readers the pool can have.
+        """
+        max_reader_count = reader_count if max_reader_count is None else max(reader_count, max_reader_count)
+        if cache_size is None and total_cache_size is not None:
+            cache_size = -max(total_cache_size // (max_reader_count + 1), 1)
         if log_path is None:
             log_file = None
         else:
             log_file = log_path.open("a", encoding="utf-8")
-        write_connection = await _create_connection(database=database, uri=uri, log_file=log_file, name="writer")
+        statistics = DBStatistics(name=str(database), slow_query_threshold=slow_query_threshold)
+        write_connection = await _create_connection(
+            database=database, uri=uri, log_file=log_file, name="writer", statistics=statistics
+        )
         await (await write_connection.execute(f"pragma journal_mode={journal_mode}")).close()
         if synchronous is not None:
             await (await write_connection.execute(f"pragma synchronous={synchronous}")).close()
 
         await (await write_connection.execute(f"pragma foreign_keys={'ON' if foreign_keys else 'OFF'}")).close()
+        await set_cache_pragmas(write_connection, cache_size=cache_size, mmap_size=mmap_size)
 
         write_connection.row_factory = row_factory
 
-        self = cls(connection=write_connection, db_version=db_version, log_file=log_file)
+        self = cls(connection=write_connection, db_version=db_version, log_file=log_file, statistics=statistics)
 
-        for index in range(reader_count):
+        async def create_reader(name: str) -> aiosqlite.Connection:
             read_connection = await _create_connection(
                 database=database,
                 uri=uri,
                 log_file=log_file,
-                name=f"reader-{index}",
+                name=name,
+                statistics=statistics,
             )
             read_connection.row_factory = row_factory
-            await self.add_connection(c=read_connection)
+            await set_cache_pragmas(read_connection, cache_size=cache_size, mmap_size=mmap_size)
+            return read_connection
+
+        for index in range(reader_count):
+            await self.add_connection(c=await create_reader(f"reader-{index}"))
+
+        self._max_read_connections = max_reader_count
+        self._reader_grow_wait = reader_grow_wait
+        self._create_reader = create_reader
 
         return self
 
     async def close(self) -> None:
+        all_statistics.discard(self.statistics)
         try:
             while self._num_read_connections > 0:
                 await (await self._read_connections.get()).close()
@@ -154,6 +290,53 @@ class DBWrapper2:
             if self._log_file is not None:
                 self._log_file.close()
 
+    @property
+    def reader_count(self) -> int:
+        return self._num_read_connections
+
+    async def _get_read_connection(self) -> aiosqlite.Connection:
+        if self._create_reader is None or self._num_read_connections >= self._max_read_connections:
+            return await self._read_connections.get()
+
+        try:
+            return self._read_connections.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+
+        # not `asyncio.wait_for`, before Python 3.12 it loses the connection if the get completes as it times out or
+        # gets cancelled
+        getter = asyncio.ensure_future(self._read_connections.get())
+        try:
+            await asyncio.wait({getter}, timeout=self._reader_grow_wait)
+        except BaseException:
+            if getter.done() and not getter.cancelled():
+                self._read_connections.put_nowait(getter.result())
+            else:
+                getter.cancel()
+            raise
+        if getter.done():
+            return getter.result()
+        # the get didn't take a connection yet, cancelling it leaves them all in the queue
+        getter.cancel()
+
+        # other tasks may have grown the pool while we were waiting
+        if self._num_read_connections >= self._max_read_connections:
+            return await self._read_connections.get()
+
+        # count the connection before opening it, so concurrent waiters don't open more than the maximum
+        self._num_read_connections += 1
+        try:
+            c = await self._create_reader(f"reader-{self._num_read_connections - 1}")
+            await (await c.execute("pragma query_only")).close()
+        except BaseException:
+            self._num_read_connections -= 1
+            raise
+        log.info(
+            f"DB {self.statistics.name}: opened read connection {self._num_read_connections} "
+            f"of at most {self._max_read_connections}"
+        )
+        return c
+
     def _next_savepoint(self) -> str:
         name = f"s{self._savepoint_name}"
         self._savepoint_name += 1
@@ -193,7 +376,9 @@ class DBWrapper2:
                 yield self._write_connection
             return
 
+        wait_start = time.perf_counter()
         async with self._lock:
+            self.statistics.add_writer_lock_wait(time.perf_counter() - wait_start)
             async with self._savepoint_ctx():
                 self._current_writer = task
                 try:
@@ -217,7 +402,9 @@ class DBWrapper2:
             yield self._write_connection
             return
 
+        wait_start = time.perf_counter()
         async with self._lock:
+            self.statistics.add_writer_lock_wait(time.perf_counter() - wait_start)
             async with self._savepoint_ctx():
                 self._current_writer = task
                 try:
@@ -262,7 +449,9 @@ class DBWrapper2:
         if task in self._in_use:
             yield self._in_use[task]
         else:
-            c = await self._read_connections.get()
+            wait_start = time.perf_counter()
+            c = await self._get_read_connection()
+            self.statistics.add_reader_wait(time.perf_counter() - wait_start)
             try:
                 # record our connection in this dict to allow nested calls in
                 # the same task to use the same connection
@@ -2,12 +2,25 @@ from __future__ import annotations
 
 import dataclasses
 import json
-from typing import Any
+from json.encoder import INFINITY, encode_basestring_ascii
+from typing import Any, Callable, Dict, List, Optional, Type
 
 from aiohttp import web
+from typing_extensions import get_args
 
+from chia.util.streamable import (
+    Streamable,
+    create_function,
+    is_type_List,
+    is_type_SpecificOptional,
+    is_type_Tuple,
+    recurse_jsonify,
+    unhashable_types,
+)
 from chia.wallet.util.wallet_types import WalletType
 
+JSONEncodeFunction = Callable[[Any, List[str]], None]
+
 
 class EnhancedJSONEncoder(json.JSONEncoder):
     """
@@ -26,12 +39,232 @@ class EnhancedJSONEncoder(json.JSONEncoder):
         return super().default(o)
 
 
+@dataclasses.dataclass(frozen=True)
+class JSONStreamable:
+    """
+    Encodes into the same json as `item.to_json_dict()` updated with `extra_fields`, without building the dict first.
+    """
+
+    item: Streamable
+    extra_fields: Dict[str, Any]
+
+
+@dataclasses.dataclass(frozen=True)
+class StreamableEncoder:
+    encode: JSONEncodeFunction
+    field_encoders: Dict[str, JSONEncodeFunction]
+
+
+# The encoders of the streamable classes, generated when they get encoded the first time
+streamable_encoders: Dict[Type[Any], StreamableEncoder] = {}
+default_encoder = EnhancedJSONEncoder()
+
+
+def encode_float(o: float) -> str:
+    if o != o:
+        return "NaN"
+    if o == INFINITY:
+        return "Infinity"
+    if o == -INFINITY:
+        return "-Infinity"
+    return float.__repr__(o)
+
+
+def encode_key(key: Any) -> str:
+    if isinstance(key, str):
+        return encode_basestring_ascii(key)
+    if isinstance(key, float):
+        return f'"{encode_float(key)}"'
+    if key is True:
+        return '"true"'
+    if key is False:
+        return '"false"'
+    if key is None:
+        return '"null"'
+    if isinstance(key, int):
+        return f'"{int.__repr__(key)}"'
+    raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+
+
+def encode_items(items: Any, encode_item: JSONEncodeFunction, out: List[str]) -> None:
+    if len(items) == 0:
+        out.append("[]")
+        return
+    separator = "["
+    for item in items:
+        out.append(separator)
+        encode_item(item, out)
+        separator = ", "
+    out.append("]")
+
+
+def encode_tuple(items: Any, encode_items: List[JSONEncodeFunction], out: List[str]) -> None:
+    if len(encode_items) == 0:
+        out.append("[]")
+        return
+    separator = "["
+    for item, encode_item in zip(items, encode_items):
+        out.append(separator)
+        encode_item(item, out)
+        separator = ", "
+    out.append("]")
+
+
+def encode_dict(o: Dict[Any, Any], out: List[str]) -> None:
+    if len(o) == 0:
+        out.append("{}")
+        return
+    separator = "{"
+    for key, value in sorted(o.items()):
+        out.append(f"{separator}{encode_key(key)}: ")
+        encode_value(value, out)
+        separator = ", "
+    out.append("}")
+
+
+def encode_value(o: Any, out: List[str]) -> None:
+    """
+    Appends the json of `o` to `out`, the same json `json.dumps(o, cls=EnhancedJSONEncoder, sort_keys=True)` returns.
+    """
+    if isinstance(o, str):
+        out.append(encode_basestring_ascii(o))
+    elif o is None:
+        out.append("null")
+    elif o is True:
+        out.append("true")
+    elif o is False:
+        out.append("false")
+    elif isinstance(o, int):
+        out.append(int.__repr__(o))
+    elif isinstance(o, float):
+        out.append(encode_float(o))
+    elif isinstance(o, (list, tuple)):
+        encode_items(o, encode_value, out)
+    elif isinstance(o, dict):
+        encode_dict(o, out)
+    elif isinstance(o, Streamable) and type(o).to_json_dict is Streamable.to_json_dict:
+        get_streamable_encoder(type(o)).encode(o, out)
+    elif isinstance(o, JSONStreamable):
+        encode_json_streamable(o, out)
+    else:
+        encode_value(default_encoder.default(o), out)
+
+
+def encode_json_streamable(o: JSONStreamable, out: List[str]) -> None:
+    if type(o.item).to_json_dict is not Streamable.to_json_dict:
+        encode_dict({**o.item.to_json_dict(), **o.extra_fields}, out)
+        return
+    field_encoders = get_streamable_encoder(type(o.item)).field_encoders
+    separator = "{"
+    for name in sorted({*field_encoders, *o.extra_fields}):
+        out.append(f"{separator}{encode_key(name)}: ")
+        if name in o.extra_fields:
+            encode_value(o.extra_fields[name], out)
+        else:
+            field_encoders[name](getattr(o.item, name), out)
+        separator = ", "
+    out.append("}" if separator == ", " else "{}")
+
+
+def encode_jsonified(item: Any, out: List[str]) -> None:
+    encode_value(recurse_jsonify(item), out)
+
+
+def encode_bytes(item: Any, out: List[str]) -> None:
+    out.append(f'"0x{bytes(item).hex()}"')
+
+
+def function_to_encode_one_item(f_type: Type[Any]) -> JSONEncodeFunction:
+    """
+    Returns the function which encodes an item of the given type the same way as `recurse_jsonify` followed by
+    `encode_value` does.
+    """
+    if is_type_SpecificOptional(f_type):
+        encode_inner = function_to_encode_one_item(get_args(f_type)[0])
+        return lambda item, out: out.append("null") if item is None else encode_inner(item, out)
+    if is_type_List(f_type) and len(get_args(f_type)) == 1:
+        encode_inner = function_to_encode_one_item(get_args(f_type)[0])
+        return lambda items, out: encode_items(items, encode_inner, out)
+    if is_type_Tuple(f_type) and len(get_args(f_type)) > 0 and Ellipsis not in get_args(f_type):
+        encode_inner_items = [function_to_encode_one_item(arg) for arg in get_args(f_type)]
+        return lambda items, out: encode_tuple(items, encode_inner_items, out)
+    if not isinstance(f_type, type):
+        return encode_jsonified
+    if issubclass(f_type, Streamable):
+        return get_streamable_encoder(f_type).encode
+    if dataclasses.is_dataclass(f_type):
+        return encode_jsonified
+    if f_type.__name__ in unhashable_types or issubclass(f_type, bytes):
+        return encode_bytes
+    if f_type is bool:
+        return lambda item, out: out.append("true" if item else "false")
+    if issubclass(f_type, int):
+        return lambda item, out: out.append(int.__repr__(item))
+    if f_type is str:
+        return lambda item, out: out.append(encode_basestring_ascii(item))
+    if hasattr(f_type, "to_json_dict"):
+        return lambda item, out: encode_value(item.to_json_dict(), out)
+    return encode_jsonified
+
+
+def inline_expression(f_type: Type[Any], value: str) -> Optional[str]:
+    """
+    Returns the expression which encodes `value` of the given type for the generated encoders, if there is one.
+    """
+    if not isinstance(f_type, type) or dataclasses.is_dataclass(f_type):
+        return None
+    if f_type.__name__ in unhashable_types:
+        return f"'\"0x' + bytes({value}).hex() + '\"'"
+    if issubclass(f_type, bytes):
+        return f"'\"0x' + {value}.hex() + '\"'"
+    if f_type is bool:
+        return f'("true" if {value} else "false")'
+    if issubclass(f_type, int):
+        return f"int_repr({value})"
+    if f_type is str:
+        return f"encode_str({value})"
+    return None
+
+
+def create_streamable_encoder(cls: Type[Streamable]) -> StreamableEncoder:
+    """
+    Generates the encoder of a streamable class which appends the json of its fields in sorted order, with the
+    fields of the types with an `inline_expression` encoded without a function call.
+    """
+    namespace: Dict[str, Any] = {"int_repr": int.__repr__, "encode_str": encode_basestring_ascii}
+    field_encoders: Dict[str, JSONEncodeFunction] = {}
+    body = []
+    separator = "{"
+    for index, field in enumerate(sorted(cls.streamable_fields(), key=lambda field: field.name)):
+        field_encoders[field.name] = function_to_encode_one_item(field.type)
+        prefix = repr(f"{separator}{encode_key(field.name)}: ")
+        expression = inline_expression(field.type, f"obj.{field.name}")
+        if expression is None:
+            namespace[f"encode_{index}"] = field_encoders[field.name]
+            body += [f"out.append({prefix})", f"encode_{index}(obj.{field.name}, out)"]
+        else:
+            body.append(f"out.append({prefix} + {expression})")
+        separator = ", "
+    body.append(f"out.append({'}' if separator == ', ' else '{}'!r})")
+    encode = create_function(cls, "encode_json", "obj, out", body, namespace)
+    return StreamableEncoder(encode, field_encoders)
+
+
+def get_streamable_encoder(cls: Type[Streamable]) -> StreamableEncoder:
+    encoder = streamable_encoders.get(cls)
+    if encoder is None:
+        encoder = create_streamable_encoder(cls)
+        streamable_encoders[cls] = encoder
+    return encoder
+
+
 def dict_to_json_str(o: Any) -> str:
     """
     Converts a python object into json.
     """
-    json_str = json.dumps(o, cls=EnhancedJSONEncoder, sort_keys=True)
-    return json_str
+    out: List[str] = []
+    encode_value(o, out)
+    return "".join(out)
 
 
 def obj_to_response(o: Any) -> web.Response:
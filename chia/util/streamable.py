@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import dataclasses
+import functools
 import io
 import os
 import pprint
+import struct
 import traceback
 from enum import Enum
 from typing import (
@@ -26,9 +28,10 @@ from blspy import G1Element, G2Element, PrivateKey
 from typing_extensions import Literal, get_args, get_origin
 
 from chia.types.blockchain_format.sized_bytes import bytes32
-from chia.util.byte_types import hexstr_to_bytes
+from chia.util.byte_types import SizedBytes, hexstr_to_bytes
 from chia.util.hash import std_hash
 from chia.util.ints import uint32
+from chia.util.struct_stream import StructStream
 
 pp = pprint.PrettyPrinter(indent=1, width=120, compact=True)
 
@@ -95,6 +98,10 @@ unhashable_types = [
 
 _T_Streamable = TypeVar("_T_Streamable", bound="Streamable")
 
+# The keys of the cached serialization and hash in the `__dict__` of streamables which opt into caching them
+CACHED_BYTES = "_cached_bytes"
+CACHED_HASH = "_cached_hash"
+
 ParseFunctionType = Callable[[BinaryIO], object]
 StreamFunctionType = Callable[[object, BinaryIO], None]
 ConvertFunctionType = Callable[[object], object]
@@ -368,10 +375,32 @@ def parse_optional(f: BinaryIO, parse_inner_type_f: ParseFunctionType) -> Option
         raise ValueError("Optional must be 0 or 1")
 
 
-def parse_rust(f: BinaryIO, f_type: Type[Any]) -> Any:
+class BytesReader(io.BytesIO):
+    """
+    A `BytesIO` which shares the buffer of the `bytes` object it reads from and gives parsers a zero-copy view of the
+    remaining data. `BytesIO.getbuffer()` copies the whole buffer on its first call, and `BytesIO.getvalue()` copies it
+    on every call after that, which made each parser using them copy the rest of a large message.
+    """
+
+    _view: memoryview
+
+    def __init__(self, blob: bytes) -> None:
+        super().__init__(blob)
+        self._view = memoryview(blob)
+
+    def remaining(self) -> memoryview:
+        return self._view[self.tell() :]
+
+
+def remaining_buffer(f: BinaryIO) -> memoryview:
+    if isinstance(f, BytesReader):
+        return f.remaining()
     assert isinstance(f, io.BytesIO)
-    buf = f.getbuffer()
-    ret, advance = f_type.parse_rust(buf[f.tell() :])
+    return f.getbuffer()[f.tell() :]
+
+
+def parse_rust(f: BinaryIO, f_type: Type[Any]) -> Any:
+    ret, advance = f_type.parse_rust(remaining_buffer(f))
     f.seek(advance, os.SEEK_CUR)
     return ret
 
@@ -392,6 +421,21 @@ def parse_list(f: BinaryIO, parse_inner_type_f: ParseFunctionType) -> List[objec
     return full_list
 
 
+def parse_fixed_size_list(
+    f: BinaryIO, item_struct: struct.Struct, from_value: Callable[[Any], object], parse_inner_type_f: ParseFunctionType
+) -> List[object]:
+    if not isinstance(f, BytesReader):
+        return parse_list(f, parse_inner_type_f)
+    buffer = f.remaining()
+    end = 4 + int.from_bytes(buffer[:4], "big") * item_struct.size
+    if len(buffer) < end:
+        # Let `parse_list` fail the same way it does for all other lists
+        return parse_list(f, parse_inner_type_f)
+    items = [from_value(value) for value, in item_struct.iter_unpack(buffer[4:end])]
+    f.seek(end, os.SEEK_CUR)
+    return items
+
+
 def parse_tuple(f: BinaryIO, list_parse_inner_type_f: List[ParseFunctionType]) -> Tuple[object, ...]:
     full_list: List[object] = []
     for parse_f in list_parse_inner_type_f:
@@ -437,6 +481,11 @@ def function_to_parse_one_item(f_type: Type[Any]) -> ParseFunctionType:
     if is_type_List(f_type):
         inner_type = get_args(f_type)[0]
         parse_inner_type_f = function_to_parse_one_item(inner_type)
+        item = fixed_size_item(inner_type)
+        if item is not None:
+            item_struct = struct.Struct(">" + item.format)
+            from_value = item.from_value
+            return lambda f: parse_fixed_size_list(f, item_struct, from_value, parse_inner_type_f)
         return lambda f: parse_list(f, parse_inner_type_f)
     if is_type_Tuple(f_type):
         inner_types = get_args(f_type)
@@ -526,10 +575,212 @@ def function_to_stream_one_item(f_type: Type[Any]) -> StreamFunctionType:
         raise UnsupportedType(f"can't stream {f_type}")
 
 
+# The struct format characters of the signed ints with a native struct format, by size in bytes
+int_formats = {1: "b", 2: "h", 4: "i", 8: "q"}
+
+
+@dataclasses.dataclass(frozen=True)
+class FixedSizeItem:
+    """
+    An item which always takes the same number of bytes. The functions generated by `streamable` (un)pack runs of such
+    fields with a single precompiled `struct`. `from_value` creates the item from the value `struct` unpacked, and
+    `to_value` returns the value for `struct` to pack, it's `None` if `struct` can pack the item itself.
+    """
+
+    format: str
+    from_value: Callable[[Any], object]
+    to_value: Optional[Callable[[Any], object]]
+
+
+def bool_from_value(value: int) -> bool:
+    if value == 0:
+        return False
+    if value == 1:
+        return True
+    raise ValueError("Bool byte must be 0 or 1")
+
+
+def fixed_size_item(f_type: Type[Any]) -> Optional[FixedSizeItem]:
+    """
+    Returns the `FixedSizeItem` of `f_type` or `None` if it doesn't have a fixed size. The checks follow the order of
+    `function_to_parse_one_item` to pick the same serialization.
+    """
+    if f_type is bool:
+        return FixedSizeItem("B", bool_from_value, None)
+    if not isinstance(f_type, type) or hasattr(f_type, "parse_rust"):
+        return None
+    if issubclass(f_type, StructStream):
+        if f_type.SIZE in int_formats:
+            int_format = int_formats[f_type.SIZE]
+            # The unpacked value always fits, skip the range check of `StructStream.__init__`
+            from_value = functools.partial(int.__new__, f_type)
+            return FixedSizeItem(int_format if f_type.SIGNED else int_format.upper(), from_value, None)
+        return FixedSizeItem(f"{f_type.SIZE}s", f_type.from_bytes, bytes)
+    if issubclass(f_type, SizedBytes):
+        # Same for the size check of `SizedBytes.__init__`
+        return FixedSizeItem(f"{f_type._size}s", functools.partial(bytes.__new__, f_type), None)
+    if hasattr(f_type, "parse") or f_type.__name__ not in size_hints:
+        return None
+    if hasattr(f_type, "from_bytes_unchecked"):
+        return FixedSizeItem(f"{size_hints[f_type.__name__]}s", f_type.from_bytes_unchecked, bytes)
+    if hasattr(f_type, "from_bytes"):
+        return FixedSizeItem(f"{size_hints[f_type.__name__]}s", f_type.from_bytes, bytes)
+    return None
+
+
+FieldRun = Union[Field, List[Tuple[Field, FixedSizeItem]]]
+
+
+def field_runs(fields: StreamableFields) -> List[FieldRun]:
+    """
+    Groups consecutive fields with a fixed size into lists, all other fields stay on their own.
+    """
+    runs: List[FieldRun] = []
+    for field in fields:
+        item = fixed_size_item(field.type)
+        if item is None:
+            runs.append(field)
+        elif len(runs) > 0 and isinstance(runs[-1], list):
+            runs[-1].append((field, item))
+        else:
+            runs.append([(field, item)])
+    return runs
+
+
+def parse_truncated_run(f: BinaryIO, pos: int, parse_functions: List[ParseFunctionType]) -> None:
+    # Let the parse functions of the single fields raise the same errors as they do for truncated data
+    f.seek(pos)
+    for parse_function in parse_functions:
+        parse_function(f)
+    raise AssertionError("Unexpected end of data")
+
+
+def create_function(cls: Type[Any], name: str, arguments: str, body: List[str], namespace: Dict[str, Any]) -> Any:
+    source = "\n".join([f"def {name}({arguments}):", *(f"    {line}" for line in body)])
+    exec(source, namespace)
+    function = namespace[name]
+    function.__qualname__ = f"{cls.__qualname__}.{name}"
+    return function
+
+
+def create_parse_function(cls: Type[Any], fields: StreamableFields) -> Callable[[Type[Any], BytesReader], Any]:
+    """
+    Generates the equivalent of `parse_streamable_fields` for `cls`. It tracks the position in `pos` while it unpacks
+    fixed size runs from the buffer and only syncs it with the reader around the calls of the other parse functions.
+    """
+    namespace: Dict[str, Any] = {"object_new": object.__new__, "parse_truncated_run": parse_truncated_run}
+    body = ["view = f._view", "obj = object_new(cls)", "data = obj.__dict__"]
+    pos_valid = False
+    for index, run in enumerate(field_runs(fields)):
+        if isinstance(run, Field):
+            if pos_valid:
+                body.append("f.seek(pos)")
+                pos_valid = False
+            namespace[f"parse_{index}"] = run.parse_function
+            body.append(f'data["{run.name}"] = parse_{index}(f)')
+            continue
+        if not pos_valid:
+            body.append("pos = f.tell()")
+            pos_valid = True
+        run_struct = struct.Struct(">" + "".join(item.format for _, item in run))
+        namespace[f"struct_{index}"] = run_struct
+        namespace[f"parse_functions_{index}"] = [field.parse_function for field, _ in run]
+        values = "".join(f"value_{i}, " for i in range(len(run)))
+        body += [
+            f"if pos + {run_struct.size} > len(view):",
+            f"    parse_truncated_run(f, pos, parse_functions_{index})",
+            f"{values}= struct_{index}.unpack_from(view, pos)",
+            f"pos += {run_struct.size}",
+        ]
+        for i, (field, item) in enumerate(run):
+            namespace[f"from_value_{index}_{i}"] = item.from_value
+            body.append(f'data["{field.name}"] = from_value_{index}_{i}(value_{i})')
+    if pos_valid:
+        body.append("f.seek(pos)")
+    body.append("return obj")
+    return create_function(cls, "parse", "cls, f", body, namespace)  # type: ignore[no-any-return]
+
+
+def create_stream_function(cls: Type[Any], fields: StreamableFields) -> StreamFunctionType:
+    """
+    Generates the equivalent of `stream_streamable_fields` for `cls`, which packs fixed size runs with one `struct`.
+    """
+    namespace: Dict[str, Any] = {}
+    body = ["write = f.write"]
+    for index, run in enumerate(field_runs(fields)):
+        if isinstance(run, Field):
+            namespace[f"stream_{index}"] = run.stream_function
+            body.append(f"stream_{index}(obj.{run.name}, f)")
+            continue
+        namespace[f"struct_{index}"] = struct.Struct(">" + "".join(item.format for _, item in run))
+        values = []
+        for i, (field, item) in enumerate(run):
+            if item.to_value is None:
+                values.append(f"obj.{field.name}")
+            else:
+                namespace[f"to_value_{index}_{i}"] = item.to_value
+                values.append(f"to_value_{index}_{i}(obj.{field.name})")
+        body.append(f"write(struct_{index}.pack({', '.join(values)}))")
+    return create_function(cls, "stream", "obj, f", body, namespace)  # type: ignore[no-any-return]
+
+
+def create_post_init_function(cls: Type[Any], fields: StreamableFields) -> Callable[[Any], None]:
+    """
+    Generates the equivalent of the field loop in `Streamable.__post_init__` for `cls`. Fields which already have
+    exactly the type of their type hint skip the post init function, which would return them unchanged.
+    """
+    namespace: Dict[str, Any] = {}
+    body = ["data = obj.__dict__"]
+    for index, field in enumerate(fields):
+        namespace[f"post_init_{index}"] = field.post_init_function
+        optional = is_type_SpecificOptional(field.type)
+        f_type = get_args(field.type)[0] if optional else field.type
+        if not isinstance(f_type, type) or is_type_List(f_type) or is_type_Tuple(f_type):
+            body.append(f'data["{field.name}"] = post_init_{index}(data["{field.name}"])')
+            continue
+        namespace[f"type_{index}"] = f_type
+        none_check = "value is not None and " if optional else ""
+        body += [
+            f'value = data["{field.name}"]',
+            f"if {none_check}value.__class__ is not type_{index}:",
+            f'    data["{field.name}"] = post_init_{index}(value)',
+        ]
+    return create_function(cls, "post_init", "obj", body, namespace)  # type: ignore[no-any-return]
+
+
+@dataclasses.dataclass(frozen=True)
+class StreamableFunctions:
+    parse: Callable[[Type[Any], BytesReader], Any]
+    stream: StreamFunctionType
+    post_init: Callable[[Any], None]
+
+
+def create_streamable_functions(cls: Type[Any], fields: StreamableFields) -> StreamableFunctions:
+    return StreamableFunctions(
+        parse=create_parse_function(cls, fields),
+        stream=create_stream_function(cls, fields),
+        post_init=create_post_init_function(cls, fields),
+    )
+
+
+def parse_streamable_fields(cls: Type[_T_Streamable], f: BinaryIO) -> _T_Streamable:
+    # Create the object without calling __init__() to avoid unnecessary post-init checks in strictdataclass
+    obj: _T_Streamable = object.__new__(cls)
+    for field in cls._streamable_fields:
+        object.__setattr__(obj, field.name, field.parse_function(f))
+    return obj
+
+
+def stream_streamable_fields(item: Streamable, f: BinaryIO) -> None:
+    for field in item._streamable_fields:
+        field.stream_function(getattr(item, field.name), f)
+
+
 def streamable(cls: Type[_T_Streamable]) -> Type[_T_Streamable]:
     """
-    This decorator forces correct streamable protocol syntax/usage and populates the caches for types hints and
-    (de)serialization methods for all members of the class. The correct usage is:
+    This decorator forces correct streamable protocol syntax/usage, populates the caches for types hints and
+    (de)serialization methods for all members of the class and generates the parse, stream and post init functions
+    specialized for the class. The correct usage is:
 
     @streamable
     @dataclass(frozen=True)
@@ -558,6 +809,7 @@ def streamable(cls: Type[_T_Streamable]) -> Type[_T_Streamable]:
         raise DefinitionError("Streamable inheritance required.", cls)
 
     cls._streamable_fields = create_fields(cls)
+    cls._streamable_functions = create_streamable_functions(cls, cls._streamable_fields)
 
     return cls
 
@@ -608,48 +860,76 @@ class Streamable:
     """
 
     _streamable_fields: ClassVar[StreamableFields]
+    _streamable_functions: ClassVar[StreamableFunctions]
+    # Classes opt into keeping their hash and serialization after the first use by setting this to the size limit of
+    # the serializations to keep, objects with larger ones only keep their hash. Cached objects must not be modified
+    # in place, i.e. their lists must stay as they are. See `benchmarks/streamable_cache.py` for the memory overhead.
+    serialization_cache_limit: ClassVar[Optional[int]] = None
 
     @classmethod
     def streamable_fields(cls) -> StreamableFields:
         return cls._streamable_fields
 
     def __post_init__(self) -> None:
-        data = self.__dict__
         try:
-            for field in self._streamable_fields:
-                object.__setattr__(self, field.name, field.post_init_function(data[field.name]))
+            self._streamable_functions.post_init(self)
         except TypeError as e:
-            missing_fields = [field.name for field in self._streamable_fields if field.name not in data]
+            missing_fields = [field.name for field in self._streamable_fields if field.name not in self.__dict__]
             if len(missing_fields) > 0:
                 raise ParameterMissingError(type(self), missing_fields) from e
             raise
 
     @classmethod
     def parse(cls: Type[_T_Streamable], f: BinaryIO) -> _T_Streamable:
-        # Create the object without calling __init__() to avoid unnecessary post-init checks in strictdataclass
-        obj: _T_Streamable = object.__new__(cls)
-        for field in cls._streamable_fields:
-            object.__setattr__(obj, field.name, field.parse_function(f))
-        return obj
+        if isinstance(f, BytesReader):
+            parsed: _T_Streamable = cls._streamable_functions.parse(cls, f)
+            return parsed
+        return parse_streamable_fields(cls, f)
 
     def stream(self, f: BinaryIO) -> None:
-        for field in self._streamable_fields:
-            field.stream_function(getattr(self, field.name), f)
+        if self.serialization_cache_limit is not None:
+            serialized = self.__dict__.get(CACHED_BYTES)
+            if serialized is not None:
+                f.write(serialized)
+                return
+        self._streamable_functions.stream(self, f)
 
     def get_hash(self) -> bytes32:
-        return std_hash(bytes(self), skip_bytes_conversion=True)
+        if self.serialization_cache_limit is None:
+            return std_hash(bytes(self), skip_bytes_conversion=True)
+        cached: Optional[bytes32] = self.__dict__.get(CACHED_HASH)
+        if cached is None:
+            cached = std_hash(bytes(self), skip_bytes_conversion=True)
+            self.__dict__[CACHED_HASH] = cached
+        return cached
 
     @classmethod
     def from_bytes(cls: Type[_T_Streamable], blob: bytes) -> _T_Streamable:
-        f = io.BytesIO(blob)
+        f = BytesReader(blob)
         parsed = cls.parse(f)
         assert f.read() == b""
+        limit = cls.serialization_cache_limit
+        # Only keep an immutable buffer, copying anything else would double the overhead
+        if limit is not None and type(blob) is bytes and len(blob) <= limit:
+            parsed.__dict__[CACHED_BYTES] = blob
         return parsed
 
     def __bytes__(self: Any) -> bytes:
+        limit = self.serialization_cache_limit
+        if limit is not None:
+            serialized: Optional[bytes] = self.__dict__.get(CACHED_BYTES)
+            if serialized is not None:
+                return serialized
         f = io.BytesIO()
-        self.stream(f)
-        return bytes(f.getvalue())
+        if type(self).stream is Streamable.stream:
+            self._streamable_functions.stream(self, f)
+        else:
+            # Subclasses which override `stream` get serialized the way they stream themselves
+            self.stream(f)
+        serialized = f.getvalue()
+        if limit is not None and len(serialized) <= limit:
+            self.__dict__[CACHED_BYTES] = serialized
+        return serialized
 
     def __str__(self: Any) -> str:
         return pp.pformat(recurse_jsonify(self))
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Generic, List, Optional, Tuple, TypeVar
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar
 
 from chia.consensus.coinbase import farmer_parent_id, pool_parent_id
 from chia.types.blockchain_format.coin import Coin
@@ -97,15 +97,23 @@ class TransactionRecord(Streamable):
         modified_tx["memos"] = memos_list
         return cls.from_json_dict(modified_tx)
 
-    def to_json_dict_convenience(self, config: Dict) -> Dict:
+    def convenience_json_fields(self, config: Dict) -> Dict[str, Any]:
+        """
+        Returns the fields `to_json_dict_convenience` adds to, or replaces in, the json dict.
+        """
         selected = config["selected_network"]
         prefix = config["network_overrides"]["config"][selected]["address_prefix"]
-        formatted = self.to_json_dict()
-        formatted["to_address"] = encode_puzzle_hash(self.to_puzzle_hash, prefix)
-        formatted["memos"] = {
-            coin_id.hex(): memo.hex()
-            for coin_id, memos in self.get_memos().items()
-            for memo in memos
-            if memo is not None
+        return {
+            "to_address": encode_puzzle_hash(self.to_puzzle_hash, prefix),
+            "memos": {
+                coin_id.hex(): memo.hex()
+                for coin_id, memos in self.get_memos().items()
+                for memo in memos
+                if memo is not None
+            },
         }
+
+    def to_json_dict_convenience(self, config: Dict) -> Dict:
+        formatted = self.to_json_dict()
+        formatted.update(self.convenience_json_fields(config))
         return formatted
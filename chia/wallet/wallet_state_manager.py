@@ -33,6 +33,7 @@ from chia.types.coin_spend import CoinSpend
 from chia.types.full_block import FullBlock
 from chia.types.mempool_inclusion_status import MempoolInclusionStatus
 from chia.util.bech32m import encode_puzzle_hash
+from chia.util.db_statistics import SLOW_QUERY_THRESHOLD
 from chia.util.db_synchronous import db_synchronous_on
 from chia.util.db_wrapper import DBWrapper2
 from chia.util.errors import Err
@@ -168,8 +169,13 @@ class WalletStateManager:
         self.db_wrapper = await DBWrapper2.create(
             database=db_path,
             reader_count=self.config.get("db_readers", 4),
+            max_reader_count=self.config.get("db_max_readers"),
+            cache_size=self.config.get("db_cache_size"),
+            total_cache_size=self.config.get("db_total_cache_size"),
+            mmap_size=self.config.get("db_mmap_size"),
             log_path=sql_log_path,
             synchronous=db_synchronous_on(self.config.get("db_sync", "auto")),
+            slow_query_threshold=self.config.get("db_slow_query_threshold", SLOW_QUERY_THRESHOLD),
         )
 
         self.initial_num_public_keys = config["initial_num_public_keys"]
@@ -15,7 +15,7 @@ dependencies = [
     "chia_rs==0.1.16",
     "clvm-tools-rs==0.1.25",  # Rust implementation of clvm_tools' compiler
     "aiohttp==3.8.3",  # HTTP server for full node rpc
-    "aiosqlite==0.17.0",  # asyncio wrapper for sqlite, to store blocks
+    "aiosqlite==0.17.0",  # asyncio wrapper for sqlite, to store blocks, `run_on_connection` relies on its internals
     "bitstring==3.1.9",  # Binary data management library
     "colorama==0.4.5",  # Colorizes terminal output
     "colorlog==6.7.0",  # Adds color to logs
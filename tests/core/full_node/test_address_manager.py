@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import math
+import os
 import time
 from pathlib import Path
 
@@ -588,3 +589,182 @@ class TestPeerManager:
             await addrman.attempt(PeerInfo(peer1.host, peer1.port), True, time.time() - 61)
         addrman.cleanup(7 * 3600 * 24, 5)
         assert await addrman.size() == 1
+
+    @pytest.mark.asyncio
+    async def test_table_positions(self):
+        addrman = AddressManagerTest()
+        source = PeerInfo("252.5.1.1", 8333)
+        for i in range(1, 50):
+            assert await addrman.add_to_new_table([TimestampedPeerInfo(f"250.1.{i}.1", 8444, time.time())], source)
+        for i in range(1, 50, 3):
+            await addrman.mark_good(PeerInfo(f"250.1.{i}.1", 8444), False)
+
+        # The positions a peer knows about match the tables
+        new_positions = {
+            (bucket, pos): node_id
+            for node_id, info in addrman.map_info.items()
+            for bucket, pos in info.new_positions.items()
+        }
+        assert new_positions == {
+            (bucket, pos): addrman.new_matrix.get(bucket, pos) for bucket, pos in addrman.new_matrix.used_positions()
+        }
+        assert all(info.ref_count == len(info.new_positions) for info in addrman.map_info.values())
+        for node_id, info in addrman.map_info.items():
+            if info.is_tried:
+                bucket, pos = info.get_tried_position(addrman.key)
+                assert bucket == info.get_tried_bucket(addrman.key)
+                assert pos == info.get_bucket_position(addrman.key, False, bucket)
+                assert addrman.tried_matrix.get(bucket, pos) == node_id
+        assert len(addrman.tried_matrix) == addrman.tried_count
+        assert len(addrman.new_matrix) == sum(info.ref_count for info in addrman.map_info.values())
+
+    @pytest.mark.asyncio
+    async def test_persist_changes(self, tmp_path: Path):
+        addrman = AddressManagerTest()
+        now = int(math.floor(time.time()))
+        source = PeerInfo("252.5.1.1", uint16(8333))
+        peers_dat_filename = tmp_path / "peers.dat"
+        log_filename = tmp_path / "peers.dat.log"
+
+        def peer(i: int) -> TimestampedPeerInfo:
+            return TimestampedPeerInfo(f"250.8.{i}.1", uint16(8444), uint64(now - i))
+
+        await addrman.add_to_new_table([peer(i) for i in range(1, 4)], source)
+        # The first time writes the whole peers file
+        await AddressManagerStore.persist(addrman, peers_dat_filename)
+        assert peers_dat_filename.exists()
+        assert not log_filename.exists()
+        peers_file_size = peers_dat_filename.stat().st_size
+
+        # Later only the changes get appended to the log
+        await addrman.add_to_new_table([peer(i) for i in range(4, 6)], source)
+        await addrman.mark_good(PeerInfo(peer(1).host, peer(1).port), False)
+        async with addrman.lock:
+            node_id = addrman.map_addr[peer(2).host]
+            for bucket, pos in list(addrman.map_info[node_id].new_positions.items()):
+                addrman.clear_new_(bucket, pos)
+        await AddressManagerStore.persist(addrman, peers_dat_filename)
+        assert peers_dat_filename.stat().st_size == peers_file_size
+        assert log_filename.exists()
+        # Nothing changed, nothing to log
+        log_size = log_filename.stat().st_size
+        await AddressManagerStore.persist(addrman, peers_dat_filename)
+        assert log_filename.stat().st_size == log_size
+
+        def persisted_state(address_manager: AddressManager):
+            return {
+                info.peer_info.host: (info.to_string(), info.is_tried, sorted(info.new_positions))
+                for info in address_manager.map_info.values()
+            }
+
+        addrman2 = await AddressManagerStore.create_address_manager(peers_dat_filename)
+        assert persisted_state(addrman2) == persisted_state(addrman)
+        assert peer(2).host not in persisted_state(addrman2)
+        assert addrman2.tried_count == 1
+        assert len(addrman2.changed_node_ids) == 0
+
+        # A new peers file replaces the log
+        await AddressManagerStore.serialize(addrman, peers_dat_filename)
+        assert not log_filename.exists()
+        addrman3 = await AddressManagerStore.create_address_manager(peers_dat_filename)
+        assert persisted_state(addrman3) == persisted_state(addrman)
+
+    @pytest.mark.asyncio
+    async def test_persist_ignores_stale_log(self, tmp_path: Path):
+        addrman = AddressManagerTest()
+        now = int(math.floor(time.time()))
+        source = PeerInfo("252.5.1.1", uint16(8333))
+        peers_dat_filename = tmp_path / "peers.dat"
+        log_filename = tmp_path / "peers.dat.log"
+        await addrman.add_to_new_table([TimestampedPeerInfo("250.9.1.1", uint16(8444), uint64(now))], source)
+        await AddressManagerStore.persist(addrman, peers_dat_filename)
+        await addrman.add_to_new_table([TimestampedPeerInfo("250.9.2.1", uint16(8444), uint64(now))], source)
+        await AddressManagerStore.persist(addrman, peers_dat_filename)
+        stale_log = log_filename.read_bytes()
+
+        # Like a crash after writing the new peers file, but before removing the log
+        await AddressManagerStore.serialize(addrman, peers_dat_filename)
+        log_filename.write_bytes(stale_log + b"\0\0\1")
+        addrman2 = await AddressManagerStore.create_address_manager(peers_dat_filename)
+        assert await addrman2.size() == 2
+        assert addrman2.peers_file_generation == addrman.peers_file_generation
+
+    @pytest.mark.asyncio
+    async def test_persist_after_torn_record(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        addrman = AddressManagerTest()
+        now = int(math.floor(time.time()))
+        source = PeerInfo("252.5.1.1", uint16(8333))
+        peers_dat_filename = tmp_path / "peers.dat"
+        log_filename = tmp_path / "peers.dat.log"
+
+        def peer(i: int) -> TimestampedPeerInfo:
+            return TimestampedPeerInfo(f"250.6.{i}.1", uint16(8444), uint64(now - i))
+
+        await addrman.add_to_new_table([peer(1)], source)
+        await AddressManagerStore.persist(addrman, peers_dat_filename)
+        await addrman.add_to_new_table([peer(2)], source)
+        await AddressManagerStore.persist(addrman, peers_dat_filename)
+        log_size = log_filename.stat().st_size
+
+        # Like a crash while appending a record, the torn record is cut off when loading
+        with open(log_filename, "ab") as f:
+            f.write(b"\0\0\1\0garbage")
+        addrman2 = await AddressManagerStore.create_address_manager(peers_dat_filename)
+        assert await addrman2.size() == 2
+        assert log_filename.stat().st_size == log_size
+        await addrman2.add_to_new_table([peer(3)], source)
+        await AddressManagerStore.persist(addrman2, peers_dat_filename)
+        addrman3 = await AddressManagerStore.create_address_manager(peers_dat_filename)
+        assert await addrman3.size() == 3
+
+        # The record of a failed append is cut off right away
+        def fail(fd: int) -> None:
+            raise OSError("disk full")
+
+        log_size = log_filename.stat().st_size
+        await addrman3.add_to_new_table([peer(4)], source)
+        monkeypatch.setattr(os, "fsync", fail)
+        await AddressManagerStore.persist(addrman3, peers_dat_filename)
+        monkeypatch.undo()
+        assert log_filename.stat().st_size == log_size
+        await addrman3.add_to_new_table([peer(5)], source)
+        await AddressManagerStore.persist(addrman3, peers_dat_filename)
+        addrman4 = await AddressManagerStore.create_address_manager(peers_dat_filename)
+        assert await addrman4.size() == 5
+
+    @pytest.mark.asyncio
+    async def test_persist_failed_write_keeps_changes(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        addrman = AddressManagerTest()
+        now = int(math.floor(time.time()))
+        source = PeerInfo("252.5.1.1", uint16(8333))
+        peers_dat_filename = tmp_path / "peers.dat"
+
+        def peer(i: int) -> TimestampedPeerInfo:
+            return TimestampedPeerInfo(f"250.7.{i}.1", uint16(8444), uint64(now - i))
+
+        async def fail(*args: object) -> None:
+            raise OSError("disk full")
+
+        await addrman.add_to_new_table([peer(1)], source)
+        await AddressManagerStore.persist(addrman, peers_dat_filename)
+        await addrman.add_to_new_table([peer(2)], source)
+        await addrman.mark_good(PeerInfo(peer(1).host, peer(1).port), False)
+
+        # The changes of a failed write are written along with the later ones
+        monkeypatch.setattr(AddressManagerStore, "_append_changes", fail)
+        await AddressManagerStore.persist(addrman, peers_dat_filename)
+        monkeypatch.undo()
+        await addrman.add_to_new_table([peer(3)], source)
+        await AddressManagerStore.persist(addrman, peers_dat_filename)
+        addrman2 = await AddressManagerStore.create_address_manager(peers_dat_filename)
+        assert await addrman2.size() == 3
+        assert addrman2.tried_count == 1
+
+        # Also those of a failed peers file
+        await addrman.add_to_new_table([peer(4)], source)
+        monkeypatch.setattr(AddressManagerStore, "_write_peers", fail)
+        await AddressManagerStore.serialize(addrman, peers_dat_filename)
+        monkeypatch.undo()
+        await AddressManagerStore.persist(addrman, peers_dat_filename)
+        addrman3 = await AddressManagerStore.create_address_manager(peers_dat_filename)
+        assert await addrman3.size() == 4
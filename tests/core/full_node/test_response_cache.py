@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List, Optional
+
+import pytest
+
+from chia.full_node.response_cache import ResponseCache
+from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.server.outbound_message import Message, make_msg
+
+
+class Creator:
+    calls: int
+    release: asyncio.Event
+    data: bytes
+
+    def __init__(self, data: bytes = b"block") -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        self.data = data
+
+    async def __call__(self) -> Optional[Message]:
+        self.calls += 1
+        await self.release.wait()
+        return make_msg(ProtocolMessageTypes.respond_block, self.data)
+
+
+@pytest.mark.asyncio
+async def test_cached() -> None:
+    cache = ResponseCache()
+    create = Creator()
+    first = await cache.get("a", 10, create)
+    assert await cache.get("a", 10, create) is first
+    assert create.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    await cache.get("b", 10, create)
+    assert create.calls == 2
+    assert len(cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_in_flight_merged() -> None:
+    cache = ResponseCache()
+    create = Creator()
+    create.release.clear()
+    tasks = [asyncio.create_task(cache.get("a", 10, create)) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    create.release.set()
+    results: List[Optional[Message]] = await asyncio.gather(*tasks)
+    assert create.calls == 1
+    assert cache.merged == 4
+    assert all(result is results[0] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_does_not_cancel_others() -> None:
+    cache = ResponseCache()
+    create = Creator()
+    create.release.clear()
+    first = asyncio.create_task(cache.get("a", 10, create))
+    second = asyncio.create_task(cache.get("a", 10, create))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    create.release.set()
+    assert await second is not None
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_none_not_cached() -> None:
+    cache = ResponseCache()
+    calls = 0
+
+    async def create() -> Optional[Message]:
+        nonlocal calls
+        calls += 1
+        return None
+
+    assert await cache.get("a", 10, create) is None
+    assert await cache.get("a", 10, create) is None
+    assert calls == 2
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_new_peak() -> None:
+    cache = ResponseCache(recent_heights=10)
+    for height in [5, 15, 20]:
+        await cache.get(height, height, Creator())
+    # Extends the chain, 5 is no longer recent
+    cache.new_peak(21, 20)
+    assert len(cache) == 2
+    # Reorg, the responses above the fork height get dropped
+    cache.new_peak(22, 17)
+    assert len(cache) == 1
+    await cache.get(15, 15, Creator())
+    assert cache.hits == 1
+    # Responses which are no longer recent don't get cached at all
+    await cache.get(5, 5, Creator())
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_max_bytes() -> None:
+    cache = ResponseCache(max_bytes=250)
+    for key in range(3):
+        await cache.get(key, 10, Creator(b"\0" * 100))
+    # The oldest entry gets evicted
+    assert len(cache) == 2
+    await cache.get(0, 10, Creator(b"\0" * 100))
+    assert cache.hits == 0
+    # Too large to be cached at all
+    await cache.get(3, 10, Creator(b"\0" * 300))
+    assert len(cache) == 2
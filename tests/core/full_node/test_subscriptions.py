@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from chia.full_node.subscriptions import PeerSubscriptions
+from chia.full_node.subscriptions import PeerSubscriptions, SubscriptionIndex
 from chia.types.blockchain_format.sized_bytes import bytes32
 
 peer1 = bytes32(b"1" * 32)
@@ -309,3 +309,24 @@ def test_coin_sub_limit_incremental() -> None:
     assert sub.peers_for_coin_id(coin4) == set()
 
     sub.remove_peer(peer1)
+
+
+def test_subscription_index() -> None:
+    index = SubscriptionIndex()
+    assert index.peers(ph1) == set()
+    assert index.add(ph1, peer1) is True
+    assert index.add(ph1, peer1) is False
+    # A single subscriber is stored without a set
+    assert index[ph1] == peer1
+    assert index.peers(ph1) == {peer1}
+
+    assert index.add(ph1, peer2) is True
+    assert index.add(ph1, peer2) is False
+    assert index.peers(ph1) == {peer1, peer2}
+
+    index.remove(ph1, peer1)
+    assert index[ph1] == peer2
+    assert index.peers(ph1) == {peer2}
+    index.remove(ph1, peer2)
+    assert ph1 not in index
+    assert len(index) == 0
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, cast
+
+import pytest
+
+from chia.full_node.wallet_update_queue import WalletUpdateQueue, merge_fork_heights
+from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.protocols.wallet_protocol import CoinState, CoinStateUpdate, NewPeakWallet
+from chia.server.outbound_message import Message
+from chia.server.ws_connection import WSChiaConnection
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.ints import uint32, uint64, uint128
+
+log = logging.getLogger(__name__)
+
+peer_1 = bytes32(b"\1" * 32)
+peer_2 = bytes32(b"\2" * 32)
+
+
+@dataclass
+class FakeConnection:
+    sent: List[List[Message]] = field(default_factory=list)
+
+    async def send_messages(self, messages: List[Message]) -> None:
+        self.sent.append(messages)
+
+
+def coin_state(index: int, created_height: Optional[int], spent_height: Optional[int] = None) -> CoinState:
+    coin = Coin(bytes32(index.to_bytes(32, "big")), bytes32(b"\0" * 32), uint64(index))
+    return CoinState(
+        coin,
+        None if spent_height is None else uint32(spent_height),
+        None if created_height is None else uint32(created_height),
+    )
+
+
+def new_peak(height: int, fork_height: int) -> NewPeakWallet:
+    return NewPeakWallet(bytes32(height.to_bytes(32, "big")), uint32(height), uint128(height), uint32(fork_height))
+
+
+def create_queue(connections: Dict[bytes32, FakeConnection]) -> WalletUpdateQueue:
+    return WalletUpdateQueue(lambda peer_id: cast(Optional[WSChiaConnection], connections.get(peer_id)), log)
+
+
+@pytest.mark.parametrize(
+    "fork_height, height, new_fork_height, new_height, expected",
+    [
+        (9, 10, 10, 11, 10),  # two extensions
+        (5, 10, 10, 11, 5),  # reorg followed by an extension
+        (9, 10, 7, 11, 7),  # extension followed by a reorg
+        (5, 10, 3, 11, 3),  # two reorgs
+        (5, 10, 8, 11, 5),
+    ],
+)
+def test_merge_fork_heights(
+    fork_height: int, height: int, new_fork_height: int, new_height: int, expected: int
+) -> None:
+    assert merge_fork_heights(fork_height, height, new_fork_height, new_height) == expected
+
+
+@pytest.mark.asyncio
+async def test_merge_updates() -> None:
+    connections = {peer_1: FakeConnection(), peer_2: FakeConnection()}
+    queue = create_queue(connections)
+    queue.add_coin_states(peer_1, uint32(10), uint32(9), bytes32(b"\1" * 32), [coin_state(1, 10), coin_state(2, 10)])
+    queue.add_peak([peer_1, peer_2], new_peak(10, 9))
+    queue.add_coin_states(peer_1, uint32(11), uint32(10), bytes32(b"\2" * 32), [coin_state(1, 10, 11)])
+    queue.add_peak([peer_1, peer_2], new_peak(11, 10))
+    assert queue.merged_updates == 3
+    await queue.flush()
+
+    assert len(connections[peer_1].sent) == 1
+    update_message, peak_message = connections[peer_1].sent[0]
+    # The coin state update has to arrive before the peak
+    assert update_message.type == ProtocolMessageTypes.coin_state_update.value
+    assert peak_message.type == ProtocolMessageTypes.new_peak_wallet.value
+    update = CoinStateUpdate.from_bytes(update_message.data)
+    assert update.height == 11
+    assert update.fork_height == 10
+    assert update.peak_hash == bytes32(b"\2" * 32)
+    assert set(update.items) == {coin_state(1, 10, 11), coin_state(2, 10)}
+    assert NewPeakWallet.from_bytes(peak_message.data) == new_peak(11, 10)
+    # The peak message is shared by both peers
+    assert connections[peer_2].sent == [[peak_message]]
+
+    # Nothing left after a flush
+    await queue.flush()
+    assert len(connections[peer_1].sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_reorg() -> None:
+    connections = {peer_1: FakeConnection()}
+    queue = create_queue(connections)
+    queue.add_coin_states(peer_1, uint32(10), uint32(9), bytes32(b"\1" * 32), [coin_state(1, 10)])
+    queue.add_peak([peer_1], new_peak(10, 9))
+    # The coin created at height 10 gets reorged out
+    queue.add_coin_states(peer_1, uint32(12), uint32(8), bytes32(b"\2" * 32), [coin_state(1, None)])
+    queue.add_peak([peer_1], new_peak(12, 8))
+    await queue.flush()
+    update_message, peak_message = connections[peer_1].sent[0]
+    update = CoinStateUpdate.from_bytes(update_message.data)
+    assert update.fork_height == 8
+    assert update.items == [coin_state(1, None)]
+    assert NewPeakWallet.from_bytes(peak_message.data).fork_point_with_previous_peak == 8
+
+
+@pytest.mark.asyncio
+async def test_disconnected_peer() -> None:
+    connections = {peer_1: FakeConnection()}
+    queue = create_queue(connections)
+    queue.add_coin_states(peer_2, uint32(10), uint32(9), bytes32(b"\1" * 32), [coin_state(1, 10)])
+    queue.add_peak([peer_1, peer_2], new_peak(10, 9))
+    await queue.flush()
+    assert len(connections[peer_1].sent) == 1
+    assert len(connections[peer_1].sent[0]) == 1
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import pytest
+import zstd
+
+from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.protocols.shared_protocol import Capability
+from chia.server.capabilities import compression_negotiated
+from chia.server.message_compression import (
+    COMPRESSION_THRESHOLD,
+    MAX_DECOMPRESSED_SIZE,
+    ZSTD_MAGIC,
+    CompressedMessage,
+    compress_message,
+    decompress_message,
+    should_compress,
+    zstd_frame_content_size,
+)
+from chia.server.outbound_message import Message, make_msg
+from chia.util.ints import uint8, uint16, uint32
+
+large_data = bytes(range(256)) * (COMPRESSION_THRESHOLD // 256 + 1)
+
+
+def test_compression_negotiated() -> None:
+    assert compression_negotiated([Capability.BASE, Capability.COMPRESSION], [Capability.COMPRESSION])
+    assert not compression_negotiated([Capability.BASE, Capability.COMPRESSION], [Capability.BASE])
+    assert not compression_negotiated([Capability.BASE], [Capability.BASE, Capability.COMPRESSION])
+
+
+def test_should_compress() -> None:
+    assert should_compress(make_msg(ProtocolMessageTypes.respond_blocks, large_data))
+    assert not should_compress(make_msg(ProtocolMessageTypes.respond_blocks, large_data[:COMPRESSION_THRESHOLD]))
+    assert not should_compress(make_msg(ProtocolMessageTypes.respond_block, large_data))
+
+
+def test_round_trip() -> None:
+    message = Message(uint8(ProtocolMessageTypes.respond_blocks.value), uint16(7), large_data)
+    compressed = compress_message(message)
+    assert compressed.type == ProtocolMessageTypes.compressed_message.value
+    assert compressed.id == message.id
+    assert len(bytes(compressed)) < len(bytes(message))
+    assert decompress_message(compressed) == message
+
+
+@pytest.mark.parametrize(
+    "compressed, error",
+    [
+        (CompressedMessage(uint8(ProtocolMessageTypes.respond_block.value), uint32(1), b""), "message type"),
+        (
+            CompressedMessage(uint8(ProtocolMessageTypes.compressed_message.value), uint32(1), b""),
+            "message type",
+        ),
+        (
+            CompressedMessage(uint8(ProtocolMessageTypes.respond_blocks.value), uint32(MAX_DECOMPRESSED_SIZE + 1), b""),
+            "decompressed size",
+        ),
+        (CompressedMessage(uint8(ProtocolMessageTypes.respond_blocks.value), uint32(10), b"invalid"), "decompress"),
+    ],
+)
+def test_invalid(compressed: CompressedMessage, error: str) -> None:
+    with pytest.raises(ValueError, match=error):
+        decompress_message(make_msg(ProtocolMessageTypes.compressed_message, compressed))
+
+
+def test_size_mismatch() -> None:
+    valid = CompressedMessage.from_bytes(
+        compress_message(make_msg(ProtocolMessageTypes.respond_blocks, large_data)).data
+    )
+    invalid = CompressedMessage(valid.type, uint32(valid.size - 1), valid.data)
+    with pytest.raises(ValueError, match="size mismatch"):
+        decompress_message(make_msg(ProtocolMessageTypes.compressed_message, invalid))
+
+
+def rle_frame(content_size: int) -> bytes:
+    """
+    A zstd frame of RLE blocks of zeros, which decompresses to `content_size` bytes from 4 bytes per 128 KiB
+    """
+    frame = ZSTD_MAGIC + bytes([0xE0]) + content_size.to_bytes(8, "little")
+    block_size = 128 * 1024
+    while content_size > 0:
+        size = min(block_size, content_size)
+        content_size -= size
+        header = (1 if content_size == 0 else 0) | (1 << 1) | (size << 3)
+        frame += header.to_bytes(3, "little") + b"\x00"
+    return frame
+
+
+def test_frame_content_size() -> None:
+    for size in [0, 255, 256, 300, 65791, 65792, 1 << 20]:
+        assert zstd_frame_content_size(zstd.compress(bytes(size), 3)) == size
+    assert zstd_frame_content_size(rle_frame(1 << 20)) == 1 << 20
+    assert zstd.decompress(rle_frame(1 << 20)) == bytes(1 << 20)
+    assert zstd_frame_content_size(b"invalid") is None
+    assert zstd_frame_content_size(rle_frame(1 << 20)[:-1]) is None
+    # zstd decompresses all the frames, into a buffer larger than the first one declares
+    assert zstd_frame_content_size(rle_frame(1 << 20) + rle_frame(1 << 20)) is None
+    # a frame without the content size: no single segment, a window descriptor and a last raw block of 3 bytes
+    assert zstd_frame_content_size(ZSTD_MAGIC + b"\x00\x00" + bytes([25, 0, 0]) + b"abc") is None
+
+
+@pytest.mark.parametrize(
+    "data, size, error",
+    [
+        # a 49 KB message which decompresses to 1.5 GB
+        (rle_frame(1500 * 1024 * 1024), MAX_DECOMPRESSED_SIZE, "size mismatch"),
+        (rle_frame(1500 * 1024 * 1024), 1500 * 1024 * 1024, "decompressed size"),
+        (ZSTD_MAGIC + b"\x00\x00" + bytes([25, 0, 0]) + b"abc", 3, "content size"),
+        (rle_frame(1024 * 1024) + rle_frame(1500 * 1024 * 1024), 1024 * 1024, "content size"),
+    ],
+)
+def test_decompression_bomb(monkeypatch: pytest.MonkeyPatch, data: bytes, size: int, error: str) -> None:
+    def decompress(data: bytes) -> bytes:
+        assert False, "the message must be rejected before decompressing it"
+
+    monkeypatch.setattr(zstd, "decompress", decompress)
+    bomb = CompressedMessage(uint8(ProtocolMessageTypes.respond_blocks.value), uint32(size), data)
+    message = make_msg(ProtocolMessageTypes.compressed_message, bomb)
+    assert len(bytes(message)) < 50 * 1024
+    with pytest.raises(ValueError, match=error):
+        decompress_message(message)
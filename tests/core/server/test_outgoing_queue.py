@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List
+
+import pytest
+
+from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.protocols.shared_protocol import Capability
+from chia.server.capabilities import chunking_negotiated
+from chia.server.message_chunking import MAX_MESSAGE_SIZE, ChunkAssembler, MessageChunk, split_message
+from chia.server.outbound_message import EncodedMessage, Message, make_msg
+from chia.server.outgoing_queue import MessagePriority, OutgoingQueue, message_priority
+from chia.util.ints import uint8, uint16, uint32
+
+new_peak = make_msg(ProtocolMessageTypes.new_peak, b"peak")
+new_transaction = make_msg(ProtocolMessageTypes.new_transaction, b"transaction")
+respond_blocks = make_msg(ProtocolMessageTypes.respond_blocks, b"blocks")
+
+
+def test_message_priority() -> None:
+    assert message_priority(ProtocolMessageTypes.new_signage_point_or_end_of_sub_slot.value) == MessagePriority.HIGH
+    assert message_priority(ProtocolMessageTypes.new_transaction.value) == MessagePriority.NORMAL
+    assert message_priority(ProtocolMessageTypes.respond_to_ph_update.value) == MessagePriority.BULK
+
+
+@pytest.mark.asyncio
+async def test_priorities() -> None:
+    queue = OutgoingQueue()
+    await queue.put(respond_blocks)
+    queue.put_nowait(new_transaction)
+    queue.put_nowait(EncodedMessage.from_message(new_peak))
+    queue.put_nowait(respond_blocks)
+    assert queue.qsize() == 4
+    assert queue.to_dict()["bulk"]["queued"] == 2
+
+    assert await queue.get() == EncodedMessage.from_message(new_peak)
+    # Only the more important messages
+    assert queue.get_nowait(MessagePriority.NORMAL) == new_transaction
+    assert queue.get_nowait(MessagePriority.NORMAL) is None
+    assert await queue.get() == respond_blocks
+    assert await queue.get() == respond_blocks
+    assert queue.empty()
+
+    statistics = queue.to_dict()
+    assert {priority: statistics[priority]["sent"] for priority in statistics} == {"high": 1, "normal": 1, "bulk": 2}
+    assert statistics["bulk"]["queued"] == 0
+    assert statistics["bulk"]["maximum"] >= statistics["high"]["maximum"]
+
+
+@pytest.mark.asyncio
+async def test_get_waits() -> None:
+    queue = OutgoingQueue()
+    task = asyncio.create_task(queue.get())
+    await asyncio.sleep(0.01)
+    assert not task.done()
+    queue.put_nowait(new_transaction)
+    assert await asyncio.wait_for(task, 1) == new_transaction
+    assert queue.to_dict()["normal"]["average"] is not None
+
+
+@pytest.mark.parametrize(
+    "message_types",
+    [
+        [
+            ProtocolMessageTypes.plot_sync_start,
+            ProtocolMessageTypes.plot_sync_loaded,
+            ProtocolMessageTypes.plot_sync_duplicates,
+            ProtocolMessageTypes.plot_sync_quarantined,
+            ProtocolMessageTypes.plot_sync_done,
+        ],
+        [ProtocolMessageTypes.plot_sync_resume, ProtocolMessageTypes.plot_sync_removed],
+        [ProtocolMessageTypes.coin_state_update, ProtocolMessageTypes.new_peak_wallet],
+    ],
+)
+@pytest.mark.asyncio
+async def test_ordered_streams(message_types: List[ProtocolMessageTypes]) -> None:
+    # The messages of a stream the receiver expects in order must not overtake each other
+    queue = OutgoingQueue()
+    for message_type in message_types:
+        queue.put_nowait(make_msg(message_type, b""))
+    queued = [queue.get_nowait() for _ in message_types]
+    assert [ProtocolMessageTypes(message.type) for message in queued] == message_types  # type: ignore[union-attr]
+
+
+def test_chunking_negotiated() -> None:
+    assert chunking_negotiated([Capability.BASE, Capability.CHUNKED_MESSAGES], [Capability.CHUNKED_MESSAGES])
+    assert not chunking_negotiated([Capability.BASE, Capability.CHUNKED_MESSAGES], [Capability.BASE])
+    assert not chunking_negotiated([Capability.BASE], [Capability.BASE, Capability.CHUNKED_MESSAGES])
+
+
+def test_chunks_round_trip() -> None:
+    message = Message(uint8(ProtocolMessageTypes.respond_blocks.value), uint16(3), bytes(range(256)) * 100)
+    chunks = [Message.from_bytes(chunk) for chunk in split_message(bytes(message), 1000)]
+    assert len(chunks) == 26
+    assert all(chunk.type == ProtocolMessageTypes.message_chunk.value for chunk in chunks)
+    assembler = ChunkAssembler()
+    assert [assembler.add(chunk) for chunk in chunks[:-1]] == [None] * 25
+    assert assembler.add(chunks[-1]) == message
+    # The assembler is ready for the next message
+    for chunk in split_message(bytes(respond_blocks), 5)[:-1]:
+        assert assembler.add(Message.from_bytes(chunk)) is None
+    assert assembler.add(Message.from_bytes(split_message(bytes(respond_blocks), 5)[-1])) == respond_blocks
+
+
+@pytest.mark.parametrize(
+    "chunks, error",
+    [
+        ([MessageChunk(uint32(MAX_MESSAGE_SIZE + 1), b"a")], "message size"),
+        ([MessageChunk(uint32(10), b"")], "Empty chunk"),
+        ([MessageChunk(uint32(10), b"a"), MessageChunk(uint32(11), b"a")], "size mismatch"),
+        ([MessageChunk(uint32(2), b"a"), MessageChunk(uint32(2), b"aa")], "exceed"),
+    ],
+)
+def test_invalid_chunks(chunks: List[MessageChunk], error: str) -> None:
+    assembler = ChunkAssembler()
+    with pytest.raises(ValueError, match=error):
+        for chunk in chunks:
+            assembler.add(make_msg(ProtocolMessageTypes.message_chunk, chunk))
+
+
+def test_nested_chunks() -> None:
+    inner = make_msg(ProtocolMessageTypes.message_chunk, MessageChunk(uint32(10), b"a"))
+    with pytest.raises(ValueError, match="Nested"):
+        ChunkAssembler().add(Message.from_bytes(split_message(bytes(inner))[0]))
@@ -1,19 +1,20 @@
 from __future__ import annotations
 
 import asyncio
-from typing import List
+from typing import Any, Dict, List
 
 import pytest
 
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.protocols.shared_protocol import Capability
 from chia.server.outbound_message import make_msg
-from chia.server.rate_limit_numbers import compose_rate_limits, get_rate_limits_to_use
+from chia.server.rate_limit_numbers import compose_rate_limits, default_request_budget, get_rate_limits_to_use
 from chia.server.rate_limit_numbers import rate_limits as rl_numbers
-from chia.server.rate_limits import RateLimiter
+from chia.server.rate_limits import RateLimiter, RequestBudget
 from chia.server.server import ChiaServer
 from chia.server.ws_connection import WSChiaConnection
 from chia.simulator.block_tools import test_constants
+from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.peer_info import PeerInfo
 from chia.util.ints import uint16
 from tests.conftest import node_with_params
@@ -357,3 +358,90 @@ class TestRateLimits:
         # Otherwise, fall back to v1
         assert ProtocolMessageTypes.request_block in rl_1["rate_limits_other"]
         assert ProtocolMessageTypes.request_block not in rl_1["rate_limits_tx"]
+
+
+class TestTokenBuckets:
+    def test_refill(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        now = 1000.0
+        monkeypatch.setattr("chia.server.rate_limits.time.monotonic", lambda: now)
+        r = RateLimiter(incoming=False)
+        # request_mempool_transactions allows 5 messages per minute
+        message = make_msg(ProtocolMessageTypes.request_mempool_transactions, bytes([1] * 32))
+        for _ in range(5):
+            assert r.process_msg_and_check(message, rl_v2, rl_v2)
+        assert not r.process_msg_and_check(message, rl_v2, rl_v2)
+        # A fixed window would allow a full burst again right after the reset, the bucket only refills gradually
+        now += 12
+        assert r.process_msg_and_check(message, rl_v2, rl_v2)
+        assert not r.process_msg_and_check(message, rl_v2, rl_v2)
+        # The bucket never holds more than the limit
+        now += 600
+        for _ in range(5):
+            assert r.process_msg_and_check(message, rl_v2, rl_v2)
+        assert not r.process_msg_and_check(message, rl_v2, rl_v2)
+
+    def test_limits_resolved_once(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        calls = []
+
+        def get_rate_limits(our_capabilities: List[Capability], peer_capabilities: List[Capability]) -> Dict[str, Any]:
+            calls.append((our_capabilities, peer_capabilities))
+            return get_rate_limits_to_use(our_capabilities, peer_capabilities)
+
+        monkeypatch.setattr("chia.server.rate_limits.get_rate_limits_to_use", get_rate_limits)
+        r = RateLimiter(incoming=True)
+        message = make_msg(ProtocolMessageTypes.new_peak, bytes([1] * 40))
+        our_capabilities, peer_capabilities = list(rl_v2), list(rl_v1)
+        for _ in range(10):
+            assert r.process_msg_and_check(message, our_capabilities, peer_capabilities)
+        assert len(calls) == 1
+        # New capabilities after the handshake resolve the limits again
+        peer_capabilities = list(rl_v2)
+        assert r.process_msg_and_check(message, our_capabilities, peer_capabilities)
+        assert len(calls) == 2
+
+
+class TestRequestBudget:
+    def test_peer_share(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        now = 1000.0
+        monkeypatch.setattr("chia.server.rate_limits.time.monotonic", lambda: now)
+        budget = RequestBudget({ProtocolMessageTypes.request_blocks: 8}, peer_share_percent=50)
+        request_blocks = ProtocolMessageTypes.request_blocks.value
+        peers = [bytes32([i] * 32) for i in range(3)]
+        # Each peer can use half of the budget
+        for _ in range(4):
+            assert budget.process_request(request_blocks, peers[0])
+        assert not budget.process_request(request_blocks, peers[0])
+        for _ in range(4):
+            assert budget.process_request(request_blocks, peers[1])
+        # The global budget is used up now
+        assert not budget.process_request(request_blocks, peers[2])
+        # Other message types are not limited
+        assert budget.process_request(ProtocolMessageTypes.request_block.value, peers[2])
+        result = budget.to_dict()["budgets"]
+        assert result == [
+            {"message_type": "request_blocks", "limit": 8, "available": 0, "allowed": 8, "rejected": 2, "peers": 3}
+        ]
+        now += 30
+        budget.remove_peer(peers[0])
+        assert budget.to_dict()["budgets"][0]["available"] == 4
+        assert budget.process_request(request_blocks, peers[2])
+        # A peer that reconnects keeps the share it already used
+        for _ in range(2):
+            assert budget.process_request(request_blocks, peers[0])
+        assert not budget.process_request(request_blocks, peers[0])
+        # The usage of a disconnected peer is dropped once its buckets are full again
+        budget.remove_peer(peers[0])
+        now += 59
+        assert budget.to_dict()["budgets"][0]["peers"] == 3
+        now += 1
+        assert budget.to_dict()["budgets"][0]["peers"] == 2
+
+    def test_from_config(self) -> None:
+        budget = RequestBudget.from_config({})
+        assert budget.to_dict()["peer_share_percent"] == default_request_budget["peer_share_percent"]
+        assert {limit["message_type"]: limit["limit"] for limit in budget.to_dict()["budgets"]} == (
+            default_request_budget["limits"]
+        )
+        budget = RequestBudget.from_config({"peer_share_percent": 10, "limits": {"request_blocks": 100}})
+        assert budget.to_dict()["peer_share_percent"] == 10
+        assert [limit["message_type"] for limit in budget.to_dict()["budgets"]] == ["request_blocks"]
@@ -5,6 +5,8 @@ from typing import Tuple
 import pytest
 
 from chia.full_node.full_node_api import FullNodeAPI
+from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.server.outbound_message import EncodedMessage, NodeType, make_msg
 from chia.server.server import ChiaServer
 from chia.simulator.block_tools import BlockTools
 from chia.types.peer_info import PeerInfo
@@ -18,3 +20,29 @@ async def test_duplicate_client_connection(
     _, _, server_1, server_2, _ = two_nodes
     assert await server_2.start_client(PeerInfo(self_hostname, uint16(server_1._port)), None)
     assert not await server_2.start_client(PeerInfo(self_hostname, uint16(server_1._port)), None)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_serializes_once(
+    two_nodes: Tuple[FullNodeAPI, FullNodeAPI, ChiaServer, ChiaServer, BlockTools], self_hostname: str
+) -> None:
+    _, _, server_1, server_2, _ = two_nodes
+    assert await server_2.start_client(PeerInfo(self_hostname, uint16(server_1._port)), None)
+    connection = server_1.all_connections[server_2.node_id]
+    message = make_msg(ProtocolMessageTypes.new_peak, b"peak")
+    # No await happens between queueing and the check below, so the outbound handler can't pick the message up
+    await server_1.send_to_all([message], NodeType.FULL_NODE)
+    assert connection.outgoing_queue.qsize() == 1
+    queued = connection.outgoing_queue.get_nowait()
+    assert isinstance(queued, EncodedMessage)
+    assert queued.message == message
+    assert queued.encoded == bytes(message)
+    # Excluded peers don't get anything
+    await server_1.send_to_all([message], NodeType.FULL_NODE, exclude=server_2.node_id)
+    await server_1.send_to_others([message], NodeType.FULL_NODE, connection)
+    assert connection.outgoing_queue.qsize() == 0
+    # Peers which don't keep up with their queue miss the broadcast
+    server_1.max_broadcast_queue_size = 1
+    await server_1.send_to_all([message, message], NodeType.FULL_NODE)
+    assert connection.outgoing_queue.qsize() == 0
+    assert connection.broadcast_messages_dropped == 2
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from chia.cmds.db_backup_func import (
+    INCREMENTAL_TABLES,
+    apply_incremental_backup,
+    backup_db_incremental,
+    backup_db_online,
+    db_backup_func,
+    default_incremental_path,
+)
+from tests.util.chain_db import Chain
+
+
+def dump(db_file: Path) -> Dict[str, List[Any]]:
+    with closing(sqlite3.connect(db_file)) as conn:
+        tables = {table: sorted(conn.execute(f"SELECT * FROM {table}").fetchall()) for table in INCREMENTAL_TABLES}
+        # a reorg can remove coins before an incremental backup sees them, their hints stay behind in the blockchain
+        # database but are no use to anyone
+        tables["hints"] = sorted(
+            conn.execute("SELECT h.* FROM hints h JOIN coin_record c ON h.coin_id = c.coin_name").fetchall()
+        )
+        return tables
+
+
+def test_online_backup_while_writing(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    source = tmp_path / "blockchain_v2_mainnet.sqlite"
+    backup = tmp_path / "backup.sqlite"
+    chain = Chain(source)
+    chain.add_blocks(100)
+    expected = dump(source)
+
+    # the full node keeps adding blocks between the steps of the backup
+    monkeypatch.setattr(time, "sleep", lambda seconds: chain.add_blocks(1))
+    backup_db_online(source, backup, pages_per_step=1, step_delay=0)
+    monkeypatch.undo()
+
+    assert chain.height > 150
+    assert dump(backup) == expected
+    with closing(sqlite3.connect(backup)) as conn:
+        assert conn.execute("pragma integrity_check").fetchone() == ("ok",)
+
+    with pytest.raises(RuntimeError, match="backup file already exists"):
+        backup_db_online(source, backup)
+
+
+def test_online_backup_clock_resolution(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    source = tmp_path / "blockchain_v2_mainnet.sqlite"
+    backup = tmp_path / "backup.sqlite"
+    chain = Chain(source)
+    chain.add_blocks(5)
+    # on Windows the clock only ticks every 15 ms, a step can take no time at all
+    monkeypatch.setattr(time, "monotonic", lambda: 1.0)
+    backup_db_online(source, backup, pages_per_step=1, step_delay=0)
+    monkeypatch.undo()
+    assert dump(backup) == dump(source)
+
+
+@pytest.mark.parametrize("online, incremental", [(True, False), (False, True)])
+def test_backup_no_indexes_unsupported(tmp_path: Path, online: bool, incremental: bool) -> None:
+    with pytest.raises(RuntimeError, match="--no_indexes is not supported"):
+        db_backup_func(tmp_path, tmp_path / "backup.sqlite", no_indexes=True, online=online, incremental=incremental)
+
+
+def test_incremental_backup(tmp_path: Path) -> None:
+    source = tmp_path / "blockchain_v2_mainnet.sqlite"
+    backup = tmp_path / "backup.sqlite"
+    incremental = default_incremental_path(backup)
+    assert incremental == tmp_path / "backup_incremental.sqlite"
+    chain = Chain(source)
+    chain.add_blocks(20)
+    backup_db_online(source, backup, step_delay=0)
+
+    chain.add_blocks(10)
+    backup_db_incremental(source, backup, incremental)
+    # a reorg below the height of the previous increment
+    chain.reorg(25)
+    chain.add_blocks(8)
+    backup_db_incremental(source, backup, incremental)
+    # a reorg of blocks the incremental backup doesn't have yet
+    chain.add_blocks(3)
+    chain.reorg(35)
+    chain.add_blocks(4)
+    backup_db_incremental(source, backup, incremental)
+    # nothing changed
+    backup_db_incremental(source, backup, incremental)
+
+    assert dump(backup) != dump(source)
+    apply_incremental_backup(backup, incremental)
+    assert dump(backup) == dump(source)
+
+    # the backup moved on to the peak of the increment
+    with pytest.raises(RuntimeError, match="doesn't continue the backup"):
+        backup_db_incremental(source, backup, incremental)
+    with pytest.raises(RuntimeError, match="doesn't continue the backup"):
+        apply_incremental_backup(backup, incremental)
+
+
+def test_incremental_backup_deep_reorg(tmp_path: Path) -> None:
+    source = tmp_path / "blockchain_v2_mainnet.sqlite"
+    backup = tmp_path / "backup.sqlite"
+    incremental = default_incremental_path(backup)
+    chain = Chain(source)
+    chain.add_blocks(20)
+    backup_db_online(source, backup, step_delay=0)
+    chain.add_blocks(5)
+    backup_db_incremental(source, backup, incremental)
+
+    chain.reorg(15)
+    chain.add_blocks(15)
+    with pytest.raises(RuntimeError, match="reorged below the height of the backup"):
+        backup_db_incremental(source, backup, incremental)
+
+
+def test_incremental_backup_v1(tmp_path: Path) -> None:
+    source = tmp_path / "blockchain_v1_mainnet.sqlite"
+    backup = tmp_path / "backup.sqlite"
+    with closing(sqlite3.connect(source)) as conn:
+        conn.execute("CREATE TABLE block_records(header_hash text PRIMARY KEY)")
+    backup.touch()
+    with pytest.raises(RuntimeError, match="only supported for v2 databases"):
+        backup_db_incremental(source, backup, default_incremental_path(backup))
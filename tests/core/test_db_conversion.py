@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import random
+import sqlite3
+from contextlib import closing
 from pathlib import Path
 from typing import List, Optional, Tuple
 
 import pytest
 
+from chia.cmds import db_upgrade_func
 from chia.cmds.db_upgrade_func import convert_v1_to_v2
 from chia.consensus.blockchain import Blockchain
 from chia.consensus.multiprocess_validation import PreValidationResult
@@ -14,6 +17,7 @@ from chia.full_node.coin_store import CoinStore
 from chia.full_node.hint_store import HintStore
 from chia.simulator.block_tools import test_constants
 from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.full_block import FullBlock
 from chia.util.db_wrapper import DBWrapper2
 from chia.util.ints import uint64
 from tests.util.temp_file import TempFile
@@ -26,116 +30,186 @@ def rand_bytes(num) -> bytes:
     return bytes(ret)
 
 
+class UniqueError(Exception):
+    pass
+
+
+def make_hints() -> List[Tuple[bytes32, bytes]]:
+    hints: List[Tuple[bytes32, bytes]] = []
+    for i in range(351):
+        hints.append((bytes32(rand_bytes(32)), rand_bytes(20)))
+
+    # the v1 schema allows duplicates in the hints table
+    for i in range(10):
+        coin_id = bytes32(rand_bytes(32))
+        hint = rand_bytes(20)
+        hints.append((coin_id, hint))
+        hints.append((coin_id, hint))
+
+    for i in range(2000):
+        hints.append((bytes32(rand_bytes(32)), rand_bytes(20)))
+
+    for i in range(5):
+        coin_id = bytes32(rand_bytes(32))
+        hint = rand_bytes(20)
+        hints.append((coin_id, hint))
+        hints.append((coin_id, hint))
+
+    return hints
+
+
 class TestDbUpgrade:
     @pytest.mark.asyncio
     @pytest.mark.parametrize("with_hints", [True, False])
     async def test_blocks(self, default_1000_blocks, with_hints: bool):
 
         blocks = default_1000_blocks
+        hints = make_hints()
 
-        hints: List[Tuple[bytes32, bytes]] = []
-        for i in range(351):
-            hints.append((bytes32(rand_bytes(32)), rand_bytes(20)))
+        with TempFile() as in_file, TempFile() as out_file:
+            await make_v1_db(in_file, blocks, hints if with_hints else None)
 
-        # the v1 schema allows duplicates in the hints table
-        for i in range(10):
-            coin_id = bytes32(rand_bytes(32))
-            hint = rand_bytes(20)
-            hints.append((coin_id, hint))
-            hints.append((coin_id, hint))
+            # now, convert v1 in_file to v2 out_file
+            convert_v1_to_v2(in_file, out_file)
 
-        for i in range(2000):
-            hints.append((bytes32(rand_bytes(32)), rand_bytes(20)))
+            await check_conversion(in_file, out_file, blocks, hints if with_hints else None)
 
-        for i in range(5):
-            coin_id = bytes32(rand_bytes(32))
-            hint = rand_bytes(20)
-            hints.append((coin_id, hint))
-            hints.append((coin_id, hint))
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("with_hints", [True, False])
+    async def test_resume(self, default_1000_blocks, with_hints: bool, monkeypatch: pytest.MonkeyPatch):
 
+        blocks = default_1000_blocks
+        hints = make_hints()
+        monkeypatch.setattr(db_upgrade_func, "BLOCK_BATCH_SIZE", 50)
+        monkeypatch.setattr(db_upgrade_func, "BLOCK_COMMIT_RATE", 100)
+        monkeypatch.setattr(db_upgrade_func, "HINT_COMMIT_RATE", 100)
+        monkeypatch.setattr(db_upgrade_func, "COIN_COMMIT_RATE", 100)
+
+        def interrupt_at(key: str, calls: int) -> None:
+            # simulates the upgrade getting killed before the transaction with this checkpoint is committed
+            counter = 0
+
+            def set_progress(out_db: sqlite3.Connection, progress_key: str, value: object) -> None:
+                nonlocal counter
+                if progress_key == key:
+                    counter += 1
+                    if counter == calls:
+                        raise UniqueError()
+                set_progress_original(out_db, progress_key, value)
+
+            monkeypatch.setattr(db_upgrade_func, "set_progress", set_progress)
+
+        set_progress_original = db_upgrade_func.set_progress
         with TempFile() as in_file, TempFile() as out_file:
-
-            db_wrapper1 = await DBWrapper2.create(
-                database=in_file,
-                reader_count=1,
-                db_version=1,
-                journal_mode="OFF",
-                synchronous="OFF",
+            await make_v1_db(in_file, blocks, hints if with_hints else None)
+
+            # killed before the schema and the peak got committed, the next run starts over
+            interrupt_at("peak_height", 1)
+            with pytest.raises(UniqueError):
+                convert_v1_to_v2(in_file, out_file, workers=0)
+            with closing(sqlite3.connect(out_file)) as out_db:
+                assert out_db.execute("SELECT name FROM sqlite_master").fetchall() == []
+            interrupt_at("blocks_next_hash", 7)
+            with pytest.raises(UniqueError):
+                convert_v1_to_v2(in_file, out_file, workers=2)
+            interrupt_at("blocks_next_hash", 3)
+            with pytest.raises(UniqueError):
+                convert_v1_to_v2(in_file, out_file, workers=0)
+            if with_hints:
+                interrupt_at("hints_rowid", 5)
+                with pytest.raises(UniqueError):
+                    convert_v1_to_v2(in_file, out_file, workers=0)
+            interrupt_at("coins_rowid", 2)
+            with pytest.raises(UniqueError):
+                convert_v1_to_v2(in_file, out_file, workers=0)
+            monkeypatch.setattr(db_upgrade_func, "set_progress", set_progress_original)
+            convert_v1_to_v2(in_file, out_file, workers=0)
+
+            await check_conversion(in_file, out_file, blocks, hints if with_hints else None)
+
+            # a complete conversion isn't resumed
+            with pytest.raises(RuntimeError, match="output file already exists"):
+                convert_v1_to_v2(in_file, out_file, workers=0)
+
+
+async def make_v1_db(in_file: Path, blocks: List[FullBlock], hints: Optional[List[Tuple[bytes32, bytes]]]) -> None:
+    db_wrapper1 = await DBWrapper2.create(
+        database=in_file,
+        reader_count=1,
+        db_version=1,
+        journal_mode="OFF",
+        synchronous="OFF",
+    )
+
+    try:
+        block_store1 = await BlockStore.create(db_wrapper1)
+        coin_store1 = await CoinStore.create(db_wrapper1)
+        if hints is not None:
+            hint_store1 = await HintStore.create(db_wrapper1)
+            for h in hints:
+                await hint_store1.add_hints([(h[0], h[1])])
+
+        bc = await Blockchain.create(coin_store1, block_store1, test_constants, Path("."), reserved_cores=0)
+
+        for block in blocks:
+            # await _validate_and_add_block(bc, block)
+            results = PreValidationResult(None, uint64(1), None, False)
+            result, err, _ = await bc.receive_block(block, results)
+            assert err is None
+    finally:
+        await db_wrapper1.close()
+
+
+async def check_conversion(
+    in_file: Path, out_file: Path, blocks: List[FullBlock], hints: Optional[List[Tuple[bytes32, bytes]]]
+) -> None:
+    db_wrapper1 = await DBWrapper2.create(database=in_file, reader_count=1, db_version=1)
+    db_wrapper2 = await DBWrapper2.create(database=out_file, reader_count=1, db_version=2)
+
+    try:
+        block_store1 = await BlockStore.create(db_wrapper1)
+        coin_store1 = await CoinStore.create(db_wrapper1)
+        hint_store1: Optional[HintStore] = None
+        if hints is not None:
+            hint_store1 = await HintStore.create(db_wrapper1)
+
+        block_store2 = await BlockStore.create(db_wrapper2)
+        coin_store2 = await CoinStore.create(db_wrapper2)
+        hint_store2 = await HintStore.create(db_wrapper2)
+
+        if hints is not None:
+            # check hints
+            for h in hints:
+                assert hint_store1 is not None
+                assert h[0] in await hint_store1.get_coin_ids(h[1])
+                assert h[0] in await hint_store2.get_coin_ids(h[1])
+
+        # check peak
+        assert await block_store1.get_peak() == await block_store2.get_peak()
+
+        # check blocks
+        for block in blocks:
+            hh = block.header_hash
+            height = block.height
+            assert await block_store1.get_full_block(hh) == await block_store2.get_full_block(hh)
+            assert await block_store1.get_full_block_bytes(hh) == await block_store2.get_full_block_bytes(hh)
+            assert await block_store1.get_full_blocks_at([height]) == await block_store2.get_full_blocks_at([height])
+            assert await block_store1.get_block_records_by_hash([hh]) == await block_store2.get_block_records_by_hash(
+                [hh]
             )
-
-            try:
-                block_store1 = await BlockStore.create(db_wrapper1)
-                coin_store1 = await CoinStore.create(db_wrapper1)
-                if with_hints:
-                    hint_store1: Optional[HintStore] = await HintStore.create(db_wrapper1)
-                    for h in hints:
-                        assert hint_store1 is not None
-                        await hint_store1.add_hints([(h[0], h[1])])
-                else:
-                    hint_store1 = None
-
-                bc = await Blockchain.create(coin_store1, block_store1, test_constants, Path("."), reserved_cores=0)
-
-                for block in blocks:
-                    # await _validate_and_add_block(bc, block)
-                    results = PreValidationResult(None, uint64(1), None, False)
-                    result, err, _ = await bc.receive_block(block, results)
-                    assert err is None
-            finally:
-                await db_wrapper1.close()
-
-            # now, convert v1 in_file to v2 out_file
-            convert_v1_to_v2(in_file, out_file)
-
-            db_wrapper1 = await DBWrapper2.create(database=in_file, reader_count=1, db_version=1)
-            db_wrapper2 = await DBWrapper2.create(database=out_file, reader_count=1, db_version=2)
-
-            try:
-                block_store1 = await BlockStore.create(db_wrapper1)
-                coin_store1 = await CoinStore.create(db_wrapper1)
-                hint_store1 = None
-                if with_hints:
-                    hint_store1 = await HintStore.create(db_wrapper1)
-
-                block_store2 = await BlockStore.create(db_wrapper2)
-                coin_store2 = await CoinStore.create(db_wrapper2)
-                hint_store2 = await HintStore.create(db_wrapper2)
-
-                if with_hints:
-                    # check hints
-                    for h in hints:
-                        assert hint_store1 is not None
-                        assert h[0] in await hint_store1.get_coin_ids(h[1])
-                        assert h[0] in await hint_store2.get_coin_ids(h[1])
-
-                # check peak
-                assert await block_store1.get_peak() == await block_store2.get_peak()
-
-                # check blocks
-                for block in blocks:
-                    hh = block.header_hash
-                    height = block.height
-                    assert await block_store1.get_full_block(hh) == await block_store2.get_full_block(hh)
-                    assert await block_store1.get_full_block_bytes(hh) == await block_store2.get_full_block_bytes(hh)
-                    assert await block_store1.get_full_blocks_at([height]) == await block_store2.get_full_blocks_at(
-                        [height]
-                    )
-                    assert await block_store1.get_block_records_by_hash(
-                        [hh]
-                    ) == await block_store2.get_block_records_by_hash([hh])
-                    assert await block_store1.get_block_record(hh) == await block_store2.get_block_record(hh)
-                    assert await block_store1.is_fully_compactified(hh) == await block_store2.is_fully_compactified(hh)
-
-                # check coins
-                for block in blocks:
-                    coins = await coin_store1.get_coins_added_at_height(block.height)
-                    assert await coin_store2.get_coins_added_at_height(block.height) == coins
-                    assert await coin_store1.get_coins_removed_at_height(
-                        block.height
-                    ) == await coin_store2.get_coins_removed_at_height(block.height)
-                    for c in coins:
-                        n = c.coin.name()
-                        assert await coin_store1.get_coin_record(n) == await coin_store2.get_coin_record(n)
-            finally:
-                await db_wrapper1.close()
-                await db_wrapper2.close()
+            assert await block_store1.get_block_record(hh) == await block_store2.get_block_record(hh)
+            assert await block_store1.is_fully_compactified(hh) == await block_store2.is_fully_compactified(hh)
+
+        # check coins
+        for block in blocks:
+            coins = await coin_store1.get_coins_added_at_height(block.height)
+            assert await coin_store2.get_coins_added_at_height(block.height) == coins
+            assert await coin_store1.get_coins_removed_at_height(
+                block.height
+            ) == await coin_store2.get_coins_removed_at_height(block.height)
+            for c in coins:
+                n = c.coin.name()
+                assert await coin_store1.get_coin_record(n) == await coin_store2.get_coin_record(n)
+    finally:
+        await db_wrapper1.close()
+        await db_wrapper2.close()
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from chia.cmds.db_snapshot_func import FRAME_SIZE, export_snapshot, import_snapshot, verify_snapshot
+from chia.consensus.blockchain import Blockchain
+from chia.full_node.block_store import BlockStore
+from chia.full_node.coin_store import CoinStore
+from chia.full_node.hint_store import HintStore
+from chia.full_node.weight_proof import WeightProofHandler
+from chia.simulator.block_tools import BlockTools
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.full_block import FullBlock
+from chia.util.db_wrapper import DBWrapper2
+from chia.util.ints import uint32
+from tests.util.chain_db import Chain
+
+
+def dump(db_file: Path, height: int) -> Dict[str, List[Any]]:
+    with closing(sqlite3.connect(db_file)) as conn:
+        return {
+            "full_blocks": conn.execute(
+                "SELECT header_hash, prev_hash, height, sub_epoch_summary, block_record FROM full_blocks "
+                "WHERE height <= ? AND in_main_chain = 1 ORDER BY height",
+                (height,),
+            ).fetchall(),
+            "peak_block": conn.execute(
+                "SELECT block FROM full_blocks WHERE height = ? AND in_main_chain = 1", (height,)
+            ).fetchall(),
+            "coin_record": conn.execute(
+                "SELECT coin_name, confirmed_index, CASE WHEN spent_index > ? THEN 0 ELSE spent_index END, coinbase, "
+                "puzzle_hash, coin_parent, amount, timestamp FROM coin_record WHERE confirmed_index <= ? "
+                "ORDER BY coin_name",
+                (height, height),
+            ).fetchall(),
+            "hints": conn.execute(
+                "SELECT h.* FROM hints h JOIN coin_record c ON h.coin_id = c.coin_name WHERE confirmed_index <= ? "
+                "ORDER BY h.coin_id, h.hint",
+                (height,),
+            ).fetchall(),
+        }
+
+
+def test_snapshot_round_trip(tmp_path: Path) -> None:
+    source = tmp_path / "blockchain_v2_mainnet.sqlite"
+    snapshot = tmp_path / "snapshot.bin"
+    imported = tmp_path / "imported.sqlite"
+    chain = Chain(source)
+    chain.add_blocks(50)
+
+    summary = export_snapshot(source, snapshot)
+    assert (summary.block_count, summary.coin_count, summary.hint_count) == (51, 102, 102)
+    assert summary == import_snapshot(snapshot, imported, genesis_challenge=bytes32(bytes(32)))
+    assert not imported.with_name("imported.sqlite.tmp").exists()
+
+    assert dump(imported, chain.height) == dump(source, chain.height)
+    with closing(sqlite3.connect(imported)) as conn:
+        assert conn.execute("SELECT hash FROM current_peak WHERE key = 0").fetchone() == (chain.peak_hash,)
+        assert conn.execute("SELECT version FROM database_version").fetchone() == (2,)
+        assert conn.execute("SELECT COUNT(*) FROM full_blocks WHERE block IS NULL").fetchone() == (50,)
+        indices = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"height", "main_chain", "coin_confirmed_index", "coin_puzzle_hash", "hint_index"} <= indices
+
+    assert verify_snapshot(snapshot, source) == summary
+    assert verify_snapshot(snapshot, imported) == summary
+    assert verify_snapshot(snapshot) == summary
+
+    with pytest.raises(RuntimeError, match="snapshot file already exists"):
+        export_snapshot(source, snapshot)
+    with pytest.raises(RuntimeError, match="output file already exists"):
+        import_snapshot(snapshot, imported)
+
+
+def test_snapshot_below_peak(tmp_path: Path) -> None:
+    source = tmp_path / "blockchain_v2_mainnet.sqlite"
+    chain = Chain(source)
+    chain.add_blocks(30)
+    at_peak = export_snapshot(source, tmp_path / "at_peak.bin")
+
+    # the coins spent and created above the height of the snapshot, and a reorg above it, don't change it
+    chain.add_blocks(10)
+    chain.reorg(35)
+    chain.add_blocks(10)
+    below_peak = export_snapshot(source, tmp_path / "below_peak.bin", height=30)
+    assert below_peak.digest == at_peak.digest
+    assert verify_snapshot(tmp_path / "at_peak.bin", source) == at_peak
+
+    import_snapshot(tmp_path / "below_peak.bin", tmp_path / "imported.sqlite")
+    assert dump(tmp_path / "imported.sqlite", 30) == dump(source, 30)
+
+    with pytest.raises(RuntimeError, match="above the peak"):
+        export_snapshot(source, tmp_path / "above_peak.bin", height=100)
+
+
+def test_snapshot_multiple_frames(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    source = tmp_path / "blockchain_v2_mainnet.sqlite"
+    chain = Chain(source)
+    chain.add_blocks(50)
+    one_frame = export_snapshot(source, tmp_path / "one_frame.bin")
+
+    monkeypatch.setattr("chia.cmds.db_snapshot_func.FRAME_SIZE", 500)
+    assert FRAME_SIZE > 500
+    many_frames = export_snapshot(source, tmp_path / "many_frames.bin")
+    assert many_frames.digest == one_frame.digest
+    assert many_frames.checksum != one_frame.checksum
+    import_snapshot(tmp_path / "many_frames.bin", tmp_path / "imported.sqlite")
+    assert dump(tmp_path / "imported.sqlite", chain.height) == dump(source, chain.height)
+
+
+def test_snapshot_corrupt(tmp_path: Path) -> None:
+    source = tmp_path / "blockchain_v2_mainnet.sqlite"
+    snapshot = tmp_path / "snapshot.bin"
+    imported = tmp_path / "imported.sqlite"
+    chain = Chain(source)
+    chain.add_blocks(50)
+    export_snapshot(source, snapshot)
+    data = snapshot.read_bytes()
+
+    snapshot.write_bytes(data[: len(data) // 2])
+    with pytest.raises(RuntimeError, match="unexpected end of file"):
+        import_snapshot(snapshot, imported)
+    assert not imported.exists()
+    assert not imported.with_name("imported.sqlite.tmp").exists()
+
+    corrupt = bytearray(data)
+    corrupt[len(data) // 2] ^= 1
+    snapshot.write_bytes(corrupt)
+    with pytest.raises(RuntimeError, match="snapshot file is corrupt"):
+        import_snapshot(snapshot, imported)
+    assert not imported.exists()
+    with pytest.raises(RuntimeError, match="snapshot file is corrupt"):
+        verify_snapshot(snapshot)
+
+    snapshot.write_bytes(b"not a snapshot")
+    with pytest.raises(RuntimeError, match="not a snapshot file"):
+        verify_snapshot(snapshot)
+
+
+def test_snapshot_mismatch(tmp_path: Path) -> None:
+    source = tmp_path / "blockchain_v2_mainnet.sqlite"
+    snapshot = tmp_path / "snapshot.bin"
+    chain = Chain(source)
+    chain.add_blocks(20)
+    export_snapshot(source, snapshot)
+
+    with pytest.raises(RuntimeError, match="different blockchain"):
+        import_snapshot(snapshot, tmp_path / "imported.sqlite", genesis_challenge=bytes32(b"\x01" * 32))
+
+    chain.conn.execute("UPDATE coin_record SET timestamp = timestamp + 1 WHERE confirmed_index = 10")
+    chain.conn.commit()
+    with pytest.raises(RuntimeError, match="doesn't match the snapshot"):
+        verify_snapshot(snapshot, source)
+
+    chain.reorg(15)
+    chain.add_blocks(10)
+    with pytest.raises(RuntimeError, match="the snapshot has"):
+        verify_snapshot(snapshot, source)
+
+
+def test_snapshot_substituted_peak_block(tmp_path: Path) -> None:
+    source = tmp_path / "blockchain_v2_mainnet.sqlite"
+    snapshot = tmp_path / "snapshot.bin"
+    substituted = tmp_path / "substituted.bin"
+    chain = Chain(source)
+    chain.add_blocks(20)
+    export_snapshot(source, snapshot)
+
+    # a different block at the snapshot height, stored under the header hash of the real one
+    other_block = chain.conn.execute("SELECT block FROM full_blocks WHERE height = 10").fetchone()[0]
+    chain.conn.execute("UPDATE full_blocks SET block = ? WHERE header_hash = ?", (other_block, chain.peak_hash))
+    chain.conn.commit()
+    with pytest.raises(RuntimeError, match="doesn't match the snapshot"):
+        verify_snapshot(snapshot, source)
+    export_snapshot(source, substituted)
+    with pytest.raises(RuntimeError, match="the block at the snapshot height is"):
+        import_snapshot(substituted, tmp_path / "imported.sqlite")
+    assert not (tmp_path / "imported.sqlite").exists()
+
+
+async def add_blocks(bc: Blockchain, blocks: List[FullBlock]) -> None:
+    for i in range(0, len(blocks), 100):
+        batch = blocks[i : i + 100]
+        pre_validation = await bc.pre_validate_blocks_multiprocessing(batch, {}, validate_signatures=False)
+        for block, result in zip(batch, pre_validation):
+            assert result.error is None
+            _, err, _ = await bc.receive_block(block, result)
+            assert err is None
+
+
+@pytest.mark.asyncio
+async def test_snapshot_open_imported(tmp_path: Path, bt: BlockTools, default_1000_blocks: List[FullBlock]) -> None:
+    source = tmp_path / "blockchain_v2_mainnet.sqlite"
+    snapshot = tmp_path / "snapshot.bin"
+    imported = tmp_path / "imported.sqlite"
+    blocks = default_1000_blocks
+    height = 900
+    db_wrapper = await DBWrapper2.create(database=source, reader_count=1, db_version=2)
+    try:
+        async with db_wrapper.writer_maybe_transaction() as conn:
+            await conn.execute("CREATE TABLE database_version(version int)")
+            await conn.execute("INSERT INTO database_version VALUES (2)")
+        await HintStore.create(db_wrapper)
+        bc = await Blockchain.create(
+            await CoinStore.create(db_wrapper), await BlockStore.create(db_wrapper), bt.constants, tmp_path, 0
+        )
+        await add_blocks(bc, blocks[: height + 1])
+        bc.shut_down()
+    finally:
+        await db_wrapper.close()
+    export_snapshot(source, snapshot)
+    import_snapshot(snapshot, imported, genesis_challenge=bt.constants.GENESIS_CHALLENGE)
+
+    db_wrapper = await DBWrapper2.create(database=imported, reader_count=1, db_version=2)
+    try:
+        block_store = await BlockStore.create(db_wrapper)
+        coin_store = await CoinStore.create(db_wrapper)
+        bc = await Blockchain.create(coin_store, block_store, bt.constants, tmp_path, 0)
+        peak = await bc.get_full_peak()
+        assert peak is not None and peak.header_hash == blocks[height].header_hash
+
+        # the blocks below the height of the snapshot only have their block records
+        below = blocks[height - 1].header_hash
+        assert await block_store.get_block_record(below) is not None
+        assert await block_store.get_full_block(below) is None
+        assert await block_store.get_full_block_bytes(below) is None
+        assert await block_store.get_block_info(below) is None
+        assert await block_store.get_generator(below) is None
+        assert await block_store.get_full_blocks_at([uint32(height - 1), uint32(height)]) == [blocks[height]]
+        with pytest.raises(ValueError):
+            await block_store.get_generators_at([uint32(height - 1)])
+        with pytest.raises(ValueError, match="not in the blockchain"):
+            await block_store.get_blocks_by_hash([below])
+        with pytest.raises(ValueError, match="not in the blockchain"):
+            await block_store.get_block_bytes_by_hash([below])
+        with pytest.raises(ValueError, match="were not found"):
+            await block_store.get_block_bytes_in_range(height - 1, height)
+        assert list(await bc.get_header_blocks_in_range(0, height, tx_filter=False)) == [blocks[height].header_hash]
+
+        # the full node creates the weight proof segments at startup, there are no blocks to create them from
+        wp_handler = WeightProofHandler(bt.constants, bc)
+        await wp_handler.create_sub_epoch_segments()
+        assert await wp_handler.get_proof_of_weight(peak.header_hash) is None
+
+        # the node syncs on from the snapshot
+        await add_blocks(bc, blocks[height + 1 :])
+        assert bc.get_peak_height() == len(blocks) - 1
+        bc.shut_down()
+    finally:
+        await db_wrapper.close()
@@ -14,7 +14,8 @@ from chia.consensus.default_constants import DEFAULT_CONSTANTS
 from chia.consensus.multiprocess_validation import PreValidationResult
 from chia.full_node.block_store import BlockStore
 from chia.full_node.coin_store import CoinStore
-from chia.simulator.block_tools import test_constants
+from chia.simulator.block_tools import BlockTools, test_constants
+from chia.simulator.wallet_tools import WalletTool
 from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.full_block import FullBlock
 from chia.util.db_wrapper import DBWrapper2
@@ -142,7 +143,9 @@ async def make_db(db_file: Path, blocks: List[FullBlock]) -> None:
         bc = await Blockchain.create(coin_store, block_store, test_constants, Path("."), reserved_cores=0)
 
         for block in blocks:
-            results = PreValidationResult(None, uint64(1), None, False)
+            # the transaction blocks need the results of their generators
+            _, _, npc_result = await bc.get_tx_removals_and_additions(block)
+            results = PreValidationResult(None, uint64(1), npc_result, False)
             result, err, _ = await bc.receive_block(block, results)
             assert err is None
     finally:
@@ -160,3 +163,95 @@ async def test_db_validate_default_1000_blocks(default_1000_blocks: List[FullBlo
         with pytest.raises(RuntimeError) as execinfo:
             validate_v2(db_file, validate_blocks=True)
         assert "Blockchain has invalid genesis challenge" in str(execinfo.value)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [0, 2])
+async def test_db_validate_default_1000_blocks_parallel(default_1000_blocks: List[FullBlock], workers: int) -> None:
+
+    with TempFile() as db_file:
+        await make_db(db_file, default_1000_blocks)
+
+        with pytest.raises(RuntimeError) as execinfo:
+            validate_v2(db_file, validate_blocks=True, validate_coins=True, workers=workers, constants=test_constants)
+        assert "Blockchain has invalid genesis challenge" in str(execinfo.value)
+
+
+def make_transaction_blocks(bt: BlockTools) -> List[FullBlock]:
+    wallet = WalletTool(test_constants)
+    reward_ph = wallet.get_new_puzzlehash()
+    blocks = bt.get_consecutive_blocks(
+        10,
+        farmer_reward_puzzle_hash=reward_ph,
+        pool_reward_puzzle_hash=reward_ph,
+        guarantee_transaction_block=True,
+    )
+    coins = [coin for block in blocks for coin in block.get_included_reward_coins() if coin.puzzle_hash == reward_ph]
+
+    blocks = bt.get_consecutive_blocks(
+        1,
+        blocks,
+        farmer_reward_puzzle_hash=reward_ph,
+        pool_reward_puzzle_hash=reward_ph,
+        transaction_data=wallet.generate_signed_transaction(uint64(1000), reward_ph, coins[0]),
+        guarantee_transaction_block=True,
+    )
+    # this block's generator references the one of the block before it
+    blocks = bt.get_consecutive_blocks(
+        1,
+        blocks,
+        farmer_reward_puzzle_hash=reward_ph,
+        pool_reward_puzzle_hash=reward_ph,
+        transaction_data=wallet.generate_signed_transaction(uint64(2000), reward_ph, coins[1]),
+        previous_generator=[blocks[-1].height],
+        guarantee_transaction_block=True,
+    )
+    assert len(blocks[-1].transactions_generator_ref_list) == 1
+    return bt.get_consecutive_blocks(3, blocks, guarantee_transaction_block=True)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [0, 2])
+async def test_db_validate_coins(bt: BlockTools, workers: int) -> None:
+    blocks = make_transaction_blocks(bt)
+    with TempFile() as db_file:
+        await make_db(db_file, blocks)
+
+        with pytest.raises(RuntimeError, match="Blockchain has invalid genesis challenge"):
+            validate_v2(db_file, validate_blocks=False, validate_coins=True, workers=workers, constants=test_constants)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "corruption, error",
+    [
+        ("UPDATE coin_record SET amount=? WHERE coinbase=0 AND spent_index=0", "has the coin_record"),
+        ("UPDATE coin_record SET spent_index=0 WHERE spent_index>0", "but its coin_record isn't"),
+        ("UPDATE coin_record SET spent_index=confirmed_index+1 WHERE spent_index=0", "but no block spent it"),
+        ("DELETE FROM coin_record WHERE coinbase=0", "Database is missing the coin"),
+        ("INSERT INTO coin_record VALUES(?, 5, 0, 0, ?, ?, ?, 0)", "but no block created it"),
+    ],
+)
+async def test_db_validate_coins_mismatch(bt: BlockTools, corruption: str, error: str) -> None:
+    blocks = make_transaction_blocks(bt)
+    with TempFile() as db_file:
+        await make_db(db_file, blocks)
+        with closing(sqlite3.connect(db_file)) as conn:
+            parameters = [rand_hash() for _ in range(corruption.count("?"))]
+            with closing(conn.execute(corruption, parameters)) as cursor:
+                assert cursor.rowcount > 0
+            conn.commit()
+
+        with pytest.raises(RuntimeError, match=error):
+            validate_v2(db_file, validate_blocks=False, validate_coins=True, constants=test_constants)
+
+        # the checks are limited to the heights the corruption is outside of
+        with pytest.raises(RuntimeError, match="Blockchain has invalid genesis challenge"):
+            validate_v2(
+                db_file,
+                validate_blocks=False,
+                validate_coins=True,
+                start_height=0,
+                end_height=0,
+                constants=test_constants,
+            )
@@ -16,6 +16,7 @@ import pytest_asyncio
 
 from chia.consensus.coinbase import create_puzzlehash_for_pk
 from chia.farmer.farmer import Farmer
+from chia.harvester.lookup_statistics import QuarantineParameter
 from chia.plot_sync.receiver import Receiver
 from chia.plotting.util import add_plot_directory
 from chia.protocols import farmer_protocol
@@ -101,6 +102,36 @@ async def test_get_routes(harvester_farmer_environment):
     await validate_get_routes(harvester_rpc_client, harvester_service.rpc_server.rpc_api)
 
 
+@pytest.mark.asyncio
+async def test_harvester_get_lookup_statistics(harvester_farmer_environment) -> None:
+    (
+        farmer_service,
+        farmer_rpc_client,
+        harvester_service,
+        harvester_rpc_client,
+        _,
+    ) = harvester_farmer_environment
+    harvester = harvester_service._node
+
+    statistics = await harvester_rpc_client.get_lookup_statistics()
+    assert statistics["quarantine"] == QuarantineParameter().to_json_dict()
+    assert statistics["plots"] == []
+    assert statistics["disks"] == []
+
+    async def non_zero_plots() -> bool:
+        return len((await harvester_rpc_client.get_plots())["plots"]) > 0
+
+    await time_out_assert(10, non_zero_plots)
+    plot = (await harvester_rpc_client.get_plots())["plots"][0]
+    harvester.lookup_statistics.add(Path(plot["filename"]), 0, 0.3)
+    statistics = await harvester_rpc_client.get_lookup_statistics()
+    assert len(statistics["plots"]) == len(statistics["disks"]) == 1
+    assert statistics["plots"][0]["filename"] == plot["filename"]
+    assert statistics["plots"][0]["histogram"]["count"] == 1
+    assert statistics["plots"][0]["histogram"]["last"] == 0.3
+    assert statistics["disks"][0]["plot_count"] == 1
+
+
 @pytest.mark.parametrize("endpoint", ["get_harvesters", "get_harvesters_summary"])
 @pytest.mark.asyncio
 async def test_farmer_get_harvesters_and_summary(harvester_farmer_environment, endpoint: str):
@@ -178,6 +209,11 @@ async def test_farmer_signage_point_endpoints(harvester_farmer_environment):
 
     await time_out_assert(5, have_signage_points, True)
     assert (await farmer_rpc_client.get_signage_point(std_hash(b"2"))) is not None
+    cache_info = await farmer_rpc_client.get_cache_info()
+    assert cache_info["signage_point_hashes"] == 1
+    assert cache_info["signage_points"] == 1
+    assert cache_info["proofs"] == 0
+    assert cache_info["oldest_age"] is not None
 
 
 @pytest.mark.asyncio
@@ -271,6 +307,8 @@ async def test_farmer_get_pool_state(harvester_farmer_environment, self_hostname
 
     pool_state = (await farmer_rpc_client.get_pool_state())["pool_state"]
     assert len(pool_state) == 1
+    # No partials submitted yet
+    assert pool_state[0]["partial_submission"] is None
     assert (
         pool_state[0]["pool_config"]["payout_instructions"]
         == "c2b08e41d766da4116e388357ed957d04ad754623a915f3fd65188a8746cf3e8"
@@ -406,6 +444,7 @@ def test_plot_matches_filter(filter_item: FilterItem, match: bool):
         (FarmerRpcClient.get_harvester_plots_keys_missing, ["keys_missing_1"], None, False, 2),
         (FarmerRpcClient.get_harvester_plots_duplicates, [], None, True, 7),
         (FarmerRpcClient.get_harvester_plots_duplicates, ["duplicates_0"], None, False, 3),
+        (FarmerRpcClient.get_harvester_plots_quarantined, [], None, True, 5),
     ],
 )
 @pytest.mark.asyncio
@@ -477,6 +516,11 @@ async def test_farmer_get_harvester_plots_endpoints(
                 plot_path = Path(harvester_plots[i]["filename"])
                 plots.append(str(duplicate_paths[dir_index] / plot_path.name))
                 copy(plot_path, plots[-1])
+    elif endpoint == FarmerRpcClient.get_harvester_plots_quarantined:
+        harvester.lookup_statistics._parameter = QuarantineParameter(True, uint32(1000), uint32(1))
+        for plot in harvester_plots[:5]:
+            harvester.lookup_statistics.add(Path(plot["filename"]), 0, 2)
+            plots.append(plot["filename"])
 
     # Sort and filter the data
     if endpoint == FarmerRpcClient.get_harvester_plots_valid:
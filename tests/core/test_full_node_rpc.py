@@ -52,6 +52,14 @@ class TestRpc:
             assert state["difficulty"] > 0
             assert state["sub_slot_iters"] > 0
 
+            request_budget = await client.get_request_budget()
+            assert request_budget["peer_share_percent"] == 25
+            assert {budget["message_type"]: budget["limit"] for budget in request_budget["budgets"]} == {
+                "request_blocks": 2000,
+                "register_interest_in_puzzle_hash": 4000,
+                "register_interest_in_coin": 4000,
+            }
+
             blocks = bt.get_consecutive_blocks(num_blocks)
             blocks = bt.get_consecutive_blocks(num_blocks, block_list_input=blocks, guarantee_transaction_block=True)
 
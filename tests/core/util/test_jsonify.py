@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import itertools
+import json
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
+import pytest
+from blspy import G1Element
+
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.program import Program
 from chia.types.blockchain_format.sized_bytes import bytes32
-from chia.util.ints import uint32
+from chia.util.ints import uint32, uint64
+from chia.util.json_util import EnhancedJSONEncoder, JSONStreamable, dict_to_json_str
 from chia.util.streamable import Streamable, recurse_jsonify, streamable
+from chia.wallet.util.wallet_types import WalletType
+from tests.util.test_full_block_utils import get_full_blocks
 
 
 def dict_with_types(d: Dict[str, Any]) -> Dict[str, Any]:
@@ -145,3 +155,87 @@ def test_recurse_jsonify() -> None:
 
     d = {"a": "foo", "b": bytes([0x13, 0x37]), "c": [uint32(1), uint32(2)], "d": {"bar": None}}
     assert recurse_jsonify(d) == {"a": "foo", "b": "0x1337", "c": [1, 2], "d": {"bar": None}}
+
+
+@streamable
+@dataclass(frozen=True)
+class JSONTypes(Streamable):
+    a: uint64
+    b: bool
+    c: str
+    d: G1Element
+    f: Optional[Coin]
+    g: List[NestedWithListInner]
+    h: Tuple[TestNestedOuter, bytes32]
+    i: Program
+
+
+@streamable
+@dataclass(frozen=True)
+class JSONOverride(Streamable):
+    a: uint32
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {"b": int(self.a) + 1}
+
+
+@streamable
+@dataclass(frozen=True)
+class JSONOverrideOuter(Streamable):
+    a: JSONOverride
+
+
+json_types = JSONTypes(
+    uint64(2**64 - 1),
+    True,
+    'foö\n"bar"',
+    G1Element(),
+    Coin(bytes32(range(32)), bytes32([1] * 32), uint64(123)),
+    [NestedWithListInner(uint32(1), b"\x01"), NestedWithListInner(uint32(2), b"")],
+    (TestNestedOuter(TestNestedInner(("foo", uint32(123), "bar"), bytes([0x13, 0x37]))), bytes32([2] * 32)),
+    Program.to([1, 2]),
+)
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        json_types,
+        JSONTypes(uint64(0), False, "", G1Element(), None, [], json_types.h, Program.to(0)),
+        JSONOverride(uint32(1)),
+        JSONOverrideOuter(JSONOverride(uint32(1))),
+        NestedWithTupleOuter((NestedWithTupleInner(("foo", uint32(1), "bar"), b"\x13"), uint32(2), "baz")),
+        {"a": [json_types, None, 1.5, float("nan"), -1, (True, False)], "b": {}, "c": [], "d": bytes32([3] * 32)},
+        {1: "a", 2.5: "b"},
+        {False: 1, True: 2},
+        {None: 1},
+        {"a": WalletType.CAT, "b": [WalletType.NFT]},
+        Coin(bytes32(range(32)), bytes32([1] * 32), uint64(123)),
+    ],
+)
+def test_dict_to_json_str(obj: Any) -> None:
+    assert dict_to_json_str(obj) == json.dumps(obj, cls=EnhancedJSONEncoder, sort_keys=True)
+
+
+@pytest.mark.parametrize(
+    "item, extra_fields",
+    [
+        (json_types, {}),
+        (json_types, {"aa": 1, "c": None, "z": [json_types]}),
+        (JSONOverride(uint32(1)), {"a": 2}),
+    ],
+)
+def test_json_streamable(item: Streamable, extra_fields: Dict[str, Any]) -> None:
+    expected = json.dumps({**item.to_json_dict(), **extra_fields}, cls=EnhancedJSONEncoder, sort_keys=True)
+    assert dict_to_json_str(JSONStreamable(item, extra_fields)) == expected
+    assert dict_to_json_str([JSONStreamable(item, extra_fields)]) == f"[{expected}]"
+
+
+def test_dict_to_json_str_full_blocks() -> None:
+    for block in itertools.islice(get_full_blocks(), 20):
+        assert dict_to_json_str(block) == json.dumps(block.to_json_dict(), sort_keys=True)
+
+
+def test_dict_to_json_str_invalid_key() -> None:
+    with pytest.raises(TypeError):
+        dict_to_json_str({bytes32([0] * 32): 1})
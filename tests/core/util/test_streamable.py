@@ -2,8 +2,8 @@ from __future__ import annotations
 
 import io
 import re
-from dataclasses import dataclass, field, fields
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type, get_type_hints
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Type, get_type_hints
 
 import pytest
 from blspy import G1Element
@@ -13,12 +13,14 @@ from typing_extensions import Literal, get_args
 from chia.protocols.wallet_protocol import RespondRemovals
 from chia.simulator.block_tools import BlockTools, test_constants
 from chia.types.blockchain_format.coin import Coin
-from chia.types.blockchain_format.program import Program
+from chia.types.blockchain_format.program import SERIALIZED_LENGTH_WINDOW, Program, SerializedProgram
 from chia.types.blockchain_format.sized_bytes import bytes4, bytes32
 from chia.types.full_block import FullBlock
 from chia.types.weight_proof import SubEpochChallengeSegment
-from chia.util.ints import uint8, uint32, uint64
+from chia.util.hash import std_hash
+from chia.util.ints import int8, int64, uint8, uint32, uint64, uint128
 from chia.util.streamable import (
+    BytesReader,
     ConversionError,
     DefinitionError,
     InvalidSizeError,
@@ -37,9 +39,11 @@ from chia.util.streamable import (
     parse_optional,
     parse_size_hints,
     parse_str,
+    parse_streamable_fields,
     parse_tuple,
     parse_uint32,
     recurse_jsonify,
+    stream_streamable_fields,
     streamable,
     streamable_from_dict,
     write_uint32,
@@ -671,6 +675,34 @@ def test_ambiguous_deserialization_program() -> None:
         TestClassProgram.from_bytes(bytes(program) + b"9")
 
 
+def test_parse_serialized_programs() -> None:
+    @streamable
+    @dataclass(frozen=True)
+    class TestClassPrograms(Streamable):
+        a: List[SerializedProgram]
+        b: Coin
+
+    # Programs smaller and larger than the first window which `SerializedProgram.parse` looks at
+    programs = [SerializedProgram.from_program(Program.to([b"a" * 1000] * count)) for count in [0, 10, 1000, 10, 1000]]
+    assert len(bytes(programs[2])) > SERIALIZED_LENGTH_WINDOW
+    item = TestClassPrograms(programs, Coin(bytes32(b"a" * 32), bytes32(b"b" * 32), uint64(1)))
+    assert TestClassPrograms.from_bytes(bytes(item)) == item
+    assert TestClassPrograms.parse(io.BytesIO(bytes(item))) == item
+
+    # The last program is truncated
+    with pytest.raises(OSError, match="bad encoding"):
+        TestClassPrograms.from_bytes(bytes(item)[:-100])
+
+
+def test_bytes_reader() -> None:
+    reader = BytesReader(b"abcdef")
+    assert reader.read(2) == b"ab"
+    assert bytes(reader.remaining()) == b"cdef"
+    assert reader.remaining().obj is reader.remaining().obj
+    reader.seek(1, io.SEEK_CUR)
+    assert bytes(reader.remaining()) == b"def"
+
+
 def test_streamable_empty() -> None:
     @streamable
     @dataclass(frozen=True)
@@ -680,6 +712,168 @@ def test_streamable_empty() -> None:
     assert A.from_bytes(bytes(A())) == A()
 
 
+@streamable
+@dataclass(frozen=True)
+class FixedSizeRuns(Streamable):
+    a: uint8
+    b: bool
+    c: int8
+    d: uint64
+    e: uint128
+    f: bytes32
+    g: G1Element
+    h: Optional[uint32]
+    i: List[bytes4]
+    j: int64
+    k: bool
+    l: str
+    m: uint32
+
+
+def get_fixed_size_runs(**kwargs: Any) -> FixedSizeRuns:
+    values: Dict[str, Any] = dict(
+        a=uint8(255),
+        b=True,
+        c=int8(-128),
+        d=uint64(2**64 - 1),
+        e=uint128(2**128 - 1),
+        f=bytes32(b"a" * 32),
+        g=G1Element(),
+        h=uint32(7),
+        i=[bytes4(b"abcd"), bytes4(b"efgh")],
+        j=int64(-1),
+        k=False,
+        l="run",
+        m=uint32(1),
+    )
+    values.update(kwargs)
+    return FixedSizeRuns(**values)
+
+
+@pytest.mark.parametrize(
+    "item",
+    [
+        get_fixed_size_runs(),
+        get_fixed_size_runs(h=None, i=[], l=""),
+        get_fixed_size_runs(a=uint8(0), b=False, c=int8(127), d=uint64(0), e=uint128(0), j=int64(2**63 - 1), k=True),
+    ],
+)
+def test_generated_functions(item: FixedSizeRuns) -> None:
+    f = io.BytesIO()
+    stream_streamable_fields(item, f)
+    blob = f.getvalue()
+    assert bytes(item) == blob
+    # The generated parse function only gets used for `BytesReader`s, `parse` walks the fields for everything else
+    assert FixedSizeRuns.from_bytes(blob) == item
+    assert FixedSizeRuns.parse(io.BytesIO(blob)) == item
+    assert parse_streamable_fields(FixedSizeRuns, BytesReader(blob)) == item
+    parsed = FixedSizeRuns.from_bytes(blob)
+    assert type(parsed.a) is uint8
+    assert all(type(value) is bytes4 for value in parsed.i)
+
+
+def test_generated_functions_truncated() -> None:
+    blob = bytes(get_fixed_size_runs())
+    for size in range(len(blob)):
+        with pytest.raises((AssertionError, ValueError)):
+            FixedSizeRuns.from_bytes(blob[:size])
+
+
+def test_generated_functions_invalid_bool() -> None:
+    blob = bytearray(bytes(get_fixed_size_runs()))
+    blob[1] = 2
+    with pytest.raises(ValueError, match="Bool byte must be 0 or 1"):
+        FixedSizeRuns.from_bytes(bytes(blob))
+
+
+def test_generated_post_init() -> None:
+    item = FixedSizeRuns(
+        1, 1, 1, 1, 1, b"a" * 32, bytes(G1Element()), 1, [b"abcd"], 1, 0, "run", 1  # type: ignore[arg-type, list-item]
+    )
+    assert item == get_fixed_size_runs(
+        a=uint8(1), b=True, c=int8(1), d=uint64(1), e=uint128(1), h=uint32(1), i=[bytes4(b"abcd")], j=int64(1)
+    )
+    assert type(item.a) is uint8
+    assert type(item.i[0]) is bytes4
+    with pytest.raises(ValueError):
+        get_fixed_size_runs(a=256)
+
+
+@streamable
+@dataclass(frozen=True)
+class CachedSerialization(Streamable):
+    a: uint32
+    b: List[bytes]
+
+    serialization_cache_limit = 64
+
+
+@streamable
+@dataclass(frozen=True)
+class CachedSerializationParent(Streamable):
+    a: CachedSerialization
+    b: Optional[CachedSerialization]
+
+
+def test_serialization_cache() -> None:
+    item = CachedSerialization(uint32(1), [b"a"])
+    serialized = bytes(item)
+    assert bytes(item) is serialized
+    assert item.get_hash() == std_hash(serialized)
+    assert item.get_hash() is item.get_hash()
+    # The cache doesn't change the fields of an item
+    assert item == CachedSerialization(uint32(1), [b"a"])
+    assert replace(item, a=uint32(2)) != item
+    assert bytes(replace(item, a=uint32(2))) != serialized
+
+    # Parsed items keep the buffer they got parsed from
+    blob = bytes(CachedSerialization(uint32(2), [b"b", b"c"]))
+    parsed = CachedSerialization.from_bytes(blob)
+    assert bytes(parsed) is blob
+    assert CachedSerializationParent.from_bytes(bytes(CachedSerializationParent(parsed, None))).a == parsed
+    # But not the ones which could still change
+    assert bytes(CachedSerialization.from_bytes(bytearray(blob))) is not blob
+
+
+def test_serialization_cache_limit() -> None:
+    item = CachedSerialization(uint32(1), [b"a" * 100])
+    serialized = bytes(item)
+    assert len(serialized) > CachedSerialization.serialization_cache_limit
+    assert bytes(item) is not serialized
+    assert bytes(CachedSerialization.from_bytes(serialized)) is not serialized
+    # The hash gets cached regardless of the size
+    assert item.get_hash() is item.get_hash()
+
+
+def test_serialization_cache_parent() -> None:
+    child = CachedSerialization(uint32(1), [b"a"])
+    parent = CachedSerializationParent(child, child)
+    # Streaming the parent uses the cached serialization of the child
+    child.__dict__["_cached_bytes"] = b"\x00" * len(bytes(child))
+    assert bytes(parent) == b"\x00" * len(bytes(child)) + b"\x01" + b"\x00" * len(bytes(child))
+
+
+def test_serialization_cache_disabled() -> None:
+    item = CachedSerializationParent(CachedSerialization(uint32(1), [b"a"]), None)
+    assert bytes(item) is not bytes(item)
+    assert item.get_hash() is not item.get_hash()
+    assert set(item.__dict__) == {"a", "b"}
+    assert set(CachedSerializationParent.from_bytes(bytes(item)).__dict__) == {"a", "b"}
+
+
+@streamable
+@dataclass(frozen=True)
+class CustomStream(Streamable):
+    a: uint32
+
+    def stream(self, f: BinaryIO) -> None:
+        f.write(b"custom")
+
+
+def test_overridden_stream() -> None:
+    assert bytes(CustomStream(uint32(1))) == b"custom"
+
+
 def test_parse_bool() -> None:
     assert not parse_bool(io.BytesIO(b"\x00"))
     assert parse_bool(io.BytesIO(b"\x01"))
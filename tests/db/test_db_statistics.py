@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import time
+
+import pytest
+
+from chia.util.db_statistics import (
+    HISTOGRAM_BUCKETS,
+    MAX_TEMPLATES,
+    OTHER_TEMPLATE,
+    DBStatistics,
+    LatencyHistogram,
+    all_statistics,
+    statement_template,
+)
+from chia.util.db_wrapper import run_on_connection
+from tests.util.db_connection import DBConnection
+
+
+@pytest.mark.parametrize(
+    "sql, template",
+    [
+        ("SELECT * FROM t WHERE a=?", "SELECT * FROM t WHERE a=?"),
+        ("SELECT  *\n  FROM t\n WHERE a = 5 ", "SELECT * FROM t WHERE a = ?"),
+        ("SELECT * FROM t WHERE a IN (?,?, ?) LIMIT 10", "SELECT * FROM t WHERE a IN (?...) LIMIT ?"),
+        ("UPDATE t SET a='x''y', b=X'00ff', c=1.5", "UPDATE t SET a=?, b=?, c=?"),
+        ("SELECT * FROM sub_epoch_segments_v3", "SELECT * FROM sub_epoch_segments_v3"),
+    ],
+)
+def test_statement_template(sql: str, template: str) -> None:
+    assert statement_template(sql) == template
+
+
+def test_latency_histogram() -> None:
+    histogram = LatencyHistogram()
+    for seconds in [0.0, HISTOGRAM_BUCKETS[0], 0.002, 0.002, 1000.0]:
+        histogram.add(seconds)
+    assert histogram.count == 5
+    assert histogram.max == 1000.0
+    assert histogram.total == pytest.approx(1000.004 + HISTOGRAM_BUCKETS[0])
+    buckets = histogram.to_json_dict()["buckets"]
+    assert [bucket["count"] for bucket in buckets] == [2, 0, 0, 2, 0, 0, 0, 0, 0, 0, 0, 1]
+    assert buckets[-1]["le"] is None
+
+
+def test_unnamed_not_registered() -> None:
+    assert DBStatistics() not in all_statistics
+    assert DBStatistics(name="test") in all_statistics
+
+
+def test_template_limit() -> None:
+    statistics = DBStatistics(name="test")
+    for index in range(MAX_TEMPLATES + 10):
+        statistics.add_execution(f"SELECT * FROM t{index}", 0.001, "writer")
+    assert len(statistics.statements) == MAX_TEMPLATES + 1
+    assert statistics.statements[OTHER_TEMPLATE].executions.count == 10
+
+
+@pytest.mark.asyncio
+async def test_statement_statistics() -> None:
+    async with DBConnection(2) as db_wrapper:
+        assert db_wrapper.statistics in all_statistics
+        async with db_wrapper.writer() as conn:
+            await conn.execute("CREATE TABLE t(a INTEGER)")
+            await conn.executemany("INSERT INTO t VALUES(?)", [(1,), (2,), (3,)])
+            for value in range(5):
+                await conn.execute(f"INSERT INTO t VALUES({value})")
+            await run_on_connection(conn, lambda c: c.execute("INSERT INTO t VALUES(?)", (6,)))
+        async with db_wrapper.reader() as conn:
+            async with conn.execute("SELECT a FROM t WHERE a IN (?, ?)", (1, 2)) as cursor:
+                assert len(list(await cursor.fetchall())) == 4
+
+        statements = db_wrapper.statistics.to_json_dict()["statements"]
+        assert statements["INSERT INTO t VALUES(?)"]["count"] == 7
+        assert statements["SELECT a FROM t WHERE a IN (?...)"]["count"] == 1
+        assert statements["SELECT a FROM t WHERE a IN (?...)"]["fetch_total"] > 0
+        assert db_wrapper.statistics.writer_lock_wait.count == 1
+        assert db_wrapper.statistics.reader_wait.count == 1
+
+        db_wrapper.statistics.reset()
+        assert db_wrapper.statistics.to_json_dict()["statements"] == {}
+
+    assert db_wrapper.statistics not in all_statistics
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_is_recorded() -> None:
+    async with DBConnection(2) as db_wrapper:
+        async with db_wrapper.reader() as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                await conn.execute("SELECT * FROM missing")
+        assert db_wrapper.statistics.statements["SELECT * FROM missing"].executions.count == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_query_log(caplog: pytest.LogCaptureFixture) -> None:
+    async with DBConnection(2) as db_wrapper:
+        db_wrapper.statistics.slow_query_threshold = 0.05
+        async with db_wrapper.writer() as conn:
+            await conn.create_function("slow", 0, lambda: time.sleep(0.1))
+            with caplog.at_level(logging.WARNING):
+                await conn.execute("SELECT 1")
+                await conn.execute("SELECT slow()")
+        assert db_wrapper.statistics.slow_queries == 1
+        assert "SELECT slow()" in caplog.text
+        assert "SELECT ?" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_lock_wait() -> None:
+    async with DBConnection(2) as db_wrapper:
+
+        async def hold_writer() -> None:
+            async with db_wrapper.writer():
+                await asyncio.sleep(0.1)
+
+        task = asyncio.create_task(hold_writer())
+        await asyncio.sleep(0)
+        async with db_wrapper.writer():
+            pass
+        await task
+        assert db_wrapper.statistics.writer_lock_wait.count == 2
+        assert db_wrapper.statistics.writer_lock_wait.max >= 0.05
@@ -2,7 +2,11 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
-from typing import TYPE_CHECKING, Callable, List
+import functools
+import sqlite3
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, List, Tuple
 
 import aiosqlite
 import pytest
@@ -10,7 +14,7 @@ import pytest
 # TODO: update after resolution in https://github.com/pytest-dev/pytest/issues/7469
 from _pytest.fixtures import SubRequest
 
-from chia.util.db_wrapper import DBWrapper2
+from chia.util.db_wrapper import DBWrapper2, execute_statements, run_all, run_on_connection
 from tests.util.db_connection import DBConnection
 
 if TYPE_CHECKING:
@@ -432,3 +436,178 @@ async def test_cancelled_reader_does_not_cancel_writer() -> None:
             assert await query_value(connection=writer) == 1
 
         assert await query_value(connection=writer) == 1
+
+
+@pytest.mark.asyncio
+async def test_run_on_connection() -> None:
+    async with DBConnection(2) as db_wrapper:
+        await setup_table(db_wrapper)
+
+        def increment(connection: sqlite3.Connection) -> int:
+            connection.execute("UPDATE counter SET value = value + 1")
+            [value] = connection.execute("SELECT value FROM counter").fetchone()
+            return int(value)
+
+        async with db_wrapper.writer() as writer:
+            assert await run_on_connection(writer, increment) == 1
+            await run_on_connection(writer, functools.partial(run_all, functions=[increment, increment]))
+            assert await query_value(connection=writer) == 3
+
+        async with db_wrapper.reader() as reader:
+            assert await query_value(connection=reader) == 3
+
+
+@pytest.mark.asyncio
+async def test_run_on_connection_thread() -> None:
+    # `run_on_connection` uses aiosqlite internals, this fails if an aiosqlite upgrade changes them
+    async with DBConnection(2) as db_wrapper:
+
+        def thread_and_connection(connection: sqlite3.Connection) -> Tuple[threading.Thread, sqlite3.Connection]:
+            return threading.current_thread(), connection
+
+        async with db_wrapper.writer() as writer:
+            thread, connection = await run_on_connection(writer, thread_and_connection)
+            # aiosqlite runs the calls on a connection on the thread of that connection
+            assert thread is writer
+            assert connection is writer._conn
+
+
+@pytest.mark.asyncio
+async def test_run_on_connection_failure_rolls_back() -> None:
+    async with DBConnection(2) as db_wrapper:
+        await setup_table(db_wrapper)
+
+        def increment_and_fail(connection: sqlite3.Connection) -> None:
+            connection.execute("UPDATE counter SET value = value + 1")
+            raise UniqueError()
+
+        with pytest.raises(UniqueError):
+            async with db_wrapper.writer() as writer:
+                await run_on_connection(writer, increment_and_fail)
+
+        async with db_wrapper.reader() as reader:
+            assert await query_value(connection=reader) == 0
+
+
+@pytest.mark.asyncio
+async def test_execute_statements() -> None:
+    async with DBConnection(2) as db_wrapper:
+        await setup_table(db_wrapper)
+
+        async with db_wrapper.writer() as writer:
+            results = await execute_statements(
+                writer,
+                [
+                    ("UPDATE counter SET value = ?", (5,)),
+                    ("SELECT value FROM counter", ()),
+                    ("SELECT value + :offset FROM counter", {"offset": 2}),
+                ],
+            )
+            assert [[tuple(row) for row in rows] for rows in results] == [[], [(5,)], [(7,)]]
+
+            with pytest.raises(sqlite3.OperationalError):
+                await execute_statements(writer, [("UPDATE counter SET value = 6", ()), ("SELECT nothing", ())])
+            # The statements before the failing one have been executed
+            assert await query_value(connection=writer) == 6
+
+
+@pytest.mark.asyncio
+async def test_reader_pool_grows(tmp_path: Path) -> None:
+    db_wrapper = await DBWrapper2.create(
+        database=tmp_path / "db.sqlite", reader_count=1, max_reader_count=2, reader_grow_wait=0
+    )
+    try:
+        await setup_table(db_wrapper)
+        assert db_wrapper.reader_count == 1
+        readers_entered = asyncio.Event()
+        release_readers = asyncio.Event()
+        connections: List[aiosqlite.Connection] = []
+
+        async def hold_reader() -> None:
+            async with db_wrapper.reader() as reader:
+                connections.append(reader)
+                assert await query_value(connection=reader) == 0
+                if len(connections) == 2:
+                    readers_entered.set()
+                await release_readers.wait()
+
+        tasks = [asyncio.create_task(hold_reader()) for _ in range(3)]
+        await asyncio.wait_for(readers_entered.wait(), timeout=10)
+        # the third reader waits, the pool doesn't grow beyond its maximum
+        assert db_wrapper.reader_count == 2
+        assert len(connections) == 2
+        release_readers.set()
+        await asyncio.gather(*tasks)
+        assert len(set(connections)) == 2
+        assert db_wrapper.reader_count == 2
+    finally:
+        await db_wrapper.close()
+
+
+@pytest.mark.asyncio
+async def test_reader_pool_fixed_size(tmp_path: Path) -> None:
+    db_wrapper = await DBWrapper2.create(database=tmp_path / "db.sqlite", reader_count=1, reader_grow_wait=0)
+    try:
+        await setup_table(db_wrapper)
+
+        async def read() -> None:
+            async with db_wrapper.reader() as reader:
+                await query_value(connection=reader)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(read() for _ in range(3)))
+        assert db_wrapper.reader_count == 1
+    finally:
+        await db_wrapper.close()
+
+
+@pytest.mark.asyncio
+async def test_reader_pool_cancelled_wait(tmp_path: Path) -> None:
+    db_wrapper = await DBWrapper2.create(
+        database=tmp_path / "db.sqlite", reader_count=1, max_reader_count=2, reader_grow_wait=10
+    )
+    try:
+        async def read() -> None:
+            async with db_wrapper.reader_no_transaction():
+                pass
+
+        async with db_wrapper.reader_no_transaction():
+            waiter = asyncio.create_task(read())
+            await asyncio.sleep(0.01)
+        # the waiter gets cancelled right after the connection it waits for got returned
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert db_wrapper.reader_count == 1
+        assert db_wrapper._read_connections.qsize() == 1
+    finally:
+        await asyncio.wait_for(db_wrapper.close(), timeout=10)
+
+
+@pytest.mark.asyncio
+async def test_total_cache_size(tmp_path: Path) -> None:
+    db_wrapper = await DBWrapper2.create(
+        database=tmp_path / "db.sqlite", reader_count=1, max_reader_count=3, total_cache_size=8192
+    )
+    try:
+        async with db_wrapper.reader_no_transaction() as reader:
+            assert list(await reader.execute_fetchall("pragma cache_size")) == [(-2048,)]
+    finally:
+        await db_wrapper.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_pragmas(tmp_path: Path) -> None:
+    db_wrapper = await DBWrapper2.create(
+        database=tmp_path / "db.sqlite", reader_count=1, cache_size=-4096, mmap_size=1 << 20
+    )
+    try:
+        async with db_wrapper.writer() as writer:
+            connections = [writer]
+        async with db_wrapper.reader_no_transaction() as reader:
+            connections.append(reader)
+        for connection in connections:
+            assert list(await connection.execute_fetchall("pragma cache_size")) == [(-4096,)]
+            assert list(await connection.execute_fetchall("pragma mmap_size")) == [(1 << 20,)]
+    finally:
+        await db_wrapper.close()
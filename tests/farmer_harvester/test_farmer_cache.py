@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import List
+
+import pytest
+from blspy import G1Element
+
+from chia.farmer.farmer_cache import FarmerCache
+from chia.protocols.farmer_protocol import NewSignagePoint
+from chia.types.blockchain_format.proof_of_space import ProofOfSpace
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.hash import std_hash
+from chia.util.ints import uint8, uint64
+
+
+def create_signage_point(index: int, sp_hash: bytes32) -> NewSignagePoint:
+    return NewSignagePoint(std_hash(b"challenge"), sp_hash, std_hash(b"reward"), uint64(1), uint64(1000), uint8(index))
+
+
+def create_proof(seed: int) -> ProofOfSpace:
+    return ProofOfSpace(std_hash(seed.to_bytes(4, "big")), G1Element(), None, G1Element(), uint8(32), b"proof")
+
+
+def add_proof(cache: FarmerCache, sp_hash: bytes32, seed: int) -> bytes32:
+    quality_str = std_hash(b"quality" + seed.to_bytes(4, "big"))
+    identifiers = (f"plot-{seed}", std_hash(b"challenge"), sp_hash, std_hash(b"node"))
+    cache.add_proof(sp_hash, f"plot-{seed}", create_proof(seed), quality_str, identifiers)
+    return quality_str
+
+
+def test_signage_points() -> None:
+    cache = FarmerCache(expiry_seconds=60)
+    sp_hash = std_hash(b"1")
+    assert cache.get_signage_points(sp_hash) is None
+    sps: List[NewSignagePoint] = [create_signage_point(i, sp_hash) for i in range(3)]
+    for sp in sps:
+        assert cache.add_signage_point(sp)
+        # Duplicates get rejected
+        assert not cache.add_signage_point(sp)
+    assert cache.get_signage_points(sp_hash) == sps
+    assert cache.get_all_signage_points() == sps
+    assert len(cache) == 1
+
+
+def test_responses_and_proofs() -> None:
+    cache = FarmerCache(expiry_seconds=60)
+    sp_hash = std_hash(b"1")
+    # Responses and proofs for unknown signage points are ignored
+    cache.add_response(sp_hash)
+    assert cache.number_of_responses(sp_hash) == 0
+    quality_str = add_proof(cache, sp_hash, 0)
+    assert cache.get_proofs(sp_hash) == []
+    assert cache.get_quality_identifiers(quality_str) is None
+
+    cache.add_signage_point(create_signage_point(0, sp_hash))
+    for expected in range(1, 4):
+        cache.add_response(sp_hash)
+        assert cache.number_of_responses(sp_hash) == expected
+    quality_str = add_proof(cache, sp_hash, 0)
+    assert cache.get_proofs(sp_hash) == [("plot-0", create_proof(0))]
+    identifiers = cache.get_quality_identifiers(quality_str)
+    assert identifiers is not None
+    assert identifiers[0] == "plot-0"
+    assert cache.to_dict()["proofs"] == 1
+    assert cache.to_dict()["quality_strings"] == 1
+
+
+def test_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = 1000.0
+    monkeypatch.setattr("chia.farmer.farmer_cache.time.monotonic", lambda: now)
+    cache = FarmerCache(expiry_seconds=10)
+    sp_hashes = [std_hash(i.to_bytes(4, "big")) for i in range(5)]
+    quality_strings = []
+    for i, sp_hash in enumerate(sp_hashes):
+        now += 1
+        cache.add_signage_point(create_signage_point(0, sp_hash))
+        quality_strings.append(add_proof(cache, sp_hash, i))
+    assert cache.to_dict()["oldest_age"] == 4
+    assert cache.to_dict()["newest_age"] == 0
+    assert cache.expire() == 0
+    # Updating an entry moves it to the end of the expiry order
+    now += 1
+    cache.add_signage_point(create_signage_point(1, sp_hashes[0]))
+    now = 1013.5
+    assert cache.expire() == 2
+    assert cache.get_signage_points(sp_hashes[1]) is None
+    assert cache.get_signage_points(sp_hashes[2]) is None
+    assert cache.get_quality_identifiers(quality_strings[1]) is None
+    assert cache.get_quality_identifiers(quality_strings[2]) is None
+    assert cache.get_signage_points(sp_hashes[0]) is not None
+    assert cache.get_quality_identifiers(quality_strings[0]) is not None
+    now = 1100
+    assert cache.expire() == 3
+    assert len(cache) == 0
+    assert cache.to_dict()["proofs"] == 0
+    assert cache.to_dict()["quality_strings"] == 0
+    assert cache.to_dict()["oldest_age"] is None
+
+
+def test_limits() -> None:
+    cache = FarmerCache(expiry_seconds=60, max_signage_points=3, max_proofs=4)
+    sp_hashes = [std_hash(i.to_bytes(4, "big")) for i in range(5)]
+    for sp_hash in sp_hashes:
+        cache.add_signage_point(create_signage_point(0, sp_hash))
+    assert len(cache) == 3
+    assert [sp.challenge_chain_sp for sp in cache.get_all_signage_points()] == sp_hashes[2:]
+    # Exceeding the proof limit drops the oldest signage points with all their proofs
+    for i in range(2):
+        add_proof(cache, sp_hashes[2], i)
+        add_proof(cache, sp_hashes[3], i + 2)
+    quality_str = add_proof(cache, sp_hashes[4], 4)
+    assert cache.get_signage_points(sp_hashes[2]) is None
+    assert cache.get_quality_identifiers(quality_str) is not None
+    assert cache.to_dict()["proofs"] == 3
+    assert cache.to_dict()["quality_strings"] == 3
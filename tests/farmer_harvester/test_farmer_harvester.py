@@ -1,13 +1,27 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
 
 import pytest
+from blspy import G1Element
 
-from chia.farmer.farmer import Farmer
+from chia.consensus.default_constants import DEFAULT_CONSTANTS
+from chia.farmer import farmer as farmer_module
+from chia.farmer.farmer import PLOT_SYNC_RESUME_STATE_EXPIRY_SECONDS, Farmer
+from chia.farmer.partial_submitter import PartialSubmitter
+from chia.plot_sync.receiver import ReceiverState
+from chia.pools.pool_config import PoolWalletConfig
+from chia.protocols.pool_protocol import PoolErrorCode
 from chia.simulator.time_out_assert import time_out_assert
+from chia.types.blockchain_format.sized_bytes import bytes32
 from chia.types.peer_info import PeerInfo
+from chia.util.ints import uint64
 from chia.util.keychain import generate_mnemonic
+from tests.farmer_harvester.test_partial_submitter import create_partial
 
 
 def farmer_is_started(farmer):
@@ -91,3 +105,76 @@ async def test_harvester_handshake(farmer_one_harvester_not_started):
     await time_out_assert(5, farmer_is_started, True, farmer)
     await time_out_assert(5, handshake_task_active, False)
     await time_out_assert(5, handshake_done, True)
+
+
+def test_prune_plot_sync_resume_states(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(farmer_module, "PLOT_SYNC_RESUME_STATES_MAX", 3)
+    farmer = Farmer(tmp_path, {}, {}, DEFAULT_CONSTANTS)
+    now = int(time.time())
+
+    def node_id(i: int) -> bytes32:
+        return bytes32(i.to_bytes(32, "big"))
+
+    for i in range(5):
+        farmer.plot_sync_resume_states[node_id(i)] = ReceiverState(uint64(i + 1), uint64(now - i), [], [], [], [], [])
+    farmer.plot_sync_resume_states[node_id(5)] = ReceiverState(
+        uint64(6), uint64(now - PLOT_SYNC_RESUME_STATE_EXPIRY_SECONDS), [], [], [], [], []
+    )
+    # The expired state and the oldest states beyond the limit get dropped
+    farmer.prune_plot_sync_resume_states()
+    assert set(farmer.plot_sync_resume_states) == {node_id(0), node_id(1), node_id(2)}
+    # They also get pruned when saved, the loaded states are the pruned ones
+    farmer.plot_sync_resume_states[node_id(6)] = ReceiverState(uint64(7), uint64(now + 1), [], [], [], [], [])
+    farmer.save_plot_sync_resume_states()
+    farmer.plot_sync_resume_states = {}
+    farmer.load_plot_sync_resume_states()
+    assert set(farmer.plot_sync_resume_states) == {node_id(6), node_id(0), node_id(1)}
+
+
+@pytest.mark.asyncio
+async def test_submitted_partial_state_changed(tmp_path: Path) -> None:
+    farmer = Farmer(tmp_path, {}, {}, DEFAULT_CONSTANTS)
+    changes: List[Tuple[str, Dict[str, Any]]] = []
+    farmer._set_state_changed_callback(lambda change, data: changes.append((change, data)))
+    p2_singleton_puzzle_hash = bytes32(b"\x01" * 32)
+    pool_config = PoolWalletConfig(
+        bytes32(b"\x02" * 32), "https://pool.example", "", bytes32(b"\x03" * 32), p2_singleton_puzzle_hash, G1Element()
+    )
+    farmer.pool_state[p2_singleton_puzzle_hash] = {
+        "pool_config": pool_config,
+        "current_difficulty": 1,
+        "points_acknowledged_since_start": 0,
+        "points_acknowledged_24h": [],
+        "pool_errors_24h": [],
+    }
+    partial = create_partial()
+    error = {"error_code": PoolErrorCode.REQUEST_FAILED.value, "error_message": "failed"}
+    await farmer.process_partial_response(p2_singleton_puzzle_hash, partial, error)
+    await farmer.process_partial_response(p2_singleton_puzzle_hash, partial, {"new_difficulty": 10})
+    # The failed partials are reported too, with the error of the pool
+    assert [(change, data["error"], data["current_difficulty"]) for change, data in changes] == [
+        ("submitted_partial", error, 1),
+        ("submitted_partial", None, 10),
+    ]
+    assert changes[0][1]["pool_url"] == "https://pool.example"
+    assert farmer.pool_state[p2_singleton_puzzle_hash]["pool_errors_24h"] == [error]
+
+
+@pytest.mark.asyncio
+async def test_close_unused_pool_connections(tmp_path: Path) -> None:
+    farmer = Farmer(tmp_path, {}, {}, DEFAULT_CONSTANTS)
+    pool_urls = ["https://pool-a.example", "https://pool-b.example"]
+    sessions = {pool_url: farmer.get_pool_session(pool_url) for pool_url in pool_urls}
+    for pool_url in pool_urls:
+        farmer.partial_submitters[pool_url] = PartialSubmitter(
+            pool_url, functools.partial(farmer.get_pool_session, pool_url), None, {}, farmer.process_partial_response
+        )
+    # The pool B got removed from the config, or its URL changed
+    await farmer.close_unused_pool_connections({pool_urls[0]})
+    assert list(farmer.partial_submitters) == [pool_urls[0]]
+    assert list(farmer.pool_sessions) == [pool_urls[0]]
+    assert sessions[pool_urls[1]].closed
+    assert not sessions[pool_urls[0]].closed
+    await farmer.close_unused_pool_connections(set())
+    assert farmer.partial_submitters == {} and farmer.pool_sessions == {}
+    assert sessions[pool_urls[0]].closed
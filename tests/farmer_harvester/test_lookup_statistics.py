@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from chia.harvester.lookup_statistics import LATENCY_BUCKETS, LatencyHistogram, LookupStatistics, QuarantineParameter
+from chia.util.ints import uint32
+
+parameter = QuarantineParameter(enabled=True, threshold_milliseconds=uint32(1000), consecutive_breaches=uint32(2))
+
+
+def test_histogram() -> None:
+    histogram = LatencyHistogram()
+    assert histogram.to_dict()["average"] is None
+    for seconds in [0.01, LATENCY_BUCKETS[0], 0.3, 100]:
+        histogram.add(seconds)
+    result = histogram.to_dict()
+    assert [bucket["le"] for bucket in result["buckets"]] == [*LATENCY_BUCKETS, None]
+    counts = [bucket["count"] for bucket in result["buckets"]]
+    assert counts[0] == 2
+    assert counts[LATENCY_BUCKETS.index(0.5)] == 1
+    assert counts[-1] == 1
+    assert sum(counts) == result["count"] == 4
+    assert result["maximum"] == result["last"] == 100
+    assert result["average"] == (0.01 + LATENCY_BUCKETS[0] + 0.3 + 100) / 4
+
+
+def test_plot_quarantine() -> None:
+    statistics = LookupStatistics(parameter)
+    slow, fast = Path("disk/slow.plot"), Path("disk/fast.plot")
+    statistics.add(slow, 1, 2)
+    statistics.add(fast, 1, 0.1)
+    assert statistics.quarantined() == []
+    statistics.add(slow, 1, 2)
+    assert statistics.quarantined() == [str(slow)]
+    # One fast lookup isn't enough to release it
+    statistics.add(slow, 1, 0.1)
+    assert statistics.quarantined() == [str(slow)]
+    statistics.add(slow, 1, 0.1)
+    assert statistics.quarantined() == []
+    # The interleaved fast lookups of the other plot prevented the disk from being quarantined
+    result = statistics.to_dict()
+    assert not result["disks"][0]["quarantined"]
+    assert result["disks"][0]["plot_count"] == 2
+    assert result["disks"][0]["histogram"]["count"] == 5
+
+
+def test_disk_quarantine() -> None:
+    statistics = LookupStatistics(parameter)
+    plots = [Path(f"slow/{i}.plot") for i in range(3)]
+    other = Path("fast/0.plot")
+    statistics.add(other, 2, 0.1)
+    statistics.add(plots[2], 1, 0.1)
+    assert statistics.quarantined() == []
+    # Two slow plots in a row quarantine the disk while none of the plots reached the limit itself
+    statistics.add(plots[0], 1, 2)
+    statistics.add(plots[1], 1, 2)
+    # All plots of the disk get reported, including the fast one
+    assert statistics.quarantined() == [str(path) for path in plots]
+    result = statistics.to_dict()
+    assert {disk["device"]: disk["quarantined"] for disk in result["disks"]} == {1: True, 2: False}
+    assert {disk["device"]: disk["directories"] for disk in result["disks"]} == {1: ["slow"], 2: ["fast"]}
+    statistics.remove(plots + [other])
+    assert statistics.quarantined() == []
+    assert statistics.to_dict()["plots"] == []
+    assert statistics.to_dict()["disks"] == []
+
+
+def test_quarantine_disabled() -> None:
+    statistics = LookupStatistics(QuarantineParameter())
+    for _ in range(10):
+        statistics.add(Path("slow.plot"), 1, 60)
+    assert statistics.quarantined() == []
+    result = statistics.to_dict()
+    assert result["quarantine"]["enabled"] is False
+    assert result["plots"][0]["consecutive_breaches"] == 10
+    assert result["plots"][0]["histogram"]["count"] == 10
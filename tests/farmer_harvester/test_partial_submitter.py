@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from secrets import token_bytes
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from blspy import G1Element, G2Element
+
+from chia.farmer.partial_submitter import Constants, PartialSubmitter
+from chia.protocols.pool_protocol import PoolErrorCode, PostPartialPayload, PostPartialRequest
+from chia.simulator.time_out_assert import time_out_assert
+from chia.types.blockchain_format.proof_of_space import ProofOfSpace
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.ints import uint8, uint64
+
+
+@dataclass
+class PoolServer:
+    url: str = ""
+    # HTTP status codes to respond with before responding successfully
+    statuses: List[int] = field(default_factory=list)
+    received: List[Dict[str, Any]] = field(default_factory=list)
+
+    async def partial(self, request: web.Request) -> web.Response:
+        self.received.append(await request.json())
+        if len(self.statuses) > 0:
+            return web.Response(status=self.statuses.pop(0))
+        return web.json_response({"new_difficulty": 10})
+
+
+@pytest_asyncio.fixture(scope="function")
+async def pool_server() -> AsyncIterator[PoolServer]:
+    server = PoolServer()
+    app = web.Application()
+    app.add_routes([web.post("/partial", server.partial)])
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    server.url = f"http://127.0.0.1:{port}"
+    yield server
+    await runner.cleanup()
+
+
+# The submitter, the partials the pool accepted and the partials which failed
+SubmitterFixture = Tuple[PartialSubmitter, List[PostPartialRequest], List[PostPartialRequest]]
+
+
+@pytest_asyncio.fixture(scope="function")
+async def submitter(pool_server: PoolServer) -> AsyncIterator[SubmitterFixture]:
+    responses: List[PostPartialRequest] = []
+    failures: List[PostPartialRequest] = []
+    session = aiohttp.ClientSession()
+
+    async def response_callback(_: bytes32, request: PostPartialRequest, response: Dict[str, Any]) -> None:
+        if "error_code" in response:
+            assert response["error_code"] == PoolErrorCode.REQUEST_FAILED.value
+            assert pool_server.url in response["error_message"]
+            failures.append(request)
+        else:
+            assert response == {"new_difficulty": 10}
+            responses.append(request)
+
+    partial_submitter = PartialSubmitter(pool_server.url, lambda: session, None, {}, response_callback)
+    partial_submitter.start()
+    yield partial_submitter, responses, failures
+    await partial_submitter.stop()
+    await session.close()
+
+
+def create_partial() -> PostPartialRequest:
+    proof = ProofOfSpace(
+        bytes32(token_bytes(32)), None, bytes32(token_bytes(32)), G1Element(), uint8(32), token_bytes(64)
+    )
+    payload = PostPartialPayload(
+        bytes32(token_bytes(32)), uint64(0), proof, bytes32(token_bytes(32)), False, bytes32(token_bytes(32))
+    )
+    return PostPartialRequest(payload, G2Element())
+
+
+def submit(partial_submitter: PartialSubmitter, count: int) -> List[PostPartialRequest]:
+    partials = [create_partial() for _ in range(count)]
+    for partial in partials:
+        assert partial_submitter.submit(bytes32(token_bytes(32)), partial)
+    return partials
+
+
+@pytest.mark.asyncio
+async def test_submit(
+    pool_server: PoolServer, submitter: SubmitterFixture, monkeypatch: Any
+) -> None:
+    partial_submitter, responses, failures = submitter
+    monkeypatch.setattr(Constants, "batch_size", 3)
+    partials = submit(partial_submitter, 10)
+    await time_out_assert(10, len, 10, responses)
+    assert sorted(responses, key=bytes) == sorted(partials, key=bytes)
+    assert len(pool_server.received) == 10
+    assert partial_submitter.queue_size() == 0
+    metrics = partial_submitter.to_dict()
+    assert metrics["submitted"] == 10
+    assert metrics["failed"] == metrics["retried"] == metrics["dropped"] == 0
+    assert len(failures) == 0
+    assert 0 < metrics["latency_average"] <= metrics["latency_max"]
+    assert metrics["latency_last"] is not None
+
+
+@pytest.mark.parametrize(["status", "retried"], [(500, True), (400, False)])
+@pytest.mark.asyncio
+async def test_retry(
+    pool_server: PoolServer,
+    submitter: SubmitterFixture,
+    monkeypatch: Any,
+    status: int,
+    retried: bool,
+) -> None:
+    partial_submitter, responses, failures = submitter
+    monkeypatch.setattr(Constants, "retry_delay", 0.1)
+    pool_server.statuses = [status]
+    partials = submit(partial_submitter, 1)
+    if retried:
+        await time_out_assert(10, len, 1, responses)
+        assert responses == partials
+        assert len(pool_server.received) == 2
+        assert partial_submitter.metrics().retried == 1
+        assert partial_submitter.metrics().submitted == 1
+    else:
+        await time_out_assert(10, lambda: partial_submitter.metrics().failed, 1)
+        assert len(responses) == 0
+        assert failures == partials
+        assert len(pool_server.received) == 1
+        assert partial_submitter.metrics().retried == 0
+
+
+@pytest.mark.asyncio
+async def test_retry_limit(
+    pool_server: PoolServer, submitter: SubmitterFixture, monkeypatch: Any
+) -> None:
+    partial_submitter, responses, failures = submitter
+    monkeypatch.setattr(Constants, "retry_delay", 0.1)
+    pool_server.statuses = [500] * Constants.max_attempts
+    partials = submit(partial_submitter, 1)
+    await time_out_assert(10, lambda: partial_submitter.metrics().failed, 1)
+    assert len(pool_server.received) == Constants.max_attempts
+    assert partial_submitter.metrics().retried == Constants.max_attempts - 1
+    assert len(responses) == 0
+    assert failures == partials
+
+
+@pytest.mark.asyncio
+async def test_rate_limit(
+    pool_server: PoolServer, submitter: SubmitterFixture, monkeypatch: Any
+) -> None:
+    partial_submitter, responses, _ = submitter
+    monkeypatch.setattr(Constants, "rate_limit", 3)
+    monkeypatch.setattr(Constants, "rate_limit_interval", 2)
+    submit(partial_submitter, 5)
+    await time_out_assert(10, len, 3, responses)
+    await asyncio.sleep(0.5)
+    # The remaining partials need to wait for the rate limit interval to pass
+    assert len(responses) == 3
+    assert partial_submitter.queue_size() == 2
+    await time_out_assert(10, len, 5, responses)
+
+
+@pytest.mark.asyncio
+async def test_drop_expired(
+    pool_server: PoolServer, submitter: SubmitterFixture, monkeypatch: Any
+) -> None:
+    partial_submitter, responses, failures = submitter
+    monkeypatch.setattr(Constants, "max_partial_age", 0)
+    partials = submit(partial_submitter, 2)
+    await time_out_assert(10, lambda: partial_submitter.metrics().dropped, 2)
+    assert len(pool_server.received) == 0
+    assert len(responses) == 0
+    assert failures == partials
+
+
+@pytest.mark.asyncio
+async def test_queue_full(submitter: SubmitterFixture, monkeypatch: Any) -> None:
+    partial_submitter, _, _ = submitter
+    monkeypatch.setattr(Constants, "max_queue_size", 0)
+    assert not partial_submitter.submit(bytes32(token_bytes(32)), create_partial())
+    assert partial_submitter.metrics().dropped == 1
@@ -75,13 +75,20 @@ def test_path_list_delta_from_lists(old: List[str], new: List[str], result: Path
 
 def test_delta_empty() -> None:
     delta: Delta = Delta()
-    all_deltas: List[DeltaType] = [delta.valid, delta.invalid, delta.keys_missing, delta.duplicates]
+    all_deltas: List[DeltaType] = [
+        delta.valid,
+        delta.invalid,
+        delta.keys_missing,
+        delta.duplicates,
+        delta.quarantined,
+    ]
     assert delta.empty()
     for d1 in all_deltas:
         delta.valid.additions["0"] = dummy_plot("0")
         delta.invalid.additions.append("0")
         delta.keys_missing.additions.append("0")
         delta.duplicates.additions.append("0")
+        delta.quarantined.additions.append("0")
         assert not delta.empty()
         for d2 in all_deltas:
             if d2 is not d1:
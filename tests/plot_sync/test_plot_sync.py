@@ -13,13 +13,14 @@ from blspy import G1Element
 
 from chia.farmer.farmer_api import Farmer
 from chia.harvester.harvester_api import Harvester
+from chia.harvester.lookup_statistics import QuarantineParameter
 from chia.plot_sync.delta import Delta, PathListDelta, PlotListDelta
 from chia.plot_sync.receiver import Receiver
 from chia.plot_sync.sender import Sender
 from chia.plot_sync.util import Constants, State
 from chia.plotting.manager import PlotManager
 from chia.plotting.util import add_plot_directory, remove_plot_directory
-from chia.protocols.harvester_protocol import Plot
+from chia.protocols.harvester_protocol import Plot, PlotSyncResume
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.server.start_service import Service
 from chia.simulator.block_tools import BlockTools
@@ -241,6 +242,7 @@ class Environment:
             assert len(plot_manager.failed_to_open_filenames) == len(receiver.invalid()) == expected.invalid_count
             assert len(plot_manager.no_key_filenames) == len(receiver.keys_missing()) == expected.keys_missing_count
             assert len(plot_manager.get_duplicates()) == len(receiver.duplicates()) == expected.duplicates_count
+            assert harvester.lookup_statistics.quarantined() == receiver.quarantined()
             assert expected.callback_passed
             assert expected.valid_delta.empty()
             assert expected.invalid_delta.empty()
@@ -485,6 +487,30 @@ async def remove_and_validate_all_directories(env: Environment) -> None:
     await env.run_sync_test()
 
 
+@pytest.mark.asyncio
+async def test_sync_quarantined(environment: Environment) -> None:
+    env: Environment = environment
+    env.add_directory(0, env.dir_1)
+    env.add_directory(1, env.dir_2)
+    await env.run_sync_test()
+    statistics = env.harvesters[0].lookup_statistics
+    statistics._parameter = QuarantineParameter(True, uint32(1000), uint32(1))
+    slow_plot = env.dir_1.path_list()[0]
+    statistics.add(slow_plot, 0, 2)
+    assert statistics.quarantined() == [str(slow_plot)]
+    await env.run_sync_test()
+    assert env.farmer.plot_sync_receivers[env.harvesters[0].server.node_id].quarantined() == [str(slow_plot)]
+    # A fast lookup releases the plot again
+    statistics.add(slow_plot, 0, 0.1)
+    await env.run_sync_test()
+    assert env.farmer.plot_sync_receivers[env.harvesters[0].server.node_id].quarantined() == []
+    # Removed plots drop out of the statistics
+    statistics.add(slow_plot, 0, 2)
+    env.remove_directory(0, env.dir_1)
+    await env.run_sync_test()
+    assert statistics.quarantined() == []
+
+
 @pytest.mark.asyncio
 async def test_add_and_remove_all_directories(environment: Environment) -> None:
     await add_and_validate_all_directories(environment)
@@ -518,8 +544,16 @@ async def test_harvester_restart(environment: Environment) -> None:
 
 
 @pytest.mark.asyncio
-async def test_farmer_restart(environment: Environment) -> None:
+async def test_farmer_restart(environment: Environment, monkeypatch: pytest.MonkeyPatch) -> None:
     env: Environment = environment
+    resumed: List[bytes32] = []
+    sync_resumed = Receiver.sync_resumed
+
+    async def sync_resumed_wrapper(self: Receiver, data: PlotSyncResume) -> None:
+        resumed.append(self.connection().peer_node_id)
+        await sync_resumed(self, data)
+
+    monkeypatch.setattr(Receiver, "sync_resumed", sync_resumed_wrapper)
     # Load all directories for both harvesters
     await add_and_validate_all_directories(env)
     last_sync_ids: List[uint64] = []
@@ -531,18 +565,21 @@ async def test_farmer_restart(environment: Environment) -> None:
     assert len(env.farmer.plot_sync_receivers) == 0
     assert not env.harvesters[0].plot_manager._refreshing_enabled
     assert not env.harvesters[1].plot_manager._refreshing_enabled
+    # The states of the receivers should be persisted to resume the plot sync after the restart
+    assert env.farmer.plot_sync_resume_states_path.exists()
     # Start the farmer, wait for the handshake and make sure the receivers come back
     await env.farmer_service.start()
     await time_out_assert(5, env.handshake_done, True, 0)
     await time_out_assert(5, env.handshake_done, True, 1)
     assert len(env.farmer.plot_sync_receivers) == 2
     # Do not use run_sync_test here, to have a more realistic test scenario just wait for the harvesters to be synced.
-    # The handshake should trigger re-sync.
+    # The handshake should trigger a resumed sync.
     for i in range(0, len(env.harvesters)):
         harvester: Harvester = env.harvesters[i]
         assert harvester.server is not None
         receiver = env.farmer.plot_sync_receivers[harvester.server.node_id]
         await time_out_assert(20, synced, True, harvester.plot_sync_sender, receiver, last_sync_ids[i])
+        assert harvester.server.node_id in resumed
     # Validate the sync
     for harvester in env.harvesters:
         plot_manager: PlotManager = harvester.plot_manager
@@ -5,14 +5,14 @@ import logging
 import random
 import time
 from secrets import token_bytes
-from typing import Any, Callable, List, Tuple, Type, Union
+from typing import Any, Callable, List, Optional, Tuple, Type, Union
 
 import pytest
 from blspy import G1Element
 
 from chia.plot_sync.delta import Delta
 from chia.plot_sync.receiver import Receiver, Sync
-from chia.plot_sync.util import ErrorCodes, State
+from chia.plot_sync.util import ErrorCodes, State, plots_fingerprint
 from chia.protocols.harvester_protocol import (
     Plot,
     PlotSyncDone,
@@ -20,6 +20,7 @@ from chia.protocols.harvester_protocol import (
     PlotSyncPathList,
     PlotSyncPlotList,
     PlotSyncResponse,
+    PlotSyncResume,
     PlotSyncStart,
 )
 from chia.server.outbound_message import NodeType
@@ -41,6 +42,7 @@ def assert_default_values(receiver: Receiver) -> None:
     assert receiver.invalid() == []
     assert receiver.keys_missing() == []
     assert receiver.duplicates() == []
+    assert receiver.quarantined() == []
 
 
 async def dummy_callback(_: bytes32, __: Delta) -> None:
@@ -103,6 +105,9 @@ def pre_function_validate(receiver: Receiver, data: Union[List[Plot], List[str]]
     elif expected_state == State.duplicates:
         for path in data:
             assert path not in receiver.duplicates()
+    elif expected_state == State.quarantined:
+        for path in data:
+            assert path not in receiver.quarantined()
 
 
 def post_function_validate(receiver: Receiver, data: Union[List[Plot], List[str]], expected_state: State) -> None:
@@ -122,6 +127,9 @@ def post_function_validate(receiver: Receiver, data: Union[List[Plot], List[str]
     elif expected_state == State.duplicates:
         for path in data:
             assert path in receiver._current_sync.delta.duplicates.additions
+    elif expected_state == State.quarantined:
+        for path in data:
+            assert path in receiver._current_sync.delta.quarantined.additions
 
 
 @pytest.mark.asyncio
@@ -142,7 +150,7 @@ async def run_sync_step(receiver: Receiver, sync_step: SyncStepData) -> None:
                 create_payload(sync_step.payload_type, False, invoke_data, i == (len(indexes) - 2))
             )
             post_function_validate(receiver, invoke_data, sync_step.state)
-            if sync_step.state == State.removed:
+            if sync_step.state in [State.removed, State.quarantined]:
                 assert receiver.current_sync().plots_processed == plots_processed_before
             else:
                 assert receiver.current_sync().plots_processed == plots_processed_before + len(invoke_data)
@@ -189,6 +197,7 @@ def plot_sync_setup() -> Tuple[Receiver, List[SyncStepData]]:
         SyncStepData(State.invalid, receiver.process_invalid, PlotSyncPathList, path_list[20:30], True),
         SyncStepData(State.keys_missing, receiver.process_keys_missing, PlotSyncPathList, path_list[30:40], True),
         SyncStepData(State.duplicates, receiver.process_duplicates, PlotSyncPathList, path_list[10:20], True),
+        SyncStepData(State.quarantined, receiver.process_quarantined, PlotSyncPathList, path_list[10:20], True),
         SyncStepData(State.done, receiver.sync_done, PlotSyncDone, uint64(0)),
     ]
 
@@ -217,11 +226,14 @@ async def test_reset() -> None:
     receiver._current_sync.delta.keys_missing.removals = ["1"]
     receiver._current_sync.delta.duplicates.additions = ["1"]
     receiver._current_sync.delta.duplicates.removals = ["1"]
+    receiver._current_sync.delta.quarantined.additions = ["1"]
+    receiver._current_sync.delta.quarantined.removals = ["1"]
     receiver._current_sync.time_done = time.time()
     receiver._last_sync = dataclasses.replace(receiver._current_sync)
     receiver._invalid = ["1"]
     receiver._keys_missing = ["1"]
     receiver._duplicates = ["1"]
+    receiver._quarantined = ["1"]
 
     receiver._last_sync.sync_id = uint64(1)
     # Call `reset` and make sure all expected values are set back to their defaults.
@@ -242,6 +254,7 @@ async def test_to_dict(counts_only: bool) -> None:
     assert get_list_or_len(plot_sync_dict_1["failed_to_open_filenames"], not counts_only) == 0
     assert get_list_or_len(plot_sync_dict_1["no_key_filenames"], not counts_only) == 0
     assert get_list_or_len(plot_sync_dict_1["duplicates"], not counts_only) == 0
+    assert get_list_or_len(plot_sync_dict_1["quarantined_filenames"], not counts_only) == 0
     assert plot_sync_dict_1["total_plot_size"] == sum(plot.file_size for plot in receiver.plots().values())
     assert plot_sync_dict_1["syncing"] is None
     assert plot_sync_dict_1["last_sync_time"] is None
@@ -263,7 +276,7 @@ async def test_to_dict(counts_only: bool) -> None:
     for state in State:
         await run_sync_step(receiver, sync_steps[state])
 
-        if state != State.idle and state != State.removed and state != State.done:
+        if state not in [State.idle, State.removed, State.quarantined, State.done]:
             expected_plot_files_processed += len(sync_steps[state].args[0])
 
         sync_data = receiver.to_dict()["syncing"]
@@ -284,6 +297,9 @@ async def test_to_dict(counts_only: bool) -> None:
     )
     assert get_list_or_len(sync_steps[State.keys_missing].args[0], counts_only) == plot_sync_dict_3["no_key_filenames"]
     assert get_list_or_len(sync_steps[State.duplicates].args[0], counts_only) == plot_sync_dict_3["duplicates"]
+    assert (
+        get_list_or_len(sync_steps[State.quarantined].args[0], counts_only) == plot_sync_dict_3["quarantined_filenames"]
+    )
 
     assert plot_sync_dict_3["total_plot_size"] == sum(plot.file_size for plot in receiver.plots().values())
     assert plot_sync_dict_3["last_sync_time"] > 0
@@ -324,6 +340,9 @@ async def test_sync_flow() -> None:
     for path in sync_steps[State.duplicates].args[0]:
         assert path not in receiver.duplicates()
 
+    for path in sync_steps[State.quarantined].args[0]:
+        assert path not in receiver.quarantined()
+
     # Walk through all states from idle to done and run them with the test data
     for state in State:
         await run_sync_step(receiver, sync_steps[state])
@@ -343,10 +362,29 @@ async def test_sync_flow() -> None:
     for path in sync_steps[State.duplicates].args[0]:
         assert path in receiver.duplicates()
 
+    for path in sync_steps[State.quarantined].args[0]:
+        assert path in receiver.quarantined()
+
     # We should be in idle state again
     assert receiver.current_sync().state == State.idle
 
 
+@pytest.mark.asyncio
+async def test_sync_without_quarantined() -> None:
+    # Harvesters without the quarantine capability don't send the quarantined message
+    receiver, sync_steps = plot_sync_setup()
+    receiver._quarantined = ["0"]
+    for state in State:
+        if state in [State.quarantined, State.done]:
+            continue
+        await run_sync_step(receiver, sync_steps[state])
+    assert receiver.current_sync().state == State.quarantined
+    await receiver.sync_done(create_payload(PlotSyncDone, False, uint64(0)))
+    assert receiver.current_sync().state == State.idle
+    assert receiver.last_sync().sync_id == 1
+    assert receiver.quarantined() == []
+
+
 @pytest.mark.asyncio
 async def test_invalid_ids() -> None:
     receiver, sync_steps = plot_sync_setup()
@@ -418,3 +456,78 @@ async def test_plot_errors(state_to_fail: State, expected_error_code: ErrorCodes
                 create_payload(current_step.payload_type, state == State.idle, *current_step.args)
             )
     assert False, "Didn't fail in the expected state"
+
+
+def test_plots_fingerprint() -> None:
+    plots = [(str(i), bytes32(token_bytes(32))) for i in range(10)]
+    fingerprint = plots_fingerprint(plots)
+    assert plots_fingerprint(reversed(plots)) == fingerprint
+    assert plots_fingerprint(plots[1:]) != fingerprint
+    assert plots_fingerprint([("other", plots[0][1])] + plots[1:]) != fingerprint
+    assert plots_fingerprint([]) == bytes32(b"\x00" * 32)
+
+
+@pytest.mark.asyncio
+async def test_restore() -> None:
+    receiver, sync_steps = plot_sync_setup()
+    for state in State:
+        await run_sync_step(receiver, sync_steps[state])
+    resume_state = receiver.resume_state()
+    restored = Receiver(get_dummy_connection(NodeType.HARVESTER), dummy_callback)  # type:ignore[arg-type]
+    restored.restore(resume_state)
+    assert restored.current_sync() == Sync()
+    assert restored.last_sync().sync_id == receiver.last_sync().sync_id
+    assert restored.last_sync().state == State.done
+    assert restored.plots() == receiver.plots()
+    assert restored.invalid() == receiver.invalid()
+    assert restored.keys_missing() == receiver.keys_missing()
+    assert restored.duplicates() == receiver.duplicates()
+    assert len(receiver.quarantined()) > 0
+    assert restored.quarantined() == receiver.quarantined()
+    assert restored.total_plot_size() == receiver.total_plot_size()
+    assert restored.fingerprint() == receiver.fingerprint()
+    assert restored.resume_state() == resume_state
+
+
+@pytest.mark.parametrize(
+    ["last_sync_id", "valid_fingerprint", "expected_error_code"],
+    [
+        pytest.param(uint64(1), True, None, id="valid"),
+        pytest.param(uint64(0), True, ErrorCodes.invalid_last_sync_id, id="no last sync"),
+        pytest.param(uint64(5), True, ErrorCodes.invalid_last_sync_id, id="last sync mismatch"),
+        pytest.param(uint64(1), False, ErrorCodes.fingerprint_mismatch, id="fingerprint mismatch"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_sync_resumed(
+    last_sync_id: uint64, valid_fingerprint: bool, expected_error_code: Optional[ErrorCodes]
+) -> None:
+    receiver, sync_steps = plot_sync_setup()
+    for state in State:
+        await run_sync_step(receiver, sync_steps[state])
+    assert receiver.last_sync().sync_id == 1
+    fingerprint = receiver.fingerprint() if valid_fingerprint else bytes32(token_bytes(32))
+    plots_before = receiver.plots().copy()
+    await receiver.sync_resumed(
+        PlotSyncResume(plot_sync_identifier(uint64(2), uint64(0)), last_sync_id, uint32(0), fingerprint)
+    )
+    if expected_error_code is not None:
+        assert_error_response(receiver, expected_error_code)
+        assert receiver.current_sync().state == State.idle
+        return
+    # A resumed sync only delivers the changes since the last sync
+    assert receiver.current_sync().state == State.loaded
+    assert receiver.current_sync().sync_id == 2
+    identifier = plot_sync_identifier(uint64(2), uint64(1))
+    await receiver.process_loaded(PlotSyncPlotList(identifier, [], True))
+    removed = list(plots_before)[0]
+    identifier = plot_sync_identifier(uint64(2), uint64(2))
+    await receiver.process_removed(PlotSyncPathList(identifier, [removed], True))
+    for step, state in enumerate([State.invalid, State.keys_missing, State.duplicates, State.quarantined]):
+        identifier = plot_sync_identifier(uint64(2), uint64(3 + step))
+        await sync_steps[state].function(PlotSyncPathList(identifier, sync_steps[state].args[0], True))
+    await receiver.sync_done(PlotSyncDone(plot_sync_identifier(uint64(2), uint64(7)), uint64(0)))
+    assert receiver.current_sync().state == State.idle
+    assert receiver.last_sync().sync_id == 2
+    assert removed not in receiver.plots()
+    assert len(receiver.plots()) == len(plots_before) - 1
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
+
 import pytest
 
 from chia.plot_sync.exceptions import AlreadyStartedError, InvalidConnectionTypeError
@@ -7,7 +9,9 @@ from chia.plot_sync.sender import ExpectedResponse, Sender
 from chia.plot_sync.util import Constants
 from chia.protocols.harvester_protocol import PlotSyncIdentifier, PlotSyncResponse
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
-from chia.server.outbound_message import NodeType
+from chia.protocols.shared_protocol import Capability
+from chia.server.outbound_message import Message, NodeType
+from chia.server.outgoing_queue import OutgoingQueue
 from chia.simulator.block_tools import BlockTools
 from chia.util.ints import int16, uint64
 from tests.plot_sync.util import get_dummy_connection, plot_sync_identifier
@@ -23,7 +27,47 @@ def test_default_values(bt: BlockTools) -> None:
     assert sender._last_sync_id == uint64(0)
     assert not sender._stop_requested
     assert sender._task is None
-    assert sender._response is None
+    assert len(sender._responses) == 0
+    assert sender._window_size == 1
+
+
+def test_invalid_window_size(bt: BlockTools) -> None:
+    with pytest.raises(ValueError):
+        Sender(bt.plot_manager, 0)
+
+
+@dataclass
+class QueueingConnectionDummy:
+    outgoing_queue: OutgoingQueue = field(default_factory=OutgoingQueue)
+
+    async def send_message(self, message: Message) -> bool:
+        self.outgoing_queue.put_nowait(message)
+        return True
+
+    def has_capability(self, capability: Capability) -> bool:
+        return True
+
+
+@pytest.mark.asyncio
+async def test_window_keeps_message_order(bt: BlockTools) -> None:
+    sender = Sender(bt.plot_manager, 8)
+    connection = QueueingConnectionDummy()
+    sender._connection = connection  # type: ignore[assignment]
+    sender.sync_start(0, True)
+    sender.process_batch([], 0)
+    sender.sync_done([], 0)
+    # All messages of the sync get queued without waiting for a response in between
+    while sender._window_available():
+        assert await sender._send_next_message()
+    sent = [message.message_type for message in sender._messages]
+    assert len(sent) == 8
+    assert sent[-3:] == [
+        ProtocolMessageTypes.plot_sync_duplicates,
+        ProtocolMessageTypes.plot_sync_quarantined,
+        ProtocolMessageTypes.plot_sync_done,
+    ]
+    queued = [connection.outgoing_queue.get_nowait() for _ in sent]
+    assert [ProtocolMessageTypes(message.type) for message in queued] == sent  # type: ignore[union-attr]
 
 
 def test_set_connection_values(bt: BlockTools) -> None:
@@ -72,20 +116,25 @@ def test_set_response(bt: BlockTools) -> None:
             plot_sync_identifier(uint64(sync_id), uint64(message_id)), int16(int(message_type.value)), None
         )
 
+    def set_expected_responses(*responses: ExpectedResponse) -> None:
+        sender._responses.clear()
+        sender._responses.extend(responses)
+
     response_message = new_response_message(0, 1, ProtocolMessageTypes.plot_sync_start)
-    assert sender._response is None
-    # Should trigger unexpected response because `Farmer._response` is `None`
+    assert len(sender._responses) == 0
+    # Should trigger unexpected response because `Sender._responses` is empty
     assert not sender.set_response(response_message)
-    # Set `Farmer._response` and make sure the response gets assigned properly
-    sender._response = new_expected_response(0, 1, ProtocolMessageTypes.plot_sync_start)
-    assert sender._response.message is None
+    # Set `Sender._responses` and make sure the response gets assigned properly
+    expected_response = new_expected_response(0, 1, ProtocolMessageTypes.plot_sync_start)
+    set_expected_responses(expected_response)
+    assert expected_response.message is None
     assert sender.set_response(response_message)
-    assert sender._response.message is not None
+    assert expected_response.message is not None
     # Should trigger unexpected response because we already received the message for the currently expected response
     assert not sender.set_response(response_message)
     # Test expired message
     expected_response = new_expected_response(1, 0, ProtocolMessageTypes.plot_sync_start)
-    sender._response = expected_response
+    set_expected_responses(expected_response)
     expired_identifier = PlotSyncIdentifier(
         uint64(expected_response.identifier.timestamp - Constants.message_timeout - 1),
         expected_response.identifier.sync_id,
@@ -94,11 +143,29 @@ def test_set_response(bt: BlockTools) -> None:
     expired_message = PlotSyncResponse(expired_identifier, int16(int(ProtocolMessageTypes.plot_sync_start.value)), None)
     assert not sender.set_response(expired_message)
     # Test invalid sync-id
-    sender._response = new_expected_response(2, 0, ProtocolMessageTypes.plot_sync_start)
+    set_expected_responses(new_expected_response(2, 0, ProtocolMessageTypes.plot_sync_start))
     assert not sender.set_response(new_response_message(3, 0, ProtocolMessageTypes.plot_sync_start))
     # Test invalid message-id
-    sender._response = new_expected_response(2, 1, ProtocolMessageTypes.plot_sync_start)
+    set_expected_responses(new_expected_response(2, 1, ProtocolMessageTypes.plot_sync_start))
     assert not sender.set_response(new_response_message(2, 2, ProtocolMessageTypes.plot_sync_start))
     # Test invalid message-type
-    sender._response = new_expected_response(3, 0, ProtocolMessageTypes.plot_sync_start)
+    set_expected_responses(new_expected_response(3, 0, ProtocolMessageTypes.plot_sync_start))
     assert not sender.set_response(new_response_message(3, 0, ProtocolMessageTypes.plot_sync_loaded))
+    # Test multiple messages in flight, responses can be assigned in any order
+    in_flight = [
+        new_expected_response(4, 0, ProtocolMessageTypes.plot_sync_start),
+        new_expected_response(4, 1, ProtocolMessageTypes.plot_sync_loaded),
+        new_expected_response(4, 2, ProtocolMessageTypes.plot_sync_loaded),
+    ]
+    set_expected_responses(*in_flight)
+    assert not sender.set_response(new_response_message(4, 3, ProtocolMessageTypes.plot_sync_loaded))
+    assert not sender.set_response(new_response_message(4, 1, ProtocolMessageTypes.plot_sync_start))
+    for message_id, message_type in [
+        (2, ProtocolMessageTypes.plot_sync_loaded),
+        (0, ProtocolMessageTypes.plot_sync_start),
+        (1, ProtocolMessageTypes.plot_sync_loaded),
+    ]:
+        assert in_flight[message_id].message is None
+        assert sender.set_response(new_response_message(4, message_id, message_type))
+        assert in_flight[message_id].message is not None
+        assert not sender.set_response(new_response_message(4, message_id, message_type))
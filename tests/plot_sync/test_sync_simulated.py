@@ -365,15 +365,20 @@ async def test_sync_simulated(
         ErrorSimulation.RespondTwice,
     ],
 )
+# The error simulations act on every fourth message, a window size of 3 makes sure the resent messages don't always hit
+# the simulated error again.
+@pytest.mark.parametrize("window_size", [1, 3])
 @pytest.mark.asyncio
 async def test_farmer_error_simulation(
     farmer_one_harvester_not_started: Tuple[List[Service[Harvester]], Service[Farmer], BlockTools],
     event_loop: asyncio.events.AbstractEventLoop,
     simulate_error: ErrorSimulation,
+    window_size: int,
 ) -> None:
     Constants.message_timeout = 5
     harvester_services, farmer_service, _ = farmer_one_harvester_not_started
     test_runner: TestRunner = await create_test_runner(harvester_services, farmer_service, event_loop)
+    test_runner.test_data[0].plot_sync_sender._window_size = window_size
     batch_size = test_runner.test_data[0].harvester.plot_manager.refresh_parameter.batch_size
     plots = create_example_plots(batch_size + 3)
     receiver = test_runner.test_data[0].plot_sync_receiver
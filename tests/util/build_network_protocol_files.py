@@ -106,6 +106,7 @@ def visit_harvester_protocol(visitor: Callable[[Any, str], None]) -> None:
     visitor(plot, "plot")
     visitor(request_plots, "request_plots")
     visitor(respond_plots, "respond_plots")
+    visitor(plot_sync_resume, "plot_sync_resume")
 
 
 def visit_introducer_protocol(visitor: Callable[[Any, str], None]) -> None:
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import random
+import sqlite3
+from dataclasses import replace
+from pathlib import Path
+from typing import List
+
+import zstd
+
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.full_block import FullBlock
+from tests.util.test_full_block_utils import get_full_blocks
+
+
+class Chain:
+    """
+    Writes a made up blockchain to a v2 database, with the statements of the full node stores, for the tests of the
+    tools that copy the database.
+    """
+
+    def __init__(self, db_file: Path) -> None:
+        self.conn = sqlite3.connect(db_file)
+        self.rng = random.Random(1337)
+        self.conn.execute("pragma journal_mode=wal")
+        self.conn.execute("CREATE TABLE database_version(version int)")
+        self.conn.execute("INSERT INTO database_version VALUES (?)", (2,))
+        self.conn.execute(
+            "CREATE TABLE full_blocks("
+            "header_hash blob PRIMARY KEY,"
+            "prev_hash blob,"
+            "height bigint,"
+            "sub_epoch_summary blob,"
+            "is_fully_compactified tinyint,"
+            "in_main_chain tinyint,"
+            "block blob,"
+            "block_record blob)"
+        )
+        self.conn.execute("CREATE TABLE current_peak(key int PRIMARY KEY, hash blob)")
+        self.conn.execute(
+            "CREATE TABLE sub_epoch_segments_v3(ses_block_hash blob PRIMARY KEY, challenge_segments blob)"
+        )
+        self.conn.execute(
+            "CREATE TABLE coin_record("
+            "coin_name blob PRIMARY KEY,"
+            " confirmed_index bigint,"
+            " spent_index bigint,"
+            " coinbase int,"
+            " puzzle_hash blob,"
+            " coin_parent blob,"
+            " amount blob,"
+            " timestamp bigint)"
+        )
+        self.conn.execute("CREATE TABLE hints(coin_id blob, hint blob, UNIQUE (coin_id, hint))")
+        self.conn.execute("CREATE INDEX height on full_blocks(height)")
+        self.conn.execute("CREATE INDEX coin_confirmed_index on coin_record(confirmed_index)")
+        self.conn.execute("CREATE INDEX coin_spent_index on coin_record(spent_index)")
+        self.height = -1
+        self.peak_hash = bytes(32)
+        self.unspent: List[bytes] = []
+        # the blocks only differ in the hashes of their foliage, which make up their header hash
+        self.block_template: FullBlock = next(get_full_blocks())
+        self.add_blocks(1)
+
+    def rand_hash(self) -> bytes:
+        return self.rng.getrandbits(256).to_bytes(32, "big")
+
+    def add_blocks(self, count: int) -> None:
+        for _ in range(count):
+            self.height += 1
+            foliage = replace(
+                self.block_template.foliage,
+                prev_block_hash=bytes32(self.peak_hash),
+                reward_block_hash=bytes32(self.rand_hash()),
+            )
+            block = replace(self.block_template, foliage=foliage)
+            header_hash = block.header_hash
+            self.conn.execute(
+                "INSERT INTO full_blocks VALUES(?, ?, ?, ?, 0, 1, ?, ?)",
+                (
+                    header_hash,
+                    self.peak_hash,
+                    self.height,
+                    self.rand_hash() if self.height % 10 == 0 else None,
+                    zstd.compress(bytes(block)),
+                    self.rand_hash() + self.rand_hash(),
+                ),
+            )
+            if self.height % 5 == 0:
+                self.conn.execute("INSERT INTO sub_epoch_segments_v3 VALUES(?, ?)", (header_hash, self.rand_hash()))
+            for coinbase in [0, 1]:
+                coin_name = self.rand_hash()
+                self.conn.execute(
+                    "INSERT INTO coin_record VALUES(?, ?, 0, ?, ?, ?, ?, ?)",
+                    (coin_name, self.height, coinbase, self.rand_hash(), self.rand_hash(), bytes(8), self.height * 19),
+                )
+                self.conn.execute("INSERT INTO hints VALUES(?, ?)", (coin_name, self.rand_hash()))
+                self.unspent.append(coin_name)
+            spent = self.unspent.pop(self.rng.randrange(len(self.unspent)))
+            self.conn.execute("UPDATE coin_record SET spent_index=? WHERE coin_name=?", (self.height, spent))
+            self.conn.execute("INSERT OR REPLACE INTO current_peak VALUES(?, ?)", (0, header_hash))
+            self.peak_hash = header_hash
+        self.conn.commit()
+
+    def reorg(self, fork_height: int) -> None:
+        self.conn.execute("UPDATE full_blocks SET in_main_chain=0 WHERE height>?", (fork_height,))
+        self.conn.execute("DELETE FROM coin_record WHERE confirmed_index>?", (fork_height,))
+        self.conn.execute("UPDATE coin_record SET spent_index=0 WHERE spent_index>?", (fork_height,))
+        self.conn.commit()
+        self.unspent = [row[0] for row in self.conn.execute("SELECT coin_name FROM coin_record WHERE spent_index=0")]
+        self.unspent.sort()
+        self.height = fork_height
+        self.peak_hash = self.conn.execute(
+            "SELECT header_hash FROM full_blocks WHERE height=? AND in_main_chain=1", (fork_height,)
+        ).fetchone()[0]
@@ -758,6 +758,17 @@ respond_plots = harvester_protocol.RespondPlots(
     ["str"],
 )
 
+plot_sync_resume = harvester_protocol.PlotSyncResume(
+    harvester_protocol.PlotSyncIdentifier(
+        uint64(1667203296),
+        uint64(5301236745638283046),
+        uint64(2841094731),
+    ),
+    uint64(16245619374017214925),
+    uint32(3312862149),
+    bytes32(bytes.fromhex("824474bd2329bed29b935426ec00fd1000a3c85b541f198ce0dd9918c78a2838")),
+)
+
 ### INTRODUCER PROTOCOL
 request_peers_introducer = introducer_protocol.RequestPeersIntroducer()
 
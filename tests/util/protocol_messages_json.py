@@ -2091,6 +2091,13 @@ respond_plots_json: Dict[str, Any] = {
     "no_key_filenames": ["str"],
 }
 
+plot_sync_resume_json: Dict[str, Any] = {
+    "identifier": {"timestamp": 1667203296, "sync_id": 5301236745638283046, "message_id": 2841094731},
+    "last_sync_id": 16245619374017214925,
+    "plot_file_count": 3312862149,
+    "fingerprint": "0x824474bd2329bed29b935426ec00fd1000a3c85b541f198ce0dd9918c78a2838",
+}
+
 request_peers_introducer_json: Dict[str, Any] = {}
 
 respond_peers_introducer_json: Dict[str, Any] = {
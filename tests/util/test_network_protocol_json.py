@@ -163,6 +163,8 @@ def test_protocol_json() -> None:
     assert type(request_plots).from_json_dict(request_plots_json) == request_plots
     assert str(respond_plots_json) == str(respond_plots.to_json_dict())
     assert type(respond_plots).from_json_dict(respond_plots_json) == respond_plots
+    assert str(plot_sync_resume_json) == str(plot_sync_resume.to_json_dict())
+    assert type(plot_sync_resume).from_json_dict(plot_sync_resume_json) == plot_sync_resume
     assert str(request_peers_introducer_json) == str(request_peers_introducer.to_json_dict())
     assert type(request_peers_introducer).from_json_dict(request_peers_introducer_json) == request_peers_introducer
     assert str(respond_peers_introducer_json) == str(respond_peers_introducer.to_json_dict())
@@ -131,6 +131,7 @@ def test_missing_messages() -> None:
         "PlotSyncPathList",
         "PlotSyncPlotList",
         "PlotSyncResponse",
+        "PlotSyncResume",
         "PlotSyncStart",
         "PoolDifficulty",
         "RequestPlots",
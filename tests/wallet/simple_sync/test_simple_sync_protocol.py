@@ -105,7 +105,8 @@ class TestSimpleSyncProtocol:
                 data_response: CoinStateUpdate = CoinStateUpdate.from_bytes(message.data)
                 for coin_state in data_response.items:
                     notified_zero_coins.add(coin_state)
-                assert len(data_response.items) == 2  # 2 per height farmer / pool reward
+                # 2 per height farmer / pool reward, updates of close peaks can get merged
+                assert len(data_response.items) == 2 * len({state.created_height for state in data_response.items})
 
         assert all_zero_coin == notified_zero_coins
 
@@ -146,7 +147,8 @@ class TestSimpleSyncProtocol:
                 data_response: CoinStateUpdate = CoinStateUpdate.from_bytes(message.data)
                 for coin_state in data_response.items:
                     notified_all_coins.add(coin_state)
-                assert len(data_response.items) == 2  # 2 per height farmer / pool reward
+                # 2 per height farmer / pool reward, updates of close peaks can get merged
+                assert len(data_response.items) == 2 * len({state.created_height for state in data_response.items})
 
         assert all_coins == notified_all_coins
 